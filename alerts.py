@@ -8,13 +8,18 @@ Main improvements over previous:
    and a periodic suppressed-count summary per keyword.
  - Optional small grouping window (GROUP_WINDOW_SECS) to combine multiple keyword
    matches into a single short summary email if they occur within the window.
+ - Emails are queued in the durable outbox (mail_outbox) and return at once; its
+   worker keeps one SMTP login, retries with backoff, drops duplicates of queued
+   alerts and folds piled-up alerts into one digest. Nothing is lost on restart.
 """
 
-import os, time, sys, smtplib, ssl, json, errno
-from email.message import EmailMessage
+import os, time, sys, json, errno
 from datetime import datetime, timezone, timedelta
 from collections import deque, defaultdict
 
+import mail_outbox
+import mail_service
+
 # --- Config from env ---
 LOGFILE = os.getenv("LOGFILE", "va_daemon.log")
 ALERT_KEYWORDS = [
@@ -76,34 +81,14 @@ def write_offset(offset):
 
 
 def send_email(subject, body, to_addrs):
-    msg = EmailMessage()
-    msg["From"] = ALERT_FROM
-    msg["To"] = ", ".join(to_addrs)
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    attempt = 0
-    while attempt < MAX_EMAIL_RETRIES:
-        try:
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(SMTP_HOST,
-                                  SMTP_PORT,
-                                  context=context,
-                                  timeout=20) as smtp:
-                smtp.login(SMTP_USER, SMTP_PASS)
-                smtp.send_message(msg)
-            return True
-        except Exception as e:
-            attempt += 1
-            sleep_for = min(60, 2**attempt)
-            print(
-                f"[{datetime.now().isoformat()}] Email send failed (attempt {attempt}): {e}. Retrying in {sleep_for}s",
-                file=sys.stderr)
-            time.sleep(sleep_for)
-    print(
-        f"[{datetime.now().isoformat()}] Giving up after {MAX_EMAIL_RETRIES} attempts to send email.",
-        file=sys.stderr)
-    return False
+    """
+    Queue an alert email in the durable outbox without waiting on SMTP.
+    Returns the outbox row id, or None if the same alert is already queued.
+    """
+    outbox = mail_outbox.get_outbox(retries=MAX_EMAIL_RETRIES)
+    return outbox.alert(
+        mail_service.Account(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS),
+        ALERT_FROM, to_addrs, subject, body)
 
 
 def mk_subject(multi=False, kw=None, first_line=""):
@@ -270,14 +255,14 @@ def flush_group_buffer(group_buffer, context_buffer):
     parts.append(f"\nLogfile: {LOGFILE}\nTime: {datetime.now().isoformat()}\n")
 
     body = "\n".join(parts)
-    sent = send_email(subject, body, ALERT_TO)
-    if sent:
+    if send_email(subject, body, ALERT_TO):
         print(
-            f"[{datetime.now().isoformat()}] Sent grouped alert ({len(group_buffer)} matches) to {ALERT_TO}",
+            f"[{datetime.now().isoformat()}] Queued grouped alert ({len(group_buffer)} matches) for {ALERT_TO}",
             file=sys.stderr)
     else:
-        print(f"[{datetime.now().isoformat()}] Failed to send grouped alert.",
-              file=sys.stderr)
+        print(
+            f"[{datetime.now().isoformat()}] Same grouped alert already queued; not queued again.",
+            file=sys.stderr)
 
 
 if __name__ == "__main__":
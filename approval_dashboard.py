@@ -7,9 +7,11 @@ Then open http://127.0.0.1:3300/approvals
 
 from flask import Flask, render_template_string, redirect, url_for
 from security_guard_v2 import SecurityGuardV2
+from flask_metrics import instrument
 
 sg = SecurityGuardV2()
 app = Flask(__name__)
+instrument(app)
 
 HTML = """
 <!DOCTYPE html>
@@ -6,19 +6,30 @@ JRAVIS Cloud Backup System (Sub-Phase 1B – Safety Layer)
 Features:
 - Creates time-stamped backups every 6 hours
 - Keeps last 7 days (auto deletes older)
-- Compresses folders into .zip archives
-- Sends optional backup confirmation email
+- Incremental: each snapshot stores only new/changed content (backup_store)
+- Optional full .zip per run (BACKUP_ARCHIVE=1), compressed in parallel and
+  streamed from the sources (backup_archive)
+- Restore any snapshot by timestamp:
+    python3 backup_store.py --root cloud_backups --restore 2025-10-20_23 DEST
+- Sends optional backup confirmation email: changed/removed files with
+  sizes and SHA-256, the restore command, and the snapshot manifest / zip
+  attached only while they fit under BACKUP_ATTACH_MAX_MB (streamed from
+  disk by smtp_stream, so memory does not grow with the backup) over the
+  shared mail_service connection pool
 """
 
 import os
 import shutil
 import time
-import zipfile
 import schedule
 import pytz
-import smtplib
 from datetime import datetime, timedelta
-from email.message import EmailMessage
+
+import backup_archive
+import backup_store
+import mail_service
+import report_catalog
+import smtp_stream
 
 # ------------------------------------------
 # CONFIGURATION
@@ -35,7 +46,16 @@ SOURCE_DIRS = [
     os.path.join(os.getcwd(), "logs"),
 ]
 KEEP_DAYS = 7
+# catalogued reports/invoices newer than this are copied into each backup
+REPORT_LOOKBACK_DAYS = float(os.getenv("BACKUP_REPORT_DAYS", "1"))
+# also write a self-contained <timestamp>.zip next to the snapshots
+ARCHIVE_BACKUPS = os.getenv("BACKUP_ARCHIVE", "0") == "1"
 SEND_EMAIL_REPORT = True
+# attachments go along only while the encoded total stays under this
+# (Gmail refuses messages over 25 MB); 0 never attaches anything
+ATTACH_MAX_MB = float(os.getenv("BACKUP_ATTACH_MAX_MB", "20"))
+# changed files listed in the email body; the full list is in the manifest
+EMAIL_LIST_MAX = int(os.getenv("BACKUP_EMAIL_LIST_MAX", "200"))
 IST = pytz.timezone("Asia/Kolkata")
 
 
@@ -52,101 +72,145 @@ def ensure_dir(path):
         os.makedirs(path)
 
 
-def cleanup_old_backups():
-    """Delete backup folders older than KEEP_DAYS."""
+def cleanup_old_backups(store=None):
+    """Delete snapshots (and legacy folders/zips) older than KEEP_DAYS."""
     now = datetime.now()
     removed = 0
     for item in os.listdir(BACKUP_ROOT):
         full_path = os.path.join(BACKUP_ROOT, item)
-        if os.path.isdir(full_path):
-            try:
-                dt = datetime.strptime(item, "%Y-%m-%d_%H-%M")
-            except ValueError:
-                continue
-            if now - dt > timedelta(days=KEEP_DAYS):
+        try:
+            dt = datetime.strptime(item[:16], "%Y-%m-%d_%H-%M")
+        except ValueError:
+            continue
+        if now - dt > timedelta(days=KEEP_DAYS):
+            if os.path.isdir(full_path):
                 shutil.rmtree(full_path, ignore_errors=True)
-                removed += 1
+            else:
+                os.remove(full_path)
+            removed += 1
     if removed:
-        log(f"🧹 Cleaned up {removed} old backup folders.")
+        log(f"🧹 Cleaned up {removed} old full-copy backups.")
+    snaps, chunks = (store or backup_store.BackupStore(BACKUP_ROOT)).prune(
+        KEEP_DAYS)
+    if snaps or chunks:
+        log(f"🧹 Pruned {snaps} old snapshots, {chunks} unused chunks.")
 
 
 def zip_folder(folder_path, zip_path):
     """Compress folder to zip file."""
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                abs_path = os.path.join(root, file)
-                rel_path = os.path.relpath(abs_path, folder_path)
-                zipf.write(abs_path, rel_path)
-
-
-def send_backup_email(summary_text, zip_file_path=None):
-    """Optional: send email with summary and attached .zip file."""
+    folder_path = os.path.abspath(folder_path)
+    entries = [(rel.split("/", 1)[1], path)
+               for rel, path in backup_store.collect([folder_path])]
+    return backup_archive.write_archive(entries, zip_path)
+
+
+def change_report(store, snap):
+    """Email body lines for what a snapshot changed: path, size, SHA-256."""
+    manifest = store.load(snap.name)
+    files = {f["path"]: f for f in manifest["files"]}
+    lines = []
+    for title, paths in (("Changed", manifest["changed"]),
+                         ("Removed", manifest["removed"])):
+        if not paths:
+            continue
+        lines.append(f"{title} files ({len(paths)}):")
+        for rel in paths[:EMAIL_LIST_MAX]:
+            f = files.get(rel)  # None for removed paths
+            if f:
+                lines.append(f"  {rel}  {f['size']:,} bytes  sha256 "
+                             f"{f.get('sha256', '-')}")
+            else:
+                lines.append(f"  {rel}")
+        if len(paths) > EMAIL_LIST_MAX:
+            lines.append(f"  ... and {len(paths) - EMAIL_LIST_MAX} more "
+                         f"(see the manifest)")
+    return "\n".join(lines) or "No files changed since the last backup."
+
+
+def send_backup_email(summary_text, attachments=()):
+    """
+    Optional: send the summary by email. attachments (paths) are streamed
+    from disk, in order, as long as their encoded total fits under
+    ATTACH_MAX_MB; the others are only named in the body.
+    """
     if not SMTP_USER or not SMTP_PASS or not SEND_EMAIL_REPORT:
         log("📧 Email report skipped (config disabled or missing creds).")
         return
 
-    msg = EmailMessage()
-    msg["From"] = f"{SENDER_NAME} <{SMTP_USER}>"
-    msg["To"] = RECEIVER_EMAIL
-    msg["Subject"] = "JRAVIS Auto Backup Report"
-    msg.set_content(summary_text)
-
-    if zip_file_path and os.path.exists(zip_file_path):
-        with open(zip_file_path, "rb") as f:
-            msg.add_attachment(
-                f.read(),
-                maintype="application",
-                subtype="zip",
-                filename=os.path.basename(zip_file_path),
-            )
+    attached, skipped = [], []
+    room = ATTACH_MAX_MB * 1024 * 1024
+    for path in attachments:
+        if not path or not os.path.exists(path):
+            continue
+        size = smtp_stream.encoded_size(path)
+        if size <= room:
+            attached.append(path)
+            room -= size
+        else:
+            skipped.append(path)
+    if skipped:
+        summary_text += (f"\n\nNot attached (over the {ATTACH_MAX_MB:g} MB "
+                         f"cap, kept on the server):\n" +
+                         "\n".join(f"  {p}" for p in skipped))
 
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(SMTP_USER, SMTP_PASS)
-        smtp.send_message(msg)
+    svc = mail_service.get_service(
+        mail_service.Account("smtp.gmail.com", 465, SMTP_USER, SMTP_PASS))
+    svc.send(f"{SENDER_NAME} <{SMTP_USER}>", [RECEIVER_EMAIL],
+             "JRAVIS Auto Backup Report", summary_text, attached).result()
 
-    log("✅ Backup report email sent.")
+    log(f"✅ Backup report email sent ({len(attached)} attachment(s), "
+        f"{len(skipped)} over the cap).")
 
 
 # ------------------------------------------
 # CORE BACKUP ROUTINE
 # ------------------------------------------
 def perform_backup():
-    """Run full backup cycle."""
+    """Run one incremental backup cycle."""
     log("🚀 Starting JRAVIS auto backup...")
 
     now = datetime.now(IST)
-    timestamp = now.strftime("%Y-%m-%d_%H-%M")
-    backup_dir = os.path.join(BACKUP_ROOT, timestamp)
-    ensure_dir(backup_dir)
+    timestamp = now.strftime(backup_store.NAME_FORMAT)
+    store = backup_store.BackupStore(BACKUP_ROOT)
 
-    copied = []
+    dirs = []
     for src in SOURCE_DIRS:
         if os.path.exists(src):
-            dest = os.path.join(backup_dir, os.path.basename(src))
-            try:
-                shutil.copytree(src, dest)
-                copied.append(dest)
-                log(f"📦 Backed up: {src} → {dest}")
-            except Exception as e:
-                log(f"⚠️  Failed to backup {src}: {e}")
+            dirs.append(src)
         else:
             log(f"⚠️  Source not found: {src}")
+    reports = report_catalog.find_within(REPORT_LOOKBACK_DAYS)
+    entries = backup_store.collect(dirs, reports, prefix="reports/")
+
+    snap = store.snapshot(entries, name=timestamp)
+    log(f"📦 Snapshot {snap.name}: {snap.files} files "
+        f"({snap.total_bytes / 1e6:.1f} MB), {len(snap.changed)} changed, "
+        f"{snap.new_bytes / 1e6:.1f} MB new in {snap.seconds:.1f}s")
 
-    # Zip the backup for compact storage
-    zip_path = os.path.join(BACKUP_ROOT, f"{timestamp}.zip")
-    zip_folder(backup_dir, zip_path)
-    log(f"🗜  Compressed backup → {zip_path}")
+    zip_path = None
+    if ARCHIVE_BACKUPS:
+        zip_path = os.path.join(BACKUP_ROOT, f"{timestamp}.zip")
+        info = backup_archive.write_archive(entries, zip_path)
+        log(f"🗜  Compressed backup → {zip_path} ({info.bytes_out / 1e6:.1f} "
+            f"MB, {info.stored} files stored as-is, {info.seconds:.1f}s)")
 
-    cleanup_old_backups()
+    cleanup_old_backups(store)
 
     summary = (f"JRAVIS Auto Backup Completed ✅\n"
                f"Time: {timestamp}\n"
-               f"Backed up {len(copied)} folders.\n\n"
-               f"Files saved in: {zip_path}\n"
-               f"Old backups older than {KEEP_DAYS} days cleaned.")
-
-    send_backup_email(summary, zip_file_path=zip_path)
+               f"Backed up {len(dirs)} folders and {len(reports)} "
+               f"catalogued report(s): {snap.files} files, "
+               f"{snap.total_bytes / 1e6:.1f} MB.\n"
+               f"Changed since last backup: {len(snap.changed)} files, "
+               f"{snap.new_bytes / 1e6:.1f} MB stored.\n\n"
+               f"Snapshot: {snap.manifest}\n"
+               + (f"Archive: {zip_path}\n" if zip_path else "") +
+               f"Restore: python3 backup_store.py --root {BACKUP_ROOT} "
+               f"--restore {snap.name} DEST\n"
+               f"Old backups older than {KEEP_DAYS} days cleaned.\n\n"
+               + change_report(store, snap))
+
+    send_backup_email(summary, [snap.manifest, zip_path])
     log("🌇 Backup process completed.\n")
 
 
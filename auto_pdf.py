@@ -1,25 +1,32 @@
-import pdfkit
 import os
 import sys
 
-# Auto-detect wkhtmltopdf path on Replit
-wk_path = '/nix/store/hxiay4lkq4389vxnhnb3d0pbaw6siwkw-wkhtmltopdf/bin/wkhtmltopdf'
-if not os.path.exists(wk_path):
-    raise FileNotFoundError(f"wkhtmltopdf not found at {wk_path}")
+import html_pdf
 
-config = pdfkit.configuration(wkhtmltopdf=wk_path)
+# Fail early, as before, if wkhtmltopdf is missing (Replit path or PATH)
+html_pdf.find_wkhtmltopdf()
 
 
 def generate_pdf_from_html_string(html_string, output_file='output.pdf'):
-    pdfkit.from_string(html_string, output_file, configuration=config)
-    print(f"PDF generated successfully: {output_file}")
+    if html_pdf.from_string(html_string, output_file):
+        print(f"PDF generated successfully: {output_file}")
 
 
 def generate_pdf_from_file(html_file, output_file='output.pdf'):
-    if not os.path.exists(html_file):
-        raise FileNotFoundError(f"HTML file not found: {html_file}")
-    pdfkit.from_file(html_file, output_file, configuration=config)
-    print(f"PDF generated successfully: {output_file}")
+    if html_pdf.from_file(html_file, output_file):
+        print(f"PDF generated successfully: {output_file}")
+
+
+def generate_pdfs_from_files(pairs):
+    """(html_file, output_pdf) pairs, converted in shared wkhtmltopdf batches."""
+    for html_file, _ in pairs:
+        if not os.path.exists(html_file):
+            raise FileNotFoundError(f"HTML file not found: {html_file}")
+    results = html_pdf.render_many(pairs)
+    for output_file in results:
+        if output_file:
+            print(f"PDF generated successfully: {output_file}")
+    return results
 
 
 if __name__ == "__main__":
@@ -46,7 +53,6 @@ if __name__ == "__main__":
                 "Error: For multiple PDFs, provide pairs of [html_file output_pdf_name]"
             )
             sys.exit(1)
-        for i in range(0, len(args), 2):
-            html_file = args[i]
-            output_name = args[i + 1]
-            generate_pdf_from_file(html_file, output_file=output_name)
+        pairs = [(args[i], args[i + 1]) for i in range(0, len(args), 2)]
+        if not all(generate_pdfs_from_files(pairs)):
+            sys.exit(1)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+backup_archive.py
+Parallel, streaming .zip writer for JRAVIS backups.
+
+zipfile.ZipFile.write compresses one file at a time on one core, and the
+old backup zipped a full copytree of the sources. Here:
+
+  - files are compressed by WORKERS threads at once (zlib releases the GIL
+    while deflating), each into its own spool (memory up to SPOOL_MAX, then
+    a temp file), while the writer appends finished members in order;
+  - already-compressed types (backup_store.STORED_TYPES: PDF, zip, png...)
+    are stored, copied from disk straight into the archive in blocks, and
+    so is anything deflate did not shrink;
+  - members are read from the source paths directly, the output goes to
+    <out>.tmp and is renamed into place, nothing is staged.
+
+At most 2 x WORKERS files are in flight, so memory is bounded by the spools,
+not by the tree. The result is a plain zip (ZIP64 past 4 GB), readable by
+zipfile, unzip and Windows.
+
+    import backup_archive, backup_store
+    entries = backup_store.collect(["PDFs", "logs"])
+    info = backup_archive.write_archive(entries, "cloud_backups/now.zip")
+
+scripts/bench_archive.py reports wall time and CPU use against zipfile.
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from backup_store import collect, is_compressed
+
+WORKERS = int(os.getenv("BACKUP_ZIP_WORKERS", "0")) or os.cpu_count() or 1
+LEVEL = int(os.getenv("BACKUP_ZIP_LEVEL", "6"))
+SPOOL_MAX = 16 * 1024 * 1024
+BLOCK = 1024 * 1024
+
+STORED, DEFLATED = 0, 8
+ZIP64_LIMIT = 0xFFFFFFFF
+_LOCAL = struct.Struct("<4sHHHHHIIIHH")
+_CENTRAL = struct.Struct("<4sHHHHHHIIIHHHHHII")
+_END = struct.Struct("<4sHHHHIIH")
+_END64 = struct.Struct("<4sQHHIIQQQQ")
+_LOCATOR64 = struct.Struct("<4sIQI")
+_UTF8 = 0x800
+
+# one archive: members written, bytes read, bytes written, members stored
+# as-is, seconds
+Archive = namedtuple("Archive", "path files bytes_in bytes_out stored seconds")
+
+
+def _dos_time(mtime):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+def _deflate(path, level):
+    """(size, compressed size, crc, spool) of path deflated, or None if
+    deflate did not make it smaller."""
+    spool = tempfile.SpooledTemporaryFile(SPOOL_MAX)
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = size = 0
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(BLOCK), b""):
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+            spool.write(comp.compress(block))
+    spool.write(comp.flush())
+    csize = spool.tell()
+    if csize >= size:
+        spool.close()
+        return None
+    spool.seek(0)
+    return size, csize, crc, spool
+
+
+class _Writer:
+    """The zip container: local headers + data, then the central directory."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.central = []
+
+    def _local(self, name, method, dos, crc, csize, size, zip64):
+        extra = struct.pack("<HHQQ", 1, 16, size, csize) if zip64 else b""
+        if zip64:
+            csize = size = ZIP64_LIMIT
+        self.fh.write(_LOCAL.pack(b"PK\x03\x04", 45 if zip64 else 20, _UTF8,
+                                  method, dos[0], dos[1], crc, csize, size,
+                                  len(name), len(extra)))
+        self.fh.write(name)
+        self.fh.write(extra)
+
+    def add(self, arcname, st, method, crc, csize, size, copy):
+        """Write one member; copy(fh) writes its data and returns
+        (crc, csize, size) when they were not known up front."""
+        name = arcname.encode("utf-8")
+        dos = _dos_time(st.st_mtime)
+        offset = self.fh.tell()
+        zip64 = max(csize, size, st.st_size) * 1.05 > ZIP64_LIMIT
+        self._local(name, method, dos, crc, csize, size, zip64)
+        result = copy(self.fh)
+        if result:
+            # sizes/crc only known after streaming: patch the local header
+            crc, csize, size = result
+            end = self.fh.tell()
+            self.fh.seek(offset)
+            self._local(name, method, dos, crc, csize, size, zip64)
+            self.fh.seek(end)
+        self.central.append((name, method, dos, crc, csize, size, offset,
+                             st.st_mode))
+
+    def close(self):
+        start = self.fh.tell()
+        for name, method, dos, crc, csize, size, offset, mode in self.central:
+            big = max(csize, size, offset) >= ZIP64_LIMIT
+            extra = (struct.pack("<HHQQQ", 1, 24, size, csize, offset)
+                     if big else b"")
+            if big:
+                csize = size = offset = ZIP64_LIMIT
+            self.fh.write(_CENTRAL.pack(
+                b"PK\x01\x02", (3 << 8) | 45, 45 if big else 20, _UTF8,
+                method, dos[0], dos[1], crc, csize, size, len(name),
+                len(extra), 0, 0, 0, (mode & 0xFFFF) << 16, offset))
+            self.fh.write(name)
+            self.fh.write(extra)
+        end = self.fh.tell()
+        count, size = len(self.central), end - start
+        if count >= 0xFFFF or start >= ZIP64_LIMIT or size >= ZIP64_LIMIT:
+            self.fh.write(_END64.pack(b"PK\x06\x06", 44, (3 << 8) | 45, 45,
+                                      0, 0, count, count, size, start))
+            self.fh.write(_LOCATOR64.pack(b"PK\x06\x07", 0, end, 1))
+            count, size, start = (min(count, 0xFFFF), min(size, ZIP64_LIMIT),
+                                  min(start, ZIP64_LIMIT))
+        self.fh.write(_END.pack(b"PK\x05\x06", 0, 0, count, count, size,
+                                start, 0))
+
+
+def _copy_raw(src):
+    def copy(out):
+        crc = size = 0
+        for block in iter(lambda: src.read(BLOCK), b""):
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+            out.write(block)
+        return crc, size, size
+    return copy
+
+
+def _copy_spool(spool):
+    def copy(out):
+        with spool:
+            for block in iter(lambda: spool.read(BLOCK), b""):
+                out.write(block)
+    return copy
+
+
+def write_archive(entries, out_path, workers=None, level=None):
+    """
+    Zip [(archive name, path)] into out_path; returns an Archive. Files that
+    vanish meanwhile are skipped.
+    """
+    t = time.perf_counter()
+    workers = workers or WORKERS
+    level = LEVEL if level is None else level
+    tmp = f"{out_path}.tmp"
+    files = stored = bytes_in = 0
+    pending = deque()
+    entries = iter(entries)
+
+    def submit(pool):
+        for arcname, path in entries:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            job = (None if is_compressed(path) or not st.st_size
+                   else pool.submit(_deflate, path, level))
+            pending.append((arcname, path, st, job))
+            return True
+        return False
+
+    try:
+        with ThreadPoolExecutor(workers) as pool, open(tmp, "wb") as fh:
+            writer = _Writer(fh)
+            while len(pending) < 2 * workers and submit(pool):
+                pass
+            while pending:
+                arcname, path, st, job = pending.popleft()
+                submit(pool)
+                try:
+                    result = job.result() if job else None
+                    if result:
+                        size, csize, crc, spool = result
+                        writer.add(arcname, st, DEFLATED, crc, csize, size,
+                                   _copy_spool(spool))
+                    else:
+                        # opened first: a vanished file is skipped before
+                        # its header is written
+                        with open(path, "rb") as src:
+                            writer.add(arcname, st, STORED, 0, 0, 0,
+                                       _copy_raw(src))
+                        stored += 1
+                        size = st.st_size
+                except FileNotFoundError:
+                    continue
+                files += 1
+                bytes_in += size
+            writer.close()
+            bytes_out = fh.tell()
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return Archive(out_path, files, bytes_in, bytes_out, stored,
+                   time.perf_counter() - t)
+
+
+def archive_dirs(dirs, out_path, files=(), prefix="", **kw):
+    """write_archive over backup_store.collect(dirs, files, prefix)."""
+    return write_archive(collect(dirs, files, prefix), out_path, **kw)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python3 backup_archive.py OUT.zip DIR [DIR ...]")
+        sys.exit(1)
+    info = archive_dirs(sys.argv[2:], sys.argv[1])
+    print(f"{info.path}: {info.files} files, {info.bytes_in / 1e6:.1f} MB -> "
+          f"{info.bytes_out / 1e6:.1f} MB in {info.seconds:.2f}s "
+          f"({info.stored} stored)")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+backup_store.py
+Content-addressed, incremental backups for auto_backup_cloud.
+
+Every snapshot used to be a full copytree of PDFs/, backups/ and logs/ plus
+a zip of that copy. Here files are cut into CHUNK_SIZE pieces, each piece is
+stored once under its SHA-256, and a snapshot is only a small JSON manifest
+(path, size, mtime, file SHA-256, chunk hashes) under snapshots/:
+
+  BACKUP_ROOT/chunks/<h[:2]>/<sha256>      one per unique chunk; zlib'd
+                                           unless the type is already
+                                           compressed (STORED_TYPES)
+  BACKUP_ROOT/snapshots/<name>.json        one per snapshot
+
+A file whose size and mtime match the previous snapshot is not even read:
+its chunk list is carried over. So a snapshot costs time and disk in
+proportion to what changed since the last one, not to the total size.
+Appends to logs touch only their last chunk.
+
+    store = backup_store.BackupStore("cloud_backups")
+    snap = store.snapshot(backup_store.collect(["PDFs", "logs"]))
+    store.restore("2025-10-20_23", "/tmp/restore")   # latest at/before
+    store.prune(keep_days=7)                          # + drops loose chunks
+
+  python3 backup_store.py --root cloud_backups --list
+  python3 backup_store.py --root cloud_backups --restore 2025-10-20 DEST
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+CHUNK_SIZE = int(os.getenv("BACKUP_CHUNK_SIZE", str(1024 * 1024)))
+NAME_FORMAT = "%Y-%m-%d_%H-%M-%S"
+# already compressed: zlib would only cost time
+STORED_TYPES = {".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z",
+                ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp3", ".mp4",
+                ".docx", ".xlsx", ".pptx"}
+
+# one snapshot's outcome: files in it, paths new or changed since the last
+# one, bytes read/hashed, bytes newly written to chunks/
+Snapshot = namedtuple(
+    "Snapshot", "name manifest files changed total_bytes read_bytes "
+    "new_bytes seconds")
+
+
+def is_compressed(path):
+    return os.path.splitext(path)[1].lower() in STORED_TYPES
+
+
+def collect(dirs, files=(), prefix=""):
+    """
+    [(relative path, absolute path)] for every file under `dirs` (relative
+    to each dir's parent, e.g. "logs/app.log") plus single `files`, which
+    go under `prefix` ("reports/x.pdf").
+    """
+    out = []
+    for d in dirs:
+        d = os.path.abspath(d)
+        base = os.path.dirname(d)
+        for root, subdirs, names in os.walk(d):
+            subdirs.sort()
+            for n in sorted(names):
+                p = os.path.join(root, n)
+                if os.path.isfile(p) and not os.path.islink(p):
+                    out.append((os.path.relpath(p, base).replace(os.sep, "/"),
+                                p))
+    for p in files:
+        out.append((f"{prefix}{os.path.basename(p)}", os.path.abspath(p)))
+    return out
+
+
+class BackupStore:
+
+    def __init__(self, root):
+        self.root = root
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.snap_dir = os.path.join(root, "snapshots")
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.snap_dir, exist_ok=True)
+
+    # ---------- chunks ----------
+    def _chunk_path(self, h):
+        return os.path.join(self.chunk_dir, h[:2], h)
+
+    def has_chunk(self, h):
+        return os.path.exists(self._chunk_path(h))
+
+    def _put_chunk(self, h, data, compress):
+        """Store a chunk if new; returns bytes written."""
+        path = self._chunk_path(h)
+        if os.path.exists(path):
+            return 0
+        blob = b"-" + data
+        if compress:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                blob = b"z" + packed
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(blob)
+        os.replace(tmp, path)
+        return len(blob)
+
+    def read_chunk(self, h):
+        with open(self._chunk_path(h), "rb") as fh:
+            blob = fh.read()
+        data = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+        if hashlib.sha256(data).hexdigest() != h:
+            raise ValueError(f"chunk {h} is corrupt")
+        return data
+
+    # ---------- snapshots ----------
+    def snapshots(self):
+        """Snapshot names, oldest first."""
+        return sorted(n[:-5] for n in os.listdir(self.snap_dir)
+                      if n.endswith(".json"))
+
+    def load(self, name):
+        with open(os.path.join(self.snap_dir, f"{name}.json"),
+                  encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def resolve(self, when=None):
+        """Name of the latest snapshot at or before `when` (a name or a
+        prefix of one, e.g. "2025-10-20" or "2025-10-20_23"; None: latest)."""
+        names = self.snapshots()
+        if when:
+            when = str(when)
+            names = [n for n in names if n[:len(when)] <= when]
+        if not names:
+            raise LookupError(f"no snapshot at or before {when or 'now'}")
+        return names[-1]
+
+    def snapshot(self, entries, name=None):
+        """Back up [(relative path, absolute path)]; returns a Snapshot."""
+        t = time.perf_counter()
+        name = name or datetime.now().strftime(NAME_FORMAT)
+        previous = {}
+        if self.snapshots():
+            previous = {f["path"]: f for f in self.load(self.resolve())["files"]}
+
+        files, changed = [], []
+        total = read = new = 0
+        for rel, path in entries:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            total += st.st_size
+            old = previous.get(rel)
+            if (old and old["size"] == st.st_size
+                    and old["mtime_ns"] == st.st_mtime_ns
+                    and all(self.has_chunk(h) for h in old["chunks"])):
+                files.append(old)
+                continue
+            compress = not is_compressed(path)
+            chunks = []
+            whole = hashlib.sha256()
+            try:
+                with open(path, "rb") as fh:
+                    for data in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                        h = hashlib.sha256(data).hexdigest()
+                        new += self._put_chunk(h, data, compress)
+                        read += len(data)
+                        whole.update(data)
+                        chunks.append(h)
+            except OSError as e:
+                print(f"[Backup] skipped {path}: {e}")
+                continue
+            entry = {"path": rel, "size": st.st_size,
+                     "mtime_ns": st.st_mtime_ns, "mode": st.st_mode & 0o7777,
+                     "sha256": whole.hexdigest(), "chunks": chunks}
+            if old is None or old["chunks"] != chunks:
+                changed.append(rel)
+            files.append(entry)
+
+        manifest = {"name": name, "created": time.time(), "files": files,
+                    "changed": changed,
+                    "removed": sorted(set(previous) -
+                                      {f["path"] for f in files})}
+        path = os.path.join(self.snap_dir, f"{name}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, separators=(",", ":"))
+        os.replace(tmp, path)  # the snapshot exists once this lands
+        return Snapshot(name, path, len(files), changed, total, read, new,
+                        time.perf_counter() - t)
+
+    def restore(self, when, dest, prefix=None):
+        """
+        Write the snapshot at/before `when` under dest (only paths starting
+        with `prefix`, if given); returns the paths written.
+        """
+        manifest = self.load(self.resolve(when))
+        written = []
+        for f in manifest["files"]:
+            if prefix and not f["path"].startswith(prefix):
+                continue
+            out = os.path.join(dest, *f["path"].split("/"))
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, "wb") as fh:
+                for h in f["chunks"]:
+                    fh.write(self.read_chunk(h))
+            os.chmod(out, f["mode"])
+            os.utime(out, ns=(f["mtime_ns"], f["mtime_ns"]))
+            written.append(out)
+        return written
+
+    def prune(self, keep_days):
+        """Drop snapshots older than keep_days (never the latest), then
+        unreferenced chunks. Returns (snapshots removed, chunks removed)."""
+        cutoff = time.time() - keep_days * 86400
+        names = self.snapshots()
+        removed = 0
+        for name in names[:-1]:
+            if self.load(name).get("created", 0) < cutoff:
+                os.remove(os.path.join(self.snap_dir, f"{name}.json"))
+                removed += 1
+        return removed, self.gc()
+
+    def gc(self):
+        """Delete chunks no snapshot refers to; returns how many."""
+        live = set()
+        for name in self.snapshots():
+            for f in self.load(name)["files"]:
+                live.update(f["chunks"])
+        removed = 0
+        for sub in os.listdir(self.chunk_dir):
+            folder = os.path.join(self.chunk_dir, sub)
+            for h in os.listdir(folder):
+                if h not in live:
+                    os.remove(os.path.join(folder, h))
+                    removed += 1
+        return removed
+
+    def disk_usage(self):
+        """Bytes under chunks/ and snapshots/."""
+        total = 0
+        for d in (self.chunk_dir, self.snap_dir):
+            for root, _, names in os.walk(d):
+                total += sum(os.path.getsize(os.path.join(root, n))
+                             for n in names)
+        return total
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="JRAVIS incremental backups")
+    p.add_argument("--root", default="cloud_backups")
+    p.add_argument("--snapshot", nargs="+", metavar="DIR",
+                   help="back up these directories")
+    p.add_argument("--list", action="store_true")
+    p.add_argument("--restore", nargs=2, metavar=("WHEN", "DEST"),
+                   help="restore the snapshot at/before WHEN into DEST")
+    p.add_argument("--prune", type=float, metavar="DAYS")
+    args = p.parse_args(argv)
+
+    store = BackupStore(args.root)
+    if args.snapshot:
+        snap = store.snapshot(collect(args.snapshot))
+        print(f"{snap.name}: {snap.files} files, {len(snap.changed)} changed, "
+              f"{snap.new_bytes / 1e6:.1f} MB new, {snap.seconds:.2f} s")
+    if args.list:
+        for name in store.snapshots():
+            m = store.load(name)
+            size = sum(f["size"] for f in m["files"])
+            print(f"{name}  {len(m['files']):6d} files  {size / 1e6:9.1f} MB"
+                  f"  {len(m['changed']):5d} changed")
+        print(f"store: {store.disk_usage() / 1e6:.1f} MB on disk")
+    if args.restore:
+        written = store.restore(args.restore[0], args.restore[1])
+        print(f"Restored {len(written)} files into {args.restore[1]}")
+    if args.prune is not None:
+        snaps, chunks = store.prune(args.prune)
+        print(f"Pruned {snaps} snapshots, {chunks} chunks")
+    if not (args.snapshot or args.list or args.restore
+            or args.prune is not None):
+        p.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
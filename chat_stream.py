@@ -0,0 +1,105 @@
+# chat_stream.py
+"""
+Bounded worker pool for slow (LLM-backed) chat replies, streamed over SSE.
+
+The request thread only submits the job and returns a stream URL; the reply
+is produced on a fixed-size pool and pushed to the browser token by token.
+When every slot is busy, submit() returns None and the caller answers with
+its local rule-based reply instead of queueing behind the LLM.
+
+Usage:
+    REPLY_STREAMS = ReplyStreams(max_workers=4)
+
+    job_id = REPLY_STREAMS.submit(lambda: openai_stream(msg),
+                                  fallback=lambda: local_reply(msg),
+                                  on_done=save_reply)
+    ...
+    return Response(REPLY_STREAMS.sse(job_id), mimetype="text/event-stream")
+"""
+
+import json
+import queue
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+class ReplyStreams:
+
+    def __init__(self, max_workers=4, max_pending=None, ttl=300,
+                 heartbeat=15):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="chat-reply")
+        # running + waiting jobs; beyond this callers fall back to local replies
+        self._slots = threading.BoundedSemaphore(max_pending
+                                                 or max_workers * 2)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+
+    def submit(self, produce, fallback=None, on_done=None):
+        """
+        Run produce() (an iterable of text chunks) on the pool.
+        Returns a job id for sse(), or None when the pool is saturated.
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        job_id = uuid.uuid4().hex
+        q = queue.Queue()
+        with self._lock:
+            self._purge()
+            self._jobs[job_id] = (q, time.time())
+        self._pool.submit(self._run, q, produce, fallback, on_done)
+        return job_id
+
+    def _run(self, q, produce, fallback, on_done):
+        parts = []
+        try:
+            for chunk in produce():
+                if chunk:
+                    parts.append(chunk)
+                    q.put(chunk)
+        except Exception:
+            traceback.print_exc()
+        try:
+            if not parts and fallback:
+                text = fallback()
+                parts.append(text)
+                q.put(text)
+            if on_done:
+                on_done("".join(parts))
+        except Exception:
+            traceback.print_exc()
+        finally:
+            q.put((_DONE, "".join(parts)))
+            self._slots.release()
+
+    def _purge(self):
+        # drop jobs nobody connected to; their workers still finish normally
+        cutoff = time.time() - self.ttl
+        for job_id in [k for k, (_, ts) in self._jobs.items() if ts < cutoff]:
+            del self._jobs[job_id]
+
+    def sse(self, job_id):
+        """Generator of SSE frames: `token` events, then one `done` event."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'unknown stream'})}\n\n"
+            return
+        q = job[0]
+        while True:
+            try:
+                item = q.get(timeout=self.heartbeat)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if isinstance(item, tuple) and item[0] is _DONE:
+                yield f"event: done\ndata: {json.dumps({'reply': item[1]})}\n\n"
+                return
+            yield f"event: token\ndata: {json.dumps({'t': item})}\n\n"
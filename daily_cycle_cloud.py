@@ -1,12 +1,13 @@
 import os
-import smtplib
 import schedule
 import time
 import pytz
 from datetime import datetime
-from fpdf import FPDF
-from email.message import EmailMessage
-from PyPDF2 import PdfReader, PdfWriter
+
+import mail_service
+import pdf_render
+import report_cache
+from report_engine import Job, get_engine
 
 # ============================================================
 #  JRAVIS CLOUD – DAILY REPORT ENGINE (UTF-8 + LOCK SAFE)
@@ -23,90 +24,74 @@ DAILY_INVOICE_FILE = "daily_invoices.pdf"
 
 
 # ============================================================
-#  PDF GENERATION
+#  PDF GENERATION (shared templates, see pdf_render)
 # ============================================================
-class UTF8FPDF(FPDF):
-
-    def __init__(self):
-        super().__init__()
-        self.core_fonts_encoding = "utf-8"
+def render_daily_report(out_path, password=None):
+    return pdf_render.render(
+        "summary",
+        out_path,
+        password,
+        title="JRAVIS Daily Summary Report",
+        subtitle=f"Date: {datetime.now(IST).strftime('%Y-%m-%d')}",
+        lines=[
+            "✅ Summary of JRAVIS operations for the day.",
+            "- System check: OK",
+            "- Automations: Active",
+            "- Tasks completed successfully.",
+            "- No errors logged.",
+        ])
+
+
+def render_daily_invoice(out_path):
+    return pdf_render.render(
+        "summary",
+        out_path,
+        title="JRAVIS Daily Invoice Summary",
+        subtitle=f"Date: {datetime.now(IST).strftime('%Y-%m-%d')}",
+        lines=[
+            "💰 Invoice 001 — Passive Stream #1",
+            "💰 Invoice 002 — Passive Stream #2",
+            "",
+            "All transactions verified by JRAVIS Cloud Engine.",
+        ])
+
+
+def daily_jobs():
+    """Summary (locked when LOCK_CODE is set) and invoices as report_engine jobs."""
+    # the content only changes with the date, so re-runs on the same day are
+    # served from report_cache
+    key = report_cache.key(datetime.now(IST).strftime('%Y-%m-%d'),
+                           pdf_render.TEMPLATE_VERSION)
+    return [
+        Job(render_daily_report, (),
+            DAILY_REPORT_FILE,
+            password=LOCK_CODE,
+            locked_path=DAILY_REPORT_FILE.replace(".pdf", "_locked.pdf"),
+            kind="report",
+            cache_key=key),
+        Job(render_daily_invoice, (),
+            DAILY_INVOICE_FILE,
+            kind="invoice",
+            cache_key=key),
+    ]
 
 
 def generate_daily_report():
-    pdf = UTF8FPDF()
-    pdf.add_page()
-    pdf.set_font("Helvetica", "", 14)
-    pdf.cell(200, 10, txt="JRAVIS Daily Summary Report", ln=True, align="C")
-    pdf.set_font("Helvetica", "", 11)
-    pdf.cell(200,
-             10,
-             txt=f"Date: {datetime.now(IST).strftime('%Y-%m-%d')}",
-             ln=True)
-    pdf.multi_cell(0,
-                   10,
-                   txt="✅ Summary of JRAVIS operations for the day.\n"
-                   "- System check: OK\n"
-                   "- Automations: Active\n"
-                   "- Tasks completed successfully.\n"
-                   "- No errors logged.")
-    pdf.output(DAILY_REPORT_FILE)
-
-    # Encrypt summary if LOCK_CODE exists
-    if LOCK_CODE:
-        writer = PdfWriter()
-        reader = PdfReader(DAILY_REPORT_FILE)
-        for page in reader.pages:
-            writer.add_page(page)
-        writer.encrypt(LOCK_CODE)
-        encrypted_name = DAILY_REPORT_FILE.replace(".pdf", "_locked.pdf")
-        with open(encrypted_name, "wb") as f:
-            writer.write(f)
-        os.remove(DAILY_REPORT_FILE)
-        return encrypted_name
-    return DAILY_REPORT_FILE
+    return get_engine().run(daily_jobs()[:1])[0]
 
 
 def generate_daily_invoice():
-    pdf = UTF8FPDF()
-    pdf.add_page()
-    pdf.set_font("Helvetica", "", 14)
-    pdf.cell(200, 10, txt="JRAVIS Daily Invoice Summary", ln=True, align="C")
-    pdf.set_font("Helvetica", "", 11)
-    pdf.cell(200,
-             10,
-             txt=f"Date: {datetime.now(IST).strftime('%Y-%m-%d')}",
-             ln=True)
-    pdf.multi_cell(0,
-                   10,
-                   txt="💰 Invoice 001 — Passive Stream #1\n"
-                   "💰 Invoice 002 — Passive Stream #2\n"
-                   "\nAll transactions verified by JRAVIS Cloud Engine.")
-    pdf.output(DAILY_INVOICE_FILE)
-    return DAILY_INVOICE_FILE
+    return get_engine().run(daily_jobs()[1:])[0]
 
 
 # ============================================================
 #  EMAIL SENDER
 # ============================================================
 def send_email_with_attachments(subject, body, attachments):
-    msg = EmailMessage()
-    msg["From"] = f"JRAVIS BOT <{SENDER_EMAIL}>"
-    msg["To"] = RECEIVER_EMAIL
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    for file_path in attachments:
-        if os.path.exists(file_path):
-            with open(file_path, "rb") as f:
-                data = f.read()
-            msg.add_attachment(data,
-                               maintype="application",
-                               subtype="pdf",
-                               filename=os.path.basename(file_path))
-
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(SENDER_EMAIL, SENDER_PASS)
-        smtp.send_message(msg)
+    svc = mail_service.get_service(
+        mail_service.Account("smtp.gmail.com", 465, SENDER_EMAIL, SENDER_PASS))
+    svc.send(f"JRAVIS BOT <{SENDER_EMAIL}>", [RECEIVER_EMAIL], subject, body,
+             [p for p in attachments if os.path.exists(p)]).result()
 
     print(f"✅ Email sent successfully to {RECEIVER_EMAIL}")
 
@@ -116,8 +101,9 @@ def send_email_with_attachments(subject, body, attachments):
 # ============================================================
 def run_daily_cycle():
     print("\n🌅 JRAVIS Daily Cycle Started...")
-    report_file = generate_daily_report()
-    invoice_file = generate_daily_invoice()
+    # both documents render in parallel; the summary is locked as soon as
+    # it is ready
+    report_file, invoice_file = get_engine().run(daily_jobs())
 
     send_email_with_attachments(
         subject=
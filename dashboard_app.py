@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, jsonify, render_template
 import os, datetime, subprocess, json
+from page_cache import install_pages
 
 app = Flask(__name__)
 
@@ -96,17 +97,19 @@ MAIN_HTML = """
 </html>
 """
 
+install_pages(app, {"main.html": MAIN_HTML})
+
 
 # ------------------------------
 # Routes
 # ------------------------------
 @app.route("/")
 def dashboard():
-    return render_template_string(MAIN_HTML,
-                                  earn_inr=str(CURRENT_EARNINGS_INR),
-                                  earn_usd=str(CURRENT_EARNINGS_USD),
-                                  progress_percent=PROGRESS_PERCENT,
-                                  phases=PHASES)
+    return render_template("main.html",
+                           earn_inr=str(CURRENT_EARNINGS_INR),
+                           earn_usd=str(CURRENT_EARNINGS_USD),
+                           progress_percent=PROGRESS_PERCENT,
+                           phases=PHASES)
 
 
 @app.route("/health")
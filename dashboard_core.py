@@ -15,7 +15,10 @@ import sqlite3
 import json
 import time
 from datetime import datetime
-from flask import Flask, request, redirect, session, render_template_string, jsonify, Response
+from flask import Flask, request, redirect, session, render_template, jsonify, Response
+from page_cache import install_pages
+from read_model import snapshot
+from flask_metrics import instrument, db_timer
 
 # ---------- CONFIG ----------
 LOCK_CODE = os.getenv("LOCK_CODE", "LakshyaSecureCode@2040")
@@ -26,6 +29,7 @@ REFRESH_SECONDS = 15
 
 app = Flask(__name__)
 app.secret_key = FLASK_SECRET
+instrument(app)
 
 
 # ---------- DB INIT ----------
@@ -59,70 +63,16 @@ def init_db():
 init_db()
 
 
-# ---------- HELPERS ----------
-def read_orders_summary():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*), IFNULL(SUM(amount),0) FROM orders")
-    total_orders, total_revenue = c.fetchone()
-    c.execute("SELECT * FROM orders ORDER BY created_at DESC LIMIT 20")
-    recent = c.fetchall()
-    conn.close()
-    return int(total_orders or 0), float(total_revenue or 0.0), recent
-
-
-def read_phase1_metrics():
-    """Return systems list and last_sync from phase1 DB (if available)."""
-    if not os.path.exists(PHASE1_DB):
-        return [], None
-    conn = sqlite3.connect(PHASE1_DB)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    try:
-        q = """SELECT t.system_id, t.payload, el.status, el.timestamp
-               FROM exec_log el
-               LEFT JOIN tasks t ON el.task_id = t.id
-               ORDER BY el.timestamp DESC
-               LIMIT 1000"""
-        c.execute(q)
-        rows = c.fetchall()
-    except Exception:
-        conn.close()
-        return [], None
-
-    agg = {}
-    last_sync = None
-    for r in rows:
-        payload_raw = r["payload"] or "{}"
-        try:
-            payload = json.loads(payload_raw)
-            sys_name = payload.get(
-                "system",
-                {}).get("name") or f"system-{r['system_id'] or 'unknown'}"
-        except Exception:
-            sys_name = f"system-{r['system_id'] or 'unknown'}"
-        if sys_name not in agg:
-            agg[sys_name] = {"success": 0, "failure": 0, "last_success": None}
-        if r["status"] and r["status"].lower().startswith("success"):
-            agg[sys_name]["success"] += 1
-            agg[sys_name]["last_success"] = agg[sys_name]["last_success"] or r[
-                "timestamp"]
-            last_sync = last_sync or r["timestamp"]
-        else:
-            agg[sys_name]["failure"] += 1
-            last_sync = last_sync or r["timestamp"]
-
-    conn.close()
-    systems = [{"name": k, **v} for k, v in agg.items()]
-    systems = sorted(systems, key=lambda x: (-x["success"], x["name"]))
-    return systems, last_sync
-
-
 # ---------- API: live JSON ----------
 @app.route("/api/live")
 def api_live():
-    total_orders, total_revenue, recent = read_orders_summary()
-    systems, last_sync = read_phase1_metrics()
+    # orders + phase1 exec_log aggregates come from the shared read model,
+    # so this endpoint does no disk reads of its own
+    snap = snapshot()
+    orders = snap.get("orders", {})
+    total_orders = orders.get("count", 0)
+    total_revenue = float(orders.get("revenue", 0.0))
+    systems, last_sync = snap.get("systems", []), snap.get("last_sync")
     # progress example toward monthly target - customizable via env
     try:
         target = float(os.getenv("MONTHLY_TARGET", "100000"))
@@ -140,13 +90,8 @@ def api_live():
         target,
         "systems":
         systems,
-        "recent_orders": [{
-            "id": r[0],
-            "stream": r[1],
-            "amount": r[2],
-            "currency": r[3],
-            "created_at": r[4]
-        } for r in recent],
+        "recent_orders":
+        orders.get("recent", []),
         "last_sync":
         last_sync
     })
@@ -236,18 +181,15 @@ def api_chat():
     message = (data.get("message") or "").strip()
     if not message:
         return jsonify({"error": "empty"}), 400
-    # store user message
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO chat (sender, message) VALUES (?, ?)",
-              ("user", message))
-    uid = c.lastrowid
-    conn.commit()
-    # craft reply
+    # rule-based reply is instant, so store message + reply in one transaction
     reply = jravis_simple_reply(message)
-    c.execute("UPDATE chat SET reply=? WHERE id=?", (reply, uid))
-    conn.commit()
-    conn.close()
+    with db_timer():
+        conn = sqlite3.connect(DB_PATH)
+        with conn:
+            conn.execute(
+                "INSERT INTO chat (sender, message, reply) VALUES (?, ?, ?)",
+                ("user", message, reply))
+        conn.close()
     # also emit a small exec_log-like event into phase1 DB if exists (non-destructive)
     try:
         if os.path.exists(PHASE1_DB):
@@ -500,6 +442,19 @@ window.onload = init;
 """
 
 
+UNLOCK_HTML = """
+      <html><body style="background:#030712;color:#e6fbff;font-family:Inter,Arial;text-align:center;padding-top:120px;">
+        <h2 style="color:#00ff88">🔒 JRAVIS Dashboard Locked</h2>
+        <form method="post">
+          <input name="code" type="password" placeholder="Enter lock code" style="padding:10px;border-radius:6px;background:#071021;color:white;border:1px solid #0f2430" />
+          <button style="padding:10px 16px;margin-left:8px;background:#00ff88;border-radius:6px;color:black;border:none">Unlock</button>
+        </form>
+      </body></html>
+"""
+
+install_pages(app, {"index.html": FRONTEND, "unlock.html": UNLOCK_HTML})
+
+
 # ---------- Test insert order API ----------
 @app.route("/api/test_insert_order", methods=["POST"])
 def api_test_insert_order():
@@ -507,12 +462,13 @@ def api_test_insert_order():
     if not session.get("unlocked"):
         return jsonify({"error": "locked"}), 401
     amount = float(os.getenv("TEST_ORDER_AMOUNT", "1200"))
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO orders (stream, amount) VALUES (?, ?)",
-              ("Test Stream", amount))
-    conn.commit()
-    conn.close()
+    with db_timer():
+        conn = sqlite3.connect(DB_PATH)
+        c = conn.cursor()
+        c.execute("INSERT INTO orders (stream, amount) VALUES (?, ?)",
+                  ("Test Stream", amount))
+        conn.commit()
+        conn.close()
     return jsonify({"ok": True, "amount": amount})
 
 
@@ -524,7 +480,8 @@ def require_unlock():
                       "feed_stream", "api_live", "api_chat")
     # allow static-like endpoints (none served separately here)
     if request.endpoint in ("unlock", "health", "api_live", "feed_stream",
-                            "api_chat", "api_test_insert_order", "api_live"):
+                            "api_chat", "api_test_insert_order", "api_live",
+                            "page_assets", "flask_metrics"):
         return None
     if not session.get("unlocked"):
         return redirect("/unlock")
@@ -541,15 +498,7 @@ def unlock():
             return redirect("/")
         return ("", 401)
     # return minimal form to be posted by JS (we also accept application/x-www-form-urlencoded)
-    return render_template_string("""
-      <html><body style="background:#030712;color:#e6fbff;font-family:Inter,Arial;text-align:center;padding-top:120px;">
-        <h2 style="color:#00ff88">🔒 JRAVIS Dashboard Locked</h2>
-        <form method="post">
-          <input name="code" type="password" placeholder="Enter lock code" style="padding:10px;border-radius:6px;background:#071021;color:white;border:1px solid #0f2430" />
-          <button style="padding:10px 16px;margin-left:8px;background:#00ff88;border-radius:6px;color:black;border:none">Unlock</button>
-        </form>
-      </body></html>
-    """)
+    return render_template("unlock.html")
 
 
 @app.route("/lockout")
@@ -566,7 +515,7 @@ def health():
 @app.route("/")
 def root():
     # serve the SPA frontend; client will POST to /unlock to unlock
-    return render_template_string(FRONTEND, refresh=REFRESH_SECONDS)
+    return render_template("index.html", refresh=REFRESH_SECONDS)
 
 
 # ---------- BOOT ----------
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+dir_watch.py
+Call back with a file's path once it has been written and left alone.
+
+    watcher = dir_watch.watch("./to_upload", print, pattern="*.pdf")
+    watcher.run()          # blocks; watcher.stop() from another thread
+
+Two implementations behind one interface (run / stop):
+
+  InotifyWatcher  Linux inotify through libc (no extra package). A file is
+                  due `debounce` seconds after it is closed after writing or
+                  renamed into the directory; a write in that window pushes
+                  it back, and a file still open for writing is never due.
+  PollingWatcher  scandir every `interval` seconds; a file is due once its
+                  size and mtime are unchanged since the previous scan, or its
+                  mtime is more than `debounce` seconds old.
+
+watch() returns an InotifyWatcher where inotify works and a PollingWatcher
+otherwise (other platforms, inotify limits reached). Both can also rescan
+the whole directory every `rescan` seconds, so files whose callback failed
+are offered again.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import threading
+import time
+
+DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", "0.25"))
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then the name
+
+
+class Watcher:
+    """Shared filtering and delivery; subclasses implement run()."""
+
+    def __init__(self, path, callback, pattern="*", accept=None,
+                 debounce=None, rescan=None):
+        self.path = path
+        self.callback = callback
+        self.pattern = pattern
+        self.accept = accept
+        self.debounce = DEBOUNCE if debounce is None else debounce
+        self.rescan = rescan
+        self._stop = threading.Event()
+
+    def wants(self, name):
+        return (fnmatch.fnmatch(name, self.pattern)
+                and (self.accept is None or self.accept(name)))
+
+    def existing(self):
+        """Paths of the wanted files currently in the directory."""
+        try:
+            with os.scandir(self.path) as it:
+                return sorted(e.path for e in it
+                              if e.is_file() and self.wants(e.name))
+        except FileNotFoundError:
+            return []
+
+    def deliver(self, path):
+        if not os.path.exists(path):
+            return  # moved away or deleted while debouncing
+        try:
+            self.callback(path)
+        except Exception as e:
+            print("[Watch][ERROR]", path, e)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        raise NotImplementedError
+
+
+class _Inotify:
+    """The three libc calls, or OSError if they are not there."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                           use_errno=True)
+        try:
+            self._add = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError("inotify is not available")
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = init(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path, mask):
+        wd = self._add(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read(self):
+        """[(mask, name)] of the events waiting on the fd."""
+        data, out, i = os.read(self.fd, 65536), [], 0
+        while i < len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, i)
+            i += _EVENT.size
+            name = data[i:i + length].rstrip(b"\0")
+            i += length
+            out.append((mask, os.fsdecode(name)))
+        return out
+
+    def close(self):
+        os.close(self.fd)
+
+
+class InotifyWatcher(Watcher):
+
+    def __init__(self, path, callback, **kw):
+        super().__init__(path, callback, **kw)
+        os.makedirs(path, exist_ok=True)
+        self._ino = _Inotify()
+        try:
+            self._ino.add_watch(path, IN_CLOSE_WRITE | IN_MOVED_TO | IN_MODIFY)
+        except OSError:
+            self._ino.close()
+            raise
+
+    def run(self):
+        due = {}  # path -> monotonic time it becomes ready
+        next_scan = time.monotonic() + self.rescan if self.rescan else None
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                wake = [t for t in (min(due.values(), default=None),
+                                    next_scan) if t is not None]
+                # wake at least once a second to notice stop()
+                timeout = min([1.0] + [max(0.0, t - now) for t in wake])
+                ready, _, _ = select.select([self._ino.fd], [], [], timeout)
+                now = time.monotonic()
+                if ready:
+                    for mask, name in self._ino.read():
+                        if mask & IN_Q_OVERFLOW:
+                            for p in self.existing():
+                                due[p] = now + self.debounce
+                        elif name and self.wants(name):
+                            p = os.path.join(self.path, name)
+                            # a write only postpones; a close makes it due
+                            if p in due or not mask & IN_MODIFY:
+                                due[p] = now + self.debounce
+                if next_scan is not None and now >= next_scan:
+                    for p in self.existing():
+                        due.setdefault(p, now)
+                    next_scan = now + self.rescan
+                for p in [p for p, t in due.items() if t <= now]:
+                    del due[p]
+                    self.deliver(p)
+        finally:
+            self._ino.close()
+
+
+class PollingWatcher(Watcher):
+
+    def __init__(self, path, callback, interval=2.0, **kw):
+        super().__init__(path, callback, **kw)
+        self.interval = interval
+
+    def run(self):
+        seen = {}  # path -> ((size, mtime), delivered) at the previous scan
+        last_full = time.monotonic()
+        while not self._stop.is_set():
+            full = bool(self.rescan) and (
+                time.monotonic() - last_full >= self.rescan)
+            if full:
+                last_full = time.monotonic()
+            now, current = time.time(), {}
+            for p in self.existing():
+                try:
+                    st = os.stat(p)
+                except FileNotFoundError:
+                    continue
+                stat, prev = (st.st_size, st.st_mtime), seen.get(p)
+                unchanged = prev is not None and prev[0] == stat
+                if unchanged and prev[1] and not full:
+                    current[p] = prev
+                    continue
+                settled = unchanged or now - st.st_mtime >= self.debounce
+                current[p] = (stat, settled)
+                if settled:
+                    self.deliver(p)
+            seen = current
+            self._stop.wait(self.interval)
+
+
+def watch(path, callback, pattern="*", accept=None, debounce=None,
+          rescan=None, interval=2.0, polling=False):
+    """InotifyWatcher when possible, else a PollingWatcher every `interval`."""
+    kw = dict(pattern=pattern, accept=accept, debounce=debounce, rescan=rescan)
+    if not polling:
+        try:
+            return InotifyWatcher(path, callback, **kw)
+        except OSError as e:
+            print(f"[Watch] inotify unavailable ({e}); polling every "
+                  f"{interval:g}s")
+    return PollingWatcher(path, callback, interval=interval, **kw)
@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+"""
+drive_client.py
+The few Google Drive operations the JRAVIS sync daemons use, behind one
+small interface so they can run against the real API or a local fake.
+
+    DriveClient            the interface (one method = one API call, except
+                           chunked uploads: one call per chunk)
+    GoogleDrive            Drive v3 REST over google-auth's AuthorizedSession,
+                           one HTTP session per worker thread; api_url= points
+                           it at any Drive-compatible server
+    FakeDrive              in-memory Drive for benchmarks and offline runs;
+                           counts calls per method, optional per-call latency
+    FakeDriveServer        FakeDrive behind a local HTTP server speaking the
+                           same REST subset, for exercising GoogleDrive itself
+
+    drive = drive_client.GoogleDrive.from_service_account("credentials.json")
+    folder = drive.create_folder("Reports")
+    drive.upload("summary_locked.pdf", folder)
+
+Uploads up to CHUNK_SIZE go in one multipart request. Larger files use a
+resumable session sent CHUNK_SIZE bytes at a time; the session URI is kept
+in UploadSessions (a JSON file) under the file's MD5, so an upload cut off
+by a network error or a restart carries on from the last byte Drive has.
+File listings and uploads return DriveFile(id, md5) with Drive's
+md5Checksum, which callers compare against file_md5() to skip unchanged
+content.
+
+Errors that mean "that id is gone" (deleted or trashed folders and files)
+are raised as NotFound so callers can drop a cached id and resolve again.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+SCOPES = ["https://www.googleapis.com/auth/drive"]
+API_URL = os.getenv("DRIVE_API_URL", "https://www.googleapis.com")
+# resumable chunks must be multiples of 256 KiB
+CHUNK_SIZE = int(os.getenv("DRIVE_CHUNK_SIZE", str(8 * 1024 * 1024)))
+SESSION_MAX_AGE = 6 * 86400  # Drive drops resumable sessions after a week
+
+DriveFile = namedtuple("DriveFile", "id md5")
+
+
+class NotFound(Exception):
+    """The folder or file id no longer exists on Drive."""
+
+
+def _quote(value):
+    return str(value).replace("\\", "\\\\").replace("'", "\\'")
+
+
+def file_md5(path, block=1024 * 1024):
+    """Hex MD5 of a file, the digest Drive reports as md5Checksum."""
+    h = hashlib.md5()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class UploadSessions:
+    """Resumable upload URIs by upload key, persisted as JSON."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.sessions = {}
+        if path:
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    self.sessions = json.load(fh)
+            except (OSError, ValueError):
+                pass
+        cutoff = time.time() - SESSION_MAX_AGE
+        self.sessions = {k: v for k, v in self.sessions.items()
+                         if v.get("created", 0) > cutoff}
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.sessions, fh)
+        os.replace(tmp, self.path)
+
+    def get(self, key):
+        with self._lock:
+            entry = self.sessions.get(key)
+            return entry and entry["uri"]
+
+    def put(self, key, uri):
+        with self._lock:
+            self.sessions[key] = {"uri": uri, "created": time.time()}
+            self._save()
+
+    def drop(self, key):
+        with self._lock:
+            if self.sessions.pop(key, None) is not None:
+                self._save()
+
+
+class DriveClient:
+    """Interface; every method is one Drive API request."""
+
+    def find_folder(self, name, parent_id=None):
+        """Id of the folder `name` (under parent_id), or None."""
+        raise NotImplementedError
+
+    def create_folder(self, name, parent_id=None):
+        """Create a folder; returns its id."""
+        raise NotImplementedError
+
+    def folder_exists(self, folder_id):
+        """True if folder_id still exists and is not trashed."""
+        raise NotImplementedError
+
+    def list_files(self, parent_id):
+        """{name: DriveFile} of the files directly in parent_id."""
+        raise NotImplementedError
+
+    def upload(self, local_path, parent_id, name=None, file_id=None, md5=None):
+        """
+        Upload local_path into parent_id as `name` (default: its basename):
+        a new file, or new content for file_id. md5 (hex) saves hashing the
+        file again. Returns the DriveFile.
+        """
+        raise NotImplementedError
+
+
+class GoogleDrive(DriveClient):
+    """
+    Drive v3 over HTTP. `session_factory()` makes a requests-style session
+    (AuthorizedSession for real credentials); one is made per thread.
+    """
+
+    def __init__(self, session_factory, api_url=None, sessions=None,
+                 chunk_size=None):
+        self.session_factory = session_factory
+        self.api_url = (api_url or API_URL).rstrip("/")
+        self.sessions = sessions or UploadSessions()
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self._local = threading.local()
+
+    @classmethod
+    def from_service_account(cls, path, scopes=SCOPES, **kw):
+        from google.auth.transport.requests import AuthorizedSession
+        from google.oauth2 import service_account
+        creds = service_account.Credentials.from_service_account_file(
+            path, scopes=scopes)
+        return cls(lambda: AuthorizedSession(creds), **kw)
+
+    @property
+    def http(self):
+        # one connection pool per thread, reused for every later call
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = self.session_factory()
+        return http
+
+    def _request(self, method, url, ok=(200, 201), **kw):
+        if url.startswith("/"):
+            url = self.api_url + url
+        resp = self.http.request(method, url, **kw)
+        if resp.status_code == 404:
+            raise NotFound(f"{method} {url}: {resp.text[:200]}")
+        if resp.status_code not in ok:
+            raise RuntimeError(
+                f"Drive {method} {url}: HTTP {resp.status_code} "
+                f"{resp.text[:200]}")
+        return resp
+
+    def _files(self, q, fields, page_size=1000):
+        token = None
+        while True:
+            params = {"q": q, "fields": f"nextPageToken, files({fields})",
+                      "pageSize": page_size}
+            if token:
+                params["pageToken"] = token
+            res = self._request("GET", "/drive/v3/files", params=params).json()
+            yield from res.get("files", [])
+            token = res.get("nextPageToken")
+            if not token:
+                return
+
+    def find_folder(self, name, parent_id=None):
+        q = f"name = '{_quote(name)}' and mimeType = '{FOLDER_MIME}'"
+        if parent_id:
+            q += f" and '{_quote(parent_id)}' in parents"
+        for f in self._files(q, "id, name", page_size=1):
+            return f["id"]
+        return None
+
+    def create_folder(self, name, parent_id=None):
+        meta = {"name": name, "mimeType": FOLDER_MIME}
+        if parent_id:
+            meta["parents"] = [parent_id]
+        return self._request("POST", "/drive/v3/files",
+                             params={"fields": "id"}, json=meta).json()["id"]
+
+    def folder_exists(self, folder_id):
+        try:
+            res = self._request("GET", f"/drive/v3/files/{folder_id}",
+                                params={"fields": "id, trashed"}).json()
+        except NotFound:
+            return False
+        return not res.get("trashed")
+
+    def list_files(self, parent_id):
+        q = (f"'{_quote(parent_id)}' in parents and trashed = false "
+             f"and mimeType != '{FOLDER_MIME}'")
+        out = {}
+        for f in self._files(q, "id, name, md5Checksum"):
+            out.setdefault(f["name"], DriveFile(f["id"], f.get("md5Checksum")))
+        return out
+
+    @staticmethod
+    def _drive_file(resp):
+        res = resp.json()
+        return DriveFile(res["id"], res.get("md5Checksum"))
+
+    def upload(self, local_path, parent_id, name=None, file_id=None, md5=None):
+        name = name or os.path.basename(local_path)
+        size = os.path.getsize(local_path)
+        if size <= self.chunk_size:
+            return self._upload_small(local_path, parent_id, name, file_id)
+        md5 = md5 or file_md5(local_path)
+        key = f"{file_id or parent_id}/{name}/{md5}"
+        uri = self.sessions.get(key)
+        if uri:
+            offset = self._offset(uri, size)
+            if isinstance(offset, DriveFile):
+                self.sessions.drop(key)
+                return offset
+            if offset is None:  # the session expired
+                self.sessions.drop(key)
+                uri = None
+        if not uri:
+            uri = self._start(parent_id, name, file_id, size)
+            self.sessions.put(key, uri)
+            offset = 0
+        with open(local_path, "rb") as fh:
+            while True:
+                fh.seek(offset)
+                chunk = fh.read(self.chunk_size)
+                end = offset + len(chunk) - 1
+                try:
+                    resp = self._request(
+                        "PUT", uri, ok=(200, 201, 308), data=chunk,
+                        headers={"Content-Range":
+                                 f"bytes {offset}-{end}/{size}"})
+                except NotFound:
+                    self.sessions.drop(key)  # the session, not the folder
+                    raise
+                if resp.status_code != 308:
+                    self.sessions.drop(key)
+                    return self._drive_file(resp)
+                offset = self._next_byte(resp)
+
+    def _upload_small(self, local_path, parent_id, name, file_id):
+        with open(local_path, "rb") as fh:
+            data = fh.read()
+        params = {"fields": "id, md5Checksum"}
+        if file_id:
+            return self._drive_file(self._request(
+                "PATCH", f"/upload/drive/v3/files/{file_id}",
+                params={**params, "uploadType": "media"}, data=data,
+                headers={"Content-Type": "application/octet-stream"}))
+        boundary = uuid.uuid4().hex
+        meta = json.dumps({"name": name, "parents": [parent_id]})
+        body = (f"--{boundary}\r\nContent-Type: application/json; "
+                f"charset=UTF-8\r\n\r\n{meta}\r\n--{boundary}\r\n"
+                f"Content-Type: application/octet-stream\r\n\r\n"
+                ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        return self._drive_file(self._request(
+            "POST", "/upload/drive/v3/files",
+            params={**params, "uploadType": "multipart"}, data=body,
+            headers={"Content-Type":
+                     f"multipart/related; boundary={boundary}"}))
+
+    def _start(self, parent_id, name, file_id, size):
+        headers = {"X-Upload-Content-Length": str(size),
+                   "X-Upload-Content-Type": "application/octet-stream"}
+        params = {"uploadType": "resumable", "fields": "id, md5Checksum"}
+        if file_id:
+            resp = self._request("PATCH", f"/upload/drive/v3/files/{file_id}",
+                                 params=params, json={}, headers=headers)
+        else:
+            resp = self._request("POST", "/upload/drive/v3/files",
+                                 params=params, headers=headers,
+                                 json={"name": name, "parents": [parent_id]})
+        return resp.headers["Location"]
+
+    def _offset(self, uri, size):
+        """Next byte Drive wants for a session, its DriveFile if complete,
+        or None if the session is gone."""
+        try:
+            resp = self._request("PUT", uri, ok=(200, 201, 308, 410),
+                                 data=b"",
+                                 headers={"Content-Range": f"bytes */{size}"})
+        except NotFound:
+            return None
+        if resp.status_code == 410:
+            return None
+        if resp.status_code == 308:
+            return self._next_byte(resp)
+        return self._drive_file(resp)
+
+    @staticmethod
+    def _next_byte(resp):
+        m = re.match(r"bytes=0-(\d+)", resp.headers.get("Range", ""))
+        return int(m.group(1)) + 1 if m else 0
+
+
+class FakeDrive(DriveClient):
+    """
+    In-memory Drive. `calls` counts requests per method; `latency` seconds
+    are slept per request (outside the lock, like real round trips).
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.items = {}  # id -> {"name", "parent", "folder", "data"}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _new_id(self):
+        return f"fake{next(self._ids):06d}"
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    @staticmethod
+    def _file(i, item):
+        return DriveFile(i, hashlib.md5(item["data"]).hexdigest())
+
+    def find_folder(self, name, parent_id=None):
+        self._call("find_folder")
+        with self._lock:
+            for i, item in self.items.items():
+                if (item["folder"] and item["name"] == name
+                        and (parent_id is None or item["parent"] == parent_id)):
+                    return i
+        return None
+
+    def create_folder(self, name, parent_id=None):
+        self._call("create_folder")
+        with self._lock:
+            if parent_id and parent_id not in self.items:
+                raise NotFound(parent_id)
+            i = self._new_id()
+            self.items[i] = {"name": name, "parent": parent_id,
+                             "folder": True, "data": None}
+            return i
+
+    def folder_exists(self, folder_id):
+        self._call("folder_exists")
+        with self._lock:
+            item = self.items.get(folder_id)
+            return bool(item and item["folder"])
+
+    def list_files(self, parent_id):
+        self._call("list_files")
+        with self._lock:
+            if parent_id not in self.items:
+                raise NotFound(parent_id)
+            return {item["name"]: self._file(i, item)
+                    for i, item in self.items.items()
+                    if item["parent"] == parent_id and not item["folder"]}
+
+    def upload(self, local_path, parent_id, name=None, file_id=None, md5=None):
+        self._call("upload")
+        with open(local_path, "rb") as fh:
+            data = fh.read()
+        return self.store(data, parent_id, name or os.path.basename(local_path),
+                          file_id)
+
+    def store(self, data, parent_id, name, file_id=None):
+        """Create or overwrite a file (not an API call)."""
+        with self._lock:
+            if file_id:
+                if file_id not in self.items:
+                    raise NotFound(file_id)
+                self.items[file_id]["data"] = data
+                return self._file(file_id, self.items[file_id])
+            if parent_id not in self.items:
+                raise NotFound(parent_id)
+            i = self._new_id()
+            item = self.items[i] = {"name": name, "parent": parent_id,
+                                    "folder": False, "data": data}
+            return self._file(i, item)
+
+    def delete(self, item_id):
+        """Remove an item and everything under it (not an API call)."""
+        with self._lock:
+            doomed = {item_id}
+            while True:
+                more = {i for i, item in self.items.items()
+                        if item["parent"] in doomed} - doomed
+                if not more:
+                    break
+                doomed |= more
+            for i in doomed:
+                self.items.pop(i, None)
+
+
+class FakeDriveServer:
+    """
+    A FakeDrive behind http://127.0.0.1:<port>, serving the Drive v3 subset
+    GoogleDrive uses (files list/get/create, multipart, media and resumable
+    uploads). `requests` counts HTTP requests and `received` request body
+    bytes; setting `drop_after = n`
+    makes the server hang up after storing the n-th chunk from then on, like
+    a network failure mid-upload.
+
+        with FakeDriveServer() as server:
+            drive = GoogleDrive(requests.Session, api_url=server.url)
+    """
+
+    def __init__(self, drive=None):
+        self.drive = drive or FakeDrive()
+        self.requests = Counter()
+        self.received = 0
+        self.uploads = {}  # upload_id -> {"name", "parent", "file_id", ...}
+        self.drop_after = None
+        self._chunks = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- the fake API ----------
+    def _match(self, q):
+        name = re.search(r"name = '((?:[^'\\]|\\.)*)'", q)
+        parent = re.search(r"'((?:[^'\\]|\\.)*)' in parents", q)
+        unquote = lambda m: m and re.sub(r"\\(.)", r"\1", m.group(1))
+        name, parent = unquote(name), unquote(parent)
+        folders = (True if f"mimeType = '{FOLDER_MIME}'" in q else
+                   False if f"mimeType != '{FOLDER_MIME}'" in q else None)
+        with self.drive._lock:
+            items = list(self.drive.items.items())
+        for i, item in items:
+            if ((name is None or item["name"] == name)
+                    and (parent is None or item["parent"] == parent)
+                    and (folders is None or item["folder"] == folders)):
+                yield i, item
+
+    def _json(self, i, item):
+        out = {"id": i, "name": item["name"], "trashed": False}
+        if item["folder"]:
+            out["mimeType"] = FOLDER_MIME
+        else:
+            out["md5Checksum"] = hashlib.md5(item["data"]).hexdigest()
+        return out
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None, headers=()):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length")
+                                           or 0))
+
+            def _route(self, method):
+                url = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = self._body()
+                with server._lock:
+                    server.requests[f"{method} {url.path}"] += 1
+                    server.received += len(body)
+                try:
+                    server._dispatch(self, method, url.path, params, body)
+                except NotFound as e:
+                    self._send(404, {"error": {"code": 404,
+                                               "message": str(e)}})
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PATCH(self):
+                self._route("PATCH")
+
+            def do_PUT(self):
+                self._route("PUT")
+
+        return Handler
+
+    def _dispatch(self, h, method, path, params, body):
+        drive = self.drive
+        m = re.search(r"/files/([^/]+)$", path)
+        item_id = m and m.group(1)
+        if path == "/drive/v3/files" and method == "GET":
+            size = int(params.get("pageSize", 100))
+            start = int(params.get("pageToken", 0))
+            found = list(self._match(params.get("q", "")))
+            page = found[start:start + size]
+            res = {"files": [self._json(i, item) for i, item in page]}
+            if start + size < len(found):
+                res["nextPageToken"] = str(start + size)
+            return h._send(200, res)
+        if path.startswith("/drive/v3/files/") and method == "GET":
+            with drive._lock:
+                item = drive.items.get(item_id)
+            if item is None:
+                raise NotFound(item_id)
+            return h._send(200, self._json(item_id, item))
+        if path == "/drive/v3/files" and method == "POST":
+            meta = json.loads(body or b"{}")
+            parent = (meta.get("parents") or [None])[0]
+            fid = drive.create_folder(meta["name"], parent)
+            return h._send(200, {"id": fid})
+        if path.startswith("/upload/drive/v3/files"):
+            kind = params.get("uploadType")
+            if kind == "resumable" and method == "PUT":
+                return self._chunk(h, params["upload_id"], body)
+            if kind == "resumable":
+                meta = json.loads(body or b"{}")
+                if item_id and item_id not in drive.items:
+                    raise NotFound(item_id)
+                parent = (meta.get("parents") or [None])[0]
+                if not item_id and parent not in drive.items:
+                    raise NotFound(parent)
+                upload_id = uuid.uuid4().hex
+                self.uploads[upload_id] = {
+                    "name": meta.get("name"), "parent": parent,
+                    "file_id": item_id, "data": bytearray(),
+                    "size": int(h.headers["X-Upload-Content-Length"])}
+                uri = (f"{self.url}/upload/drive/v3/files?"
+                       f"uploadType=resumable&upload_id={upload_id}")
+                return h._send(200, {}, [("Location", uri)])
+            if kind == "media":
+                f = drive.store(body, None, None, item_id)
+            else:  # multipart: metadata part, then the content part
+                boundary = h.headers["Content-Type"].split("boundary=")[1]
+                parts = body.split(b"--" + boundary.encode())
+                meta_part, data_part = parts[1], parts[2]
+                meta = json.loads(meta_part.split(b"\r\n\r\n", 1)[1])
+                data = data_part.split(b"\r\n\r\n", 1)[1][:-2]
+                f = drive.store(data, meta["parents"][0], meta["name"])
+            return h._send(200, {"id": f.id, "md5Checksum": f.md5})
+        h._send(400, {"error": {"code": 400, "message": f"{method} {path}"}})
+
+    def _chunk(self, h, upload_id, body):
+        up = self.uploads.get(upload_id)
+        if up is None:
+            raise NotFound(upload_id)
+        if up.get("done"):
+            f = up["done"]
+            return h._send(200, {"id": f.id, "md5Checksum": f.md5})
+        rng = h.headers.get("Content-Range", "")
+        m = re.match(r"bytes (\d+)-(\d+)/(\d+)", rng)
+        if m:
+            start = int(m.group(1))
+            if start != len(up["data"]):
+                return h._send(308, None, self._range(up))
+            up["data"] += body
+            with self._lock:
+                self._chunks += 1
+                drop = (self.drop_after is not None
+                        and self._chunks >= self.drop_after)
+            if drop:
+                # stored, but the client never hears back
+                h.close_connection = True
+                h.connection.shutdown(2)
+                return
+        if len(up["data"]) < up["size"]:
+            return h._send(308, None, self._range(up))
+        f = up["done"] = self.drive.store(bytes(up["data"]), up["parent"],
+                                          up["name"], up["file_id"])
+        h._send(200, {"id": f.id, "md5Checksum": f.md5})
+
+    @staticmethod
+    def _range(up):
+        n = len(up["data"])
+        return [("Range", f"bytes=0-{n - 1}")] if n else []
@@ -2,24 +2,46 @@
 """
 Drive Sync Daemon for JRAVIS
 
-- Polls local folders for new PDFs (summary_report.pdf, invoices.pdf, any *.pdf)
+- Watches local folders for new PDFs (summary_report.pdf, invoices.pdf, any *.pdf)
 - Encrypts each PDF with Mission Lock Code (creates *_locked.pdf)
 - Uploads locked PDF to Drive using Service Account credentials (credentials.json)
 - Moves original and locked files to archive folders
 - Has --once flag to run a single pass (useful for immediate testing)
+- Picks a file up as soon as it is closed after writing (inotify via
+  dir_watch); --poll, or a system without inotify, globs every POLL_INTERVAL
+
+Drive calls go through drive_client (the real API, or FakeDrive offline).
+One authenticated client lives for the whole process, Drive folder ids are
+kept in a persistent cache (FOLDER_CACHE_FILE) and only re-checked after
+FOLDER_TTL or when Drive says an id is gone, and files are uploaded by
+UPLOAD_WORKERS threads from a bounded queue. A pass over N PDFs costs about
+N uploads plus one listing per folder, instead of a lookup per path level
+per file. scripts/bench_drive_sync.py counts the calls against FakeDrive.
+
+Encryption is seeded from the password and the source's hash, so a report
+regenerated unchanged locks to the same bytes; when their MD5 matches the
+md5Checksum Drive holds the upload is skipped. Large files go up in
+resumable chunks whose session URIs are kept in UPLOAD_SESSIONS_FILE, so a
+restarted daemon resumes them instead of starting over.
 
 Configurable at top of this file.
 """
 import os
+import hmac
 import time
 import glob
+import json
+import hashlib
+import queue
 import shutil
 import argparse
+import threading
 from datetime import datetime
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2 import service_account
-from PyPDF2 import PdfReader, PdfWriter
+
+import dir_watch
+import drive_client
+import pdf_crypt
+import report_catalog
 
 # ---------- CONFIG ----------
 SERVICE_ACCOUNT_FILE = "credentials.json"
@@ -28,78 +50,204 @@ ROOT_FOLDER = "1TY3MseGj5GyWwOTk7A7QZ7aGZs1sFU16"  # Drive root (ensure shared)
 LOCAL_WATCH_DIR = "./to_upload"  # Drop reports here
 LOCAL_ARCHIVE_DIR = "./archive"  # Processed files go here
 MISSION_LOCK_CODE = "2040LOCK"  # Change when needed
-POLL_INTERVAL = 20  # seconds between checks
+POLL_INTERVAL = 20  # seconds between checks (polling mode)
+WATCH_RESCAN = float(os.getenv("DRIVE_WATCH_RESCAN", "300"))  # retry failures
 DEFAULT_MAP = {
     # local subfolder -> Drive path under ROOT_FOLDER
     "summary_report.pdf": "Reports/Daily",
     "invoices.pdf": "Invoices"
 }
+FOLDER_CACHE_FILE = os.getenv("DRIVE_FOLDER_CACHE", ".drive_folders.json")
+FOLDER_TTL = float(os.getenv("DRIVE_FOLDER_TTL", "86400"))  # re-check after
+UPLOAD_WORKERS = int(os.getenv("DRIVE_UPLOAD_WORKERS", "4"))
+UPLOAD_QUEUE_SIZE = int(os.getenv("DRIVE_UPLOAD_QUEUE", "64"))
+UPLOAD_SESSIONS_FILE = os.getenv("DRIVE_UPLOAD_SESSIONS", ".drive_uploads.json")
 # ----------------------------
 
 
 def auth():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
-
-
-def find_folder(service, name, parent_id=None):
-    safe_name = name.replace("'", "\\'")
-    q_parts = [
-        f"name = '{safe_name}'",
-        "mimeType = 'application/vnd.google-apps.folder'"
-    ]
-    if parent_id:
-        q_parts.append(f"'{parent_id}' in parents")
-    q = " and ".join(q_parts)
-    res = service.files().list(q=q, fields="files(id, name)").execute()
-    files = res.get("files", [])
-    return files[0]["id"] if files else None
-
-
-def create_folder(service, name, parent_id=None):
-    meta = {"name": name, "mimeType": "application/vnd.google-apps.folder"}
-    if parent_id:
-        meta["parents"] = [parent_id]
-    folder = service.files().create(body=meta, fields="id").execute()
-    return folder["id"]
-
-
-def ensure_folder_path(service, path):
-    parts = [p for p in path.split("/") if p]
-    # ensure root
-    root_id = find_folder(service, ROOT_FOLDER)
-    if not root_id:
-        root_id = create_folder(service, ROOT_FOLDER)
-    parent = root_id
-    for part in parts:
-        fid = find_folder(service, part, parent_id=parent)
-        if not fid:
-            fid = create_folder(service, part, parent_id=parent)
-        parent = fid
-    return parent
-
-
-def upload_file_to_drive(service, local_path, drive_folder_id):
+    return drive_client.GoogleDrive.from_service_account(
+        SERVICE_ACCOUNT_FILE,
+        scopes=SCOPES,
+        sessions=drive_client.UploadSessions(UPLOAD_SESSIONS_FILE))
+
+
+_drive = None
+_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_drive():
+    """The process-wide Drive client (authenticated once)."""
+    global _drive
+    with _shared_lock:
+        if _drive is None:
+            _drive = auth()
+        return _drive
+
+
+def get_cache():
+    """The process-wide FolderCache."""
+    global _cache
+    with _shared_lock:
+        if _cache is None:
+            _cache = FolderCache()
+        return _cache
+
+
+class FolderCache:
+    """
+    Drive path -> folder id, and per folder the {name: [file id, md5]} of
+    its files, persisted as JSON. Cached ids are trusted until `ttl` seconds
+    old (then one folder_exists call) or until an upload gets NotFound
+    (then invalidate() and resolve again).
+    """
+
+    def __init__(self, path=None, ttl=None, root=ROOT_FOLDER):
+        self.path = path or FOLDER_CACHE_FILE
+        self.ttl = FOLDER_TTL if ttl is None else ttl
+        self.root = root
+        self.folders = {}  # "Reports/Daily" -> {"id", "checked"}; "" = root
+        self.files = {}  # folder id -> {name: [file id, md5]}, once listed
+        self._lock = threading.RLock()
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("root") == root:
+                self.folders = data.get("folders", {})
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"root": self.root, "folders": self.folders,
+                           "files": self.files}, fh)
+            os.replace(tmp, self.path)
+
+    def _fresh(self, entry):
+        return time.time() - entry["checked"] < self.ttl
+
+    def invalidate(self, path=""):
+        """Forget `path`, everything under it and their file ids."""
+        key = "/".join(p for p in path.split("/") if p)
+        with self._lock:
+            for k in [k for k in self.folders
+                      if not key or k == key or k.startswith(key + "/")]:
+                self.files.pop(self.folders.pop(k)["id"], None)
+            self.save()
+
+    def folder_id(self, drive, path):
+        """Folder id for `path` under the root, created on Drive if missing."""
+        parts = [p for p in path.split("/") if p]
+        key = "/".join(parts)
+        with self._lock:
+            entry = self.folders.get(key)
+            if entry and self._fresh(entry):
+                return entry["id"]
+            if entry and drive.folder_exists(entry["id"]):
+                entry["checked"] = time.time()
+                self.files.pop(entry["id"], None)  # relist on next upload
+                self.save()
+                return entry["id"]
+            if entry:
+                self.invalidate(key)
+            try:
+                return self._walk(drive, parts)
+            except drive_client.NotFound:
+                # a cached ancestor is gone: start again from the root
+                self.invalidate()
+                return self._walk(drive, parts)
+
+    def _walk(self, drive, parts):
+        parent = None
+        for i in range(len(parts) + 1):
+            key = "/".join(parts[:i])
+            entry = self.folders.get(key)
+            if entry is None:
+                name = parts[i - 1] if i else self.root
+                fid = (drive.find_folder(name, parent_id=parent)
+                       or drive.create_folder(name, parent_id=parent))
+                entry = self.folders[key] = {"id": fid, "checked": time.time()}
+                self.save()
+            parent = entry["id"]
+        return parent
+
+    def file(self, drive, folder_id, name):
+        """DriveFile `name` in folder_id (one listing per folder), or None."""
+        with self._lock:
+            files = self.files.get(folder_id)
+            if files is None:
+                files = self.files[folder_id] = {
+                    n: list(f) for n, f in drive.list_files(folder_id).items()}
+                self.save()
+            entry = files.get(name)
+            if entry is None:
+                return None
+            if isinstance(entry, str):  # cache written before md5s were kept
+                return drive_client.DriveFile(entry, None)
+            return drive_client.DriveFile(*entry)
+
+    def remember_file(self, folder_id, name, drive_file):
+        with self._lock:
+            files = self.files.setdefault(folder_id, {})
+            if files.get(name) != list(drive_file):
+                files[name] = list(drive_file)
+                self.save()
+
+    def forget_file(self, folder_id, name):
+        with self._lock:
+            self.files.get(folder_id, {}).pop(name, None)
+
+
+def ensure_folder_path(service, path, cache=None):
+    return (cache or get_cache()).folder_id(service, path)
+
+
+def upload_file_to_drive(service, local_path, drive_folder_id, cache=None):
+    cache = cache or get_cache()
     filename = os.path.basename(local_path)
-    safe_filename = filename.replace("'", "\\'")
-    q = f"name = '{safe_filename}' and '{drive_folder_id}' in parents"
-    existing = service.files().list(q=q,
-                                    fields="files(id, name)").execute().get(
-                                        "files", [])
-    media = MediaFileUpload(local_path, resumable=True)
-    if existing:
-        fid = existing[0]["id"]
-        service.files().update(fileId=fid, media_body=media).execute()
-        print(f"[Drive] Updated {filename}")
-        return fid
-    else:
-        meta = {"name": filename, "parents": [drive_folder_id]}
-        uploaded = service.files().create(body=meta,
-                                          media_body=media,
-                                          fields="id").execute()
-        print(f"[Drive] Uploaded {filename}")
-        return uploaded["id"]
+    md5 = drive_client.file_md5(local_path)
+    known = cache.file(service, drive_folder_id, filename)
+    if known and known.md5 == md5:
+        print(f"[Drive] Unchanged {filename}, not uploaded")
+        return known.id
+    try:
+        new = service.upload(local_path, drive_folder_id, filename,
+                             known and known.id, md5)
+    except drive_client.NotFound:
+        if not known:
+            raise  # the folder itself is gone
+        cache.forget_file(drive_folder_id, filename)
+        known, new = None, service.upload(local_path, drive_folder_id,
+                                          filename, md5=md5)
+    cache.remember_file(drive_folder_id, filename, new)
+    print(f"[Drive] {'Updated' if known else 'Uploaded'} {filename}")
+    return new.id
+
+
+def sync_to_drive(service, local_path, drive_path, cache=None):
+    """Upload local_path into drive_path; re-resolves a folder that vanished."""
+    cache = cache or get_cache()
+    folder_id = ensure_folder_path(service, drive_path, cache)
+    try:
+        return upload_file_to_drive(service, local_path, folder_id, cache)
+    except drive_client.NotFound:
+        cache.invalidate(drive_path)
+        folder_id = ensure_folder_path(service, drive_path, cache)
+        return upload_file_to_drive(service, local_path, folder_id, cache)
+
+
+def lock_seed(input_path, password):
+    # same source + password -> same locked bytes (see pdf_crypt seed=)
+    h = hashlib.sha256()
+    with open(input_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return hmac.new(password.encode("utf-8"), h.digest(),
+                    hashlib.sha256).digest()
 
 
 def encrypt_pdf(input_path, password):
@@ -107,13 +255,8 @@ def encrypt_pdf(input_path, password):
         return None
     out = input_path.replace(".pdf", "_locked.pdf")
     try:
-        reader = PdfReader(input_path)
-        writer = PdfWriter()
-        for p in reader.pages:
-            writer.add_page(p)
-        writer.encrypt(password)
-        with open(out, "wb") as f:
-            writer.write(f)
+        pdf_crypt.encrypt_pdf(input_path, out, password,
+                              seed=lock_seed(input_path, password))
         print(
             f"[Encrypt] {os.path.basename(input_path)} → {os.path.basename(out)}"
         )
@@ -123,7 +266,7 @@ def encrypt_pdf(input_path, password):
         return None
 
 
-def process_file(service, filepath):
+def process_file(service, filepath, cache=None):
     # encrypt
     locked = encrypt_pdf(filepath, MISSION_LOCK_CODE)
     if not locked:
@@ -131,8 +274,7 @@ def process_file(service, filepath):
     # decide drive folder
     name = os.path.basename(filepath)
     drive_path = DEFAULT_MAP.get(name, "Reports/Daily")
-    folder_id = ensure_folder_path(service, drive_path)
-    upload_file_to_drive(service, locked, folder_id)
+    sync_to_drive(service, locked, drive_path, cache)
     # archive originals and locked
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     os.makedirs(LOCAL_ARCHIVE_DIR, exist_ok=True)
@@ -142,32 +284,121 @@ def process_file(service, filepath):
                               f"{ts}__{os.path.basename(locked)}")
     shutil.move(filepath, dst_orig)
     shutil.move(locked, dst_locked)
+    report_catalog.register(dst_locked)  # found by email_automation_daemon
     print(f"[Archive] moved to {LOCAL_ARCHIVE_DIR}")
     return True
 
 
-def run_once():
-    service = auth()
+class UploadQueue:
+    """
+    `workers` threads running handler(service, path) for queued paths.
+    put() blocks while `maxsize` paths are waiting, and ignores a path that
+    is already queued or in progress.
+    """
+
+    def __init__(self, service, workers=None, maxsize=None, handler=None):
+        self.service = service
+        self.handler = handler or process_file
+        self.done = self.failed = 0
+        self._queue = queue.Queue(UPLOAD_QUEUE_SIZE if maxsize is None
+                                  else maxsize)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True,
+                             name=f"drive-upload-{i}")
+            for i in range(workers or UPLOAD_WORKERS)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def put(self, path):
+        with self._lock:
+            if path in self._pending:
+                return False
+            self._pending.add(path)
+        self._queue.put(path)
+        return True
+
+    def _work(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                if self.handler(self.service, path) is False:
+                    self.failed += 1
+                else:
+                    self.done += 1
+            except Exception as e:
+                self.failed += 1
+                print("[Error] processing", path, e)
+            finally:
+                with self._lock:
+                    self._pending.discard(path)
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until everything queued so far has been handled."""
+        self._queue.join()
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+
+def is_source_pdf(name):
+    # *_locked.pdf are this daemon's own outputs, written next to the source
+    return not name.endswith("_locked.pdf")
+
+
+def pending_pdfs():
     os.makedirs(LOCAL_WATCH_DIR, exist_ok=True)
     # find pdfs in LOCAL_WATCH_DIR (top-level only)
-    files = glob.glob(os.path.join(LOCAL_WATCH_DIR, "*.pdf"))
+    return sorted(f for f in glob.glob(os.path.join(LOCAL_WATCH_DIR, "*.pdf"))
+                  if is_source_pdf(os.path.basename(f)))
+
+
+def run_once(service=None, uploads=None):
+    files = pending_pdfs()
     if not files:
         print("[Info] No PDFs found to process.")
+        return 0
+    own = uploads is None
+    if own:
+        uploads = UploadQueue(service or get_drive())
     for f in files:
-        try:
-            process_file(service, f)
-        except Exception as e:
-            print("[Error] processing", f, e)
+        uploads.put(f)
+    uploads.join()
+    if own:
+        uploads.close()
+    return len(files)
+
+
+def make_watcher(uploads, polling=False):
+    """A dir_watch watcher feeding LOCAL_WATCH_DIR's source PDFs to uploads."""
+    return dir_watch.watch(LOCAL_WATCH_DIR,
+                           uploads.put,
+                           pattern="*.pdf",
+                           accept=is_source_pdf,
+                           rescan=WATCH_RESCAN,
+                           interval=POLL_INTERVAL,
+                           polling=polling)
 
 
-def run_daemon():
+def run_daemon(service=None, polling=False):
     print("[Daemon] Starting Drive Sync Daemon...")
-    while True:
-        try:
-            run_once()
-        except Exception as e:
-            print("[Daemon][ERROR]", e)
-        time.sleep(POLL_INTERVAL)
+    uploads = UploadQueue(service or get_drive())
+    watcher = make_watcher(uploads, polling)
+    for f in pending_pdfs():
+        uploads.put(f)
+    print(f"[Daemon] Watching {LOCAL_WATCH_DIR} ({type(watcher).__name__})")
+    try:
+        watcher.run()
+    finally:
+        uploads.close()
 
 
 def parse():
@@ -175,6 +406,9 @@ def parse():
     p.add_argument("--once",
                    action="store_true",
                    help="Run single pass and exit")
+    p.add_argument("--poll",
+                   action="store_true",
+                   help="Glob every POLL_INTERVAL instead of inotify")
     return p.parse_args()
 
 
@@ -183,4 +417,4 @@ if __name__ == "__main__":
     if args.once:
         run_once()
     else:
-        run_daemon()
+        run_daemon(polling=args.poll)
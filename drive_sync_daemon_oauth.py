@@ -23,6 +23,8 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from PyPDF2 import PdfReader, PdfWriter
 
+import report_catalog
+
 # --------------------------------------------------------
 # CONFIGURATION
 # --------------------------------------------------------
@@ -165,9 +167,10 @@ def process_file(service, path):
     shutil.move(
         path, os.path.join(LOCAL_ARCHIVE_DIR,
                            f"{ts}__{os.path.basename(path)}"))
-    shutil.move(
-        locked,
-        os.path.join(LOCAL_ARCHIVE_DIR, f"{ts}__{os.path.basename(locked)}"))
+    dst_locked = os.path.join(LOCAL_ARCHIVE_DIR,
+                              f"{ts}__{os.path.basename(locked)}")
+    shutil.move(locked, dst_locked)
+    report_catalog.register(dst_locked)  # found by email_automation_daemon
     print(f"[Archive] moved {name} to archive")
 
 
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+earnings_store.py
+Indexed store for JRAVIS earnings, reports, income snapshots and activity.
+
+Report builders used to load the whole TinyDB earnings table and filter it
+by string prefix on every run, and the memory getters sorted whole tables
+to take the last N rows. Here (SQLite, EARNINGS_DB):
+
+  earnings         (id, date, ts, amount, source, note), indexed on date
+  earnings_daily   date -> total, entries     } kept up to date by triggers
+  earnings_weekly  week (Monday) -> total, entries  } on every insert/delete
+  reports          (id, date, summary, locked)
+  income_history   date -> timestamp, data (one snapshot per day)
+  activity         (id, time, event, category), indexed on time
+
+so a day's or a week's total is one primary-key lookup, the rows of a range
+are one index scan, and "last N" queries read N rows.
+
+Existing data comes over from the TinyDB files (jr_memory.json earnings and
+reports, memory_data.json memory and activity). open_store() does it on
+first use and again whenever one of those files changes (older writers may
+still append to them); each source row is copied once. By hand:
+
+  python3 earnings_store.py --migrate [jr_memory.json memory_data.json]
+  python3 earnings_store.py --days 7
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+EARNINGS_DB = os.getenv("EARNINGS_DB", "earnings.db")
+LEGACY_FILES = (os.getenv("JR_MEMORY_PATH", "jr_memory.json"),
+                os.getenv("JRAVIS_MEMORY_DB", "memory_data.json"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS earnings (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    ts TEXT,
+    amount NUMERIC NOT NULL DEFAULT 0,
+    source TEXT,
+    note TEXT,
+    legacy_id TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_earnings_date ON earnings (date);
+CREATE TABLE IF NOT EXISTS earnings_daily (
+    date TEXT PRIMARY KEY,
+    total NUMERIC NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS earnings_weekly (
+    week TEXT PRIMARY KEY,
+    total NUMERIC NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS earnings_ins AFTER INSERT ON earnings BEGIN
+    INSERT INTO earnings_daily (date, total, entries)
+        VALUES (NEW.date, NEW.amount, 1)
+        ON CONFLICT(date) DO UPDATE SET total = total + NEW.amount,
+                                        entries = entries + 1;
+    INSERT INTO earnings_weekly (week, total, entries)
+        VALUES (COALESCE(date(NEW.date, 'weekday 0', '-6 days'), ''),
+                NEW.amount, 1)
+        ON CONFLICT(week) DO UPDATE SET total = total + NEW.amount,
+                                        entries = entries + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS earnings_del AFTER DELETE ON earnings BEGIN
+    UPDATE earnings_daily SET total = total - OLD.amount,
+                              entries = entries - 1
+        WHERE date = OLD.date;
+    UPDATE earnings_weekly SET total = total - OLD.amount,
+                               entries = entries - 1
+        WHERE week = COALESCE(date(OLD.date, 'weekday 0', '-6 days'), '');
+END;
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    summary TEXT,
+    locked INTEGER NOT NULL DEFAULT 0,
+    legacy_id TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS income_history (
+    date TEXT PRIMARY KEY,
+    timestamp TEXT,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS activity (
+    id INTEGER PRIMARY KEY,
+    time TEXT NOT NULL,
+    event TEXT,
+    category TEXT,
+    legacy_id TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_activity_time ON activity (time);
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    size INTEGER
+);
+"""
+
+
+def now_iso():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _day(value):
+    """YYYY-MM-DD for a date, datetime or ISO string (timestamps allowed)."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return str(value or "")[:10]
+
+
+def week_start(day):
+    """Monday of the week containing `day` (the earnings_weekly key)."""
+    d = date.fromisoformat(_day(day))
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+class EarningsStore:
+
+    def __init__(self, path=None):
+        self.path = path or EARNINGS_DB
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path,
+                                    timeout=30,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params).lastrowid
+
+    # ---------- earnings ----------
+    def add_earning(self, day, amount, source=None, note=""):
+        """Insert one earning; the daily/weekly totals follow in the same
+        transaction. Returns the row id."""
+        return self._write(
+            "INSERT INTO earnings (date, ts, amount, source, note) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (_day(day), str(day), amount or 0, source, note or ""))
+
+    def earnings_between(self, start, end=None):
+        """Earnings with start <= date <= end (ISO days), oldest first."""
+        return [
+            dict(r) for r in self._query(
+                "SELECT id, date, ts, amount, source, note FROM earnings "
+                "WHERE date >= ? AND date <= ? ORDER BY date, id",
+                (_day(start), _day(end or "9999-12-31")))
+        ]
+
+    def day_total(self, day):
+        """(total, entries) for one day."""
+        rows = self._query(
+            "SELECT total, entries FROM earnings_daily WHERE date = ?",
+            (_day(day), ))
+        return (rows[0]["total"], rows[0]["entries"]) if rows else (0, 0)
+
+    def range_total(self, start="", end=None):
+        """(total, entries) for start <= date <= end, from the daily totals
+        (everything by default)."""
+        row = self._query(
+            "SELECT COALESCE(SUM(total), 0), COALESCE(SUM(entries), 0) "
+            "FROM earnings_daily WHERE date >= ? AND date <= ?",
+            (_day(start), _day(end or "9999-12-31")))[0]
+        return row[0], row[1]
+
+    def daily_totals(self, limit=30):
+        """Most recent `limit` days with earnings, newest first."""
+        return [
+            dict(r) for r in self._query(
+                "SELECT date, total, entries FROM earnings_daily "
+                "WHERE entries > 0 ORDER BY date DESC LIMIT ?", (limit, ))
+        ]
+
+    def weekly_totals(self, limit=12):
+        """Most recent `limit` weeks (keyed by Monday), newest first."""
+        return [
+            dict(r) for r in self._query(
+                "SELECT week, total, entries FROM earnings_weekly "
+                "WHERE entries > 0 ORDER BY week DESC LIMIT ?", (limit, ))
+        ]
+
+    def week_total(self, day):
+        """(total, entries) for the Monday-to-Sunday week containing `day`."""
+        rows = self._query(
+            "SELECT total, entries FROM earnings_weekly WHERE week = ?",
+            (week_start(day), ))
+        return (rows[0]["total"], rows[0]["entries"]) if rows else (0, 0)
+
+    def entry_count(self):
+        return self.range_total()[1]
+
+    # ---------- reports ----------
+    def add_report(self, day, summary, locked=False):
+        return self._write(
+            "INSERT INTO reports (date, summary, locked) VALUES (?, ?, ?)",
+            (str(day), summary, int(bool(locked))))
+
+    def recent_reports(self, limit=10):
+        """Last `limit` reports, oldest first (as the builders print them)."""
+        rows = self._query(
+            "SELECT date, summary, locked FROM reports ORDER BY id DESC "
+            "LIMIT ?", (limit, ))
+        return [dict(r) for r in reversed(rows)]
+
+    # ---------- income snapshots / activity (memory_system) ----------
+    def save_income_summary(self, data, day=None, timestamp=None):
+        day = _day(day or datetime.utcnow())
+        self._write(
+            "INSERT INTO income_history (date, timestamp, data) "
+            "VALUES (?, ?, ?) ON CONFLICT(date) DO UPDATE SET "
+            "timestamp=excluded.timestamp, data=excluded.data",
+            (day, timestamp or now_iso(), json.dumps(data)))
+
+    def income_history(self, limit=7):
+        """Last `limit` daily snapshots (their data), newest first."""
+        return [
+            json.loads(r["data"]) for r in self._query(
+                "SELECT data FROM income_history ORDER BY date DESC LIMIT ?",
+                (limit, ))
+        ]
+
+    def log_activity(self, event, category="general", time=None):
+        return self._write(
+            "INSERT INTO activity (time, event, category) VALUES (?, ?, ?)",
+            (time or now_iso(), event, category))
+
+    def recent_activity(self, limit=10):
+        """Last `limit` activity entries, newest first."""
+        return [
+            dict(r) for r in self._query(
+                "SELECT time, event, category FROM activity "
+                "ORDER BY time DESC, id DESC LIMIT ?", (limit, ))
+        ]
+
+    # ---------- migration ----------
+    def migrate(self, paths=LEGACY_FILES, force=False):
+        """
+        Copy rows from the TinyDB JSON files into the store. Each source row
+        is copied once (keyed by file, table and doc id), so re-running only
+        adds what was appended since; unchanged files are skipped by stat.
+        Returns the number of rows added.
+        """
+        added = 0
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            src = os.path.abspath(path)
+            seen = self._query(
+                "SELECT mtime_ns, size FROM migrations WHERE source = ?",
+                (src, ))
+            if not force and seen and tuple(seen[0]) == (st.st_mtime_ns,
+                                                         st.st_size):
+                continue
+            try:
+                with open(path) as fh:
+                    tables = json.load(fh)
+            except (OSError, ValueError) as e:
+                print(f"[earnings_store] cannot migrate {path}: {e}")
+                continue
+            if not isinstance(tables, dict):
+                continue
+            with self._lock, self.conn:
+                added += self._migrate_tables(src, tables)
+                self.conn.execute(
+                    "INSERT INTO migrations (source, mtime_ns, size) "
+                    "VALUES (?, ?, ?) ON CONFLICT(source) DO UPDATE SET "
+                    "mtime_ns=excluded.mtime_ns, size=excluded.size",
+                    (src, st.st_mtime_ns, st.st_size))
+        return added
+
+    def _migrate_tables(self, src, tables):
+        before = self.conn.total_changes
+
+        def rows(name):
+            table = tables.get(name)
+            if not isinstance(table, dict):
+                return []
+            # doc ids are insertion order in TinyDB
+            return [(f"{src}:{name}:{k}", table[k])
+                    for k in sorted((k for k in table if k.isdigit()), key=int)
+                    if isinstance(table[k], dict)]
+
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO earnings "
+            "(date, ts, amount, source, note, legacy_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(_day(e.get("date")), str(e.get("date", "")), e.get("amount")
+              or 0, e.get("source"), e.get("note", ""), key)
+             for key, e in rows("earnings")])
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO reports (date, summary, locked, legacy_id) "
+            "VALUES (?, ?, ?, ?)",
+            [(r.get("date"), r.get("summary"), int(bool(r.get("locked"))),
+              key) for key, r in rows("reports")])
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO activity (time, event, category, legacy_id) "
+            "VALUES (?, ?, ?, ?)",
+            [(a.get("time", ""), a.get("event"), a.get("category", "general"),
+              key) for key, a in rows("activity")])
+        # memory_data.json "memory": one snapshot per date, latest wins
+        self.conn.executemany(
+            "INSERT INTO income_history (date, timestamp, data) "
+            "VALUES (?, ?, ?) ON CONFLICT(date) DO UPDATE SET "
+            "timestamp=excluded.timestamp, data=excluded.data "
+            "WHERE excluded.timestamp >= income_history.timestamp",
+            [(_day(m.get("date")), m.get("timestamp", ""),
+              json.dumps(m.get("data"))) for _, m in rows("memory")
+             if m.get("date")])
+        return self.conn.total_changes - before
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path=None, migrate=True):
+    """Process-wide store for `path`; legacy JSON files are folded in first."""
+    path = path or EARNINGS_DB
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = EarningsStore(path)
+    if migrate:
+        store.migrate()
+    return store
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="JRAVIS earnings store")
+    p.add_argument("--migrate", nargs="*", metavar="JSON",
+                   help="copy TinyDB files in (default: %s)" %
+                   " ".join(LEGACY_FILES))
+    p.add_argument("--days", type=int, default=0,
+                   help="print daily totals for the last N days")
+    p.add_argument("--weeks", type=int, default=0,
+                   help="print weekly totals for the last N weeks")
+    args = p.parse_args(argv)
+
+    store = open_store(migrate=False)
+    if args.migrate is not None:
+        n = store.migrate(args.migrate or LEGACY_FILES, force=True)
+        print(f"Migrated {n} rows into {store.path}")
+    for row in store.daily_totals(args.days) if args.days else []:
+        print(f"{row['date']}  {row['total']:>12}  ({row['entries']} entries)")
+    for row in store.weekly_totals(args.weeks) if args.weeks else []:
+        print(f"week of {row['week']}  {row['total']:>12}  "
+              f"({row['entries']} entries)")
+    if args.migrate is None and not args.days and not args.weeks:
+        p.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
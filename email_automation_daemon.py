@@ -6,6 +6,10 @@ Sends the latest locked JRAVIS reports via Gmail API using existing token.json c
 - Uses the same OAuth token.json you created earlier.
 - Attaches the most recent *_locked.pdf files from ./archive.
 - Sends to the configured recipient and includes an "Approve" button (mailto link).
+- One Gmail service per process (gmail_client); each attachment is read and
+  encoded once however many recipients get it, and several recipients go
+  out in one batch request.
+- Latest files come from the report catalog, else one scandir pass.
 
 Usage:
   # test run once
@@ -17,19 +21,13 @@ Usage:
 Config (edit at top) or override via env vars.
 """
 import os
-import glob
-import base64
+import heapq
 import time
 import argparse
-import mimetypes
 from datetime import datetime, timedelta
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email.mime.text import MIMEText
-from email import encoders
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+import gmail_client
+import report_catalog
 
 # -------- CONFIG --------
 TOKEN_FILE = "token.json"  # oauth token you created
@@ -38,6 +36,11 @@ ARCHIVE_DIR = "./archive"
 SENDER_NAME = "JRAVIS Auto Mailer"
 SENDER_EMAIL = None  # None => 'me' (uses authenticated Gmail account)
 RECIPIENT_EMAIL = "nrveeresh327@gamil.com"  # from model context
+# comma-separated; each recipient gets its own copy with its own Approve link
+RECIPIENTS = [
+    r.strip() for r in os.getenv("EMAIL_RECIPIENTS", RECIPIENT_EMAIL).split(",")
+    if r.strip()
+]
 MISSION_LOCK_CODE = "2040LOCK"  # include in body (you confirmed same)
 CHECK_INTERVAL = 60 * 60  # seconds between checks in daemon mode (1 hour)
 SEND_HOUR_IST = 10  # 10 AM IST (server timezone conversion may be needed)
@@ -46,54 +49,46 @@ TIMEZONE_OFFSET_HOURS = 5 + 30 / 60  # IST = UTC +5.5 (used only for naive sched
 
 
 def auth_gmail():
-    """Load credentials from token.json and return gmail service."""
-    creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    service = build("gmail", "v1", credentials=creds, cache_discovery=False)
-    return service
+    """The process-wide Gmail sender for token.json (authenticated once)."""
+    return gmail_client.get_sender(TOKEN_FILE, SCOPES)
 
 
 def find_latest_locked_files(directory, match_suffix="_locked.pdf", top_n=2):
     """Return list of latest files (by mtime) in directory that end with match_suffix."""
-    pattern = os.path.join(directory, f"*{match_suffix}")
-    files = glob.glob(pattern)
-    files.sort(key=os.path.getmtime, reverse=True)
-    return files[:top_n]
+    files = report_catalog.latest(top_n, match_suffix, root=directory)
+    if len(files) >= top_n:
+        return files
+    # not (all) catalogued
+    return scan_latest_files(directory, match_suffix, top_n) or files
+
+
+def scan_latest_files(directory, match_suffix, top_n):
+    """One scandir pass over directory, no full sort."""
+    try:
+        with os.scandir(directory) as it:
+            entries = [
+                e for e in it
+                if e.name.endswith(match_suffix) and e.is_file()
+            ]
+    except FileNotFoundError:
+        return []
+    newest = heapq.nlargest(top_n, entries, key=lambda e: e.stat().st_mtime)
+    return [os.path.join(directory, e.name) for e in newest]
+
+
+def make_message_with_attachments(sender, to, subject, html_body, attachments,
+                                  gmail=None):
+    """Create an RFC 822 message (bytes) with attachments; encoded parts are
+    reused across calls."""
+    from_header = f"{SENDER_NAME} <{sender}>" if sender else SENDER_NAME
+    return (gmail or auth_gmail()).message(from_header, to, subject,
+                                           html_body, attachments)
 
 
-def make_message_with_attachments(sender, to, subject, html_body, attachments):
-    """Create a base64-encoded raw message for Gmail API with attachments."""
-    msg = MIMEMultipart()
-    from_header = f"{SENDER_NAME} <{sender}>" if sender else SENDER_NAME
-    msg["From"] = from_header
-    msg["To"] = to
-    msg["Subject"] = subject
-
-    msg.attach(MIMEText(html_body, "html"))
-
-    for path in attachments:
-        if not os.path.exists(path):
-            continue
-        ctype, encoding = mimetypes.guess_type(path)
-        if ctype is None:
-            ctype = "application/octet-stream"
-        maintype, subtype = ctype.split("/", 1)
-        with open(path, "rb") as f:
-            part = MIMEBase(maintype, subtype)
-            part.set_payload(f.read())
-        encoders.encode_base64(part)
-        part.add_header("Content-Disposition",
-                        f"attachment; filename=\"{os.path.basename(path)}\"")
-        msg.attach(part)
-
-    raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-    return {"raw": raw}
-
-
-def send_message(service, message_body):
-    """Send message using Gmail API (userId = 'me')."""
-    sent = service.users().messages().send(userId="me",
-                                           body=message_body).execute()
-    return sent
+def send_message(gmail, messages):
+    """Send messages (one upload, or one batch request for several); returns
+    their ids."""
+    return gmail.send(messages)
 
 
 def build_email_html(date_str, attachments, recipient=RECIPIENT_EMAIL):
@@ -124,7 +119,7 @@ def build_email_html(date_str, attachments, recipient=RECIPIENT_EMAIL):
 
 
 def send_daily_reports_once():
-    service = auth_gmail()
+    gmail = auth_gmail()
     # find attachments (latest locked files)
     locked_files = find_latest_locked_files(ARCHIVE_DIR,
                                             "_locked.pdf",
@@ -137,22 +132,23 @@ def send_daily_reports_once():
     attachments = locked_files[:2]
     date_str = datetime.now().strftime("%Y-%m-%d")
     subject = f"JRAVIS Daily Report - {date_str}"
-    html_body = build_email_html(date_str, attachments)
 
     # determine sender email: use authenticated user if SENDER_EMAIL is None
-    sender = SENDER_EMAIL or "me"
-    msg_body = make_message_with_attachments(
-        sender if sender != "me" else get_authenticated_email(service),
-        RECIPIENT_EMAIL, subject, html_body, attachments)
-    sent = send_message(service, msg_body)
-    print("[Email] Sent message id:", sent.get("id"))
+    sender = SENDER_EMAIL or get_authenticated_email(gmail)
+    messages = [
+        make_message_with_attachments(sender, to, subject,
+                                      build_email_html(date_str, attachments,
+                                                       to), attachments, gmail)
+        for to in RECIPIENTS
+    ]
+    ids = send_message(gmail, messages)
+    print("[Email] Sent message id(s):", ", ".join(map(str, ids)))
     return True
 
 
-def get_authenticated_email(service):
-    """Query Gmail profile to get the authenticated user's email address."""
-    profile = service.users().getProfile(userId="me").execute()
-    return profile.get("emailAddress")
+def get_authenticated_email(gmail):
+    """The authenticated user's email address (profile asked once)."""
+    return gmail.address()
 
 
 def run_daemon_loop():
@@ -0,0 +1,223 @@
+# flask_metrics.py
+"""
+Per-route latency / throughput metrics for the JRAVIS Flask services,
+exposed at /metrics in Prometheus text format.
+
+Enable it with one line after the app is created:
+
+    from flask_metrics import instrument
+    instrument(app)
+
+Recorded per (method, route):
+  - http_request_duration_seconds   histogram (time to response; for streamed
+                                    responses such as SSE that is time to first byte)
+  - http_request_db_seconds         histogram of time spent in timed DB sections
+  - http_requests_total             counter, also labelled by status code
+  - http_requests_in_flight         gauge per app
+
+DB time is whatever runs inside `with db_timer():`, inside a TimedLock used
+as the app's DB lock, or inside a function decorated with @timed_db.
+Unmatched URLs (404s) share the route label "<unmatched>" to keep label
+cardinality bounded.
+
+scripts/bench_flask_metrics.py measures the per-request overhead.
+"""
+
+import itertools
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+from flask import Response, request
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+           2.5, 5.0, 10.0)
+
+_local = threading.local()
+
+
+# ---------- DB timing ----------
+class db_timer:
+    """Context manager adding its elapsed time to the current request's DB time."""
+    __slots__ = ("_t0", )
+
+    def __enter__(self):
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if getattr(_local, "db", None) is not None:
+            _local.db += perf_counter() - self._t0
+        return False
+
+
+class TimedLock:
+    """Drop-in for threading.Lock() whose `with` blocks count as DB time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._t0 = 0.0
+
+    def acquire(self, *args, **kwargs):
+        return self._lock.acquire(*args, **kwargs)
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        t0 = perf_counter()
+        self._lock.acquire()
+        self._t0 = t0  # only one holder at a time, so safe to keep here
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = perf_counter() - self._t0
+        self._lock.release()
+        if getattr(_local, "db", None) is not None:
+            _local.db += elapsed
+        return False
+
+
+def timed_db(fn):
+    """Decorator: count the wrapped function's run time as DB time."""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with db_timer():
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# ---------- registry ----------
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+
+    def __init__(self, app_name):
+        self.app_name = app_name
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.db = {}
+        self.status = {}
+        # in-flight = started - finished; next() on a count is atomic under
+        # the GIL, so request start needs no lock (the gauge may briefly lag
+        # by a request when two start at once)
+        self.started = itertools.count(1)
+        self.last_started = 0
+        self.finished = 0
+
+    def record(self, method, route, status, elapsed, db_elapsed):
+        key = (method, route)
+        skey = (method, route, status)
+        with self.lock:
+            h = self.latency.get(key)
+            if h is None:
+                h = self.latency[key] = _Histogram()
+                self.db[key] = _Histogram()
+            h.counts[bisect_left(BUCKETS, elapsed)] += 1
+            h.sum += elapsed
+            h.count += 1
+            d = self.db[key]
+            d.counts[bisect_left(BUCKETS, db_elapsed)] += 1
+            d.sum += db_elapsed
+            d.count += 1
+            self.status[skey] = self.status.get(skey, 0) + 1
+            self.finished += 1
+
+    @property
+    def in_flight(self):
+        return self.last_started - self.finished
+
+    def render(self):
+        out = []
+        with self.lock:
+            self._render_hist(out, "http_request_duration_seconds",
+                              "Request latency by route.", self.latency)
+            self._render_hist(out, "http_request_db_seconds",
+                              "Time spent in DB per request by route.",
+                              self.db)
+            out.append("# HELP http_requests_total Requests by route and status.")
+            out.append("# TYPE http_requests_total counter")
+            for (method, route, status), n in sorted(self.status.items()):
+                out.append(f"http_requests_total{{{self._labels(method, route)},"
+                           f"status=\"{status}\"}} {n}")
+            out.append("# HELP http_requests_in_flight Requests being served.")
+            out.append("# TYPE http_requests_in_flight gauge")
+            out.append(f"http_requests_in_flight{{app=\"{self.app_name}\"}} "
+                       f"{self.in_flight}")
+        return "\n".join(out) + "\n"
+
+    def _labels(self, method, route):
+        route = route.replace("\\", "\\\\").replace('"', '\\"')
+        return f'app="{self.app_name}",method="{method}",route="{route}"'
+
+    def _render_hist(self, out, name, help_text, hists):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} histogram")
+        for (method, route), h in sorted(hists.items()):
+            labels = self._labels(method, route)
+            cumulative = 0
+            for le, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                out.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            out.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+            out.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+            out.append(f"{name}_count{{{labels}}} {h.count}")
+
+
+def instrument(app, path="/metrics"):
+    """Attach timing hooks and a Prometheus /metrics endpoint to `app`."""
+    if "flask_metrics" in app.extensions:
+        return app.extensions["flask_metrics"]
+    metrics = Metrics(app.name)
+    app.extensions["flask_metrics"] = metrics
+
+    started = metrics.started
+
+    def _start():
+        _local.t0 = perf_counter()
+        _local.db = 0.0
+        _local.status = 500
+        metrics.last_started = next(started)
+
+    def _status(response):
+        _local.status = response.status_code
+        return response
+
+    def _finish(exc):
+        t0 = getattr(_local, "t0", None)
+        if t0 is None:
+            return
+        elapsed = perf_counter() - t0
+        req = request._get_current_object()  # one proxy lookup, not two
+        rule = req.url_rule
+        metrics.record(req.method,
+                       rule.rule if rule is not None else "<unmatched>",
+                       _local.status, elapsed, _local.db)
+        _local.t0 = _local.db = None
+
+    # run before any other before_request hook so auth redirects are timed too
+    app.before_request_funcs.setdefault(None, []).insert(0, _start)
+    app.after_request(_status)
+    app.teardown_request(_finish)
+
+    @app.route(path, endpoint="flask_metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(),
+                        content_type="text/plain; version=0.0.4")
+
+    return metrics
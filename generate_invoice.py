@@ -1,10 +1,7 @@
-import pdfkit
 import os
 from datetime import datetime
 
-# wkhtmltopdf path on Replit
-wk_path = '/nix/store/hxiay4lkq4389vxnhnb3d0pbaw6siwkw-wkhtmltopdf/bin/wkhtmltopdf'
-config = pdfkit.configuration(wkhtmltopdf=wk_path)
+import pdf_render
 
 # Example dynamic data
 invoice_data = {
@@ -29,26 +26,19 @@ invoice_data = {
     }]
 }
 
-# Generate items rows HTML
-items_html = ""
+# Items table rows (same columns as invoice_template.html)
+rows = []
 grand_total = 0
 for item in invoice_data["items"]:
-    items_html += f"<tr><td>{item['no']}</td><td>{item['desc']}</td><td>{item['qty']}</td><td>{item['unit_price']}</td><td>{item['total']}</td></tr>"
+    rows.append((item['no'], item['desc'], item['qty'], item['unit_price'],
+                 item['total']))
     grand_total += item["total"]
 
-invoice_data["items"] = items_html
+invoice_data["items"] = rows
 invoice_data["grand_total"] = grand_total
 
-# Read template
-with open("invoice_template.html", "r") as f:
-    template = f.read()
-
-# Replace placeholders
-for key, value in invoice_data.items():
-    template = template.replace(f"{{{{{key}}}}}", str(value))
-
-# Output PDF
+# Output PDF from the compiled invoice template (no wkhtmltopdf process)
 output_pdf = f"Invoice_{invoice_data['invoice_no']}.pdf"
-pdfkit.from_string(template, output_pdf, configuration=config)
+pdf_render.render("invoice", output_pdf, **invoice_data)
 
 print(f"Invoice PDF generated: {output_pdf}")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+gmail_client.py
+Sending JRAVIS mail through the Gmail API, plus a local fake of the part of
+the API it uses.
+
+    GmailSender    one credentialed Gmail service (get_sender() keeps one per
+                   token file per process); messages are built by smtp_stream
+                   with attachment parts from a PartCache, and sent as a
+                   message/rfc822 media upload (no base64 layer around the
+                   whole message) or, several small ones at a time, as one
+                   batch HTTP request
+    PartCache      encoded attachment parts by content SHA-256 (LRU, up to
+                   CACHE_MB), so a PDF going to several recipients is read and
+                   encoded once
+    FakeGmail      stands in for googleapiclient's gmail v1 service
+                   (users().messages().send, users().getProfile,
+                   new_batch_http_request); counts HTTP calls in `calls`, with
+                   optional per-call latency, and keeps what was sent
+
+    sender = gmail_client.get_sender("token.json")
+    raw = sender.message(sender.address(), "me@x", "Daily", html,
+                         ["archive/x_locked.pdf"])
+    sender.send([raw])
+
+scripts/bench_gmail_send.py compares this with the old per-run build.
+"""
+
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from email import message_from_bytes, policy
+
+import smtp_stream
+
+SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
+CACHE_MB = float(os.getenv("GMAIL_PART_CACHE_MB", "64"))
+# messages up to this size go in batches as JSON "raw"; bigger ones are
+# uploaded alone (the upload endpoint takes up to 35 MB)
+BATCH_RAW_MAX = 4 * 1024 * 1024
+BATCH_SIZE = 50  # Gmail's advice for batch requests
+
+
+class PartCache:
+    """Encoded attachment parts, keyed by (content SHA-256, filename)."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = (CACHE_MB * 1024 * 1024 if max_bytes is None
+                          else max_bytes)
+        self.hits = self.misses = 0
+        self._parts = OrderedDict()  # (sha, name) -> part bytes
+        self._sha = {}  # (path, size, mtime_ns) -> sha
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def part(self, path):
+        """The attachment part for path; the file is read only when its
+        size or mtime changed since it was last seen."""
+        st = os.stat(path)
+        name = os.path.basename(path)
+        stamp = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            key = (self._sha.get(stamp), name)
+            part = self._parts.get(key)
+            if part is not None:
+                self._parts.move_to_end(key)
+                self.hits += 1
+                return part
+        with open(path, "rb") as fh:
+            data = fh.read()
+        key = (hashlib.sha256(data).hexdigest(), name)
+        with self._lock:
+            if len(self._sha) > 4096:
+                self._sha.clear()
+            self._sha[stamp] = key[0]
+            part = self._parts.get(key)
+            if part is not None:  # same content under another path
+                self._parts.move_to_end(key)
+                self.hits += 1
+                return part
+            self.misses += 1
+            part = smtp_stream.attachment_part(name, data)
+            self._parts[key] = part
+            self._bytes += len(part)
+            while self._bytes > self.max_bytes and len(self._parts) > 1:
+                _, old = self._parts.popitem(last=False)
+                self._bytes -= len(old)
+            return part
+
+
+def _media_upload(data):
+    from googleapiclient.http import MediaInMemoryUpload
+    return MediaInMemoryUpload(data, mimetype="message/rfc822",
+                               resumable=False)
+
+
+class GmailSender:
+
+    def __init__(self, service, cache=None, media=None):
+        self.service = service
+        self.parts = cache or PartCache()
+        self.media = media or _media_upload
+        self._address = None
+
+    @classmethod
+    def from_token(cls, token_file, scopes=SCOPES, **kw):
+        """From an OAuth token.json; the credentials refresh themselves."""
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+        creds = Credentials.from_authorized_user_file(token_file, scopes)
+        return cls(build("gmail", "v1", credentials=creds,
+                         cache_discovery=False), **kw)
+
+    def address(self):
+        """The authenticated account's address (asked once)."""
+        if self._address is None:
+            profile = self.service.users().getProfile(userId="me").execute()
+            self._address = profile.get("emailAddress")
+        return self._address
+
+    def message(self, from_addr, to, subject, html, attachments=()):
+        """An RFC 822 message (bytes) with an HTML body; missing
+        attachments are skipped."""
+        parts = [self.parts.part(p) for p in attachments if os.path.exists(p)]
+        return b"".join(smtp_stream.message_chunks(
+            from_addr, [to], subject, html, subtype="html", parts=parts))
+
+    def send(self, messages):
+        """Send RFC 822 messages; returns their Gmail ids, in order. Raises
+        the first error after every message has been tried."""
+        ids = [None] * len(messages)
+        errors = []
+        batchable = [i for i, m in enumerate(messages)
+                     if len(m) <= BATCH_RAW_MAX]
+        if len(batchable) < 2:
+            batchable = []
+        for i, data in enumerate(messages):
+            if i in batchable:
+                continue
+            try:
+                ids[i] = self.service.users().messages().send(
+                    userId="me", body={},
+                    media_body=self.media(data)).execute().get("id")
+            except Exception as e:
+                errors.append(e)
+
+        def done(request_id, response, exception):
+            if exception is not None:
+                errors.append(exception)
+            else:
+                ids[int(request_id)] = response.get("id")
+
+        for start in range(0, len(batchable), BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=done)
+            for i in batchable[start:start + BATCH_SIZE]:
+                raw = base64.urlsafe_b64encode(messages[i]).decode("ascii")
+                batch.add(self.service.users().messages().send(
+                    userId="me", body={"raw": raw}), request_id=str(i))
+            batch.execute()
+        if errors:
+            raise errors[0]
+        return ids
+
+
+_senders = {}
+_senders_lock = threading.Lock()
+
+
+def get_sender(token_file="token.json", scopes=SCOPES):
+    """The process-wide GmailSender for a token file."""
+    with _senders_lock:
+        sender = _senders.get(token_file)
+        if sender is None:
+            sender = _senders[token_file] = GmailSender.from_token(
+                token_file, scopes)
+        return sender
+
+
+# ---------- local fake ----------
+class _Request:
+
+    def __init__(self, gmail, name, fn):
+        self.gmail, self.name, self.fn = gmail, name, fn
+
+    def execute(self):
+        self.gmail._http(self.name)
+        return self.fn()
+
+
+class _Batch:
+
+    def __init__(self, gmail, callback):
+        self.gmail, self.callback, self.requests = gmail, callback, []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id or str(len(self.requests)),
+                              request))
+
+    def execute(self):
+        self.gmail._http("batch")
+        for request_id, request in self.requests:
+            try:
+                response, error = request.fn(), None
+            except Exception as e:
+                response, error = None, e
+            self.callback(request_id, response, error)
+
+
+class FakeGmail:
+    """
+    The Gmail v1 calls GmailSender makes, in memory. `sent` holds the
+    parsed messages, `calls` counts HTTP requests by kind ("send",
+    "upload", "batch", "profile") and `bytes_in` the message payload they
+    carried (the "raw" string, or the uploaded bytes); each HTTP request
+    costs `latency` seconds.
+
+        gmail = FakeGmail()
+        sender = GmailSender(gmail, media=FakeGmail.media)
+    """
+
+    def __init__(self, address="jravis.bot@example.com", latency=0.0):
+        self.address = address
+        self.latency = latency
+        self.calls = Counter()
+        self.bytes_in = 0
+        self.sent = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def media(data):
+        return data
+
+    def _http(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        time.sleep(self.latency)
+
+    def _store(self, raw, wire):
+        msg = message_from_bytes(raw, policy=policy.default)
+        with self._lock:
+            self.bytes_in += wire
+            self.sent.append(msg)
+            return {"id": f"fake{len(self.sent)}", "labelIds": ["SENT"]}
+
+    # googleapiclient-shaped surface
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def getProfile(self, userId="me"):
+        return _Request(self, "profile",
+                        lambda: {"emailAddress": self.address})
+
+    def send(self, userId="me", body=None, media_body=None):
+        if media_body is not None:
+            data = (media_body if isinstance(media_body, bytes) else
+                    media_body.getbytes(0, media_body.size()))
+            return _Request(self, "upload",
+                            lambda: self._store(data, len(data)))
+        raw = base64.urlsafe_b64decode(body["raw"])
+        return _Request(self, "send",
+                        lambda: self._store(raw, len(body["raw"])))
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
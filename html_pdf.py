@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+html_pdf.py
+Batched HTML -> PDF conversion with wkhtmltopdf.
+
+pdfkit.from_string / from_file start a fresh wkhtmltopdf (and with it a
+whole WebKit engine) for every PDF. Here many documents share one converter
+process: wkhtmltopdf --read-args-from-stdin takes one "input output" pair
+per line and converts them in turn, so start-up is paid once per batch
+instead of once per document. Each document still gets its own output file,
+so nothing has to be split afterwards.
+
+    import html_pdf
+    html_pdf.render_many([("a.html", "a.pdf"), ("<h1>Hi</h1>", "b.pdf", True)])
+    html_pdf.from_string("<h1>Hi</h1>", "hi.pdf")
+
+A pair's source is an HTML string when its third item (is_string) is True,
+as from_string passes it, and a file path when it is False. Without one the
+source is taken for an HTML string if it is not an existing file and
+contains "<". Batches of HTML_PDF_BATCH documents run on
+up to HTML_PDF_WORKERS converter processes at once. A document missing from
+a batch's output is retried on its own, so one bad page does not sink the
+rest.
+
+Config:
+  WKHTMLTOPDF        converter binary (default: PATH, then the Replit path)
+  HTML_PDF_BATCH     documents per converter process (default 50)
+  HTML_PDF_WORKERS   concurrent converter processes (default: cores)
+  HTML_PDF_TIMEOUT   seconds per document before a batch is abandoned (30)
+
+scripts/bench_html_pdf.py compares per-file pdfkit with batches.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+REPLIT_WKHTMLTOPDF = ("/nix/store/hxiay4lkq4389vxnhnb3d0pbaw6siwkw-wkhtmltopdf"
+                      "/bin/wkhtmltopdf")
+BATCH_SIZE = int(os.getenv("HTML_PDF_BATCH", "50"))
+WORKERS = int(os.getenv("HTML_PDF_WORKERS", "0")) or os.cpu_count() or 1
+TIMEOUT = float(os.getenv("HTML_PDF_TIMEOUT", "30"))
+# same defaults pdfkit passes
+OPTIONS = ("--quiet", "--encoding", "UTF-8")
+
+
+def find_wkhtmltopdf():
+    for path in (os.getenv("WKHTMLTOPDF"), shutil.which("wkhtmltopdf"),
+                 REPLIT_WKHTMLTOPDF):
+        if path and os.path.exists(path):
+            return path
+    raise FileNotFoundError(
+        "wkhtmltopdf not found (set WKHTMLTOPDF or install it)")
+
+
+def _quote(arg):
+    # wkhtmltopdf splits stdin lines on whitespace; backslash escapes
+    return re.sub(r"([\\\s\"'])", r"\\\1", str(arg))
+
+
+def _is_html(source, is_string=None):
+    if is_string is not None:
+        return is_string
+    return "<" in source and not os.path.exists(source)
+
+
+def _convert(binary, pairs, options):
+    """One converter process for every (html_path, out_path) in pairs."""
+    lines = "".join(f"{_quote(src)} {_quote(out)}\n" for src, out in pairs)
+    for _, out in pairs:
+        if os.path.exists(out):
+            os.remove(out)
+    try:
+        subprocess.run([binary, *options, "--read-args-from-stdin"],
+                       input=lines.encode(),
+                       stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL,
+                       timeout=TIMEOUT * len(pairs))
+    except subprocess.TimeoutExpired:
+        print(f"[html_pdf] batch of {len(pairs)} timed out")
+    # wkhtmltopdf exits non-zero for load warnings too; the outputs decide
+    return [
+        out if os.path.exists(out) and os.path.getsize(out) else None
+        for _, out in pairs
+    ]
+
+
+def _convert_batch(binary, pairs, options):
+    results = _convert(binary, pairs, options)
+    if len(pairs) > 1:
+        for i, (pair, path) in enumerate(zip(pairs, results)):
+            if path is None:
+                results[i] = _convert(binary, [pair], options)[0]
+    for (src, out), path in zip(pairs, results):
+        if path is None:
+            print(f"[html_pdf] failed to convert {os.path.basename(src)} -> {out}")
+    return results
+
+
+def render_many(pairs, options=OPTIONS, batch_size=None, workers=None):
+    """
+    Convert every (source, out_path[, is_string]) pair. Returns out_path
+    per pair, in order, or None where that document failed.
+    """
+    pairs = [(str(p[0]), str(p[1]), p[2] if len(p) > 2 else None)
+             for p in pairs]
+    if not pairs:
+        return []
+    binary = find_wkhtmltopdf()
+    batch_size = batch_size or BATCH_SIZE
+    workers = workers or WORKERS
+    with tempfile.TemporaryDirectory(prefix="html_pdf_") as tmp:
+        jobs = []
+        for i, (src, out, is_string) in enumerate(pairs):
+            if _is_html(src, is_string):
+                path = os.path.join(tmp, f"doc_{i}.html")
+                with open(path, "w", encoding="utf-8") as fh:
+                    fh.write(src)
+                src = path
+            elif not os.path.exists(src):
+                raise FileNotFoundError(f"HTML file not found: {src}")
+            jobs.append((os.path.abspath(src), os.path.abspath(out)))
+        # spread small runs over every converter instead of filling one batch
+        size = max(1, min(batch_size, -(-len(jobs) // workers)))
+        batches = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+        if len(batches) == 1:
+            done = [_convert_batch(binary, batches[0], options)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                done = list(
+                    pool.map(lambda b: _convert_batch(binary, b, options),
+                             batches))
+    # report the caller's paths, not the absolute ones
+    return [
+        out if path else None
+        for (_, out, _), path in zip(pairs,
+                                     (p for batch in done for p in batch))
+    ]
+
+
+def from_string(html, out_path, options=OPTIONS):
+    """Like pdfkit.from_string: html is always the document itself."""
+    return render_many([(html, out_path, True)], options)[0]
+
+
+def from_file(html_file, out_path, options=OPTIONS):
+    if not os.path.exists(html_file):
+        raise FileNotFoundError(f"HTML file not found: {html_file}")
+    return render_many([(html_file, out_path, False)], options)[0]
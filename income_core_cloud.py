@@ -11,6 +11,13 @@ Usage:
         https://<your-url>/webhook/fiverr
   - Run: python income_core_cloud.py
 
+Webhooks are acked as soon as they are validated and durably queued
+(webhook_queue); worker threads verify (PayPal), record and invoice them in
+batches. A provider retry of an order already queued or processed is acked
+and dropped. When WEBHOOK_MAX_DEPTH events are waiting the routes answer
+503 with Retry-After, so providers back off and redeliver.
+  python3 webhook_queue.py --stats | --failed | --requeue-failed
+
 Notes & Safety:
   - This is live-mode code. Do NOT commit credentials to git.
   - You must create app credentials on each platform and paste them into your environment secrets.
@@ -26,8 +33,12 @@ import threading
 import requests
 from datetime import datetime
 from flask import Flask, request, jsonify
-from tinydb import TinyDB, Query
-from fpdf import FPDF
+from tinydb import TinyDB
+from flask_metrics import instrument, timed_db
+
+import report_catalog
+import webhook_queue
+from report_engine import get_engine, invoice_filename, render_order_invoice
 
 # ------------------------
 # Configuration via env
@@ -63,6 +74,12 @@ LOCK_CODE = os.getenv("LOCK_CODE")  # optional PDF lock
 # Data & DB
 DB_FILE = os.getenv("JRAVIS_DB", "jravis_ledger.json")
 db = TinyDB(DB_FILE)
+_ledger_lock = threading.Lock()
+# (platform, order_id) -> [doc_id, invoiced, claimed by a caller invoicing it]
+_ledger = None
+
+# seconds a provider is asked to wait when the webhook queue is full
+RETRY_AFTER = int(os.getenv("WEBHOOK_RETRY_AFTER", "30"))
 
 
 # Logging helper
@@ -178,44 +195,104 @@ def fiverr_get_order(order_id):
 # ------------------------
 def generate_invoice_pdf(order_record, out_path):
     """Generate a simple invoice PDF for a single order."""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Helvetica", size=12)
-    pdf.cell(0, 10, f"JRAVIS Invoice", ln=True)
-    pdf.cell(0, 8, f"Order ID: {order_record['order_id']}", ln=True)
-    pdf.cell(0, 8, f"Platform: {order_record['platform']}", ln=True)
-    pdf.cell(0, 8, f"Buyer: {order_record.get('buyer_name','-')}", ln=True)
-    pdf.cell(0,
-             8,
-             f"Amount: {order_record['currency']} {order_record['amount']}",
-             ln=True)
-    pdf.ln(6)
-    pdf.multi_cell(0, 6, f"Details: {order_record.get('notes','-')}")
-    pdf.output(out_path)
+    render_order_invoice(order_record, out_path)
+    report_catalog.register(out_path, "invoice")
     return out_path
 
 
-def record_order_in_ledger(order_record):
-    # Save to TinyDB ledger (deduplicate by platform+order_id)
-    Orders = Query()
-    existing = db.search((Orders.platform == order_record["platform"])
-                         & (Orders.order_id == order_record["order_id"]))
-    if existing:
-        log("Order already recorded:", order_record["platform"],
+def _ledger_index():
+    """The ledger's keys, read once per process (this process is the
+    ledger's only writer). Call with _ledger_lock held."""
+    global _ledger
+    if _ledger is None:
+        # rows from before the invoiced flag were invoiced when recorded
+        _ledger = {(r.get("platform"), r.get("order_id")):
+                   [r.doc_id, r.get("invoiced", True), False]
+                   for r in db.all()}
+    return _ledger
+
+
+@timed_db
+def record_orders_in_ledger(order_records):
+    """
+    Save orders to the TinyDB ledger, deduplicated by platform+order_id, in
+    one write; returns the records that were new. New rows are marked
+    invoiced by mark_invoiced() once their invoice is out.
+    """
+    new, rows = [], []
+    with _ledger_lock:
+        ledger = _ledger_index()
+        seen = []
+        for order_record in order_records:
+            key = (order_record["platform"], order_record["order_id"])
+            if key in ledger or key in seen:
+                log("Order already recorded:", *key)
+                continue
+            seen.append(key)
+            new.append(order_record)
+            rows.append({
+                "platform": order_record["platform"],
+                "order_id": order_record["order_id"],
+                "amount": order_record["amount"],
+                "currency": order_record.get("currency", "USD"),
+                "buyer": order_record.get("buyer_name"),
+                "timestamp": now(),
+                "invoiced": False,
+                "raw": order_record
+            })
+        if rows:
+            for key, doc_id in zip(seen, db.insert_multiple(rows)):
+                ledger[key] = [doc_id, False, False]
+    for order_record in new:
+        log("Recorded order in ledger:", order_record["platform"],
             order_record["order_id"])
-        return False
-    db.insert({
-        "platform": order_record["platform"],
-        "order_id": order_record["order_id"],
-        "amount": order_record["amount"],
-        "currency": order_record.get("currency", "USD"),
-        "buyer": order_record.get("buyer_name"),
-        "timestamp": now(),
-        "raw": order_record
-    })
-    log("Recorded order in ledger:", order_record["platform"],
-        order_record["order_id"])
-    return True
+    return new
+
+
+def record_order_in_ledger(order_record):
+    return bool(record_orders_in_ledger([order_record]))
+
+
+def uninvoiced_orders(order_records):
+    """
+    Claim the records that are in the ledger but have no invoice yet (new,
+    or left behind by a run that failed after recording them) and return
+    them. A record another caller has claimed is left out, so the poller and
+    the webhook workers never invoice the same order twice; the caller must
+    end every claim with mark_invoiced() or release_orders().
+    """
+    with _ledger_lock:
+        ledger = _ledger_index()
+        out = []
+        for order_record in order_records:
+            entry = ledger.get(
+                (order_record["platform"], order_record["order_id"]))
+            if entry and not entry[1] and not entry[2]:
+                entry[2] = True
+                out.append(order_record)
+        return out
+
+
+def release_orders(order_records):
+    """Drop the claims uninvoiced_orders() took (no-op once invoiced)."""
+    with _ledger_lock:
+        ledger = _ledger_index()
+        for r in order_records:
+            ledger[(r["platform"], r["order_id"])][2] = False
+
+
+@timed_db
+def mark_invoiced(order_records):
+    """Flag the orders' ledger rows as invoiced and notified (one write) and
+    release their claims."""
+    with _ledger_lock:
+        ledger = _ledger_index()
+        entries = [ledger[(r["platform"], r["order_id"])]
+                   for r in order_records]
+        if entries:
+            db.update({"invoiced": True}, doc_ids=[e[0] for e in entries])
+            for entry in entries:
+                entry[1], entry[2] = True, False
 
 
 def notify_post_order(order_record, invoice_path):
@@ -226,14 +303,13 @@ def notify_post_order(order_record, invoice_path):
     # Keep it lightweight in live mode to avoid rate limits
 
 
-# The unified order pipeline
-def process_order_unified(platform,
-                          order_id,
-                          amount,
-                          currency="USD",
-                          buyer_name=None,
-                          notes=None):
-    order_record = {
+def make_order_record(platform,
+                      order_id,
+                      amount,
+                      currency="USD",
+                      buyer_name=None,
+                      notes=None):
+    return {
         "platform": platform,
         "order_id": str(order_id),
         "amount": float(amount),
@@ -241,23 +317,192 @@ def process_order_unified(platform,
         "buyer_name": buyer_name or "",
         "notes": notes or ""
     }
-    recorded = record_order_in_ledger(order_record)
-    if not recorded:
+
+
+def invoices_dir():
+    path = os.path.join(os.getcwd(), "invoices")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# The unified order pipeline
+def process_order_unified(platform,
+                          order_id,
+                          amount,
+                          currency="USD",
+                          buyer_name=None,
+                          notes=None):
+    order_record = make_order_record(platform, order_id, amount, currency,
+                                     buyer_name, notes)
+    record_order_in_ledger(order_record)
+    if not uninvoiced_orders([order_record]):
         return False
-    # generate invoice
-    invoices_dir = os.path.join(os.getcwd(), "invoices")
-    os.makedirs(invoices_dir, exist_ok=True)
-    invoice_filename = f"invoice_{platform}_{order_id}.pdf"
-    invoice_path = os.path.join(invoices_dir, invoice_filename)
-    generate_invoice_pdf(order_record, invoice_path)
-    notify_post_order(order_record, invoice_path)
+    try:
+        # generate invoice
+        invoice_path = os.path.join(invoices_dir(),
+                                    invoice_filename(order_record))
+        generate_invoice_pdf(order_record, invoice_path)
+        notify_post_order(order_record, invoice_path)
+        mark_invoiced([order_record])
+    finally:
+        release_orders([order_record])
     return True
 
 
+def process_orders_bulk(order_records):
+    """
+    Record a batch of orders, then render the invoices of those without one
+    (new, or recorded by an earlier run that failed before invoicing)
+    together on the report_engine pool (batched per worker). Orders another
+    caller is invoicing right now are skipped. Returns how many this call
+    invoiced; raises if any invoice failed, after marking the others, so a
+    retry renders only what is missing.
+    """
+    order_records = list(order_records)
+    record_orders_in_ledger(order_records)
+    todo = uninvoiced_orders(order_records)
+    if not todo:
+        return 0
+    done = []
+    try:
+        paths = get_engine().render_invoices(todo, invoices_dir())
+        for order_record, invoice_path in zip(todo, paths):
+            if invoice_path:
+                notify_post_order(order_record, invoice_path)
+                done.append(order_record)
+    finally:
+        mark_invoiced(done)
+        release_orders(todo)
+    if len(done) < len(todo):
+        raise RuntimeError(f"{len(todo) - len(done)} invoice(s) failed")
+    return len(done)
+
+
+# ------------------------
+# Webhook payloads -> order records
+# ------------------------
+PAYPAL_EVENTS = ("CHECKOUT.ORDER.APPROVED", "PAYMENT.CAPTURE.COMPLETED",
+                 "CHECKOUT.ORDER.COMPLETED")
+
+
+def paypal_order(body):
+    """Order record for a PayPal event we act on, else None."""
+    event_type = body.get("event_type")
+    # Example: CHECKOUT.ORDER.APPROVED or PAYMENT.CAPTURE.COMPLETED
+    if event_type not in PAYPAL_EVENTS:
+        return None
+    resource = body.get("resource", {})
+    # resource may be capture or order, adapt as needed
+    order_id = resource.get("id") or resource.get("order_id") or resource.get(
+        "invoice_id")
+    # Try to derive amount
+    amount = None
+    currency = "USD"
+    if resource.get("amount") and isinstance(resource["amount"], dict):
+        amount = resource["amount"].get("value")
+        currency = resource["amount"].get("currency_code", "USD")
+    elif resource.get("purchase_units"):
+        pu = resource["purchase_units"][0]
+        amount = pu.get("amount", {}).get("value")
+        currency = pu.get("amount", {}).get("currency_code", "USD")
+    if not amount:
+        return None
+    return make_order_record(
+        "paypal",
+        order_id,
+        amount,
+        currency,
+        buyer_name=resource.get("payer", {}).get("name", {}).get("given_name"))
+
+
+def printify_order(data):
+    # Printify posts order payloads; refer to Printify docs for exact shape
+    order_id = data.get("id") or data.get("order_id")
+    total = data.get("total_price")
+    if not (order_id and total):
+        return None
+    return make_order_record("printify",
+                             order_id,
+                             total,
+                             currency=data.get("currency", "USD"),
+                             buyer_name=data.get("recipient", {}).get("name"))
+
+
+def etsy_order(data):
+    # Etsy payloads vary; adapt mapping
+    order_id = data.get("receipt_id") or data.get("order_id") or data.get("id")
+    total = data.get("grandtotal", {}).get("amount") if isinstance(
+        data.get("grandtotal"),
+        dict) else data.get("price") or data.get("total")
+    if not (order_id and total):
+        return None
+    return make_order_record("etsy",
+                             order_id,
+                             total,
+                             currency="USD",
+                             buyer_name=data.get("buyer_user_name"))
+
+
+def fiverr_order(data):
+    order_id = data.get("order_id") or data.get("id")
+    total = data.get("amount") or data.get("price")
+    if not (order_id and total):
+        return None
+    return make_order_record("fiverr",
+                             order_id,
+                             total,
+                             currency="USD",
+                             buyer_name=data.get("buyer"))
+
+
+WEBHOOK_ORDERS = {
+    "paypal": paypal_order,
+    "printify": printify_order,
+    "etsy": etsy_order,
+    "fiverr": fiverr_order,
+}
+
+
+def handle_webhook_events(events):
+    """
+    webhook_queue handler: verify PayPal events, then record and invoice the
+    batch's orders together. Returns one result per event (None = done).
+    """
+    results, records = [], []
+    for event in events:
+        body = json.loads(event.payload)
+        if event.source == "paypal":
+            try:
+                verified = paypal_verify_webhook(event.headers, body)
+            except Exception as e:
+                log("PayPal verify error:", e)
+                results.append(e)  # retried later
+                continue
+            # If unable to verify but in LIVE mode, reject; if no webhook id, accept but log
+            if not verified and PAYPAL_WEBHOOK_ID:
+                log("Paypal webhook not verified; rejecting", event.key)
+                results.append(webhook_queue.Reject("not verified"))
+                continue
+        records.append(WEBHOOK_ORDERS[event.source](body))
+        results.append(None)
+    if records:
+        try:
+            process_orders_bulk(records)
+        except Exception as e:
+            log("Webhook batch failed:", e)
+            return [r or e for r in results]
+    return results
+
+
+def get_webhook_queue():
+    return webhook_queue.get_queue(handle_webhook_events)
+
+
 # ------------------------
 # Flask Webhooks
 # ------------------------
 app = Flask("income_core")
+instrument(app)
 
 
 @app.route("/health")
@@ -265,121 +510,69 @@ def health():
     return jsonify({"status": "ok", "time": now()})
 
 
-@app.route("/webhook/paypal", methods=["POST"])
-def webhook_paypal():
+def webhook_key(platform, order_record, headers=None):
+    """
+    Idempotency key for a queued webhook. PayPal events are only verified
+    on the workers, so until then they are keyed on their transmission id:
+    a forged event naming a real order cannot shadow the genuine delivery
+    (both are queued, the ledger records the order once).
+    """
+    if platform == "paypal" and (headers or {}).get("paypal-transmission-id"):
+        return f"paypal-tx:{headers['paypal-transmission-id']}"
+    return f"{platform}:{order_record['order_id']}"
+
+
+def ingest_webhook(platform, headers=None):
+    """
+    Validate the request body, queue it durably and ack; processing happens
+    on the webhook_queue workers. A redelivered order is acked again.
+    """
     try:
         body = request.get_json(force=True)
+        order_record = WEBHOOK_ORDERS[platform](body)
     except Exception as e:
-        log("Invalid JSON in PayPal webhook:", e)
-        return jsonify({"error": "invalid json"}), 400
-
-    headers = {k.lower(): v for k, v in request.headers.items()}
-    verified = False
+        log(f"Invalid {platform} webhook:", e)
+        return jsonify({"error": "invalid payload"}), 400
+    if order_record is None:
+        if platform == "paypal":
+            log("PayPal webhook event:", body.get("event_type"))
+            return jsonify({"ok": False, "note": "unhandled_event"}), 200
+        return jsonify({"ok": False}), 200
     try:
-        verified = paypal_verify_webhook(headers, body)
-    except Exception as e:
-        log("PayPal verify error:", e)
-    # If unable to verify but in LIVE mode, reject; if no webhook id, accept but log
-    if not verified and PAYPAL_WEBHOOK_ID:
-        log("Paypal webhook not verified; rejecting")
-        return jsonify({"error": "not verified"}), 400
+        queued = get_webhook_queue().put(
+            platform, webhook_key(platform, order_record, headers),
+            request.get_data(), headers)
+    except webhook_queue.Full as e:
+        log(f"Webhook queue full, {platform} asked to retry:", e)
+        return (jsonify({"error": "busy"}), 503, {
+            "Retry-After": str(RETRY_AFTER)
+        })
+    return jsonify({"ok": True, "queued": queued is not None}), 200
 
-    # Check event type
-    event_type = body.get("event_type")
-    log("PayPal webhook event:", event_type)
-    # Example: CHECKOUT.ORDER.APPROVED or PAYMENT.CAPTURE.COMPLETED
-    if event_type in ("CHECKOUT.ORDER.APPROVED", "PAYMENT.CAPTURE.COMPLETED",
-                      "CHECKOUT.ORDER.COMPLETED"):
-        resource = body.get("resource", {})
-        # resource may be capture or order, adapt as needed
-        order_id = resource.get("id") or resource.get(
-            "order_id") or resource.get("invoice_id")
-        # Try to derive amount
-        amount = None
-        currency = "USD"
-        if resource.get("amount") and isinstance(resource["amount"], dict):
-            amount = resource["amount"].get("value")
-            currency = resource["amount"].get("currency_code", "USD")
-        elif resource.get("purchase_units"):
-            pu = resource["purchase_units"][0]
-            amount = pu.get("amount", {}).get("value")
-            currency = pu.get("amount", {}).get("currency_code", "USD")
-        if amount:
-            # record
-            ok = process_order_unified(
-                "paypal",
-                order_id,
-                amount,
-                currency,
-                buyer_name=resource.get("payer", {}).get("name",
-                                                         {}).get("given_name"))
-            return jsonify({"ok": ok}), 200
-    return jsonify({"ok": False, "note": "unhandled_event"}), 200
+
+@app.route("/webhook/paypal", methods=["POST"])
+def webhook_paypal():
+    # the verify API needs the transmission headers, so they are kept
+    headers = {
+        k.lower(): v
+        for k, v in request.headers.items() if k.lower().startswith("paypal-")
+    }
+    return ingest_webhook("paypal", headers)
 
 
 @app.route("/webhook/printify", methods=["POST"])
 def webhook_printify():
-    # Printify posts order payloads; refer to Printify docs for exact shape
-    try:
-        data = request.get_json(force=True)
-    except Exception as e:
-        log("Invalid JSON in Printify webhook:", e)
-        return jsonify({"error": "invalid json"}), 400
-    log("Printify webhook received.")
-    order_id = data.get("id") or data.get("order_id")
-    total = None
-    if data.get("total_price"):
-        total = data["total_price"]
-    if order_id and total:
-        ok = process_order_unified("printify",
-                                   order_id,
-                                   total,
-                                   currency=data.get("currency", "USD"),
-                                   buyer_name=data.get("recipient",
-                                                       {}).get("name"))
-        return jsonify({"ok": ok}), 200
-    return jsonify({"ok": False}), 200
+    return ingest_webhook("printify")
 
 
 @app.route("/webhook/etsy", methods=["POST"])
 def webhook_etsy():
-    try:
-        data = request.get_json(force=True)
-    except Exception as e:
-        log("Invalid JSON in Etsy webhook:", e)
-        return jsonify({"error": "invalid json"}), 400
-    # Etsy payloads vary; adapt mapping
-    order_id = data.get("receipt_id") or data.get("order_id") or data.get("id")
-    total = data.get("grandtotal", {}).get("amount") if isinstance(
-        data.get("grandtotal"),
-        dict) else data.get("price") or data.get("total")
-    if order_id and total:
-        ok = process_order_unified("etsy",
-                                   order_id,
-                                   total,
-                                   currency="USD",
-                                   buyer_name=data.get("buyer_user_name"))
-        return jsonify({"ok": ok}), 200
-    return jsonify({"ok": False}), 200
+    return ingest_webhook("etsy")
 
 
 @app.route("/webhook/fiverr", methods=["POST"])
 def webhook_fiverr():
-    try:
-        data = request.get_json(force=True)
-    except Exception as e:
-        log("Invalid JSON in Fiverr webhook:", e)
-        return jsonify({"error": "invalid json"}), 400
-    order_id = data.get("order_id") or data.get("id")
-    total = data.get("amount") or data.get("price")
-    if order_id and total:
-        ok = process_order_unified("fiverr",
-                                   order_id,
-                                   total,
-                                   currency="USD",
-                                   buyer_name=data.get("buyer"))
-        return jsonify({"ok": ok}), 200
-    return jsonify({"ok": False}), 200
+    return ingest_webhook("fiverr")
 
 
 # ------------------------
@@ -395,16 +588,15 @@ def poll_printify_orders():
         resp = requests.get(url, headers=headers, timeout=15)
         resp.raise_for_status()
         orders = resp.json().get("orders", [])
-        for o in orders:
-            order_id = o.get("id")
-            total = o.get("total_price")
-            # attempt processing (recording is deduplicated)
-            process_order_unified("printify",
-                                  order_id,
-                                  total,
-                                  currency=o.get("currency", "USD"),
-                                  buyer_name=o.get("recipient",
-                                                   {}).get("name"))
+        # attempt processing (recording is deduplicated); invoices for the
+        # new ones are rendered as one batch
+        process_orders_bulk(
+            make_order_record("printify",
+                              o.get("id"),
+                              o.get("total_price"),
+                              currency=o.get("currency", "USD"),
+                              buyer_name=o.get("recipient", {}).get("name"))
+            for o in orders)
     except Exception as e:
         log("Printify poll error:", e)
 
@@ -449,6 +641,8 @@ def start_pollers_loop(interval_seconds=300):
 if __name__ == "__main__":
     log("Starting JRAVIS Income Core (LIVE MODE)" if LIVE_MODE ==
         "1" else "starting in sandbox mode")
+    # Process webhooks left queued by the previous run
+    get_webhook_queue().start()
     # Start poller thread
     start_pollers_loop(
         interval_seconds=300)  # poll every 5 minutes as fallback
@@ -17,8 +17,10 @@ import json
 import datetime
 import threading
 import time
-import pdfkit
 from flask import Flask, jsonify, render_template_string
+from read_model import snapshot
+import html_pdf
+import report_catalog
 
 # ==============================
 # ⚙️ CONFIG
@@ -71,12 +73,16 @@ def generate_reports():
     <p>Total Income: ₹{total:,.2f}</p>
     <p>Generated automatically by JRAVIS & VA BOT</p>
     """
-    pdfkit.from_string(
-        html, os.path.join(SUMMARY_DIR, f"{today} summary report.pdf"))
-
+    summary_pdf = os.path.join(SUMMARY_DIR, f"{today} summary report.pdf")
     invoice_html = f"<h1>Invoice - {today}</h1><p>Generated for legal filing.</p>"
-    pdfkit.from_string(invoice_html,
-                       os.path.join(SUMMARY_DIR, f"{today} invoices.pdf"))
+    invoices_pdf = os.path.join(SUMMARY_DIR, f"{today} invoices.pdf")
+    # converted together instead of one wkhtmltopdf start-up per PDF
+    summary_pdf, invoices_pdf = html_pdf.render_many([
+        (html, summary_pdf, True),
+        (invoice_html, invoices_pdf, True),
+    ])
+    report_catalog.register_many([(p, kind) for p, kind in (
+        (summary_pdf, "report"), (invoices_pdf, "invoice")) if p])
     print(f"[REPORTS] Generated PDFs for {today}")
 
 
@@ -87,11 +93,8 @@ app = Flask(__name__)
 
 
 def get_progress():
-    if not os.path.exists(INCOME_FILE):
-        return 0, 0
-    with open(INCOME_FILE) as f:
-        data = json.load(f)
-    total = sum(x["amount"] for x in data)
+    # income_log.json totals are kept by the shared read model (read_model.py)
+    total = snapshot().get("income", {}).get("total", 0)
     percent = min(round(total / TARGET * 100, 2), 100)
     return total, percent
 
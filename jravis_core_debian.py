@@ -8,18 +8,19 @@ print("🚀 JRAVIS Core Debian Build Starting...")
 # ---- 1. Imports ----
 try:
     from flask import Flask, jsonify
-    from tinydb import TinyDB
     from datetime import datetime
 except ModuleNotFoundError:
     print("📦 Installing missing modules... please wait...")
     import os
-    os.system("pip install flask tinydb")
+    os.system("pip install flask")
     from flask import Flask, jsonify
-    from tinydb import TinyDB
     from datetime import datetime
 
 # ---- 2. Memory Store ----
-db = TinyDB("jr_memory.json")
+# earnings_store keeps running totals; jr_memory.json is migrated on open
+import earnings_store
+
+store = earnings_store.open_store()
 app = Flask(__name__)
 
 
@@ -31,24 +32,18 @@ def home():
 
 @app.route("/api/dashboard", methods=["GET"])
 def dashboard_data():
-    earnings_table = db.table("earnings")
-    reports_table = db.table("reports")
-
     # Simulate some data if empty
-    if not earnings_table:
-        earnings_table.insert({
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "amount": 50000
-        })
-    total_earnings = sum(e["amount"] for e in earnings_table)
+    if not store.entry_count():
+        store.add_earning(datetime.now().strftime("%Y-%m-%d"), 50000)
+    total_earnings, entries = store.range_total()
 
-    last_report = (reports_table.all()[-1]["date"]
-                   if len(reports_table) > 0 else "No reports yet")
+    reports = store.recent_reports(1)
+    last_report = reports[-1]["date"] if reports else "No reports yet"
 
     data = {
         "timestamp": datetime.now().isoformat(),
         "total_earnings_inr": total_earnings,
-        "streams_active": len(earnings_table),
+        "streams_active": entries,
         "system_health":
         "OK ✅" if total_earnings > 0 else "⚠️ Pending Validation",
         "last_report": last_report
@@ -6,8 +6,9 @@ Deploy: python jravis_mission2040.py  (Render start command)
 Notes: login with your lock code (not printed here)
 """
 
-from flask import Flask, request, jsonify, session, redirect, url_for, render_template_string
+from flask import Flask, request, jsonify, session, redirect, url_for, render_template
 import os, datetime, random, math
+from page_cache import install_pages
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "JRAVIS_SECRET")
@@ -222,98 +223,7 @@ MAIN_HTML = """
 </html>
 """
 
-    <div class="card">
-      <div class="row"><div><strong>Task Timeline</strong><div class="small">Completed · Today · Tomorrow</div></div><div class="small">—</div></div>
-      <div style="height:40px"></div>
-    </div>
-
-  </div>
-
-  <div class="right">
-    <div class="card">
-      <div style="display:flex;justify-content:space-between">
-        <div><strong>Today</strong><div class="small">Tasks & quick actions</div></div>
-        <div class="small">Status</div>
-      </div>
-      <div style="margin-top:12px">✔ Completed</div>
-    </div>
-
-    <div class="card">
-      <div style="display:flex;justify-content:space-between"><div><strong>Property & Debt Tracker</strong></div><div class="small">Timeline</div></div>
-      <div style="height:36px"></div>
-    </div>
-
-    <div class="card chat-wrap">
-      <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:8px">
-        <div><strong>JRAVIS Chat</strong><div class="small">Ask JRAVIS about streams, earnings, or commands</div></div>
-        <div class="small">Live</div>
-      </div>
-      <div id="chat" class="chat-box"></div>
-      <div class="input">
-        <input id="msg" placeholder="Type to JRAVIS..." onkeydown="if(event.key==='Enter')sendMsg()">
-        <button onclick="sendMsg()">Send</button>
-      </div>
-    </div>
-
-  </div>
-</div>
-
-<script>
-// client-side: load stream lists dynamically and chat handling
-const PHASES = {{ phases_json|safe }};
-function togglePhase(name){
-  const row = document.getElementById('phase-'+name);
-  if(row.style.display==='none'){ row.style.display='table-row'; loadStreams(name); }
-  else row.style.display='none';
-}
-
-async function loadStreams(phase){
-  const container = document.getElementById('list-'+phase);
-  container.innerHTML = 'Loading…';
-  const res = await fetch('/api/streams?phase='+encodeURIComponent(phase));
-  const js = await res.json();
-  container.innerHTML = '';
-  js.streams.forEach(s => {
-    const el = document.createElement('div');
-    el.className='stream';
-    el.innerHTML = `<div>${s.name}</div><div>${s.status}</div>`;
-    container.appendChild(el);
-  });
-}
-
-function appendMsg(who, text){
-  const chat = document.getElementById('chat');
-  const el = document.createElement('div');
-  el.className = 'msg ' + (who==='user' ? 'user' : 'jravis');
-  el.textContent = (who==='user' ? '🧑‍💼 ' : '🤖 ') + text;
-  chat.appendChild(el);
-  chat.scrollTop = chat.scrollHeight;
-}
-
-async function sendMsg(){
-  const box = document.getElementById('msg');
-  const txt = box.value.trim();
-  if(!txt) return;
-  appendMsg('user', txt);
-  box.value = '';
-  try{
-    const r = await fetch('/ask', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({message:txt})});
-    const j = await r.json();
-    appendMsg('jravis', j.response);
-  }catch(e){
-    appendMsg('jravis', 'Error contacting JRAVIS: '+String(e));
-  }
-}
-
-// load a few welcome lines from server-side history
-(async function(){ 
-  const h = await fetch('/chat/history');
-  const j = await h.json();
-  j.forEach(item => appendMsg(item.who, item.msg));
-})();
-</script>
-</body></html>
-"""
+install_pages(app, {"login.html": LOGIN_HTML, "main.html": MAIN_HTML})
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -322,12 +232,12 @@ def login():
     if request.method == "POST":
         code = request.form.get("code", "").strip()
         if not code:
-            return render_template_string(LOGIN_HTML, error="Enter lock code")
-        if code == os.environ.get("LOCK_CODE_VALUE", PASSCODE):
+            return render_template("login.html", error="Enter lock code")
+        if code == (os.environ.get("LOCK_CODE_VALUE", "").strip() or PASSCODE):
             session["auth"] = True
             return redirect(url_for("main"))
-        return render_template_string(LOGIN_HTML, error="Incorrect lock code")
-    return render_template_string(LOGIN_HTML)
+        return render_template("login.html", error="Incorrect lock code")
+    return render_template("login.html")
 
 
 @app.route("/main")
@@ -337,15 +247,15 @@ def main():
     # compute progress %
     progress_percent = min(100,
                            int((CURRENT_EARNINGS_INR / MISSION_TARGET) * 100))
-    return render_template_string(MAIN_HTML,
-                                  earn_inr=CURRENT_EARNINGS_INR,
-                                  earn_usd=CURRENT_EARNINGS_USD,
-                                  progress_percent=progress_percent,
-                                  phases=PHASES,
-                                  phases_json={
-                                      k: v
-                                      for k, v in PHASES.items()
-                                  })
+    return render_template("main.html",
+                           earn_inr=CURRENT_EARNINGS_INR,
+                           earn_usd=CURRENT_EARNINGS_USD,
+                           progress_percent=progress_percent,
+                           phases=PHASES,
+                           phases_json={
+                               k: v
+                               for k, v in PHASES.items()
+                           })
 
 
 # API: streams for a phase
@@ -360,32 +270,6 @@ def api_streams():
     return jsonify({"streams": out})
 
 
-# Chat endpoint
-@app.route("/", methods=["GET", "POST"])
-def login():
-    try:
-        if request.method == "POST":
-            code = request.form.get("code", "").strip()
-            # get env var safely
-            lock_from_env = os.environ.get("LOCK_CODE_VALUE", "").strip()
-            # if env var missing, use fallback
-            expected_code = lock_from_env if lock_from_env else PASSCODE
-
-            if code == expected_code:
-                session["auth"] = True
-                return redirect(url_for("main"))
-            else:
-                return render_template_string(LOGIN_HTML,
-                                              error="Incorrect lock code.")
-        return render_template_string(LOGIN_HTML)
-    except Exception as e:
-        # catch and log any internal errors instead of crashing
-        print(f"⚠️ Login error: {e}")
-        return render_template_string(
-            LOGIN_HTML,
-            error="Server error during login. Try again or check logs.")
-
-
 # Chat history (initial load)
 @app.route("/chat/history")
 def chat_history():
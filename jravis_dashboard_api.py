@@ -2,32 +2,26 @@
 # JRAVIS Dashboard Data API — Phase 1 Bridge
 # Author: Dhruvayu
 
-from tinydb import TinyDB
 from flask import Flask, jsonify
 from datetime import datetime
 import os
+from read_model import snapshot
 
 app = Flask(__name__)
-db = TinyDB('jr_memory.json')
 
 
 @app.route("/api/dashboard", methods=["GET"])
 def dashboard_data():
-    earnings_table = db.table("earnings")
-    reports_table = db.table("reports")
+    # earnings_store rows are folded into the shared read model (read_model.py)
+    earnings = snapshot().get("earnings", {})
 
     # Get total earnings (for month)
     today = datetime.now()
     this_month = today.strftime("%Y-%m")
-    total_earnings = sum(e["amount"] for e in earnings_table.all()
-                         if e["date"].startswith(this_month))
+    total_earnings = earnings.get("by_month", {}).get(this_month, 0)
 
     # Get last report
-    last_report = None
-    if len(reports_table) > 0:
-        last_report = reports_table.all()[-1]
-    last_report_date = (last_report["date"]
-                        if last_report else "No reports yet")
+    last_report_date = earnings.get("last_report") or "No reports yet"
 
     # Get stream health (simplified for Phase 1)
     health = "OK ✅" if total_earnings > 0 else "⚠️ Pending Validation"
@@ -35,7 +29,7 @@ def dashboard_data():
     data = {
         "timestamp": datetime.now().isoformat(),
         "total_earnings_inr": total_earnings,
-        "streams_active": len(earnings_table),
+        "streams_active": earnings.get("entries", 0),
         "system_health": health,
         "last_report": last_report_date,
     }
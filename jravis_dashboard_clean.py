@@ -1,4 +1,5 @@
-from flask import Flask, render_template_string
+from flask import Flask, render_template
+from page_cache import install_pages
 
 app = Flask(__name__)
 
@@ -18,9 +19,11 @@ MAIN_HTML = """
 </html>
 """
 
+install_pages(app, {"main.html": MAIN_HTML})
+
 @app.route("/")
 def home():
-    return render_template_string(MAIN_HTML, earn_inr="125000", earn_usd="1500")
+    return render_template("main.html", earn_inr="125000", earn_usd="1500")
 
 if __name__ == "__main__":
     import os
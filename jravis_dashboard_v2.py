@@ -9,8 +9,9 @@ Start: python jravis_dashboard_v2.py
 ENV: LOCK_CODE_VALUE (recommended), PORT (defaults 10000)
 """
 
-from flask import Flask, request, session, redirect, url_for, render_template_string, jsonify
+from flask import Flask, request, session, redirect, url_for, render_template, jsonify
 import os, datetime, random, math
+from page_cache import install_pages
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "jravis_secret_key")
@@ -247,6 +248,8 @@ async function sendMsg(){
 </body></html>
 """
 
+install_pages(app, {"login.html": LOGIN_HTML, "main.html": MAIN_HTML})
+
 
 # ---------- Helper (JRAVIS logic) ----------
 def jravis_answer(msg):
@@ -288,8 +291,8 @@ def login():
         if code == expected:
             session["auth"] = True
             return redirect(url_for("main"))
-        return render_template_string(LOGIN_HTML, error="Incorrect lock code.")
-    return render_template_string(LOGIN_HTML)
+        return render_template("login.html", error="Incorrect lock code.")
+    return render_template("login.html")
 
 
 @app.route("/main")
@@ -297,12 +300,12 @@ def main():
     if not session.get("auth"):
         return redirect(url_for("login"))
     # pass plain numbers/strings only (avoid Jinja formatting issues)
-    return render_template_string(MAIN_HTML,
-                                  earn_inr=str(CURRENT_EARNINGS_INR),
-                                  earn_usd=str(CURRENT_EARNINGS_USD),
-                                  progress_percent=PROGRESS_PERCENT,
-                                  phases=PHASES,
-                                  phases_json=PHASES)
+    return render_template("main.html",
+                           earn_inr=str(CURRENT_EARNINGS_INR),
+                           earn_usd=str(CURRENT_EARNINGS_USD),
+                           progress_percent=PROGRESS_PERCENT,
+                           phases=PHASES,
+                           phases_json=PHASES)
 
 
 @app.route("/api/streams")
@@ -5,12 +5,15 @@ jravis_dashboard_v3.py
 - Auto-refresh every 30s (streams + summary)
 - Securely calls VA Bot via VABOT_URL and VABOT_API_KEY
 - Chat endpoint: local Dhruvayu-style replies; uses OpenAI if OPENAI_API_KEY provided
+  (streamed back over SSE from a bounded worker pool, CHAT_WORKERS)
 Save/overwrite your existing jravis_dashboard_v3.py with this file.
 """
 
-from flask import (Flask, request, render_template_string, jsonify, redirect,
-                   url_for, session)
+from flask import (Flask, request, render_template, jsonify, redirect,
+                   url_for, session, Response)
 import os, requests, datetime, json, time, random
+from page_cache import install_pages
+from chat_stream import ReplyStreams
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "jravis_secret_key_fallback")
@@ -21,6 +24,9 @@ VABOT_URL = os.environ.get("VABOT_URL", "").rstrip(
     "/")  # e.g. https://vabot-dashboard.onrender.com
 VABOT_API_KEY = os.environ.get("VABOT_API_KEY", "")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", None)
+# LLM replies run on this many background workers; beyond that chat falls back
+# to the local reply instead of tying up request threads
+CHAT_WORKERS = int(os.environ.get("CHAT_WORKERS", "4"))
 
 # Basic mission values (can be real values from VA Bot summary endpoint)
 MISSION_TARGET = int(os.environ.get("MISSION_TARGET", "4000000"))
@@ -149,46 +155,57 @@ def dhruvayu_local_reply(user_msg):
 
 
 # Optional OpenAI usage (if key provided)
-def openai_reply(user_msg):
-    if not OPENAI_API_KEY:
-        return None
-    try:
-        # use requests to OpenAI chat completions (compatible with older keys)
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model":
-            "gpt-4o-mini",  # safe default; adjust if you have different model access
-            "messages": [{
-                "role":
-                "system",
-                "content":
-                "You are JRAVIS. Answer concisely and respectfully, call the user 'Boss'."
-            }, {
-                "role": "user",
-                "content": user_msg
-            }],
-            "temperature":
-            0.7,
-            "max_tokens":
-            250
-        }
-        resp = requests.post("https://api.openai.com/v1/chat/completions",
-                             headers=headers,
-                             json=payload,
-                             timeout=12)
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+
+
+def _openai_request(user_msg):
+    headers = {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model":
+        "gpt-4o-mini",  # safe default; adjust if you have different model access
+        "messages": [{
+            "role":
+            "system",
+            "content":
+            "You are JRAVIS. Answer concisely and respectfully, call the user 'Boss'."
+        }, {
+            "role": "user",
+            "content": user_msg
+        }],
+        "temperature":
+        0.7,
+        "max_tokens":
+        250,
+        "stream":
+        True
+    }
+    return requests.post(OPENAI_URL,
+                         headers=headers,
+                         json=payload,
+                         timeout=12,
+                         stream=True)
+
+
+def openai_stream(user_msg):
+    """Yield reply text as OpenAI streams it (server-sent `data:` lines)."""
+    with _openai_request(user_msg) as resp:
         if resp.status_code != 200:
-            return None
-        js = resp.json()
-        txt = js.get("choices", [{}])[0].get("message", {}).get("content",
-                                                                "").strip()
-        if txt:
-            return txt
-        return None
-    except Exception:
-        return None
+            return
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            delta = json.loads(data).get("choices", [{}])[0].get("delta", {})
+            if delta.get("content"):
+                yield delta["content"]
+
+
+REPLY_STREAMS = ReplyStreams(max_workers=CHAT_WORKERS)
 
 
 # ---------------------------
@@ -406,6 +423,28 @@ function appendChat(who, text){
   }
   area.appendChild(b);
   area.scrollTop = area.scrollHeight;
+  return b;
+}
+
+// LLM replies arrive token by token over SSE
+function streamChat(url){
+  const area = document.getElementById('chat-area');
+  const b = appendChat('jravis', '');
+  let text = '';
+  const es = new EventSource(url);
+  es.addEventListener('token', e => {
+    text += JSON.parse(e.data).t;
+    b.innerText = '🤖 ' + text;
+    area.scrollTop = area.scrollHeight;
+  });
+  es.addEventListener('done', e => {
+    b.innerText = '🤖 ' + JSON.parse(e.data).reply;
+    es.close();
+  });
+  es.onerror = () => {
+    if (!text) b.innerText = '🤖 Error contacting JRAVIS.';
+    es.close();
+  };
 }
 
 async function sendChat(){
@@ -417,7 +456,8 @@ async function sendChat(){
   try {
     const res = await fetch('/chat', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({message: txt})});
     const j = await res.json();
-    appendChat('jravis', j.reply);
+    if (j.stream) streamChat(j.stream);
+    else appendChat('jravis', j.reply);
   } catch (e) {
     appendChat('jravis', 'Error contacting JRAVIS.');
   }
@@ -437,6 +477,25 @@ setInterval(refreshAll, AUTO_REFRESH_SECONDS * 1000);
 </html>
 """
 
+LOGIN_HTML = """
+    <!doctype html><html><head><meta charset="utf-8"><title>JRAVIS Access</title>
+    <style>body{background:#071023;color:#e8eef6;font-family:Inter,system-ui;display:flex;align-items:center;justify-content:center;height:100vh;margin:0}
+    .card{background:rgba(255,255,255,0.03);padding:24px;border-radius:12px;border:1px solid rgba(255,255,255,0.02)}
+    input{padding:12px;border-radius:8px;border:none;width:260px;background:transparent;color:#fff}
+    button{padding:10px 12px;margin-left:8px;border-radius:8px;border:none;background:linear-gradient(90deg,#3b82f6,#06b6d4);color:#fff}
+    </style></head><body>
+    <form method="post" class="card"><div style="font-weight:700;font-size:18px;margin-bottom:8px">JRAVIS — Enter Lock Code</div>
+    <input name="code" type="password" placeholder="Lock code" autofocus><button>Unlock</button></form></body></html>
+"""
+
+LOGIN_FAILED_HTML = "<h3 style='color:#fee'>Incorrect lock code</h3><a href='/'>Back</a>"
+
+install_pages(app, {
+    "login.html": LOGIN_HTML,
+    "login_failed.html": LOGIN_FAILED_HTML,
+    "main.html": MAIN_HTML
+})
+
 
 # ---------------------------
 # Routes
@@ -449,21 +508,10 @@ def login():
             session["auth"] = True
             return redirect(url_for("main"))
         else:
-            return render_template_string(
-                "<h3 style='color:#fee'>Incorrect lock code</h3><a href='/'>Back</a>"
-            )
+            return render_template("login_failed.html")
     if session.get("auth"):
         return redirect(url_for("main"))
-    return render_template_string("""
-    <!doctype html><html><head><meta charset="utf-8"><title>JRAVIS Access</title>
-    <style>body{background:#071023;color:#e8eef6;font-family:Inter,system-ui;display:flex;align-items:center;justify-content:center;height:100vh;margin:0}
-    .card{background:rgba(255,255,255,0.03);padding:24px;border-radius:12px;border:1px solid rgba(255,255,255,0.02)}
-    input{padding:12px;border-radius:8px;border:none;width:260px;background:transparent;color:#fff}
-    button{padding:10px 12px;margin-left:8px;border-radius:8px;border:none;background:linear-gradient(90deg,#3b82f6,#06b6d4);color:#fff}
-    </style></head><body>
-    <form method="post" class="card"><div style="font-weight:700;font-size:18px;margin-bottom:8px">JRAVIS — Enter Lock Code</div>
-    <input name="code" type="password" placeholder="Lock code" autofocus><button>Unlock</button></form></body></html>
-    """)
+    return render_template("login.html")
 
 
 @app.route("/main")
@@ -482,13 +530,13 @@ def main():
         earn_usd = DEFAULT_EARNINGS_USD
 
     progress_percent = min(100, int((earn_inr / max(1, MISSION_TARGET)) * 100))
-    return render_template_string(MAIN_HTML,
-                                  earn_inr_fmt=f"{earn_inr:,}",
-                                  earn_usd_fmt=f"{earn_usd:,}",
-                                  progress_percent=progress_percent,
-                                  target_fmt=f"{MISSION_TARGET:,}",
-                                  phases=PHASES,
-                                  phases_json=PHASES)
+    return render_template("main.html",
+                           earn_inr_fmt=f"{earn_inr:,}",
+                           earn_usd_fmt=f"{earn_usd:,}",
+                           progress_percent=progress_percent,
+                           target_fmt=f"{MISSION_TARGET:,}",
+                           phases=PHASES,
+                           phases_json=PHASES)
 
 
 @app.route("/api/streams")
@@ -574,18 +622,37 @@ def chat():
         except Exception:
             pass
 
-    # Second attempt: use OpenAI if configured
-    ai_text = openai_reply(user_msg)
-    if ai_text:
-        reply = ai_text
-    else:
-        # fallback local Dhruvayu-style reply
-        reply = dhruvayu_local_reply(user_msg)
+    # Second attempt: stream from OpenAI on the worker pool if configured
+    if OPENAI_API_KEY:
+        job_id = REPLY_STREAMS.submit(
+            lambda: openai_stream(user_msg),
+            fallback=lambda: dhruvayu_local_reply(user_msg),
+            on_done=lambda text: CHAT_HISTORY.append({
+                "who": "jravis",
+                "msg": text,
+                "ts": time.time()
+            }))
+        if job_id:
+            return jsonify({
+                "reply": None,
+                "stream": url_for("chat_stream", job_id=job_id)
+            }), 202
 
+    # fallback local Dhruvayu-style reply (no key, or all workers busy)
+    reply = dhruvayu_local_reply(user_msg)
     CHAT_HISTORY.append({"who": "jravis", "msg": reply, "ts": time.time()})
     return jsonify({"reply": reply})
 
 
+@app.route("/chat/stream/<job_id>")
+def chat_stream(job_id):
+    if not session.get("auth"):
+        return jsonify({"error": "unauthorized"}), 401
+    return Response(REPLY_STREAMS.sse(job_id),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+
 @app.route("/chat/history")
 def chat_history():
     if not session.get("auth"):
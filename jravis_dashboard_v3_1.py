@@ -11,9 +11,13 @@ Environment variables expected:
   JDB_PATH            - optional SQLite DB path (default ./jravis_tasks.db)
   JRV_POLL_SECONDS    - optional polling interval (default 10)
 """
-from flask import Flask, request, jsonify, render_template_string, redirect, url_for, session
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session
 import os, threading, time, sqlite3, json, requests, traceback
 from datetime import datetime
+from task_pagination import (ensure_task_indexes, fetch_page, parse_cursor,
+                             parse_limit, parse_statuses, compact)
+from page_cache import install_pages
+from read_model import snapshot
 
 # -------------------------
 # Basic config & Flask app
@@ -70,7 +74,11 @@ def init_db(path=DB_PATH):
             received_at TEXT
         )
     ''')
+    # read_model.py folds task status changes in by updated_at
+    c.execute("CREATE INDEX IF NOT EXISTS idx_task_queue_updated "
+              "ON task_queue (updated_at)")
     conn.commit()
+    ensure_task_indexes(conn, "task_queue")
     return conn
 
 
@@ -276,9 +284,6 @@ body{margin:0;font-family:Inter, Arial, sans-serif;background:linear-gradient(18
     </div>
   </div>
 </div>
-</body></html>
-"""
-
 <div class="card glass-card" style="padding:20px; border-radius:20px; text-align:center;">
   <h2>💰 Mission 2040 Progress</h2>
   <div id="income-total" style="font-size:1.4rem; margin:10px 0;">Loading...</div>
@@ -307,6 +312,11 @@ async function updateEarnings() {
 updateEarnings();
 setInterval(updateEarnings, 30000);
 </script>
+</body></html>
+"""
+
+install_pages(app, {"unlock.html": UNLOCK_HTML, "dashboard.html": DASH_HTML})
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -319,35 +329,23 @@ def index():
             session["unlocked"] = True
             return redirect(url_for("dashboard"))
         error = "Incorrect code"
-    return render_template_string(UNLOCK_HTML,
-                                  error=error,
-                                  vabot_url=VABOT_URL)
+    return render_template("unlock.html", error=error, vabot_url=VABOT_URL)
 
 
 @app.route("/dashboard")
 def dashboard():
     if not session.get("unlocked"):
         return redirect(url_for("index"))
-    # gather stats
-    with DB_LOCK:
-        c = DB_CONN.cursor()
-        c.execute(
-            "SELECT COUNT(*) FROM task_queue WHERE status IN ('queued','retry')"
-        )
-        queued_count = c.fetchone()[0] or 0
-        c.execute(
-            "SELECT id, payload_json, received_at FROM vabot_callbacks ORDER BY id DESC LIMIT 10"
-        )
-        rows = c.fetchall()
-    callbacks = [{
-        "payload": json.loads(r[1]) if r[1] else r[1],
-        "received_at": r[2]
-    } for r in rows]
-    return render_template_string(DASH_HTML,
-                                  vabot_url=VABOT_URL,
-                                  queued_count=queued_count,
-                                  callback_count=len(callbacks),
-                                  callbacks=callbacks)
+    # gather stats from the shared read model (no per-request DB reads)
+    tasks = snapshot().get("tasks", {})
+    by_status = tasks.get("by_status", {})
+    queued_count = by_status.get("queued", 0) + by_status.get("retry", 0)
+    callbacks = tasks.get("recent_callbacks", [])
+    return render_template("dashboard.html",
+                           vabot_url=VABOT_URL,
+                           queued_count=queued_count,
+                           callback_count=len(callbacks),
+                           callbacks=callbacks)
 
 
 # -------------------------
@@ -421,12 +419,19 @@ def vabot_status():
 # -------------------------
 @app.route("/api/list_tasks", methods=["GET"])
 def api_list_tasks():
+    # ?after=<created_at,id>&status=queued,retry&limit=100&format=compact
+    try:
+        after = parse_cursor(request.args.get("after"))
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    statuses = parse_statuses(request.args.get("status"))
+    cols = ("id", "task_json", "status", "tries", "created_at", "updated_at")
     with DB_LOCK:
-        c = DB_CONN.cursor()
-        c.execute(
-            "SELECT id, task_json, status, tries, created_at, updated_at FROM task_queue ORDER BY id DESC LIMIT 100"
-        )
-        rows = c.fetchall()
+        rows, next_cursor = fetch_page(DB_CONN, "task_queue", cols,
+                                       statuses, after, limit)
+    if request.args.get("format") == "compact":
+        return jsonify(compact(cols, rows, next_cursor)), 200
     out = [{
         "id": r[0],
         "task": json.loads(r[1]),
@@ -435,7 +440,10 @@ def api_list_tasks():
         "created_at": r[4],
         "updated_at": r[5]
     } for r in rows]
-    return jsonify(out), 200
+    resp = jsonify(out)
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    return resp, 200
 
 
 # -------------------------
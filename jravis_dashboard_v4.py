@@ -8,8 +8,9 @@ JRAVIS Dashboard v4.1
 - VA BOT compatible
 """
 
-from flask import Flask, request, jsonify, render_template_string, redirect, url_for, session
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session
 import os, requests
+from page_cache import install_pages
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "jrvis_secret_fallback")
@@ -21,53 +22,20 @@ INCOME_API = os.environ.get(
     "https://income-system-bundle.onrender.com/api/earnings_summary")
 
 
-# ==============================
-# 🔐 SECURE ACCESS PAGE
-# ==============================
-@app.route("/", methods=["GET", "POST"])
-def home():
-  if "logged_in" in session:
-    return redirect(url_for("dashboard"))
-
-  if request.method == "POST":
-    code = request.form.get("code", "")
-    if code == LOCK_CODE:
-      session["logged_in"] = True
-      return redirect(url_for("dashboard"))
-    else:
-      return render_template_string("""
-            <html><body style="background:#0b0c10; color:#fff; text-align:center; font-family:Segoe UI;">
-            <h2>🔐 JRAVIS Secure Access</h2>
-            <p style="color:red;">Invalid Lock Code</p>
-            <form method="POST">
-              <input name="code" type="password" placeholder="Enter Lock Code" 
-                     style="padding:10px;border:none;border-radius:8px;width:200px;text-align:center;">
-              <br><br><button style="padding:8px 16px;border:none;border-radius:8px;
-              background:linear-gradient(90deg,#00ffff,#00ff7f);color:black;font-weight:bold;">Unlock</button>
-            </form></body></html>
-            """)
-
-  return render_template_string("""
+LOGIN_HTML = """
     <html><body style="background:#0b0c10; color:#fff; text-align:center; font-family:Segoe UI;">
     <h2>🔐 JRAVIS Secure Access</h2>
+    {% if error %}<p style="color:red;">{{ error }}</p>{% endif %}
     <form method="POST">
       <input name="code" type="password" placeholder="Enter Lock Code"
              style="padding:10px;border:none;border-radius:8px;width:200px;text-align:center;">
       <br><br><button style="padding:8px 16px;border:none;border-radius:8px;
       background:linear-gradient(90deg,#00ffff,#00ff7f);color:black;font-weight:bold;">Unlock</button>
     </form></body></html>
-    """)
-
-
-# ==============================
-# 🌍 DASHBOARD MAIN PAGE
-# ==============================
-@app.route("/dashboard")
-def dashboard():
-  if "logged_in" not in session:
-    return redirect(url_for("home"))
+    """
 
-  html = f"""
+# Only INCOME_API is interpolated, so the page is built once at import.
+DASH_HTML = f"""
     <html>
     <head>
     <title>JRAVIS – Mission 2040</title>
@@ -192,7 +160,36 @@ def dashboard():
     </body>
     </html>
     """
-  return render_template_string(html)
+
+install_pages(app, {"login.html": LOGIN_HTML, "dashboard.html": DASH_HTML})
+
+
+# ==============================
+# 🔐 SECURE ACCESS PAGE
+# ==============================
+@app.route("/", methods=["GET", "POST"])
+def home():
+  if "logged_in" in session:
+    return redirect(url_for("dashboard"))
+
+  if request.method == "POST":
+    code = request.form.get("code", "")
+    if code == LOCK_CODE:
+      session["logged_in"] = True
+      return redirect(url_for("dashboard"))
+    return render_template("login.html", error="Invalid Lock Code")
+
+  return render_template("login.html")
+
+
+# ==============================
+# 🌍 DASHBOARD MAIN PAGE
+# ==============================
+@app.route("/dashboard")
+def dashboard():
+  if "logged_in" not in session:
+    return redirect(url_for("home"))
+  return render_template("dashboard.html")
 
 
 if __name__ == "__main__":
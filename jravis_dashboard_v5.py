@@ -7,8 +7,9 @@ import os
 import json
 import traceback
 from datetime import datetime
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, render_template, jsonify
 import requests
+from page_cache import install_pages
 
 app = Flask(__name__)
 
@@ -110,12 +111,9 @@ def api_status():
     return jsonify({"error": str(e)}), 500
 
 
-# Basic root route - renders the full dashboard UI
-@app.route("/")
-def index():
-  # Template string - inline for single-file deployment. Uses simple CSS + JS.
-  # The UI fetches /api/status every 10s and updates cards.
-  template = """
+# Template string - inline for single-file deployment. Uses simple CSS + JS.
+# The UI fetches /api/status every 10s and updates cards.
+INDEX_HTML = """
 <!doctype html>
 <html lang="en">
 <head>
@@ -276,7 +274,7 @@ def index():
     </div>
 
     <footer>
-      JRAVIS • Mission 2040 — JRAVIS Brain online • {dt}
+      JRAVIS • Mission 2040 — JRAVIS Brain online • {{ dt }}
     </footer>
   </div>
 
@@ -349,9 +347,16 @@ setInterval(fetchAndUpdate, 10000);
 
 </body>
 </html>
-    """.replace("{dt}",
-                datetime.utcnow().strftime("%d %b %Y %H:%M UTC"))
-  return render_template_string(template)
+    """
+
+install_pages(app, {"index.html": INDEX_HTML})
+
+
+# Basic root route - renders the full dashboard UI
+@app.route("/")
+def index():
+  return render_template("index.html",
+                         dt=datetime.utcnow().strftime("%d %b %Y %H:%M UTC"))
 
 
 # Optional: a simple /reports route to view stored reports (placeholder)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+mail_outbox.py
+Durable outbound mail queue (SQLite, MAIL_OUTBOX_DB) for JRAVIS alerts.
+
+alerts.send_email used to retry inline, sleeping between attempts, so a
+down SMTP server stalled the log tail for minutes; security_guard spawned a
+thread per alert; and anything not yet sent was lost on restart. Here a
+producer only inserts a row (tens of microseconds, whatever the state of
+SMTP) and one delivery worker per SMTP account sends what is due:
+
+  - rows stay 'queued' until the server has accepted them, so a crash or a
+    restart loses nothing (at worst a message goes out twice);
+  - failures are retried with exponential backoff, up to RETRIES attempts
+    (5xx refusals fail at once); while backing off the worker holds the
+    whole account, so an outage costs one attempt per backoff step;
+  - an alert identical to one still queued is dropped (dedup), and all due
+    alerts to the same recipients go out as one mail_service digest, so an
+    outage produces one digest instead of a storm;
+  - sends are rate limited to RATE_PER_MIN per account.
+
+Only one process delivers for a given account at a time (an flock on
+<db>.<account>.lock); the others just queue, and take over if it exits.
+Account passwords are never written to the database: rows name the account
+as host:port:user and are delivered by a process that has its credentials.
+
+    outbox = mail_outbox.get_outbox()
+    outbox.alert(mail_service.Account(host, 465, user, password),
+                 sender, ["me@x"], "[VA ALERT] ERROR", line)
+
+  python3 mail_outbox.py --stats
+  python3 mail_outbox.py --failed          # list failed rows
+  python3 mail_outbox.py --requeue-failed
+
+scripts/bench_mail_outbox.py measures producer latency with SMTP down, and
+delivery after a producer crash.
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import mail_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one process assumed
+    fcntl = None
+
+OUTBOX_DB = os.getenv("MAIL_OUTBOX_DB", "mail_outbox.db")
+RETRIES = int(os.getenv("MAIL_RETRIES", "5"))
+BACKOFF = float(os.getenv("MAIL_BACKOFF", "2"))
+BACKOFF_MAX = float(os.getenv("MAIL_BACKOFF_MAX", "300"))
+RATE_PER_MIN = float(os.getenv("MAIL_RATE_PER_MIN", "20"))
+POLL_SECS = float(os.getenv("MAIL_OUTBOX_POLL", "2"))  # rows from others
+DIGEST_MAX = 100  # alerts per digest
+KEEP_DAYS = float(os.getenv("MAIL_OUTBOX_KEEP_DAYS", "7"))
+EXIT_SECS = float(os.getenv("MAIL_OUTBOX_EXIT_SECS", "10"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'mail',
+    from_addr TEXT NOT NULL,
+    to_addrs TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attachments TEXT NOT NULL DEFAULT '[]',
+    dedup TEXT,
+    created REAL NOT NULL,
+    due REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    error TEXT,
+    done REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (account, status, due);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_dedup ON outbox (dedup)
+    WHERE status = 'queued';
+"""
+
+
+def account_key(account):
+    return f"{account.host}:{account.port}:{account.user or ''}"
+
+
+def log(msg):
+    print(f"[mail_outbox] {msg}", file=sys.stderr)
+
+
+class Outbox:
+
+    def __init__(self, path=None, retries=None, backoff=None, rate=None,
+                 poll=None):
+        self.path = path or OUTBOX_DB
+        self.retries = RETRIES if retries is None else retries
+        self.backoff = BACKOFF if backoff is None else backoff
+        self.rate = RATE_PER_MIN if rate is None else rate
+        self.poll = POLL_SECS if poll is None else poll
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # a commit is durable against process crashes without an fsync
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._workers = {}  # account key -> (thread, wake Event)
+        self._stop = threading.Event()
+        self._hooks = set()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params)
+
+    # ---------- producers ----------
+    def put(self, account, from_addr, to_addrs, subject, body,
+            attachments=(), kind="mail", dedup=None):
+        """
+        Queue one message and return its row id, or None when dedup (True,
+        or an explicit key) matches a message still queued. Never blocks on
+        SMTP: delivery happens on this account's worker.
+        """
+        key = account_key(account)
+        to = json.dumps(list(to_addrs))
+        if dedup is True:
+            dedup = hashlib.sha256("\0".join(
+                (key, from_addr, to, subject, body)).encode()).hexdigest()
+        now = time.time()
+        cur = self._write(
+            "INSERT OR IGNORE INTO outbox (account, kind, from_addr, "
+            "to_addrs, subject, body, attachments, dedup, created, due) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, from_addr, to, subject, body,
+             json.dumps(list(attachments)), dedup, now, now))
+        worker = self._workers.get(key) or self._start(account)
+        worker[1].set()
+        if not cur.rowcount:
+            self.duplicates += 1
+            return None
+        return cur.lastrowid
+
+    def alert(self, account, from_addr, to_addrs, subject, body):
+        """Queue an alert: deduplicated, and digested with other due alerts
+        to the same recipients."""
+        return self.put(account, from_addr, to_addrs, subject, body,
+                        kind="alert", dedup=True)
+
+    def on_failure(self, hook):
+        """Call hook(row dict, error text) when a message finally fails
+        (in whichever process delivers it)."""
+        self._hooks.add(hook)
+
+    # ---------- delivery ----------
+    def _start(self, account):
+        key = account_key(account)
+        with self._lock:
+            if key not in self._workers:
+                wake = threading.Event()
+                t = threading.Thread(target=self._run, args=(account, wake),
+                                     daemon=True, name=f"outbox-{key}")
+                self._workers[key] = (t, wake)
+                t.start()
+            return self._workers[key]
+
+    def _hold(self, key):
+        """Block until this process is the account's deliverer; returns the
+        lock file (None without fcntl), or False once stopped."""
+        if fcntl is None:
+            return None
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        fh = open(f"{self.path}.{digest}.lock", "a")
+        while not self._stop.is_set():
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fh
+            except OSError:
+                self._stop.wait(self.poll)
+        fh.close()
+        return False
+
+    def _due(self, key):
+        """The next due row, with every due alert to the same recipients
+        when it is an alert."""
+        now = time.time()
+        rows = self._query(
+            "SELECT * FROM outbox WHERE account = ? AND status = 'queued' "
+            "AND due <= ? ORDER BY due, id LIMIT 1", (key, now))
+        if rows and rows[0]["kind"] == "alert":
+            first = rows[0]
+            rows = self._query(
+                "SELECT * FROM outbox WHERE account = ? AND status = 'queued' "
+                "AND kind = 'alert' AND from_addr = ? AND to_addrs = ? "
+                "AND due <= ? ORDER BY id LIMIT ?",
+                (key, first["from_addr"], first["to_addrs"], now, DIGEST_MAX))
+        return rows
+
+    def _next_due(self, key):
+        row = self._query(
+            "SELECT MIN(due) FROM outbox WHERE account = ? "
+            "AND status = 'queued'", (key, ))[0]
+        return row[0]
+
+    def _run(self, account, wake):
+        key = account_key(account)
+        lock = self._hold(key)
+        if lock is False:
+            return
+        pool = mail_service.SMTPPool(account, size=1)
+        tokens, refilled = max(self.rate, 1), time.monotonic()
+        try:
+            while not self._stop.is_set():
+                wake.clear()
+                rows = self._due(key)
+                if not rows:
+                    due = self._next_due(key)
+                    wait = self.poll if due is None else min(
+                        self.poll, max(0.0, due - time.time()))
+                    wake.wait(wait)
+                    continue
+                if self.rate:
+                    now = time.monotonic()
+                    tokens = min(max(self.rate, 1),
+                                 tokens + (now - refilled) * self.rate / 60)
+                    refilled = now
+                    if tokens < 1:
+                        self._stop.wait((1 - tokens) * 60 / self.rate)
+                        continue
+                    tokens -= 1
+                try:
+                    backoff = self._deliver(pool, rows)
+                    self._prune()
+                    if backoff:
+                        # the server is unwell: hold the whole account, so
+                        # new rows wait too and go out as one digest later
+                        self._stop.wait(backoff)
+                except sqlite3.Error as e:
+                    log(f"database error, retrying: {e}")
+                    self._stop.wait(self.poll)
+        finally:
+            pool.close()
+            if lock:
+                lock.close()  # releases the flock
+
+    def _deliver(self, pool, rows):
+        """Send rows as one message; returns the backoff delay after a
+        failure that will be retried, else 0."""
+        first = rows[0]
+        ids = [r["id"] for r in rows]
+        subject, body = first["subject"], first["body"]
+        if first["kind"] == "alert":
+            subject, body = mail_service.digest(
+                [(datetime.fromtimestamp(r["created"]), r["subject"],
+                  r["body"]) for r in rows])
+        mail = mail_service.Mail(first["from_addr"],
+                                 json.loads(first["to_addrs"]), subject, body,
+                                 json.loads(first["attachments"]))
+        marks = ",".join("?" * len(ids))
+        try:
+            pool.send(mail)
+        except Exception as e:
+            attempts = max(r["attempts"] for r in rows) + 1
+            final = (attempts >= self.retries or mail_service.is_permanent(e)
+                     or isinstance(e, FileNotFoundError))
+            if final:
+                self._write(
+                    f"UPDATE outbox SET status = 'failed', attempts = ?, "
+                    f"error = ?, done = ? WHERE id IN ({marks})",
+                    (attempts, str(e), time.time(), *ids))
+                log(f"giving up on '{subject[:60]}' after {attempts} "
+                    f"attempt(s): {e}")
+                for row in rows:
+                    for hook in list(self._hooks):
+                        try:
+                            hook(dict(row), str(e))
+                        except Exception as he:
+                            log(f"failure hook error: {he}")
+            else:
+                delay = min(BACKOFF_MAX, self.backoff * 2 ** (attempts - 1))
+                self._write(
+                    f"UPDATE outbox SET attempts = ?, error = ?, due = ? "
+                    f"WHERE id IN ({marks})",
+                    (attempts, str(e), time.time() + delay, *ids))
+                log(f"'{subject[:60]}' failed ({e}); retry {attempts} in "
+                    f"{delay:g}s")
+                return delay
+            return 0
+        self._write(
+            f"UPDATE outbox SET status = 'sent', attempts = attempts + 1, "
+            f"error = NULL, done = ? WHERE id IN ({marks})",
+            (time.time(), *ids))
+        return 0
+
+    def _prune(self):
+        self._write(
+            "DELETE FROM outbox WHERE status != 'queued' AND done < ?",
+            (time.time() - KEEP_DAYS * 86400, ))
+
+    # ---------- housekeeping ----------
+    def counts(self):
+        """{status: rows}"""
+        return {r[0]: r[1] for r in self._query(
+            "SELECT status, COUNT(*) FROM outbox GROUP BY status")}
+
+    def failed(self, limit=50):
+        return [dict(r) for r in self._query(
+            "SELECT id, account, subject, attempts, error, done FROM outbox "
+            "WHERE status = 'failed' ORDER BY id DESC LIMIT ?", (limit, ))]
+
+    def requeue_failed(self):
+        """Put failed rows back in the queue; returns how many."""
+        return self._write(
+            "UPDATE OR IGNORE outbox SET status = 'queued', attempts = 0, "
+            "due = ? WHERE status = 'failed'", (time.time(), )).rowcount
+
+    def drain(self, timeout=None):
+        """Wait until nothing due is queued for the accounts this process
+        delivers; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        keys = list(self._workers)
+        while keys:
+            now = time.time()
+            left = sum(self._query(
+                "SELECT COUNT(*) FROM outbox WHERE account = ? AND "
+                "status = 'queued' AND due <= ?", (k, now))[0][0]
+                for k in keys)
+            if not left:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout=0):
+        """Stop the workers, after up to `timeout` seconds of draining.
+        Whatever is still queued is delivered after the next start."""
+        if timeout:
+            self.drain(timeout)
+        self._stop.set()
+        for t, wake in list(self._workers.values()):
+            wake.set()
+            t.join(5)
+        with self._lock:
+            self.conn.close()
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox(**options):
+    """The process-wide Outbox (options apply on first use), drained for up
+    to EXIT_SECS at exit."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(**options)
+            atexit.register(_outbox.close, EXIT_SECS)
+        return _outbox
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="JRAVIS mail outbox")
+    p.add_argument("--db", default=OUTBOX_DB)
+    p.add_argument("--stats", action="store_true")
+    p.add_argument("--failed", action="store_true")
+    p.add_argument("--requeue-failed", action="store_true")
+    args = p.parse_args(argv)
+    outbox = Outbox(args.db)
+    if args.stats or not (args.failed or args.requeue_failed):
+        print(json.dumps(outbox.counts(), indent=2))
+    if args.failed:
+        for row in outbox.failed():
+            print(f"#{row['id']} {row['account']} '{row['subject'][:60]}' "
+                  f"x{row['attempts']}: {row['error']}")
+    if args.requeue_failed:
+        print(f"Requeued {outbox.requeue_failed()} message(s); they go out "
+              f"with the next process that delivers for their account.")
+    outbox.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+mail_service.py
+One outbound mail path for every JRAVIS report and alert sender.
+
+Each sender used to open an SMTP connection, do TLS and AUTH, send one
+message and hang up, so a burst of alerts paid a handshake and a login per
+message. Here, per SMTP account:
+
+    SMTPPool        up to POOL_SIZE authenticated connections, kept open and
+                    reused; idle ones are NOOP-checked before reuse and
+                    closed after IDLE_SECS
+    MailService     a queue in front of the pool, drained by POOL_SIZE
+                    worker threads; failures are retried with exponential
+                    backoff (permanent 5xx refusals are not)
+    SinkServer      a local SMTP server that accepts everything, for
+                    benchmarks and offline runs
+
+    svc = mail_service.get_service(
+        mail_service.Account("smtp.gmail.com", 465, user, password))
+    svc.send(sender, [to], "Daily report", body, ["summary_locked.pdf"]
+             ).result()                 # waits; raises if it finally failed
+
+Alerts go through mail_outbox.get_outbox().alert, which persists, dedups and
+digests them (with digest() below) on top of this service. Messages are
+written with smtp_stream, so attachments are streamed from disk. Queued mail
+is flushed at interpreter exit (up to FLUSH_TIMEOUT).
+
+scripts/bench_mail_service.py compares per-message connections with the
+pool against a SinkServer with handshake latency.
+"""
+
+import atexit
+import heapq
+import itertools
+import os
+import smtplib
+import socketserver
+import ssl
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from email.utils import parseaddr
+
+import smtp_stream
+
+POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "2"))
+IDLE_SECS = float(os.getenv("MAIL_IDLE_SECS", "240"))  # servers drop ~5 min
+CHECK_SECS = 15.0  # idle longer than this: NOOP before reuse
+RETRIES = int(os.getenv("MAIL_RETRIES", "5"))
+BACKOFF = float(os.getenv("MAIL_BACKOFF", "2"))
+BACKOFF_MAX = float(os.getenv("MAIL_BACKOFF_MAX", "300"))
+FLUSH_TIMEOUT = float(os.getenv("MAIL_FLUSH_TIMEOUT", "60"))
+TIMEOUT = 30
+
+# port 465 is implicit TLS; anything else uses STARTTLS when offered
+Account = namedtuple("Account", "host port user password")
+Mail = namedtuple("Mail", "from_addr to_addrs subject body attachments")
+
+
+def log(msg):
+    print(f"[mail_service] {msg}", file=sys.stderr)
+
+
+def _quietly_close(smtp):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+def is_permanent(exc):
+    """True for refusals a retry cannot fix (5xx replies, bad login)."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return (isinstance(exc, smtplib.SMTPResponseException)
+            and exc.smtp_code >= 500)
+
+
+def digest(items):
+    """(subject, body) of one message carrying [(datetime, subject, body)]."""
+    if len(items) == 1:
+        return items[0][1], items[0][2]
+    subject = f"{items[0][1]} (+{len(items) - 1} more)"
+    body = "\n\n".join(f"=== {ts:%Y-%m-%d %H:%M:%S}  {subj}\n{text}"
+                       for ts, subj, text in items)
+    return subject, (f"{len(items)} alerts since {items[0][0]:%H:%M:%S}\n\n"
+                     + body)
+
+
+class SMTPPool:
+    """Authenticated SMTP connections to one account, reused across sends."""
+
+    def __init__(self, account, size=None, idle=None):
+        self.account = account
+        self.size = size or POOL_SIZE
+        self.idle = IDLE_SECS if idle is None else idle
+        self.opened = 0
+        self._free = []  # [(smtp, last used)]
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        a = self.account
+        context = ssl.create_default_context()
+        if a.port == 465:
+            smtp = smtplib.SMTP_SSL(a.host, a.port, timeout=TIMEOUT,
+                                    context=context)
+        else:
+            smtp = smtplib.SMTP(a.host, a.port, timeout=TIMEOUT)
+            smtp.ehlo()
+            if smtp.has_extn("starttls"):
+                smtp.starttls(context=context)
+                smtp.ehlo()
+        try:
+            if a.user:
+                smtp.login(a.user, a.password)
+        except Exception:
+            smtp.close()
+            raise
+        with self._lock:
+            self.opened += 1
+        return smtp
+
+    def _take(self):
+        """(connection, reused?)"""
+        while True:
+            with self._lock:
+                if not self._free:
+                    break
+                smtp, used = self._free.pop()
+            age = time.monotonic() - used
+            if age > self.idle:
+                _quietly_close(smtp)
+                continue
+            if age > CHECK_SECS:
+                try:
+                    if smtp.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("noop refused")
+                except (smtplib.SMTPException, OSError):
+                    smtp.close()
+                    continue
+            return smtp, True
+        return self._connect(), False
+
+    def send(self, mail):
+        """Deliver one Mail over a pooled connection; returns refused
+        recipients like smtplib.sendmail."""
+        with self._slots:
+            smtp, reused = self._take()
+            while True:
+                try:
+                    refused = smtp_stream.send(
+                        smtp, parseaddr(mail.from_addr)[1], mail.to_addrs,
+                        smtp_stream.message_chunks(
+                            mail.from_addr, mail.to_addrs, mail.subject,
+                            mail.body, mail.attachments))
+                except (smtplib.SMTPRecipientsRefused,
+                        smtplib.SMTPResponseException):
+                    # a refusal ends the transaction; the session is fine
+                    self._release(smtp)
+                    raise
+                except smtplib.SMTPServerDisconnected:
+                    smtp.close()
+                    if not reused:
+                        raise
+                    # the server dropped an idle connection: one fresh try
+                    smtp, reused = self._connect(), False
+                    continue
+                except BaseException:
+                    smtp.close()
+                    raise
+                self._release(smtp)
+                return refused
+
+    def _release(self, smtp):
+        with self._lock:
+            self._free.append((smtp, time.monotonic()))
+
+    def close(self):
+        with self._lock:
+            free, self._free = self._free, []
+        for smtp, _ in free:
+            _quietly_close(smtp)
+
+
+class MailService:
+    """A retrying send queue over one SMTPPool."""
+
+    def __init__(self, account, workers=None, retries=None, backoff=None):
+        self.pool = SMTPPool(account, workers)
+        self.retries = RETRIES if retries is None else retries
+        self.backoff = BACKOFF if backoff is None else backoff
+        self.sent = self.failed = self.retried = 0
+        self._heap = []  # (due, seq, job)
+        self._seq = itertools.count()
+        self._busy = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    # ---------- queueing ----------
+    def _push(self, due, job):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("mail service is closed")
+            heapq.heappush(self._heap, (due, next(self._seq), job))
+            if len(self._threads) < self.pool.size:
+                t = threading.Thread(target=self._work, daemon=True,
+                                     name=f"mail-{len(self._threads)}")
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+
+    def send(self, from_addr, to_addrs, subject, body, attachments=()):
+        """Queue one message; returns a Future resolving to the refused
+        recipients (or raising the final error)."""
+        future = Future()
+        mail = Mail(from_addr, list(to_addrs), subject, body,
+                    list(attachments))
+        self._push(time.monotonic(), ("mail", mail, future, 0))
+        return future
+
+    # ---------- workers ----------
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._heap:
+                        wait = self._heap[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                    elif self._closed:
+                        return
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                _, _, job = heapq.heappop(self._heap)
+                self._busy += 1
+            try:
+                _, mail, future, attempt = job
+                self._deliver(mail, future, attempt)
+            finally:
+                with self._cond:
+                    self._busy -= 1
+                    self._cond.notify_all()
+
+    def _deliver(self, mail, future, attempt):
+        try:
+            refused = self.pool.send(mail)
+        except Exception as e:
+            if attempt + 1 < self.retries and not is_permanent(e):
+                delay = min(BACKOFF_MAX, self.backoff * 2 ** attempt)
+                log(f"'{mail.subject[:60]}' failed ({e}); retry "
+                    f"{attempt + 1} in {delay:g}s")
+                self.retried += 1
+                self._push(time.monotonic() + delay,
+                           ("mail", mail, future, attempt + 1))
+                return
+            self.failed += 1
+            log(f"giving up on '{mail.subject[:60]}' after {attempt + 1} "
+                f"attempt(s): {e}")
+            future.set_exception(e)
+            return
+        self.sent += 1
+        future.set_result(refused)
+
+    def flush(self, timeout=None):
+        """Wait until the queue is empty; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._busy:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def close(self, timeout=None):
+        """Flush, stop the workers and close the pooled connections."""
+        done = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if not done:
+            log(f"{len(self._heap)} message(s) still queued at close")
+        self.pool.close()
+        return done
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(account, **options):
+    """The process-wide MailService for an account, flushed at exit;
+    options (MailService arguments) apply when it is first created."""
+    with _services_lock:
+        svc = _services.get(account)
+        if svc is None:
+            svc = _services[account] = MailService(account, **options)
+            atexit.register(svc.close, FLUSH_TIMEOUT)
+        return svc
+
+
+# ---------- local sink ----------
+class SinkServer:
+    """
+    An SMTP server on 127.0.0.1:<port> that accepts any login and message.
+    `messages` holds (envelope from, recipients, raw bytes); `connections`
+    and `logins` count sessions. `latency` seconds are spent on the greeting
+    and again on AUTH, standing in for the TLS handshake and login of a real
+    server; `fail_next = n` answers the next n DATA commands with 451.
+
+        with SinkServer(latency=0.1) as sink:
+            svc = MailService(Account("127.0.0.1", sink.port, "u", "p"))
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.messages = []
+        self.connections = self.logins = 0
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def reply(self, line):
+                self.wfile.write(line.encode("ascii") + b"\r\n")
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                time.sleep(sink.latency)
+                self.reply("220 sink ESMTP")
+                mail_from, rcpts = None, []
+                for line in iter(self.rfile.readline, b""):
+                    cmd = line[:4].upper()
+                    if cmd == b"EHLO":
+                        self.reply("250-sink")
+                        self.reply("250 AUTH PLAIN LOGIN")
+                    elif cmd == b"AUTH":
+                        time.sleep(sink.latency)
+                        with sink._lock:
+                            sink.logins += 1
+                        self.reply("235 ok")
+                    elif cmd == b"MAIL":
+                        mail_from, rcpts = line[10:].strip(), []
+                        self.reply("250 ok")
+                    elif cmd == b"RCPT":
+                        rcpts.append(line[8:].strip())
+                        self.reply("250 ok")
+                    elif cmd == b"DATA":
+                        self.reply("354 go")
+                        data = []
+                        for chunk in iter(self.rfile.readline, b""):
+                            if chunk == b".\r\n":
+                                break
+                            data.append(chunk[1:] if chunk[:1] == b"."
+                                        else chunk)
+                        with sink._lock:
+                            fail = sink.fail_next > 0
+                            if fail:
+                                sink.fail_next -= 1
+                            else:
+                                sink.messages.append(
+                                    (mail_from, rcpts, b"".join(data)))
+                        self.reply("451 try later" if fail else "250 queued")
+                    elif cmd == b"QUIT":
+                        self.reply("221 bye")
+                        return
+                    else:
+                        self.reply("250 ok")
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0),
+                                                      Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
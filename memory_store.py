@@ -1,17 +1,18 @@
-from tinydb import TinyDB, Query
 from datetime import datetime
 
-db = TinyDB('jr_memory.json')
-reports = db.table('reports')
-earnings = db.table('earnings')
+import earnings_store
+
+# earnings/reports live in earnings_store; jr_memory.json is migrated on open
+store = earnings_store.open_store()
 
 
 def add_report(date, summary, locked=False):
-    reports.insert({"date": date, "summary": summary, "locked": locked})
+    store.add_report(date, summary, locked)
 
 
 def add_earnings(date, amount, source):
-    earnings.insert({"date": date, "amount": amount, "source": source})
+    # daily and weekly totals are updated in the same transaction
+    store.add_earning(date, amount, source)
 
 
 # sample usage
@@ -1,6 +1,3 @@
-# mission_bridge.py
-
-```python
 """
 mission_bridge.py
 
@@ -15,7 +12,9 @@ Usage (import from other modules):
 import sqlite3
 import json
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
+
+from task_pagination import ensure_task_indexes, fetch_page, parse_cursor
 
 
 class Bridge:
@@ -58,7 +57,9 @@ class Bridge:
                 message TEXT
             )
         ''')
-        conn.commit(); conn.close()
+        conn.commit()
+        ensure_task_indexes(conn, 'tasks')
+        conn.close()
 
     # -------- Task bus APIs --------
     def enqueue_task(self, task_id: str, stream_id: int, stream_name: str, task_type: str, payload: Optional[Dict]=None) -> None:
@@ -88,17 +89,19 @@ class Bridge:
         cur.execute('UPDATE tasks SET status=?, updated_at=?, result=? WHERE id=?', ('completed', now, json.dumps(result), task_id))
         conn.commit(); conn.close()
 
-    def list_tasks(self, status: Optional[str]=None, limit: int=100) -> List[Dict[str,Any]]:
-        conn = self._conn(); cur = conn.cursor()
-        if status:
-            cur.execute('SELECT id, stream_id, stream_name, task_type, status, created_at, updated_at FROM tasks WHERE status=? ORDER BY created_at DESC LIMIT ?', (status, limit))
-        else:
-            cur.execute('SELECT id, stream_id, stream_name, task_type, status, created_at, updated_at FROM tasks ORDER BY created_at DESC LIMIT ?', (limit,))
-        rows = cur.fetchall(); conn.close()
-        out = []
-        for r in rows:
-            out.append({"id": r[0], "stream_id": r[1], "stream_name": r[2], "task_type": r[3], "status": r[4], "created_at": r[5], "updated_at": r[6]})
-        return out
+    def list_tasks(self, status: Union[str, Sequence[str], None]=None, limit: int=100, after: Optional[str]=None) -> List[Dict[str,Any]]:
+        return self.list_tasks_page(status, limit, after)[0]
+
+    def list_tasks_page(self, status: Union[str, Sequence[str], None]=None, limit: int=100, after: Optional[str]=None) -> Tuple[List[Dict[str,Any]], Optional[str]]:
+        """Newest-first page of tasks plus the cursor for the next page (None on the last)."""
+        statuses = [status] if isinstance(status, str) else list(status or [])
+        cols = ('id', 'stream_id', 'stream_name', 'task_type', 'status', 'created_at', 'updated_at')
+        conn = self._conn()
+        try:
+            rows, next_cursor = fetch_page(conn, 'tasks', cols, statuses, parse_cursor(after, int_ids=False), limit)
+        finally:
+            conn.close()
+        return [dict(zip(cols, r)) for r in rows], next_cursor
 
     # -------- Progress / reporting API --------
     def log_progress(self, stream_id: int, key: str, value: str, date: Optional[str]=None) -> None:
@@ -125,6 +128,3 @@ class Bridge:
         cur.execute('SELECT ts, level, message FROM logs ORDER BY id DESC LIMIT ?', (limit,))
         rows = cur.fetchall(); conn.close()
         return [{"ts": r[0], "level": r[1], "message": r[2]} for r in rows]
-```
-
----
\ No newline at end of file
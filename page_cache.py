@@ -0,0 +1,143 @@
+# page_cache.py
+"""
+Compiled template cache + hashed static assets + response compression for the
+single-file Flask dashboards.
+
+The dashboards keep their HTML inline as module strings. Passing those through
+render_template_string re-parses and re-compiles the Jinja source on every
+request; install_pages() registers them once with the app's Jinja loader so
+render_template() hits the compiled template cache instead.
+
+Usage:
+    from flask import render_template
+    from page_cache import install_pages
+
+    install_pages(app, {"index.html": INDEX_HTML})
+
+    @app.route("/")
+    def index():
+        return render_template("index.html", refresh=15)
+
+Inline <style>/<script> blocks that contain no Jinja markup are moved out to
+/_assets/<name>.<sha>.css|js and served with a one-year immutable
+Cache-Control header, so browsers fetch them once per content change.
+Responses are brotli (if the optional `brotli` package is installed) or gzip
+compressed according to Accept-Encoding.
+"""
+
+import gzip
+import hashlib
+import re
+from functools import lru_cache
+
+from flask import Response, abort, request
+from jinja2 import ChoiceLoader, DictLoader
+
+try:
+    import brotli  # optional
+except ImportError:
+    brotli = None
+
+ASSET_PREFIX = "/_assets/"
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+COMPRESS_MIN_BYTES = 512
+COMPRESSIBLE = {
+    "text/html", "text/css", "text/plain", "application/javascript",
+    "application/json"
+}
+
+_BLOCK_RE = re.compile(r"<(style|script)(\s[^>]*)?>(.*?)</\1\s*>",
+                       re.S | re.I)
+_JINJA_MARKERS = ("{{", "{%", "{#")
+_ASSET_TYPES = {
+    "style": ("css", "text/css"),
+    "script": ("js", "application/javascript")
+}
+
+
+def _extract_assets(name, source, assets):
+    """Replace Jinja-free inline style/script blocks with hashed asset links."""
+    stem = name.rsplit(".", 1)[0].replace("/", "_")
+
+    def repl(m):
+        tag, attrs, body = m.group(1).lower(), m.group(2) or "", m.group(3)
+        if "src=" in attrs.lower() or not body.strip() or any(
+                k in body for k in _JINJA_MARKERS):
+            return m.group(0)
+        ext, mimetype = _ASSET_TYPES[tag]
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:12]
+        fname = f"{stem}.{digest}.{ext}"
+        assets[fname] = (body.encode("utf-8"), mimetype)
+        if tag == "style":
+            return f'<link rel="stylesheet" href="{ASSET_PREFIX}{fname}">'
+        return f'<script{attrs} src="{ASSET_PREFIX}{fname}"></script>'
+
+    return _BLOCK_RE.sub(repl, source)
+
+
+@lru_cache(maxsize=64)
+def _encode(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _pick_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept["br"]:
+        return "br"
+    if accept["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    """after_request hook: compress buffered text responses."""
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _pick_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(_encode(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def install_pages(app, templates):
+    """
+    Register inline templates on `app` and precompile them.
+    May be called more than once per app; later calls add templates.
+    """
+    state = app.extensions.get("page_cache")
+    if state is None:
+        state = {"templates": {}, "assets": {}}
+        app.extensions["page_cache"] = state
+        app.jinja_loader = ChoiceLoader(
+            [DictLoader(state["templates"]), app.jinja_loader] if app.
+            jinja_loader else [DictLoader(state["templates"])])
+        assets = state["assets"]
+
+        @app.route(ASSET_PREFIX + "<name>", endpoint="page_assets")
+        def page_assets(name):
+            asset = assets.get(name)
+            if asset is None:
+                abort(404)
+            resp = Response(asset[0], mimetype=asset[1])
+            resp.headers["Cache-Control"] = ASSET_CACHE_CONTROL
+            return resp
+
+        app.after_request(compress_response)
+
+    for name, source in templates.items():
+        state["templates"][name] = _extract_assets(name, source,
+                                                   state["assets"])
+    for name in templates:
+        app.jinja_env.get_template(name)
+    return state
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+pdf_crypt.py
+AES-256 PDF encryption for every JRAVIS report that gets a password.
+
+The old encrypt_pdf copies (report_engine, report_invoice_cloud,
+weekly_summary_cloud, drive_sync_daemon) loaded every page into a PyPDF2
+PdfWriter, which rebuilds the whole object graph in memory and re-serializes
+it with RC4-128. Here:
+
+  - encrypt_pdf() streams the document through pdf_merge.StreamingPdfWriter:
+    each object is copied, encrypted and written as soon as it is reached,
+    and page content streams are encrypted as they are stored (never
+    decoded), so memory stays at about one input file;
+  - pdf_render takes the same Encryption object and writes encrypted
+    objects directly (pdf_render.render(..., password=...)), so locked
+    reports never exist as plaintext on disk.
+
+The security handler is the standard one, revision 6 (AES-256, PDF 2.0 /
+Acrobat X+, what every current reader opens). Strings and streams are
+AES-256-CBC with a random IV each, under a random 256-bit file key.
+
+    import pdf_crypt
+    pdf_crypt.encrypt_pdf("summary.pdf", "summary_locked.pdf", "MY OG")
+
+With seed= every random value (file key, salts, IVs) comes from an
+HMAC-SHA256 stream over the seed instead of os.urandom, so the same input and
+seed give byte-identical output; drive_sync_daemon seeds with the password
+and the source's hash so an unchanged report re-encrypts to the bytes Drive
+already holds. Equal outputs then reveal equal inputs, nothing more.
+
+scripts/bench_pdf_encrypt.py compares time and peak memory with PyPDF2.
+"""
+
+import codecs
+import hashlib
+import hmac
+import os
+import sys
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from PyPDF2.generic import (ArrayObject, ByteStringObject, DictionaryObject,
+                            EncodedStreamObject, NameObject, StreamObject,
+                            TextStringObject, encode_pdfdocencoding)
+
+from pdf_merge import StreamingPdfWriter
+
+# every permission granted (bits 1-2 must be 0, 7-8 and 13-32 must be 1)
+ALL_PERMISSIONS = -4
+
+
+def _aes(key, mode):
+    return Cipher(algorithms.AES(key), mode)
+
+
+def _hash(password, salt, udata=b""):
+    """Algorithm 2.B (ISO 32000-2): the revision 6 password hash."""
+    k = hashlib.sha256(password + salt + udata).digest()
+    i = 0
+    while True:
+        k1 = (password + k + udata) * 64
+        enc = _aes(k[:16], modes.CBC(k[16:32])).encryptor()
+        e = enc.update(k1) + enc.finalize()
+        k = (hashlib.sha256, hashlib.sha384,
+             hashlib.sha512)[int.from_bytes(e[:16], "big") % 3](e).digest()
+        i += 1
+        if i >= 64 and e[-1] <= i - 32:
+            return k[:32]
+
+
+def _wrap(key, data):
+    # UE / OE: the file key under a password-derived key, zero IV, no padding
+    enc = _aes(key, modes.CBC(b"\0" * 16)).encryptor()
+    return enc.update(data) + enc.finalize()
+
+
+def _text_bytes(text):
+    # the bytes a TextStringObject was read from, or how PyPDF2 would write it
+    try:
+        return text.get_original_bytes()
+    except Exception:
+        try:
+            return encode_pdfdocencoding(text)
+        except UnicodeEncodeError:
+            return codecs.BOM_UTF16_BE + text.encode("utf-16be")
+
+
+def _seeded(seed):
+    # deterministic stand-in for os.urandom: HMAC-SHA256(seed, counter)
+    state = {"n": 0}
+
+    def rand(n):
+        out = b""
+        while len(out) < n:
+            out += hmac.new(seed, b"%d" % state["n"], hashlib.sha256).digest()
+            state["n"] += 1
+        return out[:n]
+
+    return rand
+
+
+def _password(password):
+    return (password or "").encode("utf-8")[:127]
+
+
+class Encryption:
+    """
+    One document's encryption state: a fresh file key and the /Encrypt
+    dictionary that lets readers recover it from the password.
+    """
+
+    def __init__(self, user_password, owner_password=None,
+                 permissions=ALL_PERMISSIONS, seed=None):
+        user = _password(user_password)
+        owner = _password(owner_password if owner_password is not None
+                          else user_password)
+        self._random = os.urandom if seed is None else _seeded(seed)
+        self.key = self._random(32)
+        self.file_id = self._random(16)
+        self.permissions = permissions
+
+        salts = self._random(16)
+        self.u = _hash(user, salts[:8]) + salts
+        self.ue = _wrap(_hash(user, salts[8:]), self.key)
+        salts = self._random(16)
+        self.o = _hash(owner, salts[:8], self.u) + salts
+        self.oe = _wrap(_hash(owner, salts[8:], self.u), self.key)
+        perms = ((permissions & 0xFFFFFFFF).to_bytes(4, "little") +
+                 b"\xff\xff\xff\xffTadb" + self._random(4))
+        enc = _aes(self.key, modes.ECB()).encryptor()
+        self.perms = enc.update(perms) + enc.finalize()
+
+    def encrypt(self, data):
+        """AES-256-CBC with a random IV (prepended), PKCS#7 padded."""
+        if isinstance(data, str):
+            data = data.encode("latin-1")
+        iv = self._random(16)
+        pad = padding.PKCS7(128).padder()
+        enc = _aes(self.key, modes.CBC(iv)).encryptor()
+        return iv + enc.update(pad.update(data) + pad.finalize()) + enc.finalize()
+
+    def string(self, data):
+        """An encrypted PDF string token for raw bytes."""
+        return b"<" + self.encrypt(data).hex().encode() + b">"
+
+    def dictionary(self):
+        """Body of the /Encrypt object (written unencrypted)."""
+        return (
+            b"<< /Filter /Standard /V 5 /R 6 /Length 256"
+            b" /CF << /StdCF << /AuthEvent /DocOpen /CFM /AESV3 /Length 32 >> >>"
+            b" /StmF /StdCF /StrF /StdCF /P %d" % self.permissions +
+            b" /O <" + self.o.hex().encode() + b"> /U <" + self.u.hex().encode() +
+            b"> /OE <" + self.oe.hex().encode() + b"> /UE <" +
+            self.ue.hex().encode() + b"> /Perms <" + self.perms.hex().encode() +
+            b"> /EncryptMetadata true >>")
+
+    def trailer(self, encrypt_num):
+        """Trailer entries pointing at the /Encrypt object."""
+        fid = self.file_id.hex().encode()
+        return b" /Encrypt %d 0 R /ID [<%s> <%s>]" % (encrypt_num, fid, fid)
+
+    def encrypt_object(self, obj):
+        """
+        Encrypted counterpart of a PyPDF2 object about to be written: strings
+        and stream data are encrypted, everything else is kept. Stream data
+        is encrypted as stored, whatever its filters.
+        """
+        if isinstance(obj, StreamObject):
+            out = EncodedStreamObject()
+            for k, v in obj.items():
+                if k != "/Length":
+                    out[NameObject(k)] = self.encrypt_object(v)
+            out._data = self.encrypt(obj._data)
+            return out
+        if isinstance(obj, DictionaryObject):
+            out = DictionaryObject()
+            for k, v in obj.items():
+                out[NameObject(k)] = self.encrypt_object(v)
+            return out
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self.encrypt_object(v) for v in obj)
+        if isinstance(obj, TextStringObject):
+            return ByteStringObject(self.encrypt(_text_bytes(obj)))
+        if isinstance(obj, ByteStringObject):
+            return ByteStringObject(self.encrypt(bytes(obj)))
+        return obj
+
+
+def encrypt_pdf(input_path, output_path, password, owner_password=None,
+                input_password=None, seed=None):
+    """
+    Encrypt input_path -> output_path (may be the same file) with AES-256.
+    Streams object by object; returns output_path. seed (bytes) makes the
+    output reproducible.
+    """
+    tmp = f"{output_path}.tmp"
+    try:
+        with open(tmp, "wb") as fh:
+            writer = StreamingPdfWriter(
+                fh, dedup=False,
+                encryption=Encryption(password, owner_password, seed=seed))
+            writer.add_document(input_path, input_password)
+            writer.close()
+        os.replace(tmp, output_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return output_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python3 pdf_crypt.py IN.pdf OUT.pdf PASSWORD")
+        sys.exit(1)
+    print(encrypt_pdf(*sys.argv[1:]))
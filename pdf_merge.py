@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+pdf_merge.py
+Streaming PDF merge for the weekly summary (and anything else that bundles
+many small PDFs).
+
+PyPDF2's PdfWriter keeps every page and every object it references in memory
+until write(). merge_pdfs() here instead opens one input at a time, copies
+the objects its pages reference straight into the output file, then drops
+the reader, so peak memory is about one input file plus a few integers per
+output object, however many inputs there are.
+
+Along the way it
+  - deduplicates identical objects across inputs (the same embedded font
+    program, font descriptor, image or resource dict is written once and
+    shared by every page that uses it);
+  - Flate-compresses streams that were stored uncompressed;
+  - optionally encrypts every object on its way out (`encryption`, a
+    pdf_crypt.Encryption; that is how pdf_crypt.encrypt_pdf works).
+
+Outlines, forms and document metadata of the inputs are not carried over
+(the old PdfWriter.add_page merge dropped them too).
+
+Usage:
+    from pdf_merge import merge_pdfs
+    merge_pdfs(["a.pdf", "b.pdf"], "merged.pdf")
+
+    python3 pdf_merge.py OUT.pdf IN.pdf [IN.pdf ...]
+
+scripts/bench_pdf_merge.py compares peak RSS and output size with the
+PdfWriter merge.
+"""
+
+import hashlib
+import io
+import sys
+import zlib
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (ArrayObject, DictionaryObject, EncodedStreamObject,
+                            IndirectObject, NameObject, StreamObject)
+
+# uncompressed streams shorter than this are not worth a Flate wrapper
+COMPRESS_MIN_BYTES = 64
+
+_CATALOG, _PAGES = 1, 2
+
+
+def _page_ref(page):
+    ref = getattr(page, "indirect_reference", None) or getattr(
+        page, "indirect_ref", None)
+    return ref.idnum, ref.generation
+
+
+class StreamingPdfWriter:
+    """Writes objects to `fh` as soon as they are known; see module docstring."""
+
+    def __init__(self, fh, dedup=True, compress=True, encryption=None):
+        self.fh = fh
+        self.dedup = dedup
+        self.compress = compress
+        self.encryption = encryption
+        self._offsets = [None, None]  # object numbers 1 (catalog), 2 (pages)
+        self._seen = {}  # sha256 of serialized object -> object number
+        self._kids = []
+        self.deduplicated = 0
+        fh.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    # ---------- low level ----------
+    def _reserve(self):
+        self._offsets.append(None)
+        return len(self._offsets)
+
+    def _write(self, num, data):
+        self._offsets[num - 1] = self.fh.tell()
+        self.fh.write(b"%d 0 obj\n" % num)
+        self.fh.write(data)
+        self.fh.write(b"\nendobj\n")
+
+    @staticmethod
+    def _serialize(obj):
+        buf = io.BytesIO()
+        obj.write_to_stream(buf, None)
+        return buf.getvalue()
+
+    def _sealed(self, obj, data=None):
+        # duplicates are found on the plaintext (ciphertexts never repeat)
+        if self.encryption is not None:
+            return self._serialize(self.encryption.encrypt_object(obj))
+        return data if data is not None else self._serialize(obj)
+
+    def _add(self, obj):
+        if not self.dedup:
+            num = self._reserve()
+            self._write(num, self._sealed(obj))
+            return num
+        data = self._serialize(obj)
+        digest = hashlib.sha256(data).digest()
+        num = self._seen.get(digest)
+        if num is not None:
+            self.deduplicated += 1
+            return num
+        num = self._reserve()
+        self._write(num, self._sealed(obj, data))
+        self._seen[digest] = num
+        return num
+
+    def _add_at(self, num, obj):
+        self._write(num, self._sealed(obj))
+
+    # ---------- copying ----------
+    def _ref(self, ref, refs, active):
+        key = (ref.idnum, ref.generation)
+        num = refs.get(key)
+        if num is not None:
+            return IndirectObject(num, 0, self)
+        if key in active:
+            # reference cycle: give the object its number now, write it later
+            if active[key] is None:
+                active[key] = self._reserve()
+            return IndirectObject(active[key], 0, self)
+        active[key] = None
+        copy = self._copy(ref.get_object(), refs, active)
+        num = active.pop(key)
+        if num is None:
+            num = self._add(copy)
+        else:
+            self._add_at(num, copy)
+        refs[key] = num
+        return IndirectObject(num, 0, self)
+
+    def _copy(self, obj, refs, active, skip=()):
+        if isinstance(obj, IndirectObject):
+            return self._ref(obj, refs, active)
+        if isinstance(obj, StreamObject):
+            data = obj._data
+            out = EncodedStreamObject()
+            for k, v in obj.items():
+                if k != "/Length":
+                    out[NameObject(k)] = self._copy(v, refs, active)
+            if (self.compress and "/Filter" not in obj and data
+                    and len(data) >= COMPRESS_MIN_BYTES):
+                packed = zlib.compress(
+                    data if isinstance(data, bytes) else data.encode("latin-1"))
+                if len(packed) < len(data):
+                    out[NameObject("/Filter")] = NameObject("/FlateDecode")
+                    data = packed
+            out._data = data
+            return out
+        if isinstance(obj, DictionaryObject):
+            out = DictionaryObject()
+            for k, v in obj.items():
+                if k not in skip:
+                    out[NameObject(k)] = self._copy(v, refs, active)
+            return out
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(v, refs, active) for v in obj)
+        return obj
+
+    # ---------- public ----------
+    def add_document(self, path, password=None):
+        """Append every page of `path`. Returns the number of pages added."""
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            reader.decrypt(password or "")
+        pages = reader.pages
+        # pages get their numbers up front, so links between pages of the
+        # same document resolve without dragging in the source page tree
+        refs = {_page_ref(p): self._reserve() for p in pages}
+        kids = []
+        for page in pages:
+            num = refs[_page_ref(page)]
+            copy = self._copy(page, refs, {}, skip=("/Parent", "/B"))
+            copy[NameObject("/Parent")] = IndirectObject(_PAGES, 0, self)
+            self._add_at(num, copy)
+            kids.append(num)
+        self._kids.extend(kids)
+        return len(kids)
+
+    def close(self):
+        """Write the page tree, catalog, xref table and trailer."""
+        fh = self.fh
+        kids = b" ".join(b"%d 0 R" % n for n in self._kids)
+        self._write(_PAGES, b"<< /Type /Pages /Kids [ " + kids +
+                    b" ] /Count %d >>" % len(self._kids))
+        self._write(_CATALOG, b"<< /Type /Catalog /Pages 2 0 R >>")
+        trailer = b""
+        if self.encryption is not None:
+            num = self._reserve()
+            self._write(num, self.encryption.dictionary())
+            trailer = self.encryption.trailer(num)
+        # numbers reserved by an input that failed half-way stay valid as null
+        for i, off in enumerate(self._offsets):
+            if off is None:
+                self._write(i + 1, b"null")
+        xref = fh.tell()
+        size = len(self._offsets) + 1
+        fh.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        fh.write(b"".join(b"%010d 00000 n \n" % off for off in self._offsets))
+        fh.write(b"trailer\n<< /Size %d /Root 1 0 R" % size + trailer +
+                 b" >>\nstartxref\n%d\n%%%%EOF\n" % xref)
+
+    @property
+    def page_count(self):
+        return len(self._kids)
+
+
+def merge_pdfs(pdf_paths, out_path, password=None, log=print):
+    """
+    Merge PDFs in the given order into out_path, one input in memory at a
+    time. Unreadable inputs are skipped with a warning. `password` is tried
+    on encrypted inputs. Returns the StreamingPdfWriter (page_count,
+    deduplicated) for reporting.
+    """
+    with open(out_path, "wb") as fh:
+        writer = StreamingPdfWriter(fh)
+        for p in pdf_paths:
+            try:
+                writer.add_document(p, password)
+            except Exception as e:
+                log("Warning: failed to read PDF", p, ":", e)
+        writer.close()
+    return writer
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python3 pdf_merge.py OUT.pdf IN.pdf [IN.pdf ...]")
+        sys.exit(1)
+    w = merge_pdfs(sys.argv[2:], sys.argv[1])
+    print(f"Wrote {sys.argv[1]}: {w.page_count} pages, "
+          f"{w.deduplicated} duplicate objects shared")
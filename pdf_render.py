@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+"""
+pdf_render.py
+Shared PDF rendering layer for JRAVIS summaries, invoices and weekly covers.
+
+Generators used to build a fresh FPDF (or spawn wkhtmltopdf) per document,
+re-reading and re-subsetting fonts every time. Here:
+
+  - fonts are parsed once per process. The Unicode face (DejaVuSans, so ₹
+    and emoji-free symbols render) is subset once to a fixed charset and
+    kept as ready-made PDF objects;
+  - each layout (TEMPLATES: "summary", "weekly", "invoice", "order_invoice")
+    is compiled once per font set: fonts, resources and every static element
+    become fixed bytes, and only the {field} parts are formatted per document;
+  - documents whose text is plain WinAnsi (Latin-1 plus — € ™ ...) use the
+    built-in Helvetica variant and embed nothing (~2 KB per invoice); only
+    text such as ₹ pulls in the embedded font (~60 KB).
+
+Rendering a document is then string formatting plus one small zlib call.
+
+    import pdf_render
+    pdf_render.render("order_invoice", "invoice.pdf", order_id="A1", ...)
+    data = pdf_render.render_bytes("summary", title="...", lines=[...])
+    pdf_render.render("summary", "locked.pdf", password="...", title=...)
+
+Characters outside the font subset come out as "?" (emoji are dropped).
+
+Config:
+  REPORT_FONT       Unicode TTF (default DailyReport/DejaVuSans.ttf, then the
+                    system DejaVu); without one, text falls back to Helvetica.
+  REPORT_FONT_BOLD  bold TTF (default DejaVuSans-Bold when present, else
+                    Helvetica-Bold).
+
+scripts/bench_pdf_render.py compares per-invoice time with FPDF.
+"""
+
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from collections import namedtuple
+
+from fpdf.fonts import fpdf_charwidths
+from fpdf.ttfonts import TTFontFile
+
+import pdf_crypt
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# bump when a layout or font handling changes (part of report_cache keys)
+TEMPLATE_VERSION = 3
+A4 = (595.28, 841.89)
+MARGIN = 42.0
+
+_FONT_CANDIDATES = [
+    os.path.join(ROOT, "DailyReport", "DejaVuSans.ttf"),
+    os.path.join(ROOT, "DejaVuSans.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+_BOLD_CANDIDATES = [
+    os.path.join(ROOT, "DailyReport", "DejaVuSans-Bold.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+]
+
+# code points every compiled Unicode font carries (plus any static text)
+CHARSET = (list(range(0x20, 0x7F)) + list(range(0xA0, 0x100)) +
+           list(range(0x2010, 0x2028)) + list(range(0x2030, 0x203B)) +
+           [0x20AC, 0x20B9, 0x2122, 0x2190, 0x2191, 0x2192, 0x2193, 0x2713,
+            0x2714, 0x2716])
+
+# ---------- layout elements (coordinates in points from the top-left) ----------
+# text may contain {field} placeholders; align is "left", "right" or "center"
+Text = namedtuple("Text", "x y text font size align", defaults=("regular", 11, "left"))
+Line = namedtuple("Line", "x1 y1 x2 y2 gray", defaults=(0.6, ))
+Box = namedtuple("Box", "x y w h gray", defaults=(0.94, ))
+# sparkline of the numbers in data[field], scaled into the w x h box
+Spark = namedtuple("Spark", "x y w h field gray", defaults=(0.2, ))
+# Repeated content taken from data[field], continued on new pages as needed:
+#   columns None -> data[field] is a list of strings, each word-wrapped to width
+#   columns [(dx, width, align), ...] -> data[field] is a list of row tuples
+# `after` elements are placed relative to where the flow ends (y offsets).
+Flow = namedtuple("Flow", "x y width field font size leading columns after",
+                  defaults=("regular", 11, 16, None, ()))
+
+
+# ---------- fonts ----------
+def _hex(data):
+    return b"<" + data.hex().encode() + b">"
+
+
+class _CoreFont:
+    """One of the 14 built-in PDF fonts (WinAnsi encoded, nothing embedded)."""
+
+    def __init__(self, base, metrics):
+        self.base = base
+        cw = fpdf_charwidths[metrics]
+        self._widths = [cw.get(chr(b), 500) for b in range(256)]
+        self.object_count = 1
+
+    def encode(self, text):
+        return text.encode("cp1252", "replace")
+
+    def show(self, text):
+        return _hex(self.encode(text))
+
+    def width(self, text, size):
+        return sum(map(self._widths.__getitem__, self.encode(text))) * size / 1000
+
+    def objects(self, first, crypt=None):
+        return [
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /" +
+            self.base.encode() + b" /Encoding /WinAnsiEncoding >>"
+        ]
+
+
+class _TrueTypeFont:
+    """A TTF subset to a fixed charset once, emitted as Type0/Identity-H."""
+
+    _TOUNICODE = zlib.compress(
+        b"/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+        b"/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+        b"1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+        b"1 beginbfrange\n<0000> <FFFF> <0000>\nendbfrange\n"
+        b"endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend")
+
+    object_count = 6
+
+    def __init__(self, path, charset):
+        ttf = TTFontFile()
+        ttf.getMetrics(path)
+        widths = ttf.charWidths
+        self.name = re.sub("[ ()]", "", ttf.fullName)
+        self.missing = int(round(ttf.defaultWidth))
+        codes = sorted({c for c in charset if c < len(widths) and widths[c]})
+        sub = TTFontFile()
+        program = sub.makeSubset(path, codes)
+        self._cw = {
+            c: (0 if widths[c] == 65535 else widths[c])
+            for c in sub.codeToGlyph if c < len(widths)
+        }
+        self._cw.pop(0, None)
+        gid_map = bytearray(2 * (max(self._cw) + 1))
+        for code, glyph in sub.codeToGlyph.items():
+            if code in self._cw:
+                gid_map[2 * code:2 * code + 2] = glyph.to_bytes(2, "big")
+        self._program = zlib.compress(program)
+        self._program_len = len(program)
+        self._gid_map = zlib.compress(bytes(gid_map))
+        self._desc = (
+            b"/Ascent %d /Descent %d /CapHeight %d /Flags %d /FontBBox [%d %d %d %d] "
+            b"/ItalicAngle %d /StemV %d /MissingWidth %d" %
+            (round(ttf.ascent), round(ttf.descent), round(ttf.capHeight),
+             (ttf.flags | 4) & ~32, *[round(v) for v in ttf.bbox],
+             int(ttf.italicAngle), round(ttf.stemV), self.missing))
+        self._fallback = ord("?")
+
+    def _codes(self, text):
+        cw = self._cw
+        for ch in text:
+            c = ord(ch)
+            if c in cw:
+                yield c
+            elif unicodedata.category(ch) in ("So", "Cs", "Mn", "Cf"):
+                continue  # emoji / joiners: drop rather than print "?"
+            else:
+                yield self._fallback
+
+    def show(self, text):
+        return _hex(b"".join(c.to_bytes(2, "big") for c in self._codes(text)))
+
+    def width(self, text, size):
+        cw = self._cw
+        return sum(cw[c] for c in self._codes(text)) * size / 1000
+
+    def _w_array(self):
+        out, run_start, run = [], None, []
+        for code in sorted(self._cw):
+            if run and code == run_start + len(run):
+                run.append(self._cw[code])
+                continue
+            if run:
+                out.append(b"%d [%s]" % (run_start, b" ".join(b"%d" % w for w in run)))
+            run_start, run = code, [self._cw[code]]
+        if run:
+            out.append(b"%d [%s]" % (run_start, b" ".join(b"%d" % w for w in run)))
+        return b"[" + b" ".join(out) + b"]"
+
+    def objects(self, first, crypt=None):
+        base = b"/JRVSAA+" + self.name.encode()
+        n = [first + i for i in range(self.object_count)]
+        adobe, ucs = ((crypt.string(b"Adobe"), crypt.string(b"UCS")) if crypt
+                      else (b"(Adobe)", b"(UCS)"))
+        return [
+            b"<< /Type /Font /Subtype /Type0 /BaseFont " + base +
+            b" /Encoding /Identity-H /DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>"
+            % (n[1], n[2]),
+            b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont " + base +
+            b" /CIDSystemInfo << /Registry " + adobe + b" /Ordering " + ucs +
+            b" /Supplement 0 >> /FontDescriptor %d 0 R /DW %d /W " %
+            (n[3], self.missing) +
+            self._w_array() + b" /CIDToGIDMap %d 0 R >>" % n[4],
+            _stream(self._TOUNICODE, b"/Filter /FlateDecode"),
+            b"<< /Type /FontDescriptor /FontName " + base + b" " + self._desc +
+            b" /FontFile2 %d 0 R >>" % n[5],
+            _stream(self._gid_map, b"/Filter /FlateDecode"),
+            _stream(self._program,
+                    b"/Filter /FlateDecode /Length1 %d" % self._program_len),
+        ]
+
+
+# a stream object, serialized (and encrypted if need be) by _body
+_Stream = namedtuple("_Stream", "data extra")
+
+
+def _stream(data, extra=b""):
+    return _Stream(data, extra)
+
+
+def _body(obj, crypt=None):
+    if not isinstance(obj, _Stream):
+        return obj
+    data = crypt.encrypt(obj.data) if crypt else obj.data
+    return (b"<< /Length %d %s >>\nstream\n" % (len(data), obj.extra) + data +
+            b"\nendstream")
+
+
+_fonts = {}
+_lock = threading.RLock()
+
+
+def _font_path(env, candidates):
+    for path in [os.getenv(env)] + candidates:
+        if path and os.path.isfile(path) and os.path.getsize(path) > 0:
+            return path
+    return None
+
+
+_CORE = {"regular": ("Helvetica", "helvetica"),
+         "bold": ("Helvetica-Bold", "helveticaB")}
+_TTF = {"regular": ("REPORT_FONT", _FONT_CANDIDATES),
+        "bold": ("REPORT_FONT_BOLD", _BOLD_CANDIDATES)}
+
+
+def get_font(role, embedded=True):
+    """
+    Parsed font for "regular" or "bold", built once per process: the
+    embedded Unicode TTF, or (embedded=False, or no TTF found) the built-in
+    Helvetica face.
+    """
+    with _lock:
+        font = _fonts.get((role, embedded))
+        if font is None:
+            path = _font_path(*_TTF[role]) if embedded else None
+            font = (_TrueTypeFont(path, CHARSET) if path else
+                    _CoreFont(*_CORE[role]))
+            _fonts[role, embedded] = font
+        return font
+
+
+def wrap(text, font, size, width):
+    """Greedy word wrap; honours embedded newlines."""
+    lines = []
+    space = font.width(" ", size)
+    for para in str(text).split("\n"):
+        line, used = [], 0.0
+        for word in para.split(" "):
+            w = font.width(word, size)
+            if line and used + space + w > width:
+                lines.append(" ".join(line))
+                line, used = [], 0.0
+            used += (space if line else 0.0) + w
+            line.append(word)
+        lines.append(" ".join(line))
+    return lines
+
+
+# ---------- compiled templates ----------
+class Template:
+    """
+    A page layout compiled to bytes. Objects 1 (catalog) and 3.. (resources,
+    fonts) are identical for every document rendered from it, so they are
+    serialized once here together with their xref offsets (encrypted
+    documents re-serialize them under their own key).
+    """
+
+    def __init__(self, elements, embedded=True, page_size=A4):
+        self.width, self.height = page_size
+        self.elements = list(elements)
+        roles = []
+        for el in self._all(self.elements):
+            if hasattr(el, "font") and el.font not in roles:
+                roles.append(el.font)
+        self.fonts = {role: get_font(role, embedded) for role in roles}
+        self.names = {role: b"/F%d" % (i + 1) for i, role in enumerate(roles)}
+        self._prefix, self._offsets, self._first_free = self._compile()
+
+        # static elements become bytes now; the rest is formatted per fill
+        self._static = b"".join(
+            self._ops(el, {}) for el in self.elements
+            if not isinstance(el, Flow) and not self._dynamic(el))
+        self._dynamic_els = [
+            el for el in self.elements
+            if not isinstance(el, Flow) and self._dynamic(el)
+        ]
+        self._flows = [el for el in self.elements if isinstance(el, Flow)]
+
+    def _compile(self, crypt=None):
+        """Header plus objects 1 and 3..: (bytes, offsets, next free number)."""
+        # AES-256 (pdf_crypt) is a PDF 2.0 feature; 1.7 readers open it too
+        header = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+        chunks, offsets, pos = [header], {}, len(header)
+        next_num = 4
+        font_refs = []
+        objects = [(1, b"<< /Type /Catalog /Pages 2 0 R >>")]
+        for role, font in self.fonts.items():
+            font_refs.append(self.names[role] + b" %d 0 R" % next_num)
+            for i, body in enumerate(font.objects(next_num, crypt)):
+                objects.append((next_num + i, body))
+            next_num += font.object_count
+        objects.append((3, b"<< /Font << " + b" ".join(font_refs) +
+                        b" >> /ProcSet [/PDF /Text] >>"))
+        for num, body in objects:
+            obj = b"%d 0 obj\n" % num + _body(body, crypt) + b"\nendobj\n"
+            offsets[num] = pos
+            chunks.append(obj)
+            pos += len(obj)
+        return b"".join(chunks), offsets, next_num
+
+    @staticmethod
+    def _all(elements):
+        for el in elements:
+            yield el
+            if isinstance(el, Flow):
+                yield from el.after
+
+    @staticmethod
+    def _dynamic(el):
+        return isinstance(el, Spark) or isinstance(el, Text) and "{" in el.text
+
+    # ---------- content stream operators ----------
+    def _text(self, x, y, text, role, size, align="left"):
+        font = self.fonts[role]
+        if align != "left":
+            w = font.width(text, size)
+            x = x - w if align == "right" else x - w / 2
+        return (b"BT %s %g Tf %.2f %.2f Td %s Tj ET\n" %
+                (self.names[role], size, x, self.height - y, font.show(text)))
+
+    def _ops(self, el, data, dy=0.0):
+        if isinstance(el, Text):
+            text = el.text.format_map(data) if data or "{" in el.text else el.text
+            return self._text(el.x, el.y + dy, text, el.font, el.size, el.align)
+        if isinstance(el, Line):
+            return b"%g G %.2f %.2f m %.2f %.2f l S 0 G\n" % (
+                el.gray, el.x1, self.height - el.y1 - dy, el.x2,
+                self.height - el.y2 - dy)
+        if isinstance(el, Box):
+            return b"%g g %.2f %.2f %.2f %.2f re f 0 g\n" % (
+                el.gray, el.x, self.height - el.y - dy - el.h, el.w, el.h)
+        if isinstance(el, Spark):
+            return self._spark(el, data.get(el.field) or (), dy)
+        raise TypeError(f"unsupported element {el!r}")
+
+    def _spark(self, el, values, dy):
+        values = [float(v) for v in values]
+        if len(values) < 2:
+            return b""
+        lo, hi = min(values), max(values)
+        scale = el.h / (hi - lo) if hi > lo else 0.0
+        base = self.height - el.y - dy - el.h
+        step = el.w / (len(values) - 1)
+        points = [b"%.2f %.2f" % (el.x + i * step, base + (v - lo) * scale)
+                  for i, v in enumerate(values)]
+        return (b"%g G 0.8 w " % el.gray + points[0] + b" m " +
+                b" l ".join(points[1:]) + b" l S 1 w 0 G\n")
+
+    def _flow_pages(self, flow, data, first_page):
+        """Append the flow's operators to first_page; returns extra pages."""
+        pages, ops = [], first_page
+        y, bottom = flow.y, self.height - MARGIN
+        if flow.columns is None:
+            rows = [[line] for item in data.get(flow.field, ())
+                    for line in wrap(item, self.fonts[flow.font], flow.size,
+                                     flow.width)]
+            columns = [(0, flow.width, "left")]
+        else:
+            rows = [[str(v) for v in row] for row in data.get(flow.field, ())]
+            columns = flow.columns
+        for row in rows:
+            if y > bottom:
+                ops = []
+                pages.append(ops)
+                y = MARGIN + flow.size
+            for (dx, width, align), value in zip(columns, row):
+                x = flow.x + dx + (width if align == "right" else
+                                   width / 2 if align == "center" else 0)
+                ops.append(self._text(x, y, value, flow.font, flow.size, align))
+            y += flow.leading
+        for el in flow.after:
+            if y + (getattr(el, "y", 0) or 0) > bottom:
+                ops = []
+                pages.append(ops)
+                y = MARGIN
+            ops.append(self._ops(el, data, dy=y))
+        return pages
+
+    def fill(self, data, crypt=None):
+        """
+        Render one document; returns the PDF bytes. With `crypt` (a
+        pdf_crypt.Encryption) every string and stream is written encrypted.
+        """
+        first = [self._static]
+        first.extend(self._ops(el, data) for el in self._dynamic_els)
+        pages = [first]
+        for flow in self._flows:
+            pages.extend(self._flow_pages(flow, data, first))
+
+        if crypt is None:
+            prefix, offsets, num = self._prefix, dict(self._offsets), self._first_free
+        else:
+            prefix, offsets, num = self._compile(crypt)
+        chunks = [prefix]
+        pos = len(prefix)
+        kids = []
+        for ops in pages:
+            content = zlib.compress(b"".join(ops))
+            page = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                    b"/Resources 3 0 R /Contents %d 0 R >>" %
+                    (self.width, self.height, num + 1))
+            for body in (page, _stream(content, b"/Filter /FlateDecode")):
+                obj = b"%d 0 obj\n" % num + _body(body, crypt) + b"\nendobj\n"
+                offsets[num] = pos
+                chunks.append(obj)
+                pos += len(obj)
+                num += 1
+            kids.append(num - 2)
+        tree = (b"2 0 obj\n<< /Type /Pages /Kids [%s] /Count %d >>\nendobj\n" %
+                (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+        offsets[2] = pos
+        chunks.append(tree)
+        pos += len(tree)
+        trailer = b""
+        if crypt is not None:
+            obj = b"%d 0 obj\n" % num + crypt.dictionary() + b"\nendobj\n"
+            offsets[num] = pos
+            chunks.append(obj)
+            pos += len(obj)
+            trailer = crypt.trailer(num)
+            num += 1
+        size = num
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % size]
+        xref.extend(b"%010d 00000 n \n" % offsets[i] for i in range(1, size))
+        chunks.extend(xref)
+        chunks.append(b"trailer\n<< /Size %d /Root 1 0 R" % size + trailer +
+                      b" >>\nstartxref\n%d\n%%%%EOF\n" % pos)
+        return b"".join(chunks)
+
+
+# ---------- layouts ----------
+_W = A4[0] - 2 * MARGIN
+
+TEMPLATES = {
+    # title + date + wrapped lines (daily summaries, invoice summaries)
+    "summary": lambda: [
+        Text(MARGIN, 60, "{title}", "bold", 16),
+        Text(MARGIN, 82, "{subtitle}", "regular", 10),
+        Line(MARGIN, 92, MARGIN + _W, 92),
+        Flow(MARGIN, 114, _W, "lines", "regular", 11, 16),
+    ],
+    # weekly summary cover: period, earnings trends (stream_history
+    # trend_fields), then the documents included
+    "weekly": lambda: [
+        Box(MARGIN, 40, _W, 64),
+        Text(MARGIN + 12, 66, "{title}", "bold", 18),
+        Text(MARGIN + 12, 90, "{period}", "regular", 11),
+        Text(MARGIN, 130, "{trend_7}", "regular", 10),
+        Spark(MARGIN + _W - 160, 121, 160, 12, "spark_7"),
+        Text(MARGIN, 148, "{trend_30}", "regular", 10),
+        Spark(MARGIN + _W - 160, 139, 160, 12, "spark_30"),
+        Text(MARGIN, 166, "{trend_365}", "regular", 10),
+        Spark(MARGIN + _W - 160, 157, 160, 12, "spark_365"),
+        Text(MARGIN, 196, "{headline}", "bold", 12),
+        Line(MARGIN, 206, MARGIN + _W, 206),
+        Flow(MARGIN, 226, _W, "lines", "regular", 10, 14),
+    ],
+    # itemised invoice (the invoice_template.html layout)
+    "invoice": lambda: [
+        Text(MARGIN, 70, "Invoice", "bold", 22),
+        Text(MARGIN, 100, "Date:", "bold", 11),
+        Text(MARGIN + 90, 100, "{date}"),
+        Text(MARGIN, 118, "Invoice No:", "bold", 11),
+        Text(MARGIN + 90, 118, "{invoice_no}"),
+        Text(MARGIN, 136, "Client Name:", "bold", 11),
+        Text(MARGIN + 90, 136, "{client_name}"),
+        Box(MARGIN, 156, _W, 22),
+        Text(MARGIN + 6, 171, "#", "bold", 11),
+        Text(MARGIN + 36, 171, "Description", "bold", 11),
+        Text(MARGIN + 300, 171, "Qty", "bold", 11, "right"),
+        Text(MARGIN + 400, 171, "Unit Price", "bold", 11, "right"),
+        Text(MARGIN + _W - 6, 171, "Total", "bold", 11, "right"),
+        Flow(MARGIN, 196, _W, "items", "regular", 11, 20,
+             columns=[(6, 24, "left"), (36, 240, "left"), (240, 60, "right"),
+                      (300, 100, "right"), (400, _W - 406, "right")],
+             after=(Line(MARGIN, -8, MARGIN + _W, -8),
+                    Text(MARGIN + 6, 10, "Grand Total", "bold", 12),
+                    Text(MARGIN + _W - 6, 10, "{grand_total}", "bold", 12,
+                         "right"),
+                    Text(MARGIN, 60, "Thank you for your business!",
+                         "regular", 10))),
+    ],
+    # one order (income_core_cloud); Details wraps
+    "order_invoice": lambda: [
+        Text(MARGIN, 60, "JRAVIS Invoice", "bold", 16),
+        Text(MARGIN, 88, "Order ID: {order_id}", "regular", 12),
+        Text(MARGIN, 108, "Platform: {platform}", "regular", 12),
+        Text(MARGIN, 128, "Buyer: {buyer_name}", "regular", 12),
+        Text(MARGIN, 148, "Amount: {currency} {amount}", "regular", 12),
+        Flow(MARGIN, 180, _W, "details", "regular", 11, 15),
+    ],
+}
+
+_compiled = {}
+
+
+def get_template(name, embedded=True):
+    """Compiled layout from TEMPLATES, built once per process and font set."""
+    with _lock:
+        tpl = _compiled.get((name, embedded))
+        if tpl is None:
+            tpl = _compiled[name, embedded] = Template(TEMPLATES[name](),
+                                                       embedded)
+        return tpl
+
+
+def _latin(value):
+    """True if value (or every string inside it) is WinAnsi-encodable."""
+    if isinstance(value, str):
+        try:
+            value.encode("cp1252")
+        except UnicodeEncodeError:
+            return False
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_latin(v) for v in value)
+    return True
+
+
+class _Fields(dict):
+
+    def __missing__(self, key):
+        return ""
+
+
+def render_bytes(template, password=None, **data):
+    """PDF bytes for `template`; AES-256 encrypted when password is given."""
+    # plain Latin text needs no embedded font: ~2 KB instead of ~60 KB
+    embedded = not all(_latin(v) for v in data.values())
+    crypt = pdf_crypt.Encryption(password) if password else None
+    return get_template(template, embedded).fill(_Fields(data), crypt)
+
+
+def render(template, out_path, password=None, **data):
+    """
+    Render `template` with `data` to out_path; returns out_path. With a
+    password the file is encrypted as it is written (no plaintext copy).
+    """
+    pdf = render_bytes(template, password, **data)
+    with open(out_path, "wb") as fh:
+        fh.write(pdf)
+    return out_path
@@ -29,8 +29,10 @@ import requests
 import traceback
 from datetime import datetime
 from flask import Flask, request, jsonify, abort
+from flask_metrics import instrument, TimedLock
 
 app = Flask(__name__)
+instrument(app)
 
 # Configuration from environment
 SHARED_KEY = os.environ.get("SHARED_KEY", "jrvis_vabot_2040_securekey")
@@ -78,7 +80,7 @@ def init_db():
     return conn
 
 DB_CONN = init_db()
-DB_LOCK = threading.Lock()
+DB_LOCK = TimedLock()  # `with DB_LOCK:` blocks count as DB time in /metrics
 
 def save_income(stream, amount, timestamp=None, meta=None):
     timestamp = timestamp or datetime.utcnow().isoformat()
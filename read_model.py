@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+read_model.py
+Shared in-memory read model for the JRAVIS dashboards.
+
+One refresher keeps a snapshot of earnings, task status and activity, folding
+in only what changed since the last pass:
+  - dashboard.db   orders            (rowid > last seen)
+  - phase1_exec.db exec_log          (rowid > last seen)
+  - jravis_tasks.db task_queue       (updated_at > last seen) + vabot_callbacks
+  - earnings.db    earnings/reports  (rowid > last seen; earnings_store.py)
+  - income_log.json                  (append-only list, mtime-gated)
+Every source is stat()-checked first, so an idle system costs a few stats per
+refresh and nothing per request.
+
+The snapshot is published two ways:
+  - shared memory (READ_MODEL_SHM, seqlock-framed JSON) for dashboards on the
+    same host — snapshot() reads it without touching disk;
+  - a local HTTP API: GET /snapshot on READ_MODEL_PORT.
+
+Dashboards just call read_model.snapshot(). If no read-model service is
+running, the first call starts an in-process refresher instead; so does the
+first call after the service's heartbeat (written every refresh, changed or
+not) is READ_MODEL_STALE seconds old, i.e. the service stopped or hung.
+
+Run the service:
+  python3 read_model.py
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+
+# ---------- CONFIG ----------
+ORDERS_DB = os.getenv("DB_PATH", "dashboard.db")
+PHASE1_DB = os.getenv("PHASE1_DB_PATH", "phase1_exec.db")
+TASKS_DB = os.getenv("JDB_PATH", "./jravis_tasks.db")
+EARNINGS_DB = os.getenv("EARNINGS_DB", "earnings.db")
+INCOME_FILE = os.getenv("INCOME_FILE", "./income_log.json")
+
+REFRESH_SECONDS = float(os.getenv("READ_MODEL_REFRESH", "2"))
+SHM_NAME = os.getenv("READ_MODEL_SHM", "jravis_read_model")
+SHM_SIZE = int(os.getenv("READ_MODEL_SHM_BYTES", str(1 << 20)))
+PORT = int(os.getenv("READ_MODEL_PORT", "10070"))
+# a shared snapshot whose heartbeat is older than this is abandoned
+STALE_SECONDS = float(
+    os.getenv("READ_MODEL_STALE", str(max(10.0, 5 * REFRESH_SECONDS))))
+
+RECENT_ORDERS = 20
+RECENT_CALLBACKS = 10
+
+# seq (odd while writing), payload length, writer heartbeat (epoch seconds)
+_HEADER = struct.Struct("<QQd")
+
+
+def now_iso():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _stamp(*paths):
+    """(mtime_ns, size) for each path that exists; used to skip idle sources."""
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+# ---------- SOURCES ----------
+class _SqliteSource:
+    """Keeps one read-only connection and only queries when the file moved."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self._stamp = None
+
+    def changed(self):
+        stamp = _stamp(self.path, self.path + "-wal")
+        if stamp[0] is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        if self.conn is None:
+            self.conn = sqlite3.connect(f"file:{self.path}?mode=ro",
+                                        uri=True,
+                                        check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+        return True
+
+    def query(self, sql, params=()):
+        try:
+            return self.conn.execute(sql, params).fetchall()
+        except sqlite3.Error:
+            return []  # table not created yet by its owner
+
+
+class _JsonSource:
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+
+    def load_if_changed(self):
+        stamp = _stamp(self.path)
+        if stamp[0] is None or stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+class ReadModel:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._snapshot = {}
+
+        self._orders = _SqliteSource(ORDERS_DB)
+        self._orders_last = 0
+        self._orders_count = 0
+        self._orders_revenue = 0.0
+        self._orders_recent = []  # created_at DESC, id DESC, as /api/live had
+
+        self._phase1 = _SqliteSource(PHASE1_DB)
+        self._exec_last = 0
+        self._systems = {}
+        self._last_sync = None
+
+        self._tasks = _SqliteSource(TASKS_DB)
+        self._tasks_updated = ""
+        self._task_status = {}
+        self._callbacks_last = 0
+        self._callbacks_count = 0
+        self._callbacks_recent = deque(maxlen=RECENT_CALLBACKS)
+
+        self._memory = _SqliteSource(EARNINGS_DB)
+        self._earn_last = 0
+        self._earn_entries = 0
+        self._earn_by_month = {}
+        self._last_report = None
+
+        self._income = _JsonSource(INCOME_FILE)
+        self._income_seen = 0
+        self._income_total = 0.0
+
+    # ----- incremental folds -----
+    def _fold_orders(self):
+        if not self._orders.changed():
+            return False
+        rows = self._orders.query(
+            "SELECT rowid AS rid, id, stream, amount, currency, created_at FROM orders WHERE rowid > ? ORDER BY rowid",
+            (self._orders_last, ))
+        recent = self._orders_recent
+        for r in rows:
+            self._orders_last = r["rid"]
+            self._orders_count += 1
+            self._orders_revenue += float(r["amount"] or 0)
+            recent.append({
+                "id": r["id"],
+                "stream": r["stream"],
+                "amount": r["amount"],
+                "currency": r["currency"],
+                "created_at": r["created_at"]
+            })
+        # rows arrive in rowid order but created_at can be set by the writer,
+        # so keep the newest by created_at (NULLs last, like SQLite's DESC)
+        self._orders_recent = heapq.nlargest(
+            RECENT_ORDERS, recent,
+            key=lambda o: (o["created_at"] is not None, o["created_at"] or "",
+                           o["id"]))
+        return True
+
+    def _fold_exec_log(self):
+        if not self._phase1.changed():
+            return False
+        rows = self._phase1.query(
+            """SELECT el.rowid AS rid, t.system_id, t.payload, el.status, el.timestamp
+               FROM exec_log el LEFT JOIN tasks t ON el.task_id = t.id
+               WHERE el.rowid > ? ORDER BY el.rowid""", (self._exec_last, ))
+        for r in rows:
+            self._exec_last = r["rid"]
+            try:
+                payload = json.loads(r["payload"] or "{}")
+                name = payload.get("system", {}).get(
+                    "name") or f"system-{r['system_id'] or 'unknown'}"
+            except Exception:
+                name = f"system-{r['system_id'] or 'unknown'}"
+            agg = self._systems.setdefault(name, {
+                "success": 0,
+                "failure": 0,
+                "last_success": None
+            })
+            ts = r["timestamp"]
+            if r["status"] and r["status"].lower().startswith("success"):
+                agg["success"] += 1
+                if ts and (agg["last_success"] is None
+                           or ts > agg["last_success"]):
+                    agg["last_success"] = ts
+            else:
+                agg["failure"] += 1
+            if ts and (self._last_sync is None or ts > self._last_sync):
+                self._last_sync = ts
+        return True
+
+    def _fold_tasks(self):
+        if not self._tasks.changed():
+            return False
+        # >= so rows sharing the boundary timestamp are not missed; re-applying
+        # a status is idempotent
+        for r in self._tasks.query(
+                "SELECT id, status, updated_at FROM task_queue WHERE updated_at >= ? ORDER BY updated_at",
+            (self._tasks_updated, )):
+            self._task_status[r["id"]] = r["status"]
+            self._tasks_updated = r["updated_at"]
+        for r in self._tasks.query(
+                "SELECT id, payload_json, received_at FROM vabot_callbacks WHERE id > ? ORDER BY id",
+            (self._callbacks_last, )):
+            self._callbacks_last = r["id"]
+            self._callbacks_count += 1
+            try:
+                payload = json.loads(r["payload_json"]) if r[
+                    "payload_json"] else r["payload_json"]
+            except ValueError:
+                payload = r["payload_json"]
+            self._callbacks_recent.appendleft({
+                "payload": payload,
+                "received_at": r["received_at"]
+            })
+        return True
+
+    def _fold_memory(self):
+        if not self._memory.changed():
+            return False
+        for r in self._memory.query(
+                "SELECT id, date, amount FROM earnings WHERE id > ? ORDER BY id",
+            (self._earn_last, )):
+            self._earn_last = r["id"]
+            self._earn_entries += 1
+            month = r["date"][:7]
+            self._earn_by_month[month] = self._earn_by_month.get(
+                month, 0) + (r["amount"] or 0)
+        last = self._memory.query(
+            "SELECT date FROM reports ORDER BY id DESC LIMIT 1")
+        if last:
+            self._last_report = last[0]["date"]
+        return True
+
+    def _fold_income(self):
+        data = self._income.load_if_changed()
+        if not isinstance(data, list):
+            return False
+        if len(data) < self._income_seen:  # file was rewritten/truncated
+            self._income_seen, self._income_total = 0, 0.0
+        for x in data[self._income_seen:]:
+            self._income_total += float(x.get("amount") or 0)
+        self._income_seen = len(data)
+        return True
+
+    # ----- snapshot -----
+    def refresh(self):
+        """Fold in new rows from every source; returns True if anything changed."""
+        changed = False
+        for fold in (self._fold_orders, self._fold_exec_log, self._fold_tasks,
+                     self._fold_memory, self._fold_income):
+            try:
+                changed = fold() or changed
+            except Exception:
+                traceback.print_exc()
+        if changed or not self._snapshot:
+            self._publish()
+        return changed
+
+    def _publish(self):
+        by_status = {}
+        for st in self._task_status.values():
+            by_status[st] = by_status.get(st, 0) + 1
+        systems = sorted(({
+            "name": k,
+            **v
+        } for k, v in self._systems.items()),
+                         key=lambda x: (-x["success"], x["name"]))
+        snap = {
+            "version": self._seq + 1,
+            "refreshed_at": now_iso(),
+            "orders": {
+                "count": self._orders_count,
+                "revenue": round(self._orders_revenue, 2),
+                "recent": list(self._orders_recent)
+            },
+            "systems": systems,
+            "last_sync": self._last_sync,
+            "tasks": {
+                "by_status": by_status,
+                "callbacks": self._callbacks_count,
+                "recent_callbacks": list(self._callbacks_recent)
+            },
+            "earnings": {
+                "entries": self._earn_entries,
+                "by_month": dict(self._earn_by_month),
+                "last_report": self._last_report
+            },
+            "income": {
+                "entries": self._income_seen,
+                "total": round(self._income_total, 2)
+            }
+        }
+        with self._lock:
+            self._seq += 1
+            self._snapshot = snap
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot
+
+    def run(self, on_publish=None, interval=REFRESH_SECONDS, on_beat=None):
+        while True:
+            if self.refresh() and on_publish:
+                on_publish(self.snapshot())
+            if on_beat:
+                on_beat()
+            time.sleep(interval)
+
+
+# ---------- SHARED MEMORY ----------
+class SnapshotWriter:
+
+    def __init__(self, name=SHM_NAME, size=SHM_SIZE):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name,
+                                                  create=True,
+                                                  size=size)
+        except FileExistsError:  # stale segment from a previous run
+            self.shm = shared_memory.SharedMemory(name=name)
+        # carry on from the old writer's seq (even: no write in progress) so
+        # a reader that cached seq N never mistakes our Nth write for it
+        seq = _HEADER.unpack_from(self.shm.buf, 0)[0]
+        self._seq = seq + (seq & 1)
+        self._length = 0  # nothing of ours to beat for yet
+
+    def write(self, snap):
+        data = json.dumps(snap, default=str).encode("utf-8")
+        buf = self.shm.buf
+        if _HEADER.size + len(data) > len(buf):
+            print("[READ_MODEL] snapshot larger than shared segment; skipped")
+            return
+        self._seq += 1  # odd: write in progress
+        _HEADER.pack_into(buf, 0, self._seq, len(data), time.time())
+        buf[_HEADER.size:_HEADER.size + len(data)] = data
+        self._seq += 1
+        self._length = len(data)
+        _HEADER.pack_into(buf, 0, self._seq, len(data), time.time())
+
+    def beat(self):
+        """Tell readers the writer is alive, even with nothing new."""
+        if self._length:
+            _HEADER.pack_into(self.shm.buf, 0, self._seq, self._length,
+                              time.time())
+
+
+class SnapshotReader:
+    """Attaches to the writer's segment; decodes only when seq moves."""
+
+    def __init__(self, name=SHM_NAME):
+        self.shm = shared_memory.SharedMemory(name=name)
+        # readers must not unlink the writer's segment on exit
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        self._seq = None
+        self._snap = None
+
+    def age(self):
+        """Seconds since the writer last wrote or beat."""
+        return time.time() - _HEADER.unpack_from(self.shm.buf, 0)[2]
+
+    def close(self):
+        self.shm.close()
+
+    def get(self):
+        buf = self.shm.buf
+        for _ in range(5):
+            seq, length, _ = _HEADER.unpack_from(buf, 0)
+            if seq == self._seq:
+                return self._snap
+            if seq == 0 or seq % 2:
+                time.sleep(0.0005)
+                continue
+            data = bytes(buf[_HEADER.size:_HEADER.size + length])
+            if _HEADER.unpack_from(buf, 0)[0] == seq:
+                self._snap, self._seq = json.loads(data), seq
+                return self._snap
+        return self._snap
+
+
+# ---------- CLIENT ----------
+_client_lock = threading.Lock()
+_reader = None
+_local = None
+
+
+def _start_local():
+    global _local
+    _local = ReadModel()
+    _local.refresh()
+    threading.Thread(target=_local.run, daemon=True).start()
+
+
+def snapshot():
+    """Latest snapshot: shared memory if the service runs, else in-process."""
+    global _reader
+    if _reader is None and _local is None:
+        with _client_lock:
+            if _reader is None and _local is None:
+                try:
+                    _reader = SnapshotReader()
+                except FileNotFoundError:
+                    _start_local()
+    reader = _reader
+    if reader is not None:
+        if reader.age() <= STALE_SECONDS:
+            snap = reader.get()
+            if snap is not None:
+                return snap
+        else:
+            with _client_lock:
+                if _reader is reader:
+                    print(f"[READ_MODEL] shared snapshot {reader.age():.0f}s "
+                          f"old; refreshing in-process instead")
+                    _reader = None
+                    reader.close()
+                    _start_local()
+    return _local.snapshot() if _local else {}
+
+
+# ---------- SERVICE ----------
+def main():
+    from flask import Flask, jsonify
+
+    model = ReadModel()
+    writer = SnapshotWriter()
+    model.refresh()
+    writer.write(model.snapshot())
+    threading.Thread(target=model.run,
+                     kwargs={
+                         "on_publish": writer.write,
+                         "on_beat": writer.beat
+                     },
+                     daemon=True).start()
+
+    app = Flask(__name__)
+
+    @app.route("/snapshot")
+    def api_snapshot():
+        return jsonify(model.snapshot())
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "ok", "version": model.snapshot().get("version")})
+
+    print(f"[READ_MODEL] shm={SHM_NAME} http://127.0.0.1:{PORT}/snapshot")
+    try:
+        app.run(host="127.0.0.1", port=PORT, threaded=True)
+    finally:
+        writer.shm.close()
+        writer.shm.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+report_cache.py
+Content-addressed cache for generated reports.
+
+A report is keyed by a hash of everything that decides its bytes: the input
+data (connector results, the ledger slice, ...) and the template version.
+The same request again finds the files under that key and gets them copied
+into place instead of re-rendering and re-encrypting; any change to the
+inputs gives a new key, so stale entries are never served.
+
+    k = report_cache.key(results, TEMPLATE_VERSION)
+    paths = report_cache.fetch(k, {"final": "out/summary.pdf"})
+    if paths is None:
+        ...render + encrypt "out/summary.pdf"...
+        report_cache.store(k, {"final": "out/summary.pdf"})
+
+report_engine does this for every Job that carries a cache_key, covering the
+encrypted variant too (encryption is not deterministic, so caching is also
+what keeps repeated sends byte-identical).
+
+Layout: REPORT_CACHE_DIR/<key[:2]>/<key>/<name>. Entries not used for
+REPORT_CACHE_DAYS days are removed by prune(), which store() runs at most
+once an hour.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+CACHE_DIR = os.getenv("REPORT_CACHE_DIR", ".report_cache")
+MAX_AGE_DAYS = float(os.getenv("REPORT_CACHE_DAYS", "14"))
+PRUNE_INTERVAL = 3600
+
+_last_prune = 0.0
+
+
+def key(*parts):
+    """Stable hash of JSON-able inputs (dict order does not matter)."""
+    blob = json.dumps(parts, sort_keys=True, default=str,
+                      separators=(",", ":")).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _entry(k):
+    return os.path.join(CACHE_DIR, k[:2], k)
+
+
+def _place(src, dst):
+    # a copy, not a hard link: generators rewrite their outputs in place
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    tmp = f"{dst}.cache-tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def fetch(k, targets):
+    """
+    If every name in `targets` ({name: out_path}) is cached under key k,
+    put the files at their out_paths and return them; otherwise None.
+    """
+    entry = _entry(k)
+    cached = {name: os.path.join(entry, name) for name in targets}
+    if not all(os.path.isfile(p) for p in cached.values()):
+        return None
+    for name, out in targets.items():
+        _place(cached[name], out)
+    os.utime(entry)  # keeps it from being pruned
+    return dict(targets)
+
+
+def store(k, files):
+    """Save {name: path} under key k. Never raises; returns True if stored."""
+    entry = _entry(k)
+    try:
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(entry))
+        for name, path in files.items():
+            shutil.copyfile(path, os.path.join(tmp, name))
+        try:
+            os.rename(tmp, entry)
+        except OSError:  # another writer stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+        _maybe_prune()
+        return True
+    except Exception as e:
+        print(f"[report_cache] could not store {k[:12]}: {e}")
+        return False
+
+
+def prune(max_age_days=None):
+    """Remove entries not used for max_age_days. Returns how many went."""
+    cutoff = time.time() - 86400 * (MAX_AGE_DAYS if max_age_days is None
+                                    else max_age_days)
+    removed = 0
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    for shard in os.scandir(CACHE_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+    return removed
+
+
+def _maybe_prune():
+    global _last_prune
+    if time.time() - _last_prune > PRUNE_INTERVAL:
+        _last_prune = time.time()
+        prune()
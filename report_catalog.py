@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+report_catalog.py
+Persistent index of the PDFs JRAVIS generates (reports, invoices, summaries).
+
+Generators call register(path, kind) right after writing a file; weekly and
+backup jobs call find(since, until) instead of walking the working tree, which
+costs one index range scan plus a stat per match.
+
+Schema (SQLite, REPORT_CATALOG_DB):
+  reports(path PRIMARY KEY, kind, created_at, size, sha256)
+  created_at is the file's mtime (epoch seconds), indexed for range queries.
+
+Kinds used by the generators:
+  report   daily/summary reports (locked or not)
+  invoice  invoice PDFs, single-order or bundled
+  weekly   merged weekly summaries (excluded from weekly source lists)
+
+Files written before the catalog existed are picked up by a one-shot reindex:
+  python3 report_catalog.py --reindex [ROOT ...]
+  python3 report_catalog.py --list --days 7
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+CATALOG_DB = os.getenv("REPORT_CATALOG_DB", "report_catalog.db")
+
+KINDS = ("report", "invoice", "weekly")
+PDF_EXTS = (".pdf", )
+# never descend into these while reindexing
+SKIP_DIRS = {
+    ".git", "node_modules", "__pycache__", "backups", "cloud_backups",
+    "_old_code", ".venv", "venv"
+}
+
+
+def _connect(db_path=None):
+    conn = sqlite3.connect(db_path or CATALOG_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reports (
+            path TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_created "
+                 "ON reports (created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_kind_created "
+                 "ON reports (kind, created_at)")
+    return conn
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def guess_kind(path):
+    """Kind for files the generators did not register themselves."""
+    name = os.path.basename(path).lower()
+    if name.startswith("weekly_summary"):
+        return "weekly"
+    if "invoice" in name:
+        return "invoice"
+    return "report"
+
+
+def _upsert(conn, path, kind, st, sha):
+    conn.execute(
+        "INSERT INTO reports (path, kind, created_at, size, sha256) "
+        "VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(path) DO UPDATE SET kind=excluded.kind, "
+        "created_at=excluded.created_at, size=excluded.size, "
+        "sha256=excluded.sha256", (path, kind, st.st_mtime, st.st_size, sha))
+
+
+def register(path, kind=None, db_path=None):
+    """
+    Record a freshly written file. Never raises: a catalog problem must not
+    fail the report run, it only means the file is found by the next reindex.
+    """
+    try:
+        path = os.path.abspath(str(path))
+        st = os.stat(path)
+        sha = file_sha256(path)
+        with closing(_connect(db_path)) as conn, conn:
+            _upsert(conn, path, kind or guess_kind(path), st, sha)
+        return path
+    except Exception as e:
+        print(f"[report_catalog] could not register {path}: {e}")
+        return None
+
+
+def register_many(items, db_path=None):
+    """register() for many (path, kind) pairs in one transaction."""
+    rows = []
+    for path, kind in items:
+        try:
+            path = os.path.abspath(str(path))
+            rows.append((path, kind or guess_kind(path), os.stat(path),
+                         file_sha256(path)))
+        except OSError as e:
+            print(f"[report_catalog] could not register {path}: {e}")
+    if not rows:
+        return 0
+    try:
+        with closing(_connect(db_path)) as conn, conn:
+            for path, kind, st, sha in rows:
+                _upsert(conn, path, kind, st, sha)
+    except sqlite3.Error as e:
+        print(f"[report_catalog] could not register {len(rows)} files: {e}")
+        return 0
+    return len(rows)
+
+
+def find(since, until=None, kinds=None, root=None, db_path=None):
+    """
+    Paths of catalogued files with since <= mtime < until (epoch seconds),
+    oldest first. Entries whose file is gone are dropped from the catalog.
+    """
+    until = time.time() + 1 if until is None else until
+    sql = "SELECT path FROM reports WHERE created_at >= ? AND created_at < ?"
+    args = [since, until]
+    if kinds:
+        sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+        args += list(kinds)
+    if root:
+        prefix = os.path.join(os.path.abspath(str(root)), "")
+        sql += " AND substr(path, 1, ?) = ?"
+        args += [len(prefix), prefix]
+    sql += " ORDER BY created_at, path"
+    with closing(_connect(db_path)) as conn, conn:
+        paths = [r[0] for r in conn.execute(sql, args)]
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            conn.executemany("DELETE FROM reports WHERE path = ?",
+                             [(p, ) for p in missing])
+    if not missing:
+        return paths
+    gone = set(missing)
+    return [p for p in paths if p not in gone]
+
+
+def find_within(days, kinds=None, root=None, db_path=None):
+    return find(time.time() - days * 86400, kinds=kinds, root=root,
+                db_path=db_path)
+
+
+def latest(n, suffix="", kinds=None, root=None, db_path=None):
+    """
+    The n newest catalogued files (by mtime) whose path ends with suffix,
+    newest first; an index scan that stops after n live files. Entries
+    whose file is gone are dropped from the catalog.
+    """
+    sql, args = "SELECT path FROM reports WHERE 1", []
+    if suffix:
+        sql += " AND substr(path, -?) = ?"
+        args += [len(suffix), suffix]
+    if kinds:
+        sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+        args += list(kinds)
+    if root:
+        prefix = os.path.join(os.path.abspath(str(root)), "")
+        sql += " AND substr(path, 1, ?) = ?"
+        args += [len(prefix), prefix]
+    sql += " ORDER BY created_at DESC, path DESC"
+    paths, missing = [], []
+    with closing(_connect(db_path)) as conn, conn:
+        with closing(conn.execute(sql, args)) as rows:
+            for (path, ) in rows:
+                if not os.path.exists(path):
+                    missing.append((path, ))
+                    continue
+                paths.append(path)
+                if len(paths) >= n:
+                    break
+        if missing:
+            conn.executemany("DELETE FROM reports WHERE path = ?", missing)
+    return paths
+
+
+def reindex(roots, db_path=None):
+    """
+    Walk `roots` once and (re)catalog every PDF found; unchanged files
+    (same size and mtime) are not re-hashed. Returns the number of new or
+    updated entries.
+    """
+    changed = 0
+    with closing(_connect(db_path)) as conn, conn:
+        known = {
+            p: (size, created)
+            for p, size, created in conn.execute(
+                "SELECT path, size, created_at FROM reports")
+        }
+        for root in roots:
+            for dirpath, dirnames, filenames in os.walk(os.path.abspath(root)):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+                for fn in filenames:
+                    if not fn.lower().endswith(PDF_EXTS):
+                        continue
+                    path = os.path.join(dirpath, fn)
+                    try:
+                        st = os.stat(path)
+                        if known.get(path) == (st.st_size, st.st_mtime):
+                            continue
+                        _upsert(conn, path, guess_kind(path), st,
+                                file_sha256(path))
+                        changed += 1
+                    except OSError as e:
+                        print(f"[report_catalog] skip {path}: {e}")
+    return changed
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="JRAVIS report catalog")
+    p.add_argument("--reindex", nargs="*", metavar="ROOT",
+                   help="catalog PDFs under ROOT (default: current directory)")
+    p.add_argument("--list", action="store_true",
+                   help="print catalogued files from the last --days days")
+    p.add_argument("--days", type=float, default=7)
+    p.add_argument("--kind", action="append", choices=KINDS)
+    args = p.parse_args(argv)
+
+    if args.reindex is not None:
+        roots = args.reindex or [os.getcwd()]
+        n = reindex(roots)
+        print(f"Reindexed {', '.join(roots)}: {n} new/updated entries "
+              f"in {CATALOG_DB}")
+    if args.list:
+        for path in find_within(args.days, kinds=args.kind):
+            print(path)
+    if args.reindex is None and not args.list:
+        p.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 
+import report_catalog
+
 CRED_JSON = os.getenv("GDRIVE_CREDENTIALS_JSON", "")
 TARGET_FOLDER_ID = os.getenv("GDRIVE_TARGET_FOLDER_ID", "")
 INVOICE_DIR = os.getenv("INVOICE_DIR", "./invoices")
@@ -51,6 +53,15 @@ def collect_files(date_obj, days=1):
             INVOICE_DIR, (date_obj - timedelta(days=d)).strftime("%Y-%m-%d"))
         if os.path.isdir(folder):
             files += glob.glob(os.path.join(folder, "*.pdf"))
+    # plus everything the generators catalogued for the same days
+    start = datetime.combine(date_obj - timedelta(days=days - 1),
+                             datetime.min.time())
+    seen = {os.path.abspath(f) for f in files}
+    files += [
+        p for p in report_catalog.find(start.timestamp(),
+                                       (start + timedelta(days=days)).timestamp())
+        if p not in seen
+    ]
     return files
 
 
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+report_engine.py
+Parallel rendering for JRAVIS report PDFs.
+
+Independent documents (a day's summary and its invoices, or thousands of
+per-order invoices) are rendered on a process pool. A render function that
+takes a `password` keyword (the pdf_render based ones) writes the locked
+file directly; for any other, encryption runs as a second pipeline stage:
+as soon as a document that needs locking finishes rendering, its
+encryption (pdf_crypt, AES-256) is queued on the same pool while the other
+documents are still rendering.
+
+    from report_engine import Job, get_engine
+
+    summary, invoices = get_engine().run([
+        Job(render_summary, (data, ), "summary.pdf", password=LOCK_CODE,
+            locked_path="summary_locked.pdf", kind="report"),
+        Job(render_invoices, (data, ), "invoices.pdf", kind="invoice"),
+    ])
+
+A render function is a module-level (picklable) callable taking
+(out_path, *args), optionally with a password=None keyword. It fails by raising or by returning False; the engine then
+returns None for that job and logs the error. Finished files are registered
+in report_catalog when the job has a `kind`.
+
+Bulk per-order invoices:
+
+    paths = get_engine().render_invoices(orders, "invoices/")
+
+renders in batches of REPORT_BATCH_SIZE orders per task, so 5,000 invoices
+keep every worker busy without 5,000 round trips through the pool.
+
+A job with a cache_key (report_cache.key(...) of its input data and
+template version) is looked up in report_cache first: when the same inputs
+were rendered before, the cached PDF and its encrypted variant are copied
+into place and nothing is rendered or encrypted.
+
+Pool size is REPORT_WORKERS (default: all cores). With one worker, or a
+single job, everything runs inline and no pool is started.
+
+scripts/bench_report_engine.py measures serial vs pooled invoice rendering.
+"""
+
+import atexit
+import inspect
+import os
+import threading
+import traceback
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pdf_crypt
+import pdf_render
+import report_cache
+import report_catalog
+
+WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "100"))
+
+# render(out_path, *args) writes the PDF; password: encrypt it (at render
+# time when render takes a password keyword, else afterwards);
+# locked_path: where the locked copy goes (default: replace out_path);
+# keep_plain: keep the unlocked file next to it; cache_key: see report_cache
+Job = namedtuple(
+    "Job", "render args out_path password locked_path keep_plain kind cache_key",
+    defaults=(None, None, False, None, None))
+
+
+# ---------- stages (run in the pool) ----------
+def _render(render, args, out_path):
+    if render(out_path, *args) is False:
+        raise RuntimeError(f"render {render.__name__} failed for {out_path}")
+    return out_path
+
+
+def _takes_password(render):
+    try:
+        return "password" in inspect.signature(render).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _render_locked(render, args, out_path, password, locked_path, keep_plain):
+    """Render straight into the locked file; no plaintext unless kept."""
+    target = locked_path or out_path
+    if keep_plain and target != out_path:
+        _render(render, args, out_path)
+    if render(target, *args, password=password) is False:
+        raise RuntimeError(f"render {render.__name__} failed for {target}")
+    return target
+
+
+def _first_stage(job):
+    """(fn, args) that renders job, encrypting too when render can."""
+    if job.password and _takes_password(job.render):
+        return _render_locked, (job.render, job.args, job.out_path,
+                                job.password, job.locked_path, job.keep_plain)
+    return _render, (job.render, job.args, job.out_path)
+
+
+def _cache_key(job):
+    # the caller's key covers the data; the rest decides how it is rendered
+    return report_cache.key(job.cache_key, job.render.__module__,
+                            job.render.__qualname__, job.password,
+                            job.keep_plain)
+
+
+def _cache_targets(job):
+    """Files a finished job leaves behind, by cache name."""
+    final = (job.locked_path or job.out_path) if job.password else job.out_path
+    targets = {"final": final}
+    if job.password and job.keep_plain and final != job.out_path:
+        targets["plain"] = job.out_path
+    return targets
+
+
+def _lock(out_path, password, locked_path, keep_plain):
+    target = locked_path or out_path
+    pdf_crypt.encrypt_pdf(out_path, target, password)
+    if not keep_plain and target != out_path:
+        os.remove(out_path)
+    return target
+
+
+def render_order_invoice(order_record, out_path):
+    """Single-order invoice (the layout income_core_cloud has always used)."""
+    return pdf_render.render("order_invoice",
+                             out_path,
+                             order_id=order_record['order_id'],
+                             platform=order_record['platform'],
+                             buyer_name=order_record.get('buyer_name', '-'),
+                             currency=order_record['currency'],
+                             amount=order_record['amount'],
+                             details=[f"Details: {order_record.get('notes','-')}"])
+
+
+def invoice_filename(order_record):
+    return f"invoice_{order_record['platform']}_{order_record['order_id']}.pdf"
+
+
+def _render_invoice_batch(render, orders, out_dir):
+    out = []
+    for order in orders:
+        path = os.path.join(out_dir, invoice_filename(order))
+        try:
+            render(order, path)
+            out.append(path)
+        except Exception as e:
+            print(f"[report_engine] invoice {path} failed: {e}")
+            out.append(None)
+    return out
+
+
+# ---------- engine ----------
+class ReportEngine:
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or WORKERS
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def run(self, jobs):
+        """
+        Render (and encrypt) every job; returns the final path per job, in
+        job order, or None where that job failed.
+        """
+        jobs = list(jobs)
+        results = [None] * len(jobs)
+        todo = []
+        for i, job in enumerate(jobs):
+            hit = job.cache_key and report_cache.fetch(
+                _cache_key(job), _cache_targets(job))
+            if hit:
+                results[i] = hit["final"]
+            else:
+                todo.append(i)
+        batch = [jobs[i] for i in todo]
+        if self.max_workers == 1 or len(batch) <= 1:
+            rendered = [self._run_inline(job) for job in batch]
+        else:
+            rendered = self._run_pooled(batch)
+        for i, path in zip(todo, rendered):
+            results[i] = path
+            if path and jobs[i].cache_key:
+                report_cache.store(_cache_key(jobs[i]),
+                                   _cache_targets(jobs[i]))
+        done = [(job, path) for job, path in zip(jobs, results)
+                if path and job.kind]
+        report_catalog.register_many(
+            [(path, job.kind) for job, path in done] +
+            [(job.out_path, job.kind) for job, path in done
+             if path != job.out_path and job.keep_plain])
+        return results
+
+    def _run_inline(self, job):
+        try:
+            fn, args = _first_stage(job)
+            path = fn(*args)
+            if job.password and fn is _render:
+                path = _lock(path, job.password, job.locked_path,
+                             job.keep_plain)
+            return path
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    def _run_pooled(self, jobs):
+        pool = self.pool
+        results = [None] * len(jobs)
+        pending = {}
+        for i, job in enumerate(jobs):
+            fn, args = _first_stage(job)
+            pending[pool.submit(fn, *args)] = (i, "render")
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, stage = pending.pop(fut)
+                job = jobs[i]
+                try:
+                    path = fut.result()
+                except Exception:
+                    print(f"[report_engine] {stage} failed for {job.out_path}:")
+                    traceback.print_exc()
+                    continue
+                if (stage == "render" and job.password
+                        and not _takes_password(job.render)):
+                    pending[pool.submit(_lock, path, job.password,
+                                        job.locked_path,
+                                        job.keep_plain)] = (i, "encrypt")
+                else:
+                    results[i] = path
+        return results
+
+    def render_invoices(self, orders, out_dir, render=render_order_invoice,
+                        batch_size=None, kind="invoice"):
+        """
+        Render one invoice per order record into out_dir, batch_size orders
+        per pool task. Returns paths in order (None for failures).
+        """
+        orders = list(orders)
+        os.makedirs(out_dir, exist_ok=True)
+        batch_size = batch_size or BATCH_SIZE
+        if self.max_workers == 1 or len(orders) <= batch_size:
+            results = _render_invoice_batch(render, orders, out_dir)
+        else:
+            # spread small runs over every worker instead of filling one batch
+            size = max(1, min(batch_size, -(-len(orders) // self.max_workers)))
+            futures = [
+                self.pool.submit(_render_invoice_batch, render,
+                                 orders[i:i + size], out_dir)
+                for i in range(0, len(orders), size)
+            ]
+            results = [p for fut in futures for p in fut.result()]
+        if kind:
+            report_catalog.register_many((p, kind) for p in results if p)
+        return results
+
+    def gather(self, calls):
+        """Run independent (fn, args) calls on the pool; results in order."""
+        calls = list(calls)
+        if self.max_workers == 1 or len(calls) <= 1:
+            return [fn(*args) for fn, args in calls]
+        futures = [self.pool.submit(fn, *args) for fn, args in calls]
+        return [fut.result() for fut in futures]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine; its pool is started on first parallel use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ReportEngine()
+            atexit.register(_engine.shutdown)
+        return _engine
@@ -11,17 +11,19 @@ Usage:
 """
 
 import os
-import io
 import sys
-import smtplib
 import traceback
 from datetime import datetime, timedelta
-from fpdf import FPDF
-from PyPDF2 import PdfReader, PdfWriter
-from tinydb import TinyDB, where
-from email.message import EmailMessage
 from email.utils import formataddr
 
+import earnings_store
+import mail_service
+import pdf_crypt
+import pdf_render
+import report_cache
+import report_catalog
+from report_engine import Job, get_engine
+
 # ----------------------------
 # Config via environment vars
 # ----------------------------
@@ -34,115 +36,117 @@ REPORT_RECIPIENT = os.environ.get("REPORT_RECIPIENT", "nrveeresh327@gamil.com")
 FROM_NAME = os.environ.get("FROM_NAME", "JRAVIS Bot")
 FROM_EMAIL = os.environ.get("FROM_EMAIL", SMTP_USER or "noreply@jravis.local")
 
-DB_PATH = os.environ.get("JR_MEMORY_PATH", "jr_memory.json")
 REPORTS_DIR = os.environ.get("REPORTS_DIR", "/tmp/jravis_reports")
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
 
 # ----------------------------
-# Helpers: PDF creation
+# Build reports from the earnings store
 # ----------------------------
-class SimplePDF:
-
-    def __init__(self, title="JRAVIS Report"):
-        self.pdf = FPDF()
-        self.pdf.set_auto_page_break(auto=True, margin=15)
-        self.title = title
-
-    def add_title(self, text):
-        self.pdf.add_page()
-        self.pdf.set_font("Arial", "B", 16)
-        self.pdf.cell(0, 10, text, ln=True)
-        self.pdf.ln(6)
-
-    def add_paragraph(self, text):
-        self.pdf.set_font("Arial", size=11)
-        self.pdf.multi_cell(0, 7, text)
-        self.pdf.ln(3)
-
-    def save_to_bytes(self):
-        buf = io.BytesIO(self.pdf.output(dest="S").encode("latin1"))
-        return buf
-
-    def save_to_file(self, path):
-        self.pdf.output(path)
-
+def load_db(path=None):
+    """earnings_store.EarningsStore (jr_memory.json is migrated on open)."""
+    return earnings_store.open_store(path)
 
-# ----------------------------
-# Build reports from TinyDB
-# ----------------------------
-def load_db(path=DB_PATH):
-    return TinyDB(path)
 
+def render_simple_pdf(path, heading, paragraphs, password=None):
+    """Write a titled summary PDF (picklable, so report_engine can run it)."""
+    return pdf_render.render("summary", path, password, title=heading,
+                             lines=paragraphs)
 
-def build_daily_summary(db):
-    # Collect simple statistics for today (or most recent)
-    reports = db.table("reports").all()
-    earnings = db.table("earnings").all()
 
+def daily_summary_content(db):
+    """(path, heading, paragraphs) for today's summary."""
     today = datetime.utcnow().date().isoformat()
-    summary = SimplePDF("JRAVIS Daily Summary")
-    summary.add_title(f"JRAVIS — Daily Summary ({today})")
-
-    # Example summary content (customize as needed)
-    total_earnings = sum(
-        e.get("amount", 0) for e in earnings
-        if e.get("date", "").startswith(today))
-    summary.add_paragraph(f"Date: {today}")
-    summary.add_paragraph(
-        f"Total reported earnings (today): ₹{total_earnings:,}")
-    summary.add_paragraph(f"Number of earnings records: {len(earnings)}")
-    summary.add_paragraph("Recent reports:")
-    for r in reports[-10:]:
-        summary.add_paragraph(
+
+    # today's total is pre-aggregated; only the last 10 reports are read
+    total_earnings, _ = db.day_total(today)
+    paragraphs = [
+        f"Date: {today}",
+        f"Total reported earnings (today): ₹{total_earnings:,}",
+        f"Number of earnings records: {db.entry_count()}",
+        "Recent reports:",
+    ]
+    for r in db.recent_reports(10):
+        paragraphs.append(
             f"- {r.get('date','?')} — {str(r.get('summary','')).strip()[:100]}"
         )
-
-    # Save files
     fname = os.path.join(REPORTS_DIR, f"daily_summary_{today}.pdf")
-    summary.save_to_file(fname)
-    return fname
+    return fname, f"JRAVIS — Daily Summary ({today})", paragraphs
 
 
-def build_weekly_invoice(db):
-    # Build a simple invoices PDF (last 7 days)
-    earnings = db.table("earnings").all()
+def weekly_invoice_content(db):
+    """(path, heading, paragraphs) for the last 7 days of invoices."""
     a_week_ago = (datetime.utcnow() - timedelta(days=7)).date().isoformat()
 
-    invoice = SimplePDF("JRAVIS Weekly Invoices")
-    invoice.add_title(
-        f"JRAVIS — Weekly Invoice ({a_week_ago} to {datetime.utcnow().date().isoformat()})"
-    )
+    # one index range scan for the rows, daily totals for the sum
+    weekly_earnings = db.earnings_between(a_week_ago)
+    total, _ = db.range_total(a_week_ago)
 
-    weekly_earnings = [e for e in earnings if e.get("date", "") >= a_week_ago]
-    total = sum(e.get("amount", 0) for e in weekly_earnings)
-
-    invoice.add_paragraph(f"Period start: {a_week_ago}")
-    invoice.add_paragraph(f"Total weekly earnings: ₹{total:,}")
-    invoice.add_paragraph("Details:")
+    paragraphs = [
+        f"Period start: {a_week_ago}",
+        f"Total weekly earnings: ₹{total:,}",
+        "Details:",
+    ]
     for e in weekly_earnings:
-        invoice.add_paragraph(
-            f"- {e.get('date')} : {e.get('amount')} — {e.get('note','')[:120]}"
+        paragraphs.append(
+            f"- {e['date']} : {e['amount']} — {(e['note'] or '')[:120]}"
         )
 
     fname = os.path.join(
         REPORTS_DIR,
         f"weekly_invoices_{datetime.utcnow().date().isoformat()}.pdf")
-    invoice.save_to_file(fname)
+    heading = f"JRAVIS — Weekly Invoice ({a_week_ago} to {datetime.utcnow().date().isoformat()})"
+    return fname, heading, paragraphs
+
+
+def build_daily_summary(db):
+    fname, heading, paragraphs = daily_summary_content(db)
+    render_simple_pdf(fname, heading, paragraphs)
+    report_catalog.register(fname, "report")
+    return fname
+
+
+def build_weekly_invoice(db):
+    fname, heading, paragraphs = weekly_invoice_content(db)
+    render_simple_pdf(fname, heading, paragraphs)
+    report_catalog.register(fname, "invoice")
     return fname
 
 
+def render_summary_and_invoices(db):
+    """
+    Render the summary and the invoices in parallel; the summary's locked
+    copy is encrypted as it is rendered. Unchanged content is served
+    from report_cache. Returns (locked_summary, invoices).
+    """
+    summary_pdf, heading, paragraphs = daily_summary_content(db)
+    invoices_pdf, inv_heading, inv_paragraphs = weekly_invoice_content(db)
+    version = pdf_render.TEMPLATE_VERSION
+    locked, invoices = get_engine().run([
+        Job(render_simple_pdf, (heading, paragraphs),
+            summary_pdf,
+            password=REPORT_LOCK_CODE,
+            locked_path=os.path.splitext(summary_pdf)[0] + "_locked.pdf",
+            keep_plain=True,
+            kind="report",
+            cache_key=report_cache.key(heading, paragraphs, version)),
+        Job(render_simple_pdf, (inv_heading, inv_paragraphs),
+            invoices_pdf,
+            kind="invoice",
+            cache_key=report_cache.key(inv_heading, inv_paragraphs,
+                                       version)),
+    ])
+    if not locked or not invoices:
+        raise RuntimeError("Report rendering failed (see log above).")
+    return locked, invoices
+
+
 # ----------------------------
 # PDF encryption
 # ----------------------------
 def encrypt_pdf(input_path, output_path, password):
-    writer = PdfWriter()
-    reader = PdfReader(input_path)
-    for page in reader.pages:
-        writer.add_page(page)
-    writer.encrypt(password)
-    with open(output_path, "wb") as fh:
-        writer.write(fh)
+    pdf_crypt.encrypt_pdf(input_path, output_path, password)
+    report_catalog.register(output_path, "report")
     return output_path
 
 
@@ -153,39 +157,24 @@ def send_email(subject, body, attachments=None, recipient=REPORT_RECIPIENT):
     if attachments is None:
         attachments = []
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = formataddr((FROM_NAME, FROM_EMAIL))
-    msg["To"] = recipient
-    msg.set_content(body)
-
-    # attach files
+    # attach files (streamed from disk when the message is sent)
+    files = []
     for path in attachments:
-        try:
-            with open(path, "rb") as f:
-                data = f.read()
-            maintype = "application"
-            subtype = "pdf"
-            msg.add_attachment(data,
-                               maintype=maintype,
-                               subtype=subtype,
-                               filename=os.path.basename(path))
-        except Exception as e:
-            print("⚠️ Attachment failed:", path, e)
-
-    # send
+        if os.path.isfile(path):
+            files.append(path)
+        else:
+            print("⚠️ Attachment failed:", path, "not found")
+
+    # send over the shared, pooled connection (STARTTLS when offered)
     if not SMTP_SERVER or not SMTP_USER or not SMTP_PASS:
         raise EnvironmentError(
             "Missing SMTP configuration. Set SMTP_SERVER, SMTP_USER, SMTP_PASS in environment."
         )
 
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30) as s:
-        s.ehlo()
-        if SMTP_PORT == 587:
-            s.starttls()
-            s.ehlo()
-        s.login(SMTP_USER, SMTP_PASS)
-        s.send_message(msg)
+    svc = mail_service.get_service(
+        mail_service.Account(SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS))
+    svc.send(formataddr((FROM_NAME, FROM_EMAIL)), [recipient], subject, body,
+             files).result()
     return True
 
 
@@ -195,12 +184,8 @@ def send_email(subject, body, attachments=None, recipient=REPORT_RECIPIENT):
 def run_daily_flow():
     try:
         db = load_db()
-        summary_pdf = build_daily_summary(db)
-        encrypted_summary = os.path.splitext(summary_pdf)[0] + "_locked.pdf"
-        encrypt_pdf(summary_pdf, encrypted_summary, REPORT_LOCK_CODE)
-
-        invoices_pdf = build_weekly_invoice(
-            db)  # reuses weekly builder for attachments
+        # invoices reuse the weekly builder for attachments
+        encrypted_summary, invoices_pdf = render_summary_and_invoices(db)
         subject = f"JRAVIS Daily Summary — {datetime.utcnow().date().isoformat()}"
         body = ("JRAVIS Daily Summary attached (locked). "
                 "Invoices attached as separate file.\n\n"
@@ -218,12 +203,8 @@ def run_daily_flow():
 def run_weekly_flow():
     try:
         db = load_db()
-        summary_pdf = build_daily_summary(
-            db)  # weekly summary can reuse daily builder or create longer
-        encrypted_summary = os.path.splitext(summary_pdf)[0] + "_locked.pdf"
-        encrypt_pdf(summary_pdf, encrypted_summary, REPORT_LOCK_CODE)
-
-        invoices_pdf = build_weekly_invoice(db)
+        # weekly summary can reuse daily builder or create longer
+        encrypted_summary, invoices_pdf = render_summary_and_invoices(db)
         subject = f"JRAVIS Weekly Summary — week ending {datetime.utcnow().date().isoformat()}"
         body = "JRAVIS Weekly Summary attached (locked) and invoices attached."
         send_email(subject,
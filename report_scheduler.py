@@ -9,6 +9,9 @@ from datetime import datetime
 import requests
 from io import BytesIO
 
+import stream_history
+from report_engine import get_engine
+
 # ==============================================
 # 🔧 Setup
 # ==============================================
@@ -48,6 +51,33 @@ def safe_text(text):
     return text.encode("latin-1", "replace").decode("latin-1")
 
 
+# ==============================================
+# 📈 Trends (stream_history)
+# ==============================================
+def record_and_trend(data):
+    """Record today's figures; 7/30/365-day trends ([] if unavailable)."""
+    try:
+        history = stream_history.open_history()
+        history.record_results(data)
+        return history.trends()
+    except Exception as e:
+        logging.warning(f"⚠️ Stream history unavailable: {e}")
+        return []
+
+
+def draw_sparkline(pdf, x, y, w, h, values):
+    """Line segments for values in the w x h box (top-left at x, y; mm)."""
+    if len(values) < 2:
+        return
+    lo, hi = min(values), max(values)
+    scale = h / (hi - lo) if hi > lo else 0
+    step = w / (len(values) - 1)
+    points = [(x + i * step, y + h - (v - lo) * scale)
+              for i, v in enumerate(values)]
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        pdf.line(x1, y1, x2, y2)
+
+
 # ==============================================
 # 🧾 Build Summary PDF
 # ==============================================
@@ -76,6 +106,17 @@ def build_summary_pdf():
     pdf.set_font("Arial", "B", 12)
     pdf.cell(0, 8, safe_text(f"Total Earnings: ₹ {total_earnings:,}"), ln=True)
 
+    trends = record_and_trend(data)
+    if trends:
+        pdf.ln(6)
+        pdf.cell(0, 8, safe_text("Trends"), ln=True)
+        pdf.set_font("Arial", "", 10)
+        for t in trends:
+            y = pdf.get_y()
+            pdf.cell(0, 8, safe_text(stream_history.trend_line(t)), ln=True)
+            draw_sparkline(pdf, 140, y + 2, 50, 4,
+                           stream_history.buckets(t.series, 52))
+
     buf = BytesIO()
     pdf.output(buf)
     buf.seek(0)
@@ -151,8 +192,11 @@ def send_email_with_pdfs():
             "Attached are today's Mission 2040 Summary Report and Invoice Pack."
         )
 
-        summary_pdf_buf = build_summary_pdf()
-        invoice_pdf_buf = build_invoice_pdf()
+        # independent documents: render them side by side
+        summary_pdf_buf, invoice_pdf_buf = get_engine().gather([
+            (build_summary_pdf, ()),
+            (build_invoice_pdf, ()),
+        ])
 
         msg.add_attachment(
             summary_pdf_buf.read(),
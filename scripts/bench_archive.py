@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Backup archive wall time / CPU use: zipfile vs backup_archive.
+
+A mixed tree of --mb megabytes (default 2048) is built once in the workdir:
+40% PDFs and 10% PNGs (random bytes, i.e. already compressed), 40% logs
+and 10% JSON (text). Then, each in a fresh subprocess:
+
+  copytree+zipfile  the old perform_backup: copytree to a staging folder,
+                    then zipfile ZIP_DEFLATED over the copy
+  zipfile           zipfile ZIP_DEFLATED straight from the sources
+  archive xN        backup_archive.write_archive with N worker threads
+
+CPU is the child's user+sys time; CPU% above 100 means more than one core
+was busy. Every archive is checked with zipfile.testzip().
+
+Usage:
+  python3 scripts/bench_archive.py [--mb 2048] [--workers 1,4] [workdir]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+PRELUDE = """
+import os
+import shutil
+import sys
+import zipfile
+sys.path.insert(0, %r)
+src, out = sys.argv[1], sys.argv[2]
+dirs = [os.path.join(src, d) for d in sorted(os.listdir(src))]
+""" % str(ROOT)
+
+ZIPFILE = """
+def zip_dir(folder, zip_path):
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
+        for root, _, files in os.walk(folder):
+            for f in files:
+                p = os.path.join(root, f)
+                z.write(p, os.path.relpath(p, folder))
+"""
+
+OLD = PRELUDE + ZIPFILE + """
+stage = out + ".stage"
+for d in dirs:
+    shutil.copytree(d, os.path.join(stage, os.path.basename(d)))
+zip_dir(stage, out)
+shutil.rmtree(stage)
+"""
+
+PLAIN = PRELUDE + ZIPFILE + """
+zip_dir(src, out)
+"""
+
+NEW = PRELUDE + """
+import backup_archive
+backup_archive.archive_dirs(dirs, out, workers=int(sys.argv[3]))
+"""
+
+WORDS = ("income stream printify fiverr payout invoice report daily weekly "
+         "cycle ok error retry upload drive backup INR USD 1234.50 2025-10-20 "
+         "23:30:01 INFO WARN connector status pending settled").split()
+
+
+def make_tree(src, mb):
+    rng = random.Random(2040)
+    corpus = " ".join(rng.choice(WORDS) + (str(rng.randrange(10 ** 4))
+                                           if rng.random() < .3 else "")
+                      for _ in range(800000)).encode()
+    budget, i = mb * 1024 * 1024, 0
+    while budget > 0:
+        kind = i % 10
+        if kind < 4:
+            d, name, size = "PDFs", f"report_{i:06d}.pdf", rng.randrange(
+                100, 4000) * 1024
+            data = os.urandom(size)
+        elif kind < 5:
+            d, name = "images", f"chart_{i:06d}.png"
+            data = os.urandom(rng.randrange(50, 1500) * 1024)
+        else:
+            d = "logs" if kind < 9 else "backups"
+            name = f"{d}_{i:06d}." + ("log" if kind < 9 else "json")
+            size = rng.randrange(100, 4000) * 1024
+            start = rng.randrange(len(corpus) - size)
+            data = corpus[start:start + size]
+        os.makedirs(os.path.join(src, d), exist_ok=True)
+        with open(os.path.join(src, d, name), "wb") as fh:
+            fh.write(data)
+        budget -= len(data)
+        i += 1
+
+
+def run(code, *args):
+    """(wall s, cpu s, peak RSS KB) of one child."""
+    t = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code, *map(str, args)])
+    _, status, usage = os.wait4(proc.pid, 0)
+    if os.waitstatus_to_exitcode(status):
+        raise RuntimeError(f"child exited with {status}")
+    return (time.perf_counter() - t, usage.ru_utime + usage.ru_stime,
+            usage.ru_maxrss)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--mb", type=int, default=2048)
+    p.add_argument("--workers", default=f"1,{max(4, os.cpu_count() or 1)}")
+    p.add_argument("--skip-old", action="store_true",
+                   help="leave out copytree+zipfile")
+    p.add_argument("workdir", nargs="?")
+    args = p.parse_args()
+
+    work = args.workdir or tempfile.mkdtemp(prefix="jravis_archive_")
+    src = os.path.join(work, "src")
+    if not os.path.isdir(src):
+        print(f"Building a {args.mb} MB tree in {src} ...")
+        make_tree(src, args.mb)
+    size = sum(os.path.getsize(os.path.join(r, n))
+               for r, _, names in os.walk(src) for n in names)
+    print(f"source: {size / 1e6:.0f} MB, {os.cpu_count()} CPU(s)")
+
+    rows = [] if args.skip_old else [("copytree+zipfile", OLD, ())]
+    rows.append(("zipfile", PLAIN, ()))
+    rows += [(f"archive x{n}", NEW, (n,))
+             for n in map(int, args.workers.split(","))]
+    import zipfile
+    for name, code, extra in rows:
+        out = os.path.join(work, name.replace(" ", "_").replace("+", "_")
+                           + ".zip")
+        wall, cpu, rss = run(code, src, out, *extra)
+        with zipfile.ZipFile(out) as z:
+            bad = z.testzip()
+        if bad:
+            raise RuntimeError(f"{name}: corrupt member {bad}")
+        print(f"{name:<17} {wall:7.2f} s wall  {cpu:7.2f} s CPU "
+              f"({100 * cpu / wall:4.0f}%)  out {os.path.getsize(out) / 1e6:7.0f}"
+              f" MB  peak RSS {rss / 1024:5.0f} MB")
+        os.remove(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
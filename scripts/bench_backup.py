@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Backup time / disk use: the old copytree + zip vs backup_store snapshots.
+
+A mixed tree (PDFs, logs, JSON backups) of --mb megabytes is built once. Then:
+
+  copytree+zip   the old perform_backup: full copy, then a zip of the copy
+  snapshot 1     backup_store, empty store
+  snapshot 2     after a typical 6 hours: --change-files new PDFs and a line
+                 appended to every log
+  snapshot 3     nothing changed
+
+Each row's "disk" is what the run added to the backup root. The last
+snapshot is restored and compared byte for byte with the source.
+
+Usage:
+  python3 scripts/bench_backup.py [--mb 200] [--change-files 5] [workdir]
+"""
+
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import backup_store
+
+
+def make_tree(src, mb):
+    """~mb MB: 60% PDFs (incompressible), 30% logs, 10% JSON."""
+    rnd = lambda n: os.urandom(n)
+    line = b"2025-10-20 23:30:01 [INFO] cycle ok, income=1234.50 stream=x\n"
+    budget = mb * 1024 * 1024
+    i = 0
+    while budget > 0:
+        kind = i % 10
+        if kind < 6:
+            d, name, data = "PDFs", f"report_{i:05d}.pdf", rnd(300 * 1024)
+        elif kind < 9:
+            d, name = "logs", f"app_{i:05d}.log"
+            data = b"".join(line.replace(b"x", b"%d-%d" % (i, j))
+                            for j in range(4000))
+        else:
+            d, name = "backups", f"state_{i:05d}.json"
+            data = (b'{"earnings": [' + b"1234.5, " * 20000 + b"0]}")
+        os.makedirs(os.path.join(src, d), exist_ok=True)
+        with open(os.path.join(src, d, name), "wb") as fh:
+            fh.write(data)
+        budget -= len(data)
+        i += 1
+
+
+def du(path):
+    return sum(os.path.getsize(os.path.join(r, n))
+               for r, _, names in os.walk(path) for n in names)
+
+
+def old_backup(src, root, stamp):
+    dest = os.path.join(root, stamp)
+    for d in ("PDFs", "backups", "logs"):
+        shutil.copytree(os.path.join(src, d), os.path.join(dest, d))
+    with zipfile.ZipFile(os.path.join(root, f"{stamp}.zip"), "w",
+                         zipfile.ZIP_DEFLATED) as z:
+        for r, _, names in os.walk(dest):
+            for n in names:
+                p = os.path.join(r, n)
+                z.write(p, os.path.relpath(p, dest))
+
+
+def change(src, n):
+    for k in range(n):
+        with open(os.path.join(src, "PDFs", f"new_{time.time_ns()}_{k}.pdf"),
+                  "wb") as fh:
+            fh.write(os.urandom(300 * 1024))
+    for n_ in os.listdir(os.path.join(src, "logs")):
+        with open(os.path.join(src, "logs", n_), "ab") as fh:
+            fh.write(b"2025-10-21 05:30:00 [INFO] next cycle\n")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--mb", type=int, default=200)
+    p.add_argument("--change-files", type=int, default=5)
+    p.add_argument("workdir", nargs="?")
+    args = p.parse_args()
+    work = args.workdir or tempfile.mkdtemp(prefix="jravis_backup_")
+    src = os.path.join(work, "src")
+    if not os.path.isdir(src):
+        make_tree(src, args.mb)
+    dirs = [os.path.join(src, d) for d in ("PDFs", "backups", "logs")]
+    print(f"source: {du(src) / 1e6:.0f} MB, "
+          f"{sum(len(f) for _, _, f in os.walk(src))} files")
+
+    old_root = os.path.join(work, "old")
+    shutil.rmtree(old_root, ignore_errors=True)
+    os.makedirs(old_root)
+    t = time.perf_counter()
+    old_backup(src, old_root, "2025-10-20_23-30")
+    print(f"{'copytree+zip':<14} {time.perf_counter() - t:6.2f} s  "
+          f"disk +{du(old_root) / 1e6:7.1f} MB")
+
+    new_root = os.path.join(work, "new")
+    shutil.rmtree(new_root, ignore_errors=True)
+    store = backup_store.BackupStore(new_root)
+    for label, before in (("snapshot 1", None),
+                          ("snapshot 2", lambda: change(src, args.change_files)),
+                          ("snapshot 3", None)):
+        if before:
+            before()
+        used = store.disk_usage()
+        snap = store.snapshot(backup_store.collect(dirs))
+        print(f"{label:<14} {snap.seconds:6.2f} s  disk "
+              f"+{(store.disk_usage() - used) / 1e6:7.1f} MB  "
+              f"read {snap.read_bytes / 1e6:7.1f} MB  "
+              f"{len(snap.changed)} changed files")
+        time.sleep(1.1)  # distinct snapshot names
+
+    out = os.path.join(work, "restored")
+    shutil.rmtree(out, ignore_errors=True)
+    t = time.perf_counter()
+    written = store.restore(None, out)
+    for d in ("PDFs", "backups", "logs"):
+        cmp = filecmp.dircmp(os.path.join(src, d), os.path.join(out, d))
+        if cmp.left_only or cmp.right_only or cmp.diff_files:
+            raise RuntimeError(f"restore differs in {d}")
+        _, mismatch, errors = filecmp.cmpfiles(
+            os.path.join(src, d), os.path.join(out, d), cmp.common_files,
+            shallow=False)
+        if mismatch or errors:
+            raise RuntimeError(f"restore differs in {d}: {mismatch[:3]}")
+    print(f"{'restore':<14} {time.perf_counter() - t:6.2f} s  "
+          f"{len(written)} files, identical to the source")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Backup email peak memory: EmailMessage.add_attachment vs smtp_stream.
+
+For each attachment size in --mb (random bytes, like a zip), a child process
+sends one message with that attachment to a local SMTP sink:
+
+  EmailMessage   the old send_backup_email: f.read() + add_attachment +
+                 smtplib send_message
+  smtp_stream    message_chunks + send, the attachment read and encoded
+                 from disk in blocks
+
+The sink keeps the last message; its attachment is decoded and compared
+with the source file, so both rows are checked for correctness too.
+
+Usage:
+  python3 scripts/bench_backup_email.py [--mb 5,50,200] [workdir]
+"""
+
+import argparse
+import os
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+PRELUDE = """
+import os
+import smtplib
+import sys
+sys.path.insert(0, %r)
+port, path = int(sys.argv[1]), sys.argv[2]
+""" % str(ROOT)
+
+OLD = PRELUDE + """
+from email.message import EmailMessage
+msg = EmailMessage()
+msg["From"], msg["To"], msg["Subject"] = "bot@x", "me@x", "backup"
+msg.set_content("summary")
+with open(path, "rb") as f:
+    msg.add_attachment(f.read(), maintype="application", subtype="zip",
+                       filename=os.path.basename(path))
+with smtplib.SMTP("127.0.0.1", port) as smtp:
+    smtp.send_message(msg)
+"""
+
+NEW = PRELUDE + """
+import smtp_stream
+chunks = smtp_stream.message_chunks("bot@x", ["me@x"], "backup", "summary",
+                                    [path])
+with smtplib.SMTP("127.0.0.1", port) as smtp:
+    smtp_stream.send(smtp, "bot@x", ["me@x"], chunks)
+"""
+
+# in its own process: the parent must stay small, as a forked child's peak
+# RSS starts from the parent's
+VERIFY = """
+import email
+import sys
+from email import policy
+with open(sys.argv[1], "rb") as fh:
+    msg = email.message_from_binary_file(fh, policy=policy.default)
+with open(sys.argv[2], "rb") as fh:
+    sys.exit(next(msg.iter_attachments()).get_content() != fh.read())
+"""
+
+
+class Sink(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept one message per DATA; stores it on disk."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.reply("220 sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line[:4].upper()
+            if cmd == b"QUIT":
+                self.reply("221 bye")
+                return
+            if cmd != b"DATA":
+                self.reply("250 ok")
+                continue
+            self.reply("354 go")
+            with open(self.server.out, "wb") as fh:
+                for data in iter(self.rfile.readline, b""):
+                    if data == b".\r\n":
+                        break
+                    fh.write(data[1:] if data.startswith(b".") else data)
+            self.reply("250 queued")
+
+
+def run(code, *args):
+    """(wall s, peak RSS KB) of one child."""
+    t = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code, *map(str, args)])
+    _, status, usage = os.wait4(proc.pid, 0)
+    if os.waitstatus_to_exitcode(status):
+        raise RuntimeError(f"child exited with {status}")
+    return time.perf_counter() - t, usage.ru_maxrss
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--mb", default="5,50,200")
+    p.add_argument("workdir", nargs="?")
+    args = p.parse_args()
+    work = args.workdir or tempfile.mkdtemp(prefix="jravis_email_")
+    os.makedirs(work, exist_ok=True)
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Sink)
+    server.out = os.path.join(work, "received.eml")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    for mb in map(int, args.mb.split(",")):
+        path = os.path.join(work, f"backup_{mb}mb.zip")
+        with open(path, "wb") as fh:
+            for _ in range(mb):
+                fh.write(os.urandom(1024 * 1024))
+        for name, code in (("EmailMessage", OLD), ("smtp_stream", NEW)):
+            wall, rss = run(code, port, path)
+            sent = os.path.getsize(server.out)
+            if subprocess.call([sys.executable, "-c", VERIFY, server.out,
+                                path]):
+                raise RuntimeError(f"{name}: attachment differs")
+            print(f"{mb:4d} MB  {name:<13} {wall:6.2f} s  message "
+                  f"{sent / 1e6:6.1f} MB  peak RSS {rss / 1024:6.1f} MB")
+        os.remove(path)
+    server.shutdown()
+    os.remove(server.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
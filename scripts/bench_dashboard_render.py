@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Requests/sec for `/` on the dashboards, before and after page_cache.
+
+"before" renders the original inline source through render_template_string
+(re-compiled on every request, as the apps used to); "after" hits the real
+route, which renders the precompiled template.
+
+Usage:
+  python3 scripts/bench_dashboard_render.py [requests]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+TMP = tempfile.mkdtemp(prefix="jravis_bench_")
+os.environ.setdefault("DB_PATH", os.path.join(TMP, "dashboard.db"))
+os.environ.setdefault("PHASE1_DB_PATH", os.path.join(TMP, "phase1_exec.db"))
+
+from flask import render_template_string  # noqa: E402
+
+import dashboard_app  # noqa: E402
+import dashboard_core  # noqa: E402
+
+
+def rps(client, path, n, headers=None):
+    client.get(path, headers=headers)  # warm up
+    t = time.perf_counter()
+    for _ in range(n):
+        r = client.get(path, headers=headers)
+    dt = time.perf_counter() - t
+    return n / dt, len(r.get_data())
+
+
+def bench(name, app, source, ctx, n, unlock_key=None):
+    app.add_url_rule("/_bench_before", "_bench_before",
+                     lambda: render_template_string(source, **ctx))
+    client = app.test_client()
+    if unlock_key:
+        with client.session_transaction() as s:
+            s[unlock_key] = True
+    before, before_size = rps(client, "/_bench_before", n)
+    after, after_size = rps(client, "/", n)
+    after_gz, gz_size = rps(client, "/", n, {"Accept-Encoding": "gzip, br"})
+    print(f"{name:<16} before {before:8.0f} req/s ({before_size} B)   "
+          f"after {after:8.0f} req/s ({after_size} B)   "
+          f"after+compress {after_gz:8.0f} req/s ({gz_size} B)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    bench("dashboard_app", dashboard_app.app, dashboard_app.MAIN_HTML, {
+        "earn_inr": str(dashboard_app.CURRENT_EARNINGS_INR),
+        "earn_usd": str(dashboard_app.CURRENT_EARNINGS_USD),
+        "progress_percent": dashboard_app.PROGRESS_PERCENT,
+        "phases": dashboard_app.PHASES
+    }, n)
+    bench("dashboard_core", dashboard_core.app, dashboard_core.FRONTEND,
+          {"refresh": dashboard_core.REFRESH_SECONDS}, n, "unlocked")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Drive API calls / wall time for syncing N PDFs, against drive_client.FakeDrive.
+
+  legacy      the old drive_sync_daemon call pattern: per file, a lookup per
+              path level (root included), a name query, then the upload;
+              one file at a time
+  cold cache  drive_sync_daemon.sync_to_drive through an UploadQueue, empty
+              folder cache
+  warm cache  the same with the cache file the cold run left behind (a
+              restarted daemon); same names, new content: every upload is an
+              update
+  unchanged   the same files again, byte for byte: MD5 matches Drive's
+              md5Checksum, nothing is uploaded
+
+Files are spread over FOLDERS Drive paths 2-4 levels deep. Every fake call
+sleeps --latency seconds, like a round trip. Encryption is left out: this
+measures the Drive side only.
+
+Usage:
+  python3 scripts/bench_drive_sync.py [--files 500] [--latency 0.02]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import drive_client
+import drive_sync_daemon as dsd
+
+FOLDERS = ["Reports/Daily", "Reports/Weekly", "Invoices",
+           "Invoices/2025/10", "Invoices/2025/11", "Reports/Daily/2025/10",
+           "Reports/Daily/2025/11", "Backups/Reports", "Streams/Printify/PDF",
+           "Streams/Fiverr/PDF"]
+
+
+def drive_path(path):
+    return FOLDERS[int(Path(path).stem.split("_")[1]) % len(FOLDERS)]
+
+
+def legacy_sync(drive, path):
+    # what process_file did per file before the cache
+    parent = (drive.find_folder(dsd.ROOT_FOLDER)
+              or drive.create_folder(dsd.ROOT_FOLDER))
+    for part in drive_path(path).split("/"):
+        parent = (drive.find_folder(part, parent_id=parent)
+                  or drive.create_folder(part, parent_id=parent))
+    known = drive.list_files(parent).get(os.path.basename(path))
+    return drive.upload(path, parent, file_id=known and known.id)
+
+
+def run_legacy(drive, files):
+    for f in files:
+        legacy_sync(drive, f)
+
+
+def run_cached(drive, files, cache_file, workers):
+    cache = dsd.FolderCache(cache_file)
+    uploads = dsd.UploadQueue(
+        drive, workers=workers,
+        handler=lambda d, p: dsd.sync_to_drive(d, p, drive_path(p), cache))
+    for f in files:
+        uploads.put(f)
+    uploads.join()
+    uploads.close()
+    if uploads.failed:
+        raise RuntimeError(f"{uploads.failed} uploads failed")
+
+
+def write(files):
+    for f in files:
+        with open(f, "wb") as fh:
+            fh.write(b"%PDF-1.7\n" + os.urandom(256))
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--files", type=int, default=500)
+    p.add_argument("--latency", type=float, default=0.02)
+    p.add_argument("--workers", type=int, default=dsd.UPLOAD_WORKERS)
+    args = p.parse_args()
+
+    work = tempfile.mkdtemp(prefix="jravis_drive_")
+    files = [os.path.join(work, f"report_{i:05d}_locked.pdf")
+             for i in range(args.files)]
+    write(files)
+    cache_file = os.path.join(work, "folders.json")
+
+    print(f"{args.files} PDFs over {len(FOLDERS)} folders, "
+          f"{args.latency * 1000:.0f} ms per call, {args.workers} workers")
+    legacy, drive = drive_client.FakeDrive(args.latency), \
+        drive_client.FakeDrive(args.latency)
+    rows = (("legacy", legacy, lambda: run_legacy(legacy, files)),
+            ("cold cache", drive,
+             lambda: run_cached(drive, files, cache_file, args.workers)),
+            # the Drive the cold run populated, seen by a restarted daemon
+            ("warm cache", drive,
+             lambda: write(files) or run_cached(drive, files, cache_file,
+                                                args.workers)),
+            ("unchanged", drive,
+             lambda: run_cached(drive, files, cache_file, args.workers)))
+    for name, fake, run in rows:
+        fake.calls.clear()
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        dt = time.perf_counter() - t
+        calls = ", ".join(f"{k} {v}" for k, v in sorted(fake.calls.items()))
+        print(f"{name:<11} {fake.total_calls:6d} calls "
+              f"({fake.total_calls / args.files:.2f}/file)  {dt:6.2f} s   "
+              f"{calls}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Resumable / deduplicated Drive uploads, against drive_client.FakeDriveServer.
+
+  full        a fresh upload in CHUNK_SIZE chunks
+  cut+resume  the connection drops after --cut chunks; a new GoogleDrive
+              (a restarted daemon, same UploadSessions file) finishes it
+  restart     what the same cut cost before: the whole file again
+  unchanged   drive_sync_daemon.upload_file_to_drive with the same bytes:
+              local MD5 == Drive md5Checksum, no request at all
+
+Bytes are request bodies the server received.
+
+Usage:
+  python3 scripts/bench_drive_upload.py [--mb 64] [--chunk-mb 8] [--cut 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import requests
+
+import drive_client as dc
+import drive_sync_daemon as dsd
+
+
+def client(server, sessions_file, chunk):
+    return dc.GoogleDrive(requests.Session, api_url=server.url,
+                          sessions=dc.UploadSessions(sessions_file),
+                          chunk_size=chunk)
+
+
+def row(name, server, t, note=""):
+    dt = time.perf_counter() - t
+    print(f"{name:<11} {dt:6.2f} s  {sum(server.requests.values()):4d} requests"
+          f"  {server.received / 1e6:8.1f} MB sent  {note}")
+    server.requests.clear()
+    server.received = 0
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--mb", type=int, default=64)
+    p.add_argument("--chunk-mb", type=int, default=8)
+    p.add_argument("--cut", type=int, default=5)
+    args = p.parse_args()
+    chunk = args.chunk_mb * 1024 * 1024
+
+    work = tempfile.mkdtemp(prefix="jravis_upload_")
+    path = os.path.join(work, "archive_locked.pdf")
+    with open(path, "wb") as fh:
+        for _ in range(args.mb):
+            fh.write(os.urandom(1024 * 1024))
+    md5 = dc.file_md5(path)
+    sessions = os.path.join(work, "sessions.json")
+    print(f"{args.mb} MB file, {args.chunk_mb} MB chunks, cut after "
+          f"{args.cut} chunks")
+
+    with dc.FakeDriveServer() as server:
+        folder = server.drive.create_folder("Reports")
+
+        t = time.perf_counter()
+        f = client(server, sessions, chunk).upload(path, folder)
+        assert f.md5 == md5
+        row("full", server, t)
+
+        t = time.perf_counter()
+        server.drop_after = server._chunks + args.cut
+        try:
+            client(server, sessions, chunk).upload(path, folder, file_id=f.id)
+        except requests.ConnectionError:
+            pass
+        server.drop_after = None
+        f = client(server, sessions, chunk).upload(path, folder, file_id=f.id)
+        assert f.md5 == md5
+        row("cut+resume", server, t, "(cut + resumed)")
+
+        t = time.perf_counter()
+        server.drop_after = server._chunks + args.cut
+        try:
+            dc.GoogleDrive(requests.Session, api_url=server.url,
+                           chunk_size=chunk).upload(path, folder, file_id=f.id)
+        except requests.ConnectionError:
+            pass
+        server.drop_after = None
+        # no persisted session: start again from byte 0
+        f = dc.GoogleDrive(requests.Session, api_url=server.url,
+                           chunk_size=chunk).upload(path, folder, file_id=f.id)
+        row("restart", server, t, "(cut + from scratch)")
+
+        cache = dsd.FolderCache(os.path.join(work, "folders.json"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            dsd.upload_file_to_drive(client(server, sessions, chunk), path,
+                                     folder, cache)
+        server.requests.clear()  # the one-off folder listing
+        server.received = 0
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            dsd.upload_file_to_drive(client(server, sessions, chunk), path,
+                                     folder, cache)
+        row("unchanged", server, t, "(MD5 matched, hashing only)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Write-to-upload latency of drive_sync_daemon's watch mode, against FakeDrive.
+
+A report is written into LOCAL_WATCH_DIR the way the generators do it (open,
+several writes with short pauses, close); the latency is from the close to
+the locked copy landing on the fake Drive. Encryption and archiving are the
+daemon's real process_file.
+
+  inotify   dir_watch.InotifyWatcher (debounce WATCH_DEBOUNCE)
+  polling   dir_watch.PollingWatcher every --interval seconds (the old
+            daemon globbed every POLL_INTERVAL = 20 s)
+
+Usage:
+  python3 scripts/bench_drive_watch.py [--reports 10] [--interval 2]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import drive_client
+import drive_sync_daemon as dsd
+import pdf_render
+
+
+class TimedDrive(drive_client.FakeDrive):
+    """FakeDrive that records when each name was uploaded."""
+
+    def __init__(self, latency):
+        super().__init__(latency)
+        self.landed = {}
+
+    def upload(self, local_path, parent_id, name=None, file_id=None, md5=None):
+        fid = super().upload(local_path, parent_id, name, file_id, md5)
+        self.landed[name or os.path.basename(local_path)] = time.perf_counter()
+        return fid
+
+
+def write_slowly(path, data, pieces=4, pause=0.05):
+    # a writer that takes a while: must not be picked up half-written
+    with open(path, "wb") as fh:
+        step = len(data) // pieces + 1
+        for i in range(0, len(data), step):
+            fh.write(data[i:i + step])
+            fh.flush()
+            time.sleep(pause)
+    return time.perf_counter()
+
+
+def measure(mode, reports, interval, latency):
+    work = tempfile.mkdtemp(prefix=f"jravis_watch_{mode}_")
+    dsd.LOCAL_WATCH_DIR = os.path.join(work, "to_upload")
+    dsd.LOCAL_ARCHIVE_DIR = os.path.join(work, "archive")
+    dsd.POLL_INTERVAL = interval
+    os.makedirs(dsd.LOCAL_WATCH_DIR)
+    cache = dsd.FolderCache(os.path.join(work, "folders.json"))
+    drive = TimedDrive(latency)
+    uploads = dsd.UploadQueue(
+        drive, handler=lambda d, p: dsd.process_file(d, p, cache))
+    watcher = dsd.make_watcher(uploads, polling=(mode == "polling"))
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+
+    pdf = pdf_render.render_bytes("summary", title="Summary",
+                                  lines=[f"line {i}" for i in range(200)])
+    out = []
+    for i in range(reports):
+        closed = write_slowly(
+            os.path.join(dsd.LOCAL_WATCH_DIR, f"report_{i}.pdf"), pdf)
+        name = f"report_{i}_locked.pdf"
+        deadline = time.perf_counter() + 4 * interval + 10
+        while name not in drive.landed and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        if name not in drive.landed:
+            raise RuntimeError(f"{mode}: {name} never uploaded")
+        out.append(drive.landed[name] - closed)
+        time.sleep(0.3)  # reports arrive one at a time
+    watcher.stop()
+    thread.join()
+    uploads.close()
+    # nothing half-written: no Drive copy is shorter than the document
+    for item in drive.items.values():
+        if not item["folder"] and len(item["data"]) < len(pdf):
+            raise RuntimeError(f"{mode}: truncated upload {item['name']}")
+    return type(watcher).__name__, out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--reports", type=int, default=10)
+    p.add_argument("--interval", type=float, default=2.0,
+                   help="polling interval (s)")
+    p.add_argument("--latency", type=float, default=0.02,
+                   help="fake Drive round trip (s)")
+    args = p.parse_args()
+    for mode in ("inotify", "polling"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            kind, lat = measure(mode, args.reports, args.interval,
+                                args.latency)
+        print(f"{mode:<8} {kind:<15} median {statistics.median(lat):6.3f} s"
+              f"   max {max(lat):6.3f} s   ({len(lat)} reports)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Per-request overhead of flask_metrics.instrument().
+
+Two measurements on a trivial app:
+  1) the three hooks alone (start / status / finish) inside a request
+     context: the cost instrument() adds to each request;
+  2) full test-client requests with and without instrumentation (noisier,
+     since the test client itself costs tens of microseconds).
+
+Usage:
+  python3 scripts/bench_flask_metrics.py [requests]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from flask import Flask  # noqa: E402
+
+from flask_metrics import instrument  # noqa: E402
+
+
+def make_app(instrumented):
+    app = Flask(f"bench_{'on' if instrumented else 'off'}")
+
+    @app.route("/ping")
+    def ping():
+        return "ok"
+
+    if instrumented:
+        instrument(app)
+    return app
+
+
+def per_request_us(client, n):
+    client.get("/ping")
+    t = time.perf_counter()
+    for _ in range(n):
+        client.get("/ping")
+    return (time.perf_counter() - t) / n * 1e6
+
+
+def hooks_us(app, n):
+    start = app.before_request_funcs[None][0]
+    status = app.after_request_funcs[None][0]
+    finish = app.teardown_request_funcs[None][0]
+    resp = app.response_class("ok")
+    with app.test_request_context("/ping"):
+        app.url_map.bind("localhost").match("/ping")
+        t = time.perf_counter()
+        for _ in range(n):
+            start()
+            status(resp)
+            finish(None)
+        return (time.perf_counter() - t) / n * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    on = make_app(True)
+    print(f"hooks only:         {hooks_us(on, n * 10):6.2f} us/request")
+    off, on_client = make_app(False).test_client(), on.test_client()
+    off_runs, on_runs = [], []
+    for _ in range(5):  # interleave so machine noise hits both sides
+        off_runs.append(per_request_us(off, n))
+        on_runs.append(per_request_us(on_client, n))
+    off_us, on_us = min(off_runs), min(on_runs)
+    print(f"test client, off:   {off_us:6.2f} us/request")
+    print(f"test client, on:    {on_us:6.2f} us/request "
+          f"({on_us - off_us:+.2f} us)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Daily report mail through the Gmail API: the old per-run build vs
+gmail_client, against gmail_client.FakeGmail (--latency seconds per HTTP
+request).
+
+  old            per run: getProfile, then per recipient a MIMEMultipart
+                 with every PDF read and encoded again, the whole message
+                 base64url'd into "raw", one send request each
+  gmail_client   one sender for all runs: profile asked once, PDF parts from
+                 the PartCache, messages built by smtp_stream and sent in one
+                 batch request (or one media upload for a single recipient)
+
+and finding the newest *_locked.pdf among --archive files:
+
+  glob + sort    glob, stat every file, sort by mtime
+  scandir        one scandir pass, heapq.nlargest
+  catalog        report_catalog.latest (index scan, stops after n)
+
+Usage:
+  python3 scripts/bench_gmail_send.py [--recipients 10] [--runs 3]
+                                      [--pdf-mb 2] [--archive 20000]
+                                      [--latency 0.1] [workdir]
+"""
+
+import argparse
+import base64
+import glob
+import mimetypes
+import os
+import sys
+import tempfile
+import time
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import email_automation_daemon as daemon
+import gmail_client
+import report_catalog
+
+
+def old_message(sender, to, subject, html, attachments):
+    """The old make_message_with_attachments."""
+    msg = MIMEMultipart()
+    msg["From"], msg["To"], msg["Subject"] = sender, to, subject
+    msg.attach(MIMEText(html, "html"))
+    for path in attachments:
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        part = MIMEBase(*ctype.split("/", 1))
+        with open(path, "rb") as f:
+            part.set_payload(f.read())
+        encoders.encode_base64(part)
+        part.add_header("Content-Disposition",
+                        f"attachment; filename=\"{os.path.basename(path)}\"")
+        msg.attach(part)
+    return {"raw": base64.urlsafe_b64encode(msg.as_bytes()).decode()}
+
+
+def old_run(gmail, recipients, attachments):
+    sender = gmail.users().getProfile(userId="me").execute()["emailAddress"]
+    for to in recipients:
+        body = old_message(sender, to, "JRAVIS Daily Report",
+                           daemon.build_email_html("2026-10-19", attachments,
+                                                   to), attachments)
+        gmail.users().messages().send(userId="me", body=body).execute()
+
+
+def new_run(sender, recipients, attachments):
+    messages = [
+        sender.message(sender.address(), to, "JRAVIS Daily Report",
+                       daemon.build_email_html("2026-10-19", attachments, to),
+                       attachments) for to in recipients
+    ]
+    sender.send(messages)
+
+
+def make_archive(work, n, pdf_bytes):
+    arch = os.path.join(work, "archive")
+    os.makedirs(arch, exist_ok=True)
+    now = time.time()
+    paths = []
+    for i in range(n):
+        p = os.path.join(arch, f"{i:06d}__report_{i}_locked.pdf")
+        with open(p, "wb") as f:
+            f.write(os.urandom(pdf_bytes) if i >= n - 2 else b"%PDF-1.4\n")
+        os.utime(p, (now - n + i, now - n + i))
+        paths.append(p)
+    return arch, paths
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        wall = time.perf_counter() - t
+        best = wall if best is None else min(best, wall)
+    return best, out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--recipients", type=int, default=10)
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--pdf-mb", type=float, default=2)
+    p.add_argument("--archive", type=int, default=20000)
+    p.add_argument("--latency", type=float, default=0.1)
+    p.add_argument("workdir", nargs="?")
+    args = p.parse_args()
+    work = args.workdir or tempfile.mkdtemp(prefix="jravis_gmail_")
+    arch, paths = make_archive(work, args.archive,
+                               int(args.pdf_mb * 1024 * 1024))
+    db = os.path.join(work, "catalog.db")
+    report_catalog.register_many(((p, "report") for p in paths), db_path=db)
+    recipients = [f"boss{i}@example.com" for i in range(args.recipients)]
+
+    lookups = (("glob + sort", lambda: sorted(
+        glob.glob(os.path.join(arch, "*_locked.pdf")), key=os.path.getmtime,
+        reverse=True)[:5]),
+               ("scandir", lambda: daemon.scan_latest_files(
+                   arch, "_locked.pdf", 5)),
+               ("catalog", lambda: report_catalog.latest(
+                   5, "_locked.pdf", root=arch, db_path=db)))
+    print(f"newest 5 of {args.archive} archived files")
+    expect = None
+    for name, fn in lookups:
+        wall, found = timed(fn)
+        expect = expect or found
+        print(f"  {name:<12} {wall * 1000:8.1f} ms  "
+              f"{'same' if found == expect else 'DIFFERENT'}")
+    attachments = expect[:2]
+
+    print(f"{args.runs} runs x {args.recipients} recipients, 2 x "
+          f"{args.pdf_mb:g} MB PDFs, {args.latency * 1000:.0f} ms per request")
+    for name in ("old", "gmail_client"):
+        gmail = gmail_client.FakeGmail(latency=args.latency)
+        sender = gmail_client.GmailSender(gmail, media=gmail.media)
+        t = time.perf_counter()
+        for _ in range(args.runs):
+            if name == "old":
+                old_run(gmail, recipients, attachments)
+            else:
+                new_run(sender, recipients, attachments)
+        wall = time.perf_counter() - t
+        calls = sum(gmail.calls.values())
+        extra = (f"  parts encoded {sender.parts.misses}, reused "
+                 f"{sender.parts.hits}" if name != "old" else "")
+        print(f"  {name:<12} {wall:6.2f} s  {calls:3d} HTTP requests "
+              f"({dict(gmail.calls)})  {gmail.bytes_in / 1e6:7.1f} MB sent  "
+              f"{len(gmail.sent)} delivered{extra}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
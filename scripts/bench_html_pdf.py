@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+HTML -> PDF for N invoice HTMLs: one wkhtmltopdf per file vs html_pdf batches.
+
+  per-file     pdfkit.from_file per invoice (the old auto_pdf loop)
+  batched      html_pdf.render_many, HTML_PDF_BATCH invoices per converter
+  pdf_render   the compiled "invoice" template, no HTML at all (reference)
+
+The invoices are invoice_template.html filled with generated line items.
+
+Usage:
+  python3 scripts/bench_html_pdf.py [invoices]     (default 200)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import html_pdf  # noqa: E402
+import pdf_render  # noqa: E402
+
+
+def invoice(i):
+    items = [(n, f"Design service {n}", n % 3 + 1, 250, (n % 3 + 1) * 250)
+             for n in range(1, 6)]
+    return {
+        "date": "01-01-2025",
+        "invoice_no": f"INV-{1000 + i}",
+        "client_name": f"Client {i}",
+        "items": items,
+        "grand_total": sum(row[-1] for row in items),
+    }
+
+
+def to_html(template, data):
+    rows = "".join("<tr>" + "".join(f"<td>{v}</td>" for v in row) + "</tr>"
+                   for row in data["items"])
+    html = template.replace("{{items}}", rows)
+    for key in ("date", "invoice_no", "client_name", "grand_total"):
+        html = html.replace("{{%s}}" % key, str(data[key]))
+    return html
+
+
+def timed(name, fn, n):
+    t0 = time.perf_counter()
+    ok = sum(1 for p in fn() if p)
+    wall = time.perf_counter() - t0
+    print(f"{name:<12} {wall:8.2f} s   {wall / n * 1000:8.1f} ms/invoice   "
+          f"({ok}/{n} written)")
+    return wall
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tmp = Path(tempfile.mkdtemp(prefix="jravis_html_"))
+    template = (ROOT / "invoice_template.html").read_text()
+    data = [invoice(i) for i in range(n)]
+    pairs = []
+    for i, d in enumerate(data):
+        src = tmp / f"invoice_{i}.html"
+        src.write_text(to_html(template, d))
+        pairs.append((str(src), str(tmp / f"invoice_{i}.pdf")))
+
+    try:
+        binary = html_pdf.find_wkhtmltopdf()
+    except FileNotFoundError as e:
+        binary = None
+        print(f"{e}; HTML rows skipped")
+
+    results = {}
+    if binary:
+        import pdfkit
+        config = pdfkit.configuration(wkhtmltopdf=binary)
+        results["per-file"] = timed(
+            "per-file", lambda: [
+                pdfkit.from_file(src, out, configuration=config,
+                                 options={"quiet": ""}) and out
+                for src, out in pairs
+            ], n)
+        results["batched"] = timed("batched",
+                                   lambda: html_pdf.render_many(pairs), n)
+    results["pdf_render"] = timed(
+        "pdf_render", lambda: [
+            pdf_render.render("invoice", out, **d)
+            for d, (_, out) in zip(data, pairs)
+        ], n)
+    if binary:
+        print(f"batched speed-up: "
+              f"{results['per-file'] / results['batched']:.1f}x")
+    shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Alert producer latency and crash safety: inline SMTP retries vs mail_outbox.
+
+  inline retries   the old alerts.send_email against a down SMTP server:
+                   connect, fail, sleep 2**attempt, --old-retries times
+  outbox put       --alerts distinct alerts queued with SMTP down:
+                   per-call latency percentiles
+  crash + restart  a child queues --crash alerts with SMTP down and dies
+                   (os._exit, nothing flushed); a fresh Outbox on the same
+                   database then delivers them to a mail_service.SinkServer
+  storm            --alerts identical alerts: rows kept after dedup
+
+Usage:
+  python3 scripts/bench_mail_outbox.py [--alerts 10000] [--crash 200]
+                                       [--old-retries 3] [workdir]
+"""
+
+import argparse
+import os
+import smtplib
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import mail_outbox
+import mail_service
+
+CRASH = """
+import os
+import sys
+sys.path.insert(0, %r)
+import mail_outbox
+import mail_service
+db, port, n = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+outbox = mail_outbox.Outbox(db)
+acct = mail_service.Account("127.0.0.1", port, "bot@x", "secret")
+for i in range(n):
+    outbox.alert(acct, "bot@x", ["me@x"], f"ERROR #{i}", f"line {i}")
+os._exit(1)
+""" % str(ROOT)
+
+
+def dead_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def inline(port, retries):
+    """The old send_email loop, one call."""
+    msg = EmailMessage()
+    msg["From"], msg["To"], msg["Subject"] = "bot@x", "me@x", "ERROR"
+    msg.set_content("line")
+    attempt = 0
+    while attempt < retries:
+        try:
+            with smtplib.SMTP("127.0.0.1", port, timeout=20) as smtp:
+                smtp.login("bot@x", "secret")
+                smtp.send_message(msg)
+            return True
+        except Exception:
+            attempt += 1
+            time.sleep(min(60, 2**attempt))
+    return False
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--alerts", type=int, default=10000)
+    p.add_argument("--crash", type=int, default=200)
+    p.add_argument("--old-retries", type=int, default=3)
+    p.add_argument("workdir", nargs="?")
+    args = p.parse_args()
+    work = args.workdir or tempfile.mkdtemp(prefix="jravis_outbox_")
+    os.makedirs(work, exist_ok=True)
+    down = mail_service.Account("127.0.0.1", dead_port(), "bot@x", "secret")
+
+    if args.old_retries:
+        t = time.perf_counter()
+        inline(down.port, args.old_retries)
+        print(f"{'inline retries':<16} one call blocked "
+              f"{time.perf_counter() - t:6.2f} s ({args.old_retries} attempts)")
+
+    outbox = mail_outbox.Outbox(os.path.join(work, "put.db"))
+    lat = []
+    for i in range(args.alerts):
+        t = time.perf_counter()
+        outbox.alert(down, "bot@x", ["me@x"], f"ERROR #{i}", f"line {i}")
+        lat.append((time.perf_counter() - t) * 1e6)
+    lat.sort()
+    print(f"{'outbox put':<16} {args.alerts} calls, SMTP down: p50 "
+          f"{statistics.median(lat):5.0f} us  p99 "
+          f"{lat[int(len(lat) * .99)]:5.0f} us  max {lat[-1]:6.0f} us")
+
+    for i in range(args.alerts):
+        outbox.alert(down, "bot@x", ["me@x"], "ERROR disk full", "same line")
+    storm = outbox._query("SELECT COUNT(*) FROM outbox WHERE subject = ?",
+                          ("ERROR disk full", ))[0][0]
+    outbox.close()
+
+    db = os.path.join(work, "crash.db")
+    with mail_service.SinkServer() as sink:
+        subprocess.call([sys.executable, "-c", CRASH, db, str(sink.port),
+                         str(args.crash)])
+        queued = mail_outbox.Outbox(db).counts().get("queued", 0)
+        t = time.perf_counter()
+        revived = mail_outbox.Outbox(db, rate=0)
+        revived.put(mail_service.Account("127.0.0.1", sink.port, "bot@x",
+                                         "secret"), "bot@x", ["me@x"],
+                    "restart", "worker up")
+        revived.drain(60)
+        counts = revived.counts()
+        revived.close()
+        print(f"{'crash + restart':<16} {queued} queued at the crash, "
+              f"{counts.get('sent', 0) - 1} delivered after restart in "
+              f"{time.perf_counter() - t:5.2f} s as {len(sink.messages) - 1} "
+              f"digest(s)")
+    print(f"{'storm':<16} {args.alerts} identical alerts -> {storm} row(s) "
+          f"queued")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
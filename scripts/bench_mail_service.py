@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Mail delivery cost: a connection per message vs mail_service.
+
+A local mail_service.SinkServer stands in for the SMTP server; --latency
+seconds are spent on its greeting and again on AUTH, roughly what TLS
+setup and login cost against smtp.gmail.com. --messages messages go out:
+
+  per-message    the old senders: connect, login, send_message, quit
+  mail_service   MailService.send for each, then wait for all
+  with failures  MailService.send while the sink refuses the first
+                 --fail DATA commands with 451 (retried with backoff)
+
+Usage:
+  python3 scripts/bench_mail_service.py [--messages 50] [--latency 0.15]
+"""
+
+import argparse
+import smtplib
+import sys
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import mail_service
+
+
+def per_message(port, n):
+    for i in range(n):
+        msg = EmailMessage()
+        msg["From"], msg["To"], msg["Subject"] = "bot@x", "me@x", f"alert {i}"
+        msg.set_content("ERROR something broke")
+        with smtplib.SMTP("127.0.0.1", port, timeout=30) as smtp:
+            smtp.login("bot@x", "secret")
+            smtp.send_message(msg)
+
+
+def service(port, n, **kw):
+    svc = mail_service.MailService(
+        mail_service.Account("127.0.0.1", port, "bot@x", "secret"), **kw)
+    futures = [svc.send("bot@x", ["me@x"], f"alert {i}",
+                        "ERROR something broke") for i in range(n)]
+    svc.flush()
+    for f in futures:
+        f.result()
+    svc.close()
+    return svc
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--messages", type=int, default=50)
+    p.add_argument("--latency", type=float, default=0.15)
+    p.add_argument("--fail", type=int, default=3)
+    args = p.parse_args()
+    n = args.messages
+    rows = (("per-message", lambda port: per_message(port, n)),
+            ("mail_service", lambda port: service(port, n)),
+            ("with failures", lambda port: service(port, n, backoff=0.2)))
+    print(f"{n} messages, {args.latency * 1000:.0f} ms handshake + "
+          f"{args.latency * 1000:.0f} ms login")
+    for name, run in rows:
+        with mail_service.SinkServer(latency=args.latency) as sink:
+            if name == "with failures":
+                sink.fail_next = args.fail
+            t = time.perf_counter()
+            run(sink.port)
+            wall = time.perf_counter() - t
+            print(f"{name:<14} {wall:6.2f} s  {sink.connections:3d} "
+                  f"connections  {sink.logins:3d} logins  "
+                  f"{len(sink.messages):3d} messages delivered")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Encrypt time / peak RSS for one N-page report: PyPDF2 PdfWriter vs pdf_crypt.
+
+  PdfWriter      the old encrypt_pdf: every page into a PdfWriter, RC4-128
+  pdf_crypt      pdf_crypt.encrypt_pdf: streamed, AES-256
+  render+lock    pdf_render summary rendered, then pdf_crypt.encrypt_pdf
+  render locked  the same summary rendered with password= (no plaintext file)
+  (imports)      a child that only imports PyPDF2 + pdf_crypt: the RSS floor
+
+The input is an fpdf document with DejaVuSans embedded (like the Unicode
+daily reports). Each row runs in a fresh subprocess so ru_maxrss is its own
+peak.
+
+Usage:
+  python3 scripts/bench_pdf_encrypt.py [pages] [workdir]     (default 200)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+FONT = ROOT / "DailyReport" / "DejaVuSans.ttf"
+PASSWORD = "MY OG"
+
+PRELUDE = """
+import sys
+sys.path.insert(0, %r)
+from PyPDF2 import PdfReader, PdfWriter
+import pdf_crypt
+import pdf_render
+""" % str(ROOT)
+
+OLD = PRELUDE + """
+reader = PdfReader(sys.argv[1])
+writer = PdfWriter()
+for page in reader.pages:
+    writer.add_page(page)
+writer.encrypt(%r)
+with open(sys.argv[2], "wb") as f:
+    writer.write(f)
+""" % PASSWORD
+
+NEW = PRELUDE + """
+pdf_crypt.encrypt_pdf(sys.argv[1], sys.argv[2], %r)
+""" % PASSWORD
+
+LINES = """
+lines = ["Orders, income and system activity — entry %d" % i
+         for i in range(46 * int(sys.argv[3]))]
+"""
+
+RENDER_THEN_LOCK = PRELUDE + LINES + """
+plain = sys.argv[2] + ".plain.pdf"
+pdf_render.render("summary", plain, title="Summary", lines=lines)
+pdf_crypt.encrypt_pdf(plain, sys.argv[2], %r)
+""" % PASSWORD
+
+RENDER_LOCKED = PRELUDE + LINES + """
+pdf_render.render("summary", sys.argv[2], %r, title="Summary", lines=lines)
+""" % PASSWORD
+
+IMPORTS = PRELUDE
+
+
+# built in a child too: a forked child's ru_maxrss starts at the parent's RSS
+MAKE_INPUT = """
+import sys
+from fpdf import FPDF
+pdf = FPDF()
+pdf.add_font("DejaVu", "", %r, uni=True)
+for page in range(int(sys.argv[3])):
+    pdf.add_page()
+    pdf.set_font("DejaVu", "", 11)
+    pdf.cell(0, 10, f"JRAVIS Report — page {page + 1}", ln=True)
+    pdf.multi_cell(0, 6, "Orders, income and system activity ₹ 0123456789 "
+                   "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ\\n" * 20)
+pdf.output(sys.argv[2])
+""" % str(FONT)
+
+
+def run(code, *args):
+    """Run one row in a child; returns (seconds, the child's peak RSS in KB)."""
+    t = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code, *map(str, args)])
+    _, status, usage = os.wait4(proc.pid, 0)
+    if os.waitstatus_to_exitcode(status):
+        raise RuntimeError(f"child exited with {status}")
+    return time.perf_counter() - t, usage.ru_maxrss
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    folder = sys.argv[2] if len(sys.argv) > 2 else tempfile.mkdtemp(
+        prefix="jravis_encrypt_")
+    os.makedirs(folder, exist_ok=True)
+    src = os.path.join(folder, f"report_{pages}.pdf")
+    if not os.path.exists(src):
+        print(f"Generating a {pages}-page input in {folder} ...")
+        run(MAKE_INPUT, "-", src, pages)
+    print(f"input: {pages} pages, {os.path.getsize(src) / 1e6:.2f} MB")
+
+    times = {}
+    for name, code in (("(imports)", IMPORTS), ("PdfWriter", OLD),
+                       ("pdf_crypt", NEW), ("render+lock", RENDER_THEN_LOCK),
+                       ("render locked", RENDER_LOCKED)):
+        # every child gets: input, output, pages
+        out = os.path.join(folder, f"locked_{name.strip('()').replace(' ', '_')}.pdf")
+        dt, peak = run(code, src, out, pages)
+        times[name] = dt
+        line = f"{name:<14} {dt:6.2f} s   peak RSS {peak / 1024:7.1f} MB"
+        if os.path.exists(out):
+            from PyPDF2 import PdfReader
+            reader = PdfReader(out)
+            reader.decrypt(PASSWORD)
+            line += (f"   output {os.path.getsize(out) / 1e6:6.2f} MB   "
+                     f"{len(reader.pages)} pages")
+        print(line)
+    base = times["(imports)"]
+    print(f"pdf_crypt speed-up vs PdfWriter (imports excluded): "
+          f"{(times['PdfWriter'] - base) / (times['pdf_crypt'] - base):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
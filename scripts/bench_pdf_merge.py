@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Peak RSS / output size of the weekly merge: PyPDF2 PdfWriter vs pdf_merge.
+
+Generates N daily-report style PDFs (fpdf, DejaVuSans embedded as in the
+unicode reports) and merges them both ways, each in a fresh subprocess so
+ru_maxrss is the merge's own peak.
+
+Usage:
+  python3 scripts/bench_pdf_merge.py [count] [workdir]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+FONT = ROOT / "DailyReport" / "DejaVuSans.ttf"
+
+OLD = """
+import sys
+from PyPDF2 import PdfReader, PdfWriter
+writer = PdfWriter()
+for p in sys.argv[2:]:
+    for page in PdfReader(p).pages:
+        writer.add_page(page)
+with open(sys.argv[1], "wb") as f:
+    writer.write(f)
+"""
+
+NEW = """
+import sys
+sys.path.insert(0, %r)
+from pdf_merge import merge_pdfs
+merge_pdfs(sys.argv[2:], sys.argv[1])
+""" % str(ROOT)
+
+
+def make_inputs(folder, n):
+    from fpdf import FPDF
+    paths = []
+    for i in range(n):
+        pdf = FPDF()
+        pdf.add_font("DejaVu", "", str(FONT), uni=True)
+        for page in range(2):
+            pdf.add_page()
+            pdf.set_font("DejaVu", "", 12)
+            pdf.cell(0, 10, f"JRAVIS Daily Summary — day {i + 1}", ln=True)
+            pdf.multi_cell(0, 7, "Orders, income and system activity ₹ 0123456789 "
+                           "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ\n" * 15)
+        path = os.path.join(folder, f"daily_{i:04d}.pdf")
+        pdf.output(path)
+        paths.append(path)
+    return paths
+
+
+def run(code, out, inputs):
+    """Run one merge in a child; returns (seconds, the child's own peak RSS in KB)."""
+    t = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code, out, *inputs])
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise RuntimeError(f"merge exited with {proc.returncode}")
+    return time.perf_counter() - t, usage.ru_maxrss
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    folder = sys.argv[2] if len(sys.argv) > 2 else tempfile.mkdtemp(
+        prefix="jravis_merge_")
+    os.makedirs(folder, exist_ok=True)
+    inputs = sorted(str(p) for p in Path(folder).glob("daily_*.pdf"))[:n]
+    if len(inputs) < n:
+        print(f"Generating {n} input PDFs in {folder} ...")
+        inputs = make_inputs(folder, n)
+    total_in = sum(os.path.getsize(p) for p in inputs)
+    print(f"inputs: {n} PDFs, {total_in / 1e6:.1f} MB")
+
+    from PyPDF2 import PdfReader
+    for name, code in (("pdf_merge", NEW), ("PdfWriter", OLD)):
+        out = os.path.join(folder, f"merged_{name}.pdf")
+        dt, peak = run(code, out, inputs)
+        pages = len(PdfReader(out).pages)
+        print(f"{name:<10} {dt:6.1f} s   peak RSS {peak / 1024:7.1f} MB   "
+              f"output {os.path.getsize(out) / 1e6:7.2f} MB   {pages} pages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
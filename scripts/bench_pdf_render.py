@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Per-invoice render time: FPDF / wkhtmltopdf per document vs pdf_render.
+
+  fpdf-core     the old income_core_cloud layout, new FPDF per order
+  fpdf-dejavu   same, registering DejaVuSans per document (Unicode text)
+  wkhtmltopdf   invoice_template.html through pdfkit, one process per file
+                (skipped when wkhtmltopdf is not on PATH)
+  pdf_render    the compiled "order_invoice" / "invoice" templates; the
+                "(₹)" row has non-Latin text and so embeds DejaVuSans
+
+Rows marked "in memory" skip the file write (fpdf dest="S" vs render_bytes),
+which is what dominates both sides once fonts are out of the picture.
+
+Usage:
+  python3 scripts/bench_pdf_render.py [invoices]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fpdf import FPDF  # noqa: E402
+
+import pdf_render  # noqa: E402
+
+FONT = ROOT / "DailyReport" / "DejaVuSans.ttf"
+
+
+def order(i, notes="Bulk benchmark order — mug, 2 × 499"):
+    return {
+        "platform": "printify",
+        "order_id": f"ORD{i:06d}",
+        "amount": 10 + i % 90,
+        "currency": "INR",
+        "buyer_name": f"Buyer {i}",
+        "notes": notes,
+    }
+
+
+def fpdf_invoice(o, path, unicode_font=False):
+    pdf = FPDF()
+    pdf.add_page()
+    if unicode_font:
+        pdf.add_font("DejaVu", "", str(FONT), uni=True)
+        pdf.set_font("DejaVu", size=12)
+        notes = o["notes"]
+    else:
+        pdf.set_font("Helvetica", size=12)
+        notes = o["notes"].encode("latin-1", "replace").decode("latin-1")
+    pdf.cell(0, 10, "JRAVIS Invoice", ln=True)
+    pdf.cell(0, 8, f"Order ID: {o['order_id']}", ln=True)
+    pdf.cell(0, 8, f"Platform: {o['platform']}", ln=True)
+    pdf.cell(0, 8, f"Buyer: {o['buyer_name']}", ln=True)
+    pdf.cell(0, 8, f"Amount: {o['currency']} {o['amount']}", ln=True)
+    pdf.ln(6)
+    pdf.multi_cell(0, 6, f"Details: {notes}")
+    return pdf.output(path, "F" if path else "S")
+
+
+def render_invoice(o, path):
+    fields = dict(order_id=o["order_id"], platform=o["platform"],
+                  buyer_name=o["buyer_name"], currency=o["currency"],
+                  amount=o["amount"], details=[f"Details: {o['notes']}"])
+    if path is None:
+        return pdf_render.render_bytes("order_invoice", **fields)
+    return pdf_render.render("order_invoice", path, **fields)
+
+
+def html_invoice(o, path, template, config):
+    import pdfkit
+    rows = (f"<tr><td>1</td><td>{o['notes']}</td><td>1</td>"
+            f"<td>{o['amount']}</td><td>{o['amount']}</td></tr>")
+    html = (template.replace("{{date}}", "2025-01-01")
+            .replace("{{invoice_no}}", o["order_id"])
+            .replace("{{client_name}}", o["buyer_name"])
+            .replace("{{items}}", rows)
+            .replace("{{grand_total}}", str(o["amount"])))
+    pdfkit.from_string(html, path, configuration=config, options={"quiet": ""})
+
+
+def template_invoice(o, path):
+    pdf_render.render("invoice", path, date="2025-01-01",
+                      invoice_no=o["order_id"], client_name=o["buyer_name"],
+                      items=[(1, o["notes"], 1, o["amount"], o["amount"])],
+                      grand_total=o["amount"])
+
+
+def measure(name, fn, n, tmp, make=order, to_disk=True):
+    out = os.path.join(tmp, name.replace(" ", "_"))
+    os.makedirs(out, exist_ok=True)
+    size = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        if to_disk:
+            fn(make(i), os.path.join(out, f"invoice_{i}.pdf"))
+        else:
+            size += len(fn(make(i), None))
+    wall = time.perf_counter() - t0
+    if to_disk:
+        size = sum(f.stat().st_size for f in Path(out).iterdir())
+    shutil.rmtree(out, ignore_errors=True)
+    print(f"{name:<26} {wall / n * 1000:8.3f} ms/invoice   "
+          f"{n / wall:8.0f} invoices/s   {size / n / 1024:6.1f} KB each")
+    return wall / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    tmp = tempfile.mkdtemp(prefix="jravis_render_")
+    t0 = time.perf_counter()
+    pdf_render.get_template("order_invoice")
+    pdf_render.get_template("invoice")
+    print(f"{n} invoices; fonts + templates compiled once in "
+          f"{(time.perf_counter() - t0) * 1000:.0f} ms")
+    base = {
+        "fpdf-core": measure("fpdf-core", fpdf_invoice, n, tmp),
+        "fpdf-dejavu": measure(
+            "fpdf-dejavu", lambda o, p: fpdf_invoice(o, p, True), n, tmp),
+    }
+    wk = shutil.which("wkhtmltopdf")
+    if wk:
+        import pdfkit
+        template = (ROOT / "invoice_template.html").read_text()
+        config = pdfkit.configuration(wkhtmltopdf=wk)
+        base["wkhtmltopdf"] = measure(
+            "wkhtmltopdf", lambda o, p: html_invoice(o, p, template, config),
+            min(n, 200), tmp)
+    else:
+        print(f"{'wkhtmltopdf':<26} (not installed, skipped)")
+    ours = measure("pdf_render order", render_invoice, n, tmp)
+    measure("pdf_render invoice", template_invoice, n, tmp)
+    measure("pdf_render order (₹)", render_invoice, n, tmp,
+            make=lambda i: order(i, "Bulk benchmark order — mug, 2 × ₹499"))
+    print()
+    core = measure("fpdf-core in memory", fpdf_invoice, n, tmp, to_disk=False)
+    mem = measure("pdf_render in memory", render_invoice, n, tmp,
+                  to_disk=False)
+    print()
+    for name, t in base.items():
+        print(f"speed-up vs {name}: {t / ours:.1f}x")
+    print(f"speed-up vs fpdf-core, in memory: {core / mem:.1f}x")
+    shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
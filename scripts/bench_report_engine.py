@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Serial vs report_engine rendering of per-order invoices.
+
+"serial" is the old path: one generate_invoice_pdf-style render after
+another in this process. "engine" is ReportEngine.render_invoices on a pool
+of REPORT_WORKERS (default: all cores). Core usage is CPU seconds spent
+(this process + workers) over wall time.
+
+Usage:
+  python3 scripts/bench_report_engine.py [invoices] [workers]
+"""
+
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("REPORT_CATALOG_DB",
+                      os.path.join(tempfile.mkdtemp(), "catalog.db"))
+
+from report_engine import (ReportEngine, _render_invoice_batch,  # noqa: E402
+                           render_order_invoice)
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + kids.ru_utime + kids.ru_stime
+
+
+def orders(n):
+    return [{
+        "platform": "printify",
+        "order_id": f"ORD{i:06d}",
+        "amount": 10 + i % 90,
+        "currency": "USD",
+        "buyer_name": f"Buyer {i}",
+        "notes": "Bulk benchmark order",
+    } for i in range(n)]
+
+
+def measure(fn, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    c0, t0 = cpu_seconds(), time.perf_counter()
+    paths = fn(out_dir)
+    wall = time.perf_counter() - t0
+    cpu = cpu_seconds() - c0
+    shutil.rmtree(out_dir, ignore_errors=True)
+    return wall, cpu, sum(1 for p in paths if p)
+
+
+def pooled(batch, workers):
+
+    def run(out_dir):
+        # pool start-up and shutdown are part of the cost; shutting down also
+        # reaps the workers so their CPU time shows up in RUSAGE_CHILDREN
+        engine = ReportEngine(workers)
+        try:
+            return engine.render_invoices(batch, out_dir, kind=None)
+        finally:
+            engine.shutdown()
+
+    return run
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    batch = orders(n)
+    tmp = tempfile.mkdtemp(prefix="jravis_invoices_")
+    print(f"{n} invoices, {ReportEngine(workers).max_workers} worker(s), "
+          f"{os.cpu_count()} core(s)")
+    runs = {
+        "serial":
+        lambda d: _render_invoice_batch(render_order_invoice, batch, d),
+        "engine": pooled(batch, workers),
+    }
+    best = {}
+    for _ in range(2):  # interleave so machine noise hits both sides
+        for name, fn in runs.items():
+            r = measure(fn, os.path.join(tmp, name))
+            if name not in best or r[0] < best[name][0]:
+                best[name] = r
+    for name, (wall, cpu, ok) in best.items():
+        print(f"{name:<8} {wall:7.2f} s   {n / wall:7.0f} invoices/s   "
+              f"cores used {cpu / wall:4.1f}   ({ok}/{n} written)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
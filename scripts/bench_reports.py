@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Render-time regression suite for the report generators.
+
+For each scale (orders: 10, 1k, 100k by default) it builds synthetic inputs
+and times one generator per child process, recording wall time, the child's
+peak RSS and the bytes written:
+
+  generate_reports      scripts/generate_reports.main(): connector results
+                        (one connector per 100 orders), summary (encrypted)
+                        + invoices
+  report_invoice_cloud  render_summary_and_invoices() over an earnings ledger
+                        of N entries
+  daily_cycle_cloud     daily_jobs() through report_engine (LOCK_CODE set)
+  weekly_merge          weekly_summary_cloud.merge_pdfs() of min(N, max-docs)
+                        invoices plus the trend cover
+  income_core_invoices  income_core_cloud.generate_invoice_pdf() per order,
+                        min(N, max-docs) orders
+
+Per-document generators stop at --max-docs (default 1000) files; past that
+they measure the disk, not the renderer. Input generation is not timed.
+
+Everything runs offline in a scratch directory: SMTP is a recording fake,
+googleapiclient.discovery.build (when installed) returns a fake Drive
+service, and outbound connections raise. Catalog, cache, ledger and history
+databases are per-run files, so report_cache never serves a hit.
+
+Results are compared with scripts/bench_reports_baseline.json; the run fails
+(exit 1) when time or peak RSS grows by more than --threshold (default 25%,
+ignoring differences under 50 ms / 8 MB) or output size by more than 10%.
+
+Usage:
+  python3 scripts/bench_reports.py [--scales 10 1000 100000] [--only NAME ...]
+  python3 scripts/bench_reports.py --update-baseline
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE = Path(__file__).with_name("bench_reports_baseline.json")
+SCALES = (10, 1000, 100000)
+GENERATORS = ("generate_reports", "report_invoice_cloud", "daily_cycle_cloud",
+              "weekly_merge", "income_core_invoices")
+TIME_SLACK = 0.05  # seconds
+RSS_SLACK = 8 * 1024  # KB
+SIZE_THRESHOLD = 0.10
+PLATFORMS = ("printify", "etsy", "fiverr", "paypal", "gumroad", "meshy")
+
+
+# ---------- offline stubs (child side) ----------
+class OfflineSMTP:
+    """smtplib.SMTP / SMTP_SSL stand-in: records subjects, sends nothing."""
+    sent = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def ehlo(self, *args, **kwargs):
+        return (250, b"offline")
+
+    starttls = login = ehlo
+
+    def send_message(self, msg, *args, **kwargs):
+        OfflineSMTP.sent.append(msg["Subject"])
+        return {}
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        OfflineSMTP.sent.append(str(msg)[:60])
+        return {}
+
+    def quit(self):
+        return (221, b"offline")
+
+    close = quit
+
+
+class OfflineDrive:
+    """Fake Drive service: any files()/permissions() call chain executes
+    to an empty listing with an id."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self, *args, **kwargs):
+        return {"id": "offline", "files": []}
+
+
+def go_offline():
+    import smtplib
+    smtplib.SMTP = smtplib.SMTP_SSL = OfflineSMTP
+    try:
+        import googleapiclient.discovery
+        googleapiclient.discovery.build = lambda *a, **k: OfflineDrive()
+    except ImportError:
+        pass  # nothing benchmarked here imports it without the package
+
+    connect = socket.socket.connect
+
+    def no_network(sock, address):
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            raise OSError(f"bench_reports runs offline (connect to {address})")
+        return connect(sock, address)
+
+    socket.socket.connect = no_network
+    socket.create_connection = lambda address, *a, **k: no_network(
+        socket.socket(), address)
+
+
+# ---------- synthetic data ----------
+def make_orders(n, seed=40):
+    rnd = random.Random(seed)
+    return [{
+        "platform": PLATFORMS[i % len(PLATFORMS)],
+        "order_id": f"ORD{i:07d}",
+        "amount": round(rnd.uniform(5, 500), 2),
+        "currency": "INR",
+        "buyer_name": f"Buyer {i % 997}",
+        "notes": f"Synthetic order {i} — {rnd.choice(['mug', 'tee', 'print'])}",
+    } for i in range(n)]
+
+
+def connector_results(orders):
+    connectors = max(1, len(orders) // 100)
+    results = {}
+    for i, o in enumerate(orders):
+        name = f"{o['platform']}_{i % connectors:04d}"
+        entry = results.setdefault(name, {"status": "ok", "earnings": 0.0})
+        entry["earnings"] += o["amount"]
+    return {"ts": time.time(), "results": results}
+
+
+def seed_ledger(orders):
+    import earnings_store
+    store = earnings_store.open_store(migrate=False)
+    today = date.today()
+    rows = [((today - timedelta(days=i % 30)).isoformat(), o["amount"],
+             o["platform"], o["order_id"]) for i, o in enumerate(orders)]
+    with store.conn:
+        store.conn.executemany(
+            "INSERT INTO earnings (date, ts, amount, source, note) "
+            "VALUES (?, ?, ?, ?, ?)", [(d, d, a, s, n) for d, a, s, n in rows])
+    return store
+
+
+# ---------- generators (child side) ----------
+# each returns (prepare, run): prepare() builds inputs untimed, run() renders
+# and returns the output paths
+def gen_generate_reports(n, work, max_docs):
+    import generate_reports
+
+    def prepare():
+        generate_reports.OUT = work
+        (work / "connector_results.json").write_text(
+            json.dumps(connector_results(make_orders(n))))
+
+    def run():
+        if generate_reports.main() != 0:
+            raise RuntimeError("generate_reports.main() failed")
+        return list(work.glob("*.pdf"))
+
+    return prepare, run
+
+
+def gen_report_invoice_cloud(n, work, max_docs):
+    import report_invoice_cloud
+    box = {}
+
+    def prepare():
+        box["db"] = seed_ledger(make_orders(n))
+
+    def run():
+        return list(report_invoice_cloud.render_summary_and_invoices(box["db"]))
+
+    return prepare, run
+
+
+def gen_daily_cycle_cloud(n, work, max_docs):
+    import daily_cycle_cloud
+    from report_engine import get_engine
+
+    def run():
+        paths = get_engine().run(daily_cycle_cloud.daily_jobs())
+        if not all(paths):
+            raise RuntimeError("daily_cycle_cloud jobs failed")
+        return paths
+
+    return (lambda: None), run
+
+
+def gen_weekly_merge(n, work, max_docs):
+    import pdf_render
+    import weekly_summary_cloud
+    box = {}
+
+    def prepare():
+        box["files"] = []
+        for o in make_orders(min(n, max_docs)):
+            path = str(work / f"invoice_{o['order_id']}.pdf")
+            pdf_render.render("order_invoice", path, details=[o["notes"]], **o)
+            box["files"].append(path)
+
+    def run():
+        out = str(work / "weekly_summary.pdf")
+        cover = weekly_summary_cloud.weekly_cover(box["files"],
+                                                  date.today().isoformat())
+        weekly_summary_cloud.merge_pdfs([cover] + box["files"], out)
+        return [out]
+
+    return prepare, run
+
+
+def gen_income_core_invoices(n, work, max_docs):
+    import income_core_cloud
+    from report_engine import invoice_filename
+    box = {}
+
+    def prepare():
+        box["orders"] = make_orders(min(n, max_docs))
+
+    def run():
+        return [
+            income_core_cloud.generate_invoice_pdf(
+                o, str(work / invoice_filename(o))) for o in box["orders"]
+        ]
+
+    return prepare, run
+
+
+def child(name, n, work, max_docs, result_path):
+    work = Path(work)
+    os.chdir(work)
+    sys.path[:0] = [str(ROOT), str(ROOT / "scripts")]
+    go_offline()
+    prepare, run = globals()["gen_" + name](n, work, max_docs)
+    prepare()
+    t0 = time.perf_counter()
+    paths = run()
+    seconds = time.perf_counter() - t0
+    written = [Path(p) for p in paths if p]
+    size = sum(p.stat().st_size for p in written)
+    Path(result_path).write_text(json.dumps({
+        "seconds": seconds,
+        "bytes": size,
+        "docs": len(written),
+        "emails": len(OfflineSMTP.sent),
+    }))
+
+
+# ---------- parent ----------
+def run_one(name, n, max_docs):
+    work = Path(tempfile.mkdtemp(prefix=f"jravis_bench_{name}_"))
+    env = dict(os.environ,
+               REPORT_CATALOG_DB=str(work / "catalog.db"),
+               REPORT_CACHE_DIR=str(work / "cache"),
+               EARNINGS_DB=str(work / "earnings.db"),
+               HISTORY_DB=str(work / "history.db"),
+               JRAVIS_DB=str(work / "ledger.json"),
+               JR_MEMORY_PATH=str(work / "none.json"),
+               JRAVIS_MEMORY_DB=str(work / "none.json"),
+               REPORTS_DIR=str(work),
+               WORK_DIR=str(work),
+               LOCK_CODE=os.getenv("LOCK_CODE", "bench-lock"),
+               SMTP_SERVER="", SMTP_USER="", SMTP_PASS="")
+    result = work / "result.json"
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--child", name, str(n), str(work),
+         str(max_docs), str(result)],
+        env=env, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    try:
+        if os.waitstatus_to_exitcode(status) or not result.exists():
+            raise RuntimeError(f"{name} @ {n} failed (exit status {status})")
+        out = json.loads(result.read_text())
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    out["peak_rss_kb"] = usage.ru_maxrss
+    return out
+
+
+def regressions(key, now, base, threshold):
+    found = []
+    if now["seconds"] > base["seconds"] * (1 + threshold) + TIME_SLACK:
+        found.append(f"time {base['seconds']:.3f}s -> {now['seconds']:.3f}s")
+    if now["peak_rss_kb"] > base["peak_rss_kb"] * (1 + threshold) + RSS_SLACK:
+        found.append(f"peak RSS {base['peak_rss_kb'] / 1024:.1f} MB -> "
+                     f"{now['peak_rss_kb'] / 1024:.1f} MB")
+    if now["bytes"] > base["bytes"] * (1 + SIZE_THRESHOLD) + 1024:
+        found.append(f"output {base['bytes']} B -> {now['bytes']} B")
+    return [f"{key}: {r}" for r in found]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    p.add_argument("--only", nargs="+", choices=GENERATORS,
+                   default=list(GENERATORS))
+    p.add_argument("--max-docs", type=int, default=1000)
+    p.add_argument("--repeat", type=int, default=3,
+                   help="runs per measurement; the fastest counts")
+    p.add_argument("--threshold", type=float, default=0.25)
+    p.add_argument("--baseline", type=Path, default=BASELINE)
+    p.add_argument("--update-baseline", action="store_true")
+    p.add_argument("--child", nargs=5, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    if args.child:
+        name, n, work, max_docs, result = args.child
+        child(name, int(n), work, int(max_docs), result)
+        return 0
+
+    baseline = (json.loads(args.baseline.read_text())
+                if args.baseline.exists() else {})
+    current, failed = {}, []
+    print(f"{'generator':<22} {'orders':>7} {'docs':>5} {'time':>9} "
+          f"{'peak RSS':>10} {'output':>10}   vs baseline")
+    for n in args.scales:
+        for name in args.only:
+            key = f"{name}@{n}"
+            runs = [run_one(name, n, args.max_docs) for _ in range(args.repeat)]
+            now = min(runs, key=lambda r: r["seconds"])
+            now["peak_rss_kb"] = min(r["peak_rss_kb"] for r in runs)
+            current[key] = now
+            base = baseline.get(key)
+            note = "(no baseline)"
+            if base:
+                bad = regressions(key, now, base, args.threshold)
+                failed.extend(bad)
+                note = ("REGRESSED" if bad else "ok") + \
+                    f" ({now['seconds'] / max(base['seconds'], 1e-9):.2f}x time)"
+            print(f"{name:<22} {n:>7} {now['docs']:>5} {now['seconds']:>8.3f}s "
+                  f"{now['peak_rss_kb'] / 1024:>8.1f}MB "
+                  f"{now['bytes'] / 1024:>8.1f}KB   {note}")
+
+    if args.update_baseline:
+        baseline.update(current)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True)
+                                 + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if failed:
+        print("\nRegressions beyond the threshold:")
+        for line in failed:
+            print("  -", line)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Webhook ack latency under a burst: processing inline vs webhook_queue.
+
+income_core_cloud runs in a child process on a threaded werkzeug server
+(HTTP/1.1 keep-alive); --concurrency client threads post --requests
+Printify order webhooks as fast as it answers, --dup of them redeliveries
+of an order already sent.
+
+  empty route   GET /health: what the server and client alone manage
+  inline        the old handler: ledger, invoice PDF and notify before 200
+  queue         the current routes: validate, queue, 200; then the time the
+                workers need to record and invoice everything
+  queue, capped WEBHOOK_MAX_DEPTH=--cap: how many requests get 503 +
+                Retry-After while the workers catch up
+  sustained     one client posting --rate webhooks/s for --seconds: how
+                long events wait before they are processed while traffic
+                never pauses (bounded by WEBHOOK_SETTLE_MAX_SECS)
+  crash         the server is SIGKILLed right after the burst and started
+                again; every acked order must end up in the ledger once
+  concurrent    --racers threads (the poller and the webhook workers) run
+                process_orders_bulk over the same --race orders at once;
+                each order must be invoiced and notified exactly once
+
+Usage:
+  python3 scripts/bench_webhooks.py [--requests 5000] [--inline 500]
+                                    [--concurrency 16] [--dup 0.1]
+                                    [--cap 300] [--rate 33] [--seconds 4]
+                                    [--race 50] [--racers 3] [workdir]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import webhook_queue
+
+SERVER = """
+import sys
+sys.path.insert(0, %r)
+from flask import jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+import income_core_cloud as core
+
+mode, port = sys.argv[1], int(sys.argv[2])
+if mode == "inline":
+    @core.app.route("/inline/printify", methods=["POST"])
+    def inline_printify():
+        data = request.get_json(force=True)
+        ok = core.process_order_unified("printify", data["id"],
+                                        data["total_price"],
+                                        buyer_name=data["recipient"]["name"])
+        return jsonify({"ok": ok}), 200
+else:
+    core.get_webhook_queue().start()
+WSGIRequestHandler.protocol_version = "HTTP/1.1"
+make_server("127.0.0.1", port, core.app, threaded=True).serve_forever()
+""" % str(ROOT)
+
+RACE = """
+import sys
+import threading
+sys.path.insert(0, %r)
+import income_core_cloud as core
+
+racers, n = int(sys.argv[1]), int(sys.argv[2])
+notified, lock = [], threading.Lock()
+notify = core.notify_post_order
+
+
+def counting(order_record, invoice_path):
+    with lock:
+        notified.append(order_record["order_id"])
+    notify(order_record, invoice_path)
+
+
+core.notify_post_order = counting
+records = [core.make_order_record("printify", f"RACE{i:05d}", 19.99,
+                                  buyer_name=f"buyer {i}") for i in range(n)]
+start = threading.Barrier(racers)
+
+
+def racer():
+    start.wait()
+    core.process_orders_bulk(records)
+
+
+threads = [threading.Thread(target=racer) for _ in range(racers)]
+for th in threads:
+    th.start()
+for th in threads:
+    th.join()
+print(len(notified), len(set(notified)))
+""" % str(ROOT)
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def work_env(work, **env):
+    os.makedirs(work, exist_ok=True)
+    return dict(os.environ, JRAVIS_DB=os.path.join(work, "ledger.json"),
+                WEBHOOK_QUEUE_DB=os.path.join(work, "webhooks.db"),
+                REPORT_CATALOG_DB=os.path.join(work, "catalog.db"),
+                REPORT_CACHE_DIR=os.path.join(work, "cache"),
+                REPORT_WORKERS="1", **{k: str(v) for k, v in env.items()})
+
+
+def start_server(work, mode, **env):
+    port = free_port()
+    env = work_env(work, **env)
+    out = open(os.path.join(work, f"server_{mode}.log"), "ab")
+    proc = subprocess.Popen([sys.executable, "-c", SERVER, mode, str(port)],
+                            cwd=work, env=env, stdout=out, stderr=out)
+    for _ in range(200):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            return proc, port
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f"server did not start, see {out.name}")
+
+
+def payloads(n, dup, seed=1):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        order = rnd.randrange(len(out)) if out and rnd.random() < dup else i
+        out.append({"id": f"PF{order:07d}", "total_price": "19.99",
+                    "currency": "USD", "recipient": {"name": f"buyer {order}"}})
+    return out
+
+
+def load(port, path, bodies, concurrency, method="POST"):
+    """Post bodies from `concurrency` keep-alive connections; returns
+    (seconds, sorted latencies, {status: count})."""
+    lat, codes, lock = [], {}, threading.Lock()
+    todo = iter(enumerate(bodies))
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        mine, seen = [], {}
+        while True:
+            with lock:
+                item = next(todo, None)
+            if item is None:
+                break
+            data = json.dumps(item[1])
+            t = time.perf_counter()
+            try:
+                conn.request(method, path, data,
+                             {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port,
+                                                  timeout=60)
+                status = "error"
+            mine.append(time.perf_counter() - t)
+            seen[status] = seen.get(status, 0) + 1
+        conn.close()
+        with lock:
+            lat.extend(mine)
+            for k, v in seen.items():
+                codes[k] = codes.get(k, 0) + v
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return time.perf_counter() - t, sorted(lat), codes
+
+
+def paced(port, path, bodies, rate):
+    """Post bodies one at a time, `rate` per second."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    start = time.perf_counter()
+    for i, body in enumerate(bodies):
+        time.sleep(max(0.0, start + i / rate - time.perf_counter()))
+        conn.request("POST", path, json.dumps(body),
+                     {"Content-Type": "application/json"})
+        conn.getresponse().read()
+    conn.close()
+    return time.perf_counter() - start
+
+
+def processing_lag(work):
+    """Seconds from ack to processed for every done event, sorted."""
+    with sqlite3.connect(os.path.join(work, "webhooks.db")) as conn:
+        return sorted(r[0] for r in conn.execute(
+            "SELECT done - created FROM events WHERE status = 'done'"))
+
+
+def drain(work, timeout=600):
+    queue = webhook_queue.WebhookQueue(None, os.path.join(work,
+                                                          "webhooks.db"))
+    t = time.perf_counter()
+    ok = queue.drain(timeout)
+    counts = queue.counts()
+    queue.close()
+    return time.perf_counter() - t, ok, counts
+
+
+def ledger_orders(work):
+    with open(os.path.join(work, "ledger.json")) as f:
+        rows = json.load(f).get("_default", {}).values()
+    ids = [r["order_id"] for r in rows]
+    return len(ids), len(set(ids))
+
+
+def report(name, wall, lat, codes, extra=""):
+    n = len(lat)
+    print(f"{name:<14} {n / wall:7.0f} req/s  p50 "
+          f"{statistics.median(lat) * 1000:7.1f} ms  p99 "
+          f"{lat[int(n * .99)] * 1000:7.1f} ms  max {lat[-1] * 1000:7.1f} ms  "
+          f"{dict(sorted(codes.items(), key=str))}{extra}")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=5000)
+    p.add_argument("--inline", type=int, default=500)
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--dup", type=float, default=0.1)
+    p.add_argument("--cap", type=int, default=300)
+    p.add_argument("--rate", type=float, default=33)
+    p.add_argument("--seconds", type=float, default=4)
+    p.add_argument("--race", type=int, default=50)
+    p.add_argument("--racers", type=int, default=3)
+    p.add_argument("workdir", nargs="?")
+    args = p.parse_args()
+    work = args.workdir or tempfile.mkdtemp(prefix="jravis_webhooks_")
+    bodies = payloads(args.requests, args.dup)
+    unique = len({b["id"] for b in bodies})
+    print(f"{args.requests} webhooks ({unique} distinct orders), "
+          f"{args.concurrency} connections")
+
+    proc, port = start_server(os.path.join(work, "empty"), "queue")
+    wall, lat, codes = load(port, "/health", bodies, args.concurrency,
+                            method="GET")
+    proc.terminate()
+    proc.wait()
+    report("empty route", wall, lat, codes)
+
+    if args.inline:
+        proc, port = start_server(os.path.join(work, "inline"), "inline")
+        wall, lat, codes = load(port, "/inline/printify",
+                                bodies[:args.inline], args.concurrency)
+        proc.terminate()
+        proc.wait()
+        report("inline", wall, lat, codes, f"  ({args.inline} requests)")
+
+    rows = (("queue", {}), ("queue, capped", {"WEBHOOK_MAX_DEPTH": args.cap}))
+    for name, env in rows:
+        sub = os.path.join(work, name.replace(", ", "_"))
+        proc, port = start_server(sub, "queue", **env)
+        wall, lat, codes = load(port, "/webhook/printify", bodies,
+                                args.concurrency)
+        seconds, ok, counts = drain(sub)
+        proc.terminate()
+        proc.wait()
+        rows_, distinct = ledger_orders(sub)
+        report(name, wall, lat, codes,
+               f"\n{'':<14} workers done {seconds:5.1f} s after the burst "
+               f"({counts}); ledger {rows_} rows, {distinct} distinct")
+
+    sub = os.path.join(work, "sustained")
+    steady = payloads(int(args.rate * args.seconds), 0, seed=2)
+    proc, port = start_server(sub, "queue")
+    wall = paced(port, "/webhook/printify", steady, args.rate)
+    processed = sum(1 for _ in processing_lag(sub))
+    drain(sub)
+    proc.terminate()
+    proc.wait()
+    lag = processing_lag(sub)
+    print(f"{'sustained':<14} {len(steady)} webhooks at {args.rate:g}/s for "
+          f"{wall:.1f} s: {processed} processed before the last ack; wait "
+          f"p50 {statistics.median(lag):.2f} s  max {lag[-1]:.2f} s")
+
+    sub = os.path.join(work, "crash")
+    proc, port = start_server(sub, "queue")
+    wall, lat, codes = load(port, "/webhook/printify", bodies,
+                            args.concurrency)
+    proc.send_signal(signal.SIGKILL)
+    proc.wait()
+    acked = drain(sub, 0)[2]
+    proc, port = start_server(sub, "queue")
+    seconds, ok, counts = drain(sub)
+    proc.terminate()
+    proc.wait()
+    rows_, distinct = ledger_orders(sub)
+    print(f"{'crash':<14} {codes.get(200, 0)} acked, killed with {acked}; "
+          f"after restart {counts} in {seconds:.1f} s; ledger {rows_} rows, "
+          f"{distinct} distinct of {unique} orders")
+
+    sub = os.path.join(work, "concurrent")
+    env = work_env(sub)
+    t = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", RACE, str(args.racers), str(args.race)],
+        cwd=sub, env=env, capture_output=True, text=True,
+        check=True).stdout.split()
+    notified, distinct = int(out[-2]), int(out[-1])
+    rows_, _ = ledger_orders(sub)
+    print(f"{'concurrent':<14} {args.racers} callers x {args.race} orders in "
+          f"{time.perf_counter() - t:.1f} s: {notified} notifications for "
+          f"{distinct} orders ({'ok' if notified == args.race else 'DUPLICATES'}"
+          f"); ledger {rows_} rows")
+    return 0 if notified == args.race else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
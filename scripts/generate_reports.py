@@ -4,8 +4,12 @@ Generate two PDFs from DailyReport/out/connector_results.json:
   1) DD-MM-YYYY summary report.pdf    (encrypted with passcode 'MY OG')
   2) DD-MM-YYYY invoices.pdf          (not encrypted)
 
+Each run's results are recorded in stream_history, and the summary ends
+with 7/30/365-day earnings trends and sparklines read back from it.
+
 Requirements:
-  pip install reportlab PyPDF2
+  pip install reportlab PyPDF2 fpdf cryptography pycryptodome
+  (AES-256 encryption runs through report_engine / pdf_crypt)
 
 Usage:
   python3 scripts/generate_reports.py
@@ -20,13 +24,21 @@ from pathlib import Path
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
-from PyPDF2 import PdfReader, PdfWriter
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import report_cache  # noqa: E402
+import stream_history  # noqa: E402
+from report_engine import Job, get_engine  # noqa: E402
+
 OUT = ROOT / "DailyReport" / "out"
 OUT.mkdir(parents=True, exist_ok=True)
 
 PASSCODE = "MY OG"  # per your saved memory
+# bump when make_summary_pdf / make_invoices_pdf or the encryption change
+# (cache key part)
+TEMPLATE_VERSION = 3
 
 
 def load_results():
@@ -41,9 +53,26 @@ def load_results():
         return None
 
 
-def make_summary_pdf(summary_path, results):
+def draw_sparkline(c, x, y, w, h, values):
+    """Polyline of values scaled into the w x h box with its bottom at y."""
+    if len(values) < 2:
+        return
+    lo, hi = min(values), max(values)
+    scale = h / (hi - lo) if hi > lo else 0
+    step = w / (len(values) - 1)
+    path = c.beginPath()
+    path.moveTo(x, y + (values[0] - lo) * scale)
+    for i, v in enumerate(values[1:], 1):
+        path.lineTo(x + i * step, y + (v - lo) * scale)
+    c.setLineWidth(0.8)
+    c.drawPath(path, stroke=1, fill=0)
+    c.setLineWidth(1)
+
+
+def make_summary_pdf(summary_path, results, trends=()):
     """
-    Creates a neat summary PDF listing each connector, status, and earnings.
+    Creates a neat summary PDF listing each connector, status, and earnings,
+    then the stream_history trends.
     """
     try:
         c = canvas.Canvas(str(summary_path), pagesize=A4)
@@ -95,6 +124,22 @@ def make_summary_pdf(summary_path, results):
         c.setFont("Helvetica-Bold", 12)
         c.drawString(x, y - 4 * mm, "TOTAL")
         c.drawRightString(x + 150 * mm, y - 4 * mm, str(int(total)))
+        y -= 16 * mm
+
+        # Trends
+        if trends:
+            if y < 30 * mm + 8 * mm * len(trends):
+                c.showPage()
+                y = height - margin
+            c.setFont("Helvetica-Bold", 11)
+            c.drawString(x, y, "Trends")
+            y -= 7 * mm
+            c.setFont("Helvetica", 10)
+            for t in trends:
+                c.drawString(x, y, stream_history.trend_line(t))
+                draw_sparkline(c, x + 110 * mm, y - 1 * mm, 40 * mm, 4 * mm,
+                               stream_history.buckets(t.series, 52))
+                y -= 7 * mm
         c.showPage()
         c.save()
         return True
@@ -154,21 +199,6 @@ def make_invoices_pdf(invoices_path, results):
         return False
 
 
-def encrypt_pdf(in_path, out_path, password):
-    try:
-        reader = PdfReader(str(in_path))
-        writer = PdfWriter()
-        for p in reader.pages:
-            writer.add_page(p)
-        writer.encrypt(user_pwd=password, owner_pwd=None, use_128bit=True)
-        with open(out_path, "wb") as f:
-            writer.write(f)
-        return True
-    except Exception as e:
-        print("Error encrypting PDF:", e)
-        return False
-
-
 def main():
     results = load_results()
     if results is None:
@@ -181,27 +211,41 @@ def main():
     summary_final = OUT / summary_name
     invoices_final = OUT / invoices_name
 
-    ok1 = make_summary_pdf(summary_tmp, results)
-    if not ok1:
-        print("Failed to create summary PDF")
-        return 2
-
-    ok2 = make_invoices_pdf(invoices_final, results)
-    if not ok2:
-        print("Failed to create invoices PDF")
-        return 2
+    try:
+        history = stream_history.open_history()
+        history.record_results(results)
+        trends = history.trends()
+    except Exception as e:
+        print("Stream history unavailable, no trends:", e)
+        trends = []
 
-    # Encrypt the summary (write to final)
-    enc_ok = encrypt_pdf(summary_tmp, summary_final, PASSCODE)
-    # cleanup tmp
+    # Both PDFs render in parallel; the summary is encrypted to its final
+    # name as soon as it is rendered (the tmp file is removed). The same
+    # connector results on the same day come straight from report_cache.
+    key = report_cache.key(results, date_str, TEMPLATE_VERSION)
+    summary_ok, invoices_ok = get_engine().run([
+        Job(make_summary_pdf, (results, trends),
+            str(summary_tmp),
+            password=PASSCODE,
+            locked_path=str(summary_final),
+            kind="report",
+            cache_key=report_cache.key(key, trends)),
+        Job(make_invoices_pdf, (results, ),
+            str(invoices_final),
+            kind="invoice",
+            cache_key=key),
+    ])
     try:
         if summary_tmp.exists():
             summary_tmp.unlink()
     except Exception:
         pass
 
-    if not enc_ok:
-        print("Failed to encrypt summary PDF")
+    if not summary_ok:
+        print("Failed to create or encrypt summary PDF")
+        return 2
+    if not invoices_ok:
+        print("Failed to create invoices PDF")
         return 2
 
     print("Generated files:")
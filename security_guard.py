@@ -28,11 +28,13 @@ import os
 import time
 import uuid
 import json
-import smtplib
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import Callable, Any, Optional, Tuple, Dict
 
+import mail_outbox
+import mail_service
 # import your token manager
 from token_manager import get_token
 
@@ -65,43 +67,46 @@ def append_audit(entry: dict):
         f.write(entry_line + "\n")
 
 
-def send_alert(subject: str, body: str):
-    """Send an alert: prefer webhook if configured, else fall back to SMTP email when available."""
+_webhook_pool = ThreadPoolExecutor(max_workers=2,
+                                   thread_name_prefix="alert-webhook")
+
+
+def _audit_alert_failure(row: dict, error: str):
+    # last-resort: append to audit log
+    append_audit({
+        "t": iso_now(),
+        "type": "alert_failure",
+        "error": error,
+        "subject": row["subject"]
+    })
 
-    # non-blocking
-    def _send():
-        payload = {"time": iso_now(), "subject": subject, "body": body}
-        # webhook if configured
-        if ALERT_WEBHOOK:
+
+def send_alert(subject: str, body: str):
+    """Send an alert to the webhook and/or by email, whichever are configured."""
+
+    # email: a row in the durable outbox, delivered (retried, deduplicated,
+    # digested) by its worker; a final failure goes to the audit log
+    if SMTP_SERVER and SMTP_USER and SMTP_PASS and ALERT_EMAIL_TO:
+        recipients = [r.strip() for r in ALERT_EMAIL_TO.split(",") if r.strip()]
+        outbox = mail_outbox.get_outbox()
+        outbox.on_failure(_audit_alert_failure)
+        outbox.alert(
+            mail_service.Account(SMTP_SERVER, SMTP_PORT, SMTP_USER,
+                                 SMTP_PASS), ALERT_EMAIL_FROM or SMTP_USER,
+            recipients, subject, body)
+
+    # webhook if configured (non-blocking, on a bounded pool)
+    if ALERT_WEBHOOK:
+
+        def _post():
+            payload = {"time": iso_now(), "subject": subject, "body": body}
             try:
                 import requests
                 requests.post(ALERT_WEBHOOK, json=payload, timeout=10)
             except Exception as e:
-                # fallback to email below
                 pass
 
-        # fallback: SMTP if configured
-        if SMTP_SERVER and SMTP_USER and SMTP_PASS and ALERT_EMAIL_TO:
-            try:
-                recipients = [
-                    r.strip() for r in ALERT_EMAIL_TO.split(",") if r.strip()
-                ]
-                msg = f"From: {ALERT_EMAIL_FROM}\r\nTo: {', '.join(recipients)}\r\nSubject: {subject}\r\n\r\n{body}"
-                s = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=10)
-                s.starttls()
-                s.login(SMTP_USER, SMTP_PASS)
-                s.sendmail(ALERT_EMAIL_FROM, recipients, msg)
-                s.quit()
-            except Exception as e:
-                # last-resort: append to audit log
-                append_audit({
-                    "t": iso_now(),
-                    "type": "alert_failure",
-                    "error": str(e),
-                    "subject": subject
-                })
-
-    threading.Thread(target=_send, daemon=True).start()
+        _webhook_pool.submit(_post)
 
 
 # ---------- SecurityGuard ----------
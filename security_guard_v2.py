@@ -8,9 +8,11 @@ Adds:
  - CLI-friendly list/approve/deny commands
 """
 
-import os, json, time, uuid, threading, smtplib
+import os, json, time, uuid, threading
 from datetime import datetime, timezone
 from typing import Any, Callable, Dict, Optional, Tuple
+import mail_outbox
+import mail_service
 from token_manager import get_token
 
 # ---------------- Configuration ----------------
@@ -40,21 +42,19 @@ def append_jsonl(path: str, data: dict):
         f.write(json.dumps(data, ensure_ascii=False) + "\n")
 
 
+def audit_alert_failure(row: dict, err: str):
+    append_jsonl(AUDIT_FILE, {"t": iso_now(), "type": "alert_fail", "err": err})
+
+
 def send_email_alert(subj: str, body: str):
+    """Queue an alert email in the durable outbox (mail_outbox); a final
+    delivery failure is written to the audit file."""
     if not (SMTP_SERVER and ALERT_EMAIL_TO and SMTP_USER and SMTP_PASS): return
-    try:
-        s = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=10)
-        s.starttls()
-        s.login(SMTP_USER, SMTP_PASS)
-        msg = f"From:{ALERT_EMAIL_FROM}\r\nTo:{ALERT_EMAIL_TO}\r\nSubject:{subj}\r\n\r\n{body}"
-        s.sendmail(ALERT_EMAIL_FROM, [ALERT_EMAIL_TO], msg)
-        s.quit()
-    except Exception as e:
-        append_jsonl(AUDIT_FILE, {
-            "t": iso_now(),
-            "type": "alert_fail",
-            "err": str(e)
-        })
+    outbox = mail_outbox.get_outbox()
+    outbox.on_failure(audit_alert_failure)
+    outbox.alert(
+        mail_service.Account(SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS),
+        ALERT_EMAIL_FROM or SMTP_USER, [ALERT_EMAIL_TO], subj, body)
 
 
 # ---------------- Persistent store ----------------
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+smtp_stream.py
+Send mail with attachments streamed from disk.
+
+EmailMessage.add_attachment() + send_message() hold the file, its base64
+form and the flattened message in memory at once (about 3.7x the file).
+Here the message is produced as a sequence of byte chunks and written to
+the SMTP DATA stream as it is produced: headers and the text part come from
+the email package, each attachment is read and base64-encoded BLOCK bytes at
+a time, so memory stays flat whatever the attachment sizes.
+
+    chunks = smtp_stream.message_chunks(
+        "JRAVIS BOT <bot@x>", ["me@x"], "Backup", "text...",
+        attachments=["cloud_backups/snapshots/2025-10-20_23-30-00.json"])
+    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
+        smtp.login(user, password)
+        smtp_stream.send(smtp, user, ["me@x"], chunks)
+
+encoded_size() gives what an attachment will weigh in the message, for
+checking against a size cap before deciding to attach it. attachment_part()
+encodes one attachment up front, for callers that send the same file in
+several messages and keep the encoded part (message_chunks(parts=...)).
+"""
+
+import base64
+import mimetypes
+import os
+import smtplib
+import uuid
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formatdate, make_msgid
+
+# 57 raw bytes -> one 76-char base64 line; BLOCK is a whole number of lines
+LINE_BYTES = 57
+BLOCK = LINE_BYTES * 1024 * 16
+
+
+def encoded_size(path):
+    """Bytes path takes as a base64 attachment body (CRLF lines)."""
+    full, rest = divmod(os.path.getsize(path), LINE_BYTES)
+    return full * 78 + (4 * -(-rest // 3) + 2 if rest else 0)
+
+
+def _b64_lines(data):
+    for i in range(0, len(data), LINE_BYTES):
+        yield base64.b64encode(data[i:i + LINE_BYTES]) + b"\r\n"
+
+
+def _b64(data):
+    return b"".join(_b64_lines(data))
+
+
+def _part_header(content_type, disposition=None):
+    head = (f"Content-Type: {content_type}\r\n"
+            f"Content-Transfer-Encoding: base64\r\n")
+    if disposition:
+        head += f"Content-Disposition: {disposition}\r\n"
+    return (head + "\r\n").encode("ascii")
+
+
+def _filename(name):
+    try:
+        name.encode("ascii")
+    except UnicodeEncodeError:
+        from email.utils import encode_rfc2231
+        return f"attachment; filename*={encode_rfc2231(name, 'utf-8')}"
+    return 'attachment; filename="%s"' % name.replace('"', "")
+
+
+def _attachment_header(name):
+    ctype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return _part_header(ctype, _filename(name))
+
+
+def attachment_part(name, data):
+    """One attachment as a complete encoded MIME part (headers + base64)."""
+    return _attachment_header(name) + _b64(data)
+
+
+def message_chunks(from_addr, to_addrs, subject, text, attachments=(),
+                   headers=None, subtype="plain", parts=()):
+    """
+    Yield the message as CRLF-terminated byte chunks. attachments are paths
+    or (filename, path) pairs, read lazily while the chunks are consumed;
+    parts are attachment_part() results, added after them. subtype="html"
+    sends text as HTML.
+    """
+    boundary = f"=_jravis_{uuid.uuid4().hex}"
+    head = EmailMessage(policy=SMTP)
+    head["From"] = from_addr
+    head["To"] = ", ".join(to_addrs)
+    head["Subject"] = subject
+    head["Date"] = formatdate(localtime=True)
+    head["Message-ID"] = make_msgid()
+    for k, v in (headers or {}).items():
+        head[k] = v
+    head["MIME-Version"] = "1.0"
+    head["Content-Type"] = f'multipart/mixed; boundary="{boundary}"'
+    # folded one by one: as_bytes() would close the (still empty) multipart
+    yield b"".join(SMTP.fold_binary(k, v) for k, v in head.items()) + b"\r\n"
+
+    sep = f"--{boundary}\r\n".encode("ascii")
+    yield sep + _part_header(f'text/{subtype}; charset="utf-8"')
+    yield _b64(text.encode("utf-8"))
+
+    for item in attachments:
+        name, path = item if isinstance(item, tuple) else (
+            os.path.basename(item), item)
+        yield sep + _attachment_header(name)
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(BLOCK), b""):
+                yield _b64(block)
+    for part in parts:
+        yield sep + part
+    yield f"--{boundary}--\r\n".encode("ascii")
+
+
+def send(smtp, from_addr, to_addrs, chunks):
+    """
+    Send pre-built message chunks over a logged-in smtplib connection.
+    Base64 bodies never start a line with ".", and neither do the headers,
+    so no dot-stuffing is needed.
+    """
+    smtp.ehlo_or_helo_if_needed()
+    code, resp = smtp.mail(from_addr)
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    refused = {}
+    for rcpt in to_addrs:
+        code, resp = smtp.rcpt(rcpt)
+        if code not in (250, 251):
+            refused[rcpt] = (code, resp)
+    if len(refused) == len(to_addrs):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, resp = smtp.docmd("data")
+    if code != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, resp)
+    for chunk in chunks:
+        smtp.send(chunk)
+    smtp.send(b".\r\n")
+    code, resp = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
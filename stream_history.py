@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+stream_history.py
+Per-stream daily earnings and status history, for trends and sparklines.
+
+Summary reports used to show only the current snapshot (connector_results.json,
+read_memory()); a trend would have meant re-reading every old JSON or PDF.
+Each run now records its snapshot here (SQLite, HISTORY_DB):
+
+  stream_days  (day, stream) -> earnings, status
+               WITHOUT ROWID, clustered on the day number (date.toordinal()),
+               so any window is one contiguous range scan
+
+and report builders read columns back as arrays: daily_series() returns one
+dense array('d') per window (days without data are 0), and trends() gets the
+7/30/365-day totals plus the previous period of each from prefix sums over
+that single array. A two-year window is ~730 rows per stream; reading and
+folding it takes a few milliseconds.
+
+pandas is a dependency of this tree (send_daily_report, auto_invoice_bot),
+but the per-day SUM/GROUP BY already runs in SQLite and what comes back is
+one 730-value column, so the folds stay on array/accumulate: a DataFrame
+would cost more to import and build than the prefix sums take. Callers that
+want one can wrap daily_series() in pandas.Series themselves.
+
+    import stream_history
+    hist = stream_history.open_history()
+    hist.record_results(results)              # connector_results.json shape
+    for t in hist.trends():
+        print(t.days, t.total, t.change, stream_history.sparkline(t.series))
+
+Recording the same stream twice on one day replaces that day's value (a run
+reports the day's figure so far). Older earnings come in from earnings_store
+with --backfill-earnings.
+
+  python3 stream_history.py --record DailyReport/out/connector_results.json
+  python3 stream_history.py --backfill-earnings
+  python3 stream_history.py --trends
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+from collections import namedtuple
+from datetime import date, datetime
+from itertools import accumulate
+
+HISTORY_DB = os.getenv("HISTORY_DB", "stream_history.db")
+WINDOWS = (7, 30, 365)
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stream_days (
+    day INTEGER NOT NULL,
+    stream TEXT NOT NULL,
+    earnings REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (day, stream)
+) WITHOUT ROWID;
+"""
+
+# total: sum over the last `days` days up to `end`; previous: the `days`
+# before that; change: relative change (None when previous is 0);
+# series: the daily values of the window, oldest first
+Trend = namedtuple("Trend", "days end total previous change series")
+
+
+def day_number(value=None):
+    """date.toordinal() of a date, datetime or YYYY-MM-DD string (today)."""
+    if value is None:
+        return date.today().toordinal()
+    if isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def _amount(info):
+    if isinstance(info, dict):
+        info = info.get("earnings") or info.get("amount") or 0
+    try:
+        return float(info)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class HistoryStore:
+
+    def __init__(self, path=None):
+        self.path = path or HISTORY_DB
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path,
+                                    timeout=30,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    # ---------- writing ----------
+    def record_many(self, rows):
+        """Upsert (day, stream, earnings, status) rows; returns how many."""
+        rows = [(day_number(d), str(s), float(e or 0), status or "")
+                for d, s, e, status in rows]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO stream_days (day, stream, earnings, status) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(day, stream) DO UPDATE SET "
+                "earnings = excluded.earnings, status = excluded.status", rows)
+        return len(rows)
+
+    def record(self, day, stream, earnings, status="ok"):
+        return self.record_many([(day, stream, earnings, status)])
+
+    def record_results(self, results, day=None):
+        """
+        Record one snapshot: connector_results.json ({"results": {name:
+        {"status", "earnings"|"amount"}}}) or a flat {stream: amount} dict.
+        Keys starting with "_" (e.g. "_send_now") are not streams.
+        """
+        streams = results.get("results", results)
+        if day is None and results.get("ts"):
+            day = datetime.fromtimestamp(results["ts"])
+        return self.record_many(
+            (day, name, _amount(info),
+             info.get("status", "") if isinstance(info, dict) else "ok")
+            for name, info in streams.items()
+            if not str(name).startswith("_"))
+
+    def backfill_earnings(self, store):
+        """Per-source daily sums from an earnings_store.EarningsStore."""
+        rows = store._query(
+            "SELECT date, COALESCE(NULLIF(source, ''), 'other') AS stream, "
+            "SUM(amount) AS total FROM earnings WHERE date != '' "
+            "GROUP BY date, stream")
+        return self.record_many(
+            (r["date"], r["stream"], r["total"], "ok") for r in rows)
+
+    # ---------- columns ----------
+    def daily_series(self, days, end=None, stream=None):
+        """Daily totals (all streams, or one) for `days` days up to `end`,
+        oldest first, as array('d'); missing days are 0."""
+        last = day_number(end)
+        first = last - days + 1
+        sql = ("SELECT day, SUM(earnings) FROM stream_days "
+               "WHERE day BETWEEN ? AND ?")
+        params = [first, last]
+        if stream is not None:
+            sql += " AND stream = ?"
+            params.append(stream)
+        out = array("d", bytes(8 * days))
+        with self._lock:
+            for day, total in self.conn.execute(sql + " GROUP BY day", params):
+                out[day - first] = total
+        return out
+
+    def trends(self, end=None, windows=WINDOWS, stream=None):
+        """One Trend per window, all from a single 2 x max(window) scan."""
+        last = day_number(end)
+        span = 2 * max(windows)
+        series = self.daily_series(span, last, stream)
+        prefix = list(accumulate(series, initial=0.0))
+        out = []
+        for w in windows:
+            total = prefix[span] - prefix[span - w]
+            previous = prefix[span - w] - prefix[span - 2 * w]
+            change = (total - previous) / previous if previous else None
+            out.append(Trend(w, date.fromordinal(last).isoformat(), total,
+                             previous, change, series[span - w:]))
+        return out
+
+    def stream_totals(self, days, end=None):
+        """[(stream, total, latest status)] over the window, largest first."""
+        last = day_number(end)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT stream, SUM(earnings), "
+                "  (SELECT status FROM stream_days s2 WHERE s2.stream = s.stream "
+                "   AND s2.day <= ? ORDER BY day DESC LIMIT 1) "
+                "FROM stream_days s WHERE day BETWEEN ? AND ? "
+                "GROUP BY stream ORDER BY 2 DESC",
+                (last, last - days + 1, last)).fetchall()
+        return rows
+
+    def days_recorded(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(DISTINCT day) FROM stream_days").fetchone()[0]
+
+
+# ---------- presentation ----------
+def buckets(values, n):
+    """Sum `values` into n equal-width buckets (n >= len: unchanged)."""
+    if n >= len(values):
+        return list(values)
+    prefix = list(accumulate(values, initial=0.0))
+    edges = [round(i * len(values) / n) for i in range(n + 1)]
+    return [prefix[b] - prefix[a] for a, b in zip(edges, edges[1:])]
+
+
+def sparkline(values, width=None):
+    """Unicode block sparkline ("▁▃▇█"); `width` buckets long series."""
+    values = buckets(values, width) if width else list(values)
+    if not values:
+        return ""
+    lo, hi = min(values), max(values)
+    scale = (len(SPARK_CHARS) - 1) / (hi - lo) if hi > lo else 0
+    return "".join(SPARK_CHARS[int((v - lo) * scale)] for v in values)
+
+
+def format_change(change):
+    return "n/a" if change is None else f"{change * 100:+.0f}%"
+
+
+def trend_line(trend, currency="INR"):
+    """e.g. '30 days: INR 12,340 (+8% vs previous 30)'."""
+    return (f"{trend.days} days: {currency} {trend.total:,.0f} "
+            f"({format_change(trend.change)} vs previous {trend.days})")
+
+
+def trend_fields(trends, width=52):
+    """pdf_render fields for the weekly template: trend_<n>, spark_<n>."""
+    fields = {}
+    for t in trends:
+        fields[f"trend_{t.days}"] = trend_line(t)
+        fields[f"spark_{t.days}"] = buckets(t.series, width)
+    return fields
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_history(path=None):
+    """Process-wide HistoryStore for `path`."""
+    path = path or HISTORY_DB
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = HistoryStore(path)
+        return store
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="JRAVIS stream history")
+    p.add_argument("--record", metavar="JSON",
+                   help="record a connector_results.json snapshot")
+    p.add_argument("--backfill-earnings", action="store_true",
+                   help="copy per-source daily sums from earnings_store")
+    p.add_argument("--trends", action="store_true",
+                   help="print 7/30/365-day trends")
+    args = p.parse_args(argv)
+
+    hist = open_history()
+    if args.record:
+        with open(args.record, encoding="utf-8") as fh:
+            print(f"Recorded {hist.record_results(json.load(fh))} streams")
+    if args.backfill_earnings:
+        import earnings_store
+        n = hist.backfill_earnings(earnings_store.open_store())
+        print(f"Backfilled {n} stream-days into {hist.path}")
+    if args.trends:
+        for t in hist.trends():
+            print(f"{trend_line(t):<48} {sparkline(t.series, 52)}")
+        for stream, total, status in hist.stream_totals(30):
+            print(f"  {stream:<20} {total:>12,.0f}  {status}")
+    if not (args.record or args.backfill_earnings or args.trends):
+        p.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# task_pagination.py
+"""
+Keyset (cursor) pagination helpers for the SQLite task tables.
+
+Used by jravis_dashboard_v3_1, va_bot_api_additions and mission_bridge.Bridge.
+Pages are ordered newest first by (created_at, id) and continued with a
+cursor of the form "<created_at>,<id>", so page N costs the same index seek
+as page 1 no matter how many rows sit in front of it.
+"""
+
+import heapq
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def ensure_task_indexes(conn, table: str) -> None:
+    """Create the indexes keyset pages and status filters rely on."""
+    cur = conn.cursor()
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_id "
+                f"ON {table} (created_at, id)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_status_created_id "
+                f"ON {table} (status, created_at, id)")
+    conn.commit()
+
+
+def encode_cursor(created_at: Any, row_id: Any) -> str:
+    return f"{created_at},{row_id}"
+
+
+def parse_cursor(after: Optional[str], int_ids: bool = True):
+    """Split "<created_at>,<id>" into a tuple. Raises ValueError if malformed."""
+    if not after:
+        return None
+    created_at, sep, row_id = after.rpartition(",")
+    if not sep or not created_at or not row_id:
+        raise ValueError(f"Invalid cursor: {after}")
+    return created_at, (int(row_id) if int_ids else row_id)
+
+
+def parse_limit(value: Optional[str], default: int = DEFAULT_LIMIT) -> int:
+    if value in (None, ""):
+        return default
+    return max(1, min(int(value), MAX_LIMIT))
+
+
+def parse_statuses(value: Optional[str]) -> List[str]:
+    """"queued,retry" -> ["queued", "retry"]"""
+    if not value:
+        return []
+    return [s.strip() for s in value.split(",") if s.strip()]
+
+
+def fetch_page(conn,
+               table: str,
+               columns: Sequence[str],
+               statuses: Optional[Sequence[str]] = None,
+               after: Optional[Tuple[Any, Any]] = None,
+               limit: int = DEFAULT_LIMIT) -> Tuple[List[tuple], Optional[str]]:
+    """
+    Return (rows, next_cursor) for one page of `table`, newest first.
+
+    `columns` must include created_at and id. Each status is queried on its
+    own (status, created_at, id) index range and the results merged, so a
+    multi-status filter never falls back to a full sort.
+    """
+    cols = list(columns)
+    ci, ii = cols.index("created_at"), cols.index("id")
+    select = f"SELECT {', '.join(cols)} FROM {table}"
+    order = " ORDER BY created_at DESC, id DESC LIMIT ?"
+
+    def query(where: List[str], params: List[Any]) -> List[tuple]:
+        if after is not None:
+            where = where + ["(created_at, id) < (?, ?)"]
+            params = params + list(after)
+        sql = select + (" WHERE " + " AND ".join(where) if where else "")
+        cur = conn.cursor()
+        cur.execute(sql + order, params + [limit + 1])
+        return cur.fetchall()
+
+    if not statuses:
+        rows = query([], [])
+    elif len(statuses) == 1:
+        rows = query(["status=?"], [statuses[0]])
+    else:
+        key = lambda r: (r[ci], r[ii])
+        runs = [query(["status=?"], [s]) for s in statuses]
+        rows = heapq.merge(*runs, key=key, reverse=True)
+        rows = [r for _, r in zip(range(limit + 1), rows)]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[ci], last[ii])
+    return rows, next_cursor
+
+
+def compact(columns: Sequence[str], rows: List[Sequence[Any]],
+            next_cursor: Optional[str]) -> Dict[str, Any]:
+    """Compact body: column names once, each row as a plain array."""
+    return {"cols": list(columns), "rows": [list(r) for r in rows],
+            "next": next_cursor}
@@ -2,8 +2,12 @@
 import os, threading, time, sqlite3, json, requests, traceback
 from datetime import datetime
 from flask import Flask, request, jsonify
+from flask_metrics import instrument, TimedLock
+from task_pagination import (ensure_task_indexes, fetch_page, parse_cursor,
+                             parse_limit, parse_statuses, compact)
 
 app = Flask(__name__)
+instrument(app)
 DB = os.environ.get('VADB_PATH', './vabot_tasks.db')
 SHARED_KEY = os.environ.get('SHARED_KEY', 'change-this-securely')
 JRAVIS_URL = os.environ.get('JRAVIS_URL',
@@ -12,7 +16,7 @@ MAX_WORKER_THREADS = int(os.environ.get('VABOT_WORKERS', 3))
 
 ALLOWED_TASKS = {"start_stream", "stop_stream", "collect_report", "run_phase"}
 DB_CONN = None
-DB_LOCK = threading.Lock()
+DB_LOCK = TimedLock()  # `with DB_LOCK:` blocks count as DB time in /metrics
 
 
 def now():
@@ -27,6 +31,7 @@ def init_db():
                  (id INTEGER PRIMARY KEY AUTOINCREMENT, inbound_json TEXT, status TEXT, tries INTEGER, created_at TEXT, updated_at TEXT, last_error TEXT)'''
               )
     DB_CONN.commit()
+    ensure_task_indexes(DB_CONN, 'tasks')
 
 
 init_db()
@@ -177,25 +182,36 @@ def health():
 
 
 # Example control endpoint to list tasks (for debugging)
+# ?after=<created_at,id>&status=queued,running&limit=200&format=compact
 @app.route('/api/list_tasks', methods=['GET'])
 def list_tasks():
+    try:
+        after = parse_cursor(request.args.get('after'))
+        limit = parse_limit(request.args.get('limit'), default=200)
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+    statuses = parse_statuses(request.args.get('status'))
+    cols = ('id', 'inbound_json', 'status', 'tries', 'created_at',
+            'updated_at')
     with DB_LOCK:
-        c = DB_CONN.cursor()
-        c.execute(
-            "SELECT id, inbound_json, status, tries, created_at, updated_at FROM tasks ORDER BY id DESC LIMIT 200"
-        )
-        rows = c.fetchall()
-        out = []
-        for r in rows:
-            out.append({
-                'id': r[0],
-                'task': json.loads(r[1]),
-                'status': r[2],
-                'tries': r[3],
-                'created_at': r[4],
-                'updated_at': r[5]
-            })
-    return jsonify(out), 200
+        rows, next_cursor = fetch_page(DB_CONN, 'tasks', cols, statuses,
+                                       after, limit)
+    if request.args.get('format') == 'compact':
+        return jsonify(compact(cols, rows, next_cursor)), 200
+    out = []
+    for r in rows:
+        out.append({
+            'id': r[0],
+            'task': json.loads(r[1]),
+            'status': r[2],
+            'tries': r[3],
+            'created_at': r[4],
+            'updated_at': r[5]
+        })
+    resp = jsonify(out)
+    if next_cursor:
+        resp.headers['X-Next-Cursor'] = next_cursor
+    return resp, 200
 
 
 if __name__ == '__main__':
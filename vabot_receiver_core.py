@@ -1,11 +1,13 @@
 import os
 import logging
 from flask import Flask, request, jsonify
+from flask_metrics import instrument
 
 # -----------------------------
 # Configuration
 # -----------------------------
 app = Flask(__name__)
+instrument(app)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
 
 # Shared secret key with Render bridge
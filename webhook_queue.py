@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+webhook_queue.py
+Durable ingestion queue (SQLite, WEBHOOK_QUEUE_DB) for the income_core_cloud
+webhooks.
+
+The webhook handlers used to verify, record, render the invoice and notify
+before answering, so a burst of webhooks outran the providers' timeouts and
+came back as retries. Here a handler only validates the payload and inserts
+a row (one small commit) before acking; a pool of worker threads processes
+what is queued, in batches:
+
+  - every event carries an idempotency key (platform:order_id, or the
+    transmission id for PayPal events not yet verified); an event whose key
+    is already queued, in progress or done is acked and dropped, so
+    provider retries and duplicate deliveries are processed once;
+  - rows stay in the database until processed, so a crash or a restart
+    loses nothing (what was in progress is processed again, and the ledger
+    ignores orders it already has);
+  - a handler error is retried with exponential backoff, up to RETRIES
+    attempts (Reject fails the event at once);
+  - during a burst the workers stand back (until put()s pause for
+    SETTLE_SECS, the oldest waiting event is SETTLE_MAX_SECS old, or half
+    of MAX_DEPTH is waiting), so acks do not compete with invoice
+    rendering for the CPU, while steady traffic is still processed;
+  - put() raises Full once MAX_DEPTH events are waiting, so the route can
+    answer 503 + Retry-After and the provider redelivers later, instead of
+    the backlog growing without bound.
+
+Only one process runs the workers at a time (an flock on <db>.lock); other
+processes, e.g. further gunicorn workers, only ingest, and take over if it
+exits.
+
+    queue = webhook_queue.get_queue(handler)   # handler(events) -> results
+    queue.put("printify", "printify:123", raw_body)
+
+handler gets a list of Event and returns one result per event: None when
+it is done, or the exception it failed with.
+
+  python3 webhook_queue.py --stats
+  python3 webhook_queue.py --failed          # list failed events
+  python3 webhook_queue.py --requeue-failed
+
+scripts/bench_webhooks.py drives the income_core_cloud routes with a local
+load generator.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one process assumed
+    fcntl = None
+
+QUEUE_DB = os.getenv("WEBHOOK_QUEUE_DB", "webhook_queue.db")
+WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+BATCH = int(os.getenv("WEBHOOK_BATCH", "50"))
+MAX_DEPTH = int(os.getenv("WEBHOOK_MAX_DEPTH", "10000"))
+RETRIES = int(os.getenv("WEBHOOK_RETRIES", "5"))
+BACKOFF = float(os.getenv("WEBHOOK_BACKOFF", "5"))
+BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "600"))
+# workers start on a burst once put()s pause this long (or it grows deep)
+SETTLE_SECS = float(os.getenv("WEBHOOK_SETTLE_SECS", "0.05"))
+SETTLE_MAX_SECS = float(os.getenv("WEBHOOK_SETTLE_MAX_SECS", "1"))
+DEPTH_SECS = 0.5  # how stale put()'s view of the queue depth may be
+POLL_SECS = float(os.getenv("WEBHOOK_POLL", "1"))  # rows from others
+KEEP_DAYS = float(os.getenv("WEBHOOK_KEEP_DAYS", "7"))  # dedup window
+EXIT_SECS = float(os.getenv("WEBHOOK_EXIT_SECS", "10"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    headers TEXT NOT NULL DEFAULT '{}',
+    created REAL NOT NULL,
+    due REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    error TEXT,
+    done REAL
+);
+CREATE INDEX IF NOT EXISTS idx_events_due ON events (status, due);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_events_key ON events (key)
+    WHERE status != 'failed';
+"""
+
+Event = namedtuple("Event", "id source key payload headers attempts")
+
+
+class Full(Exception):
+    """More than max_depth events are waiting."""
+
+
+class Reject(Exception):
+    """Raised (or returned) by a handler for an event that will never
+    succeed; it fails without retries."""
+
+
+def log(msg):
+    print(f"[webhook_queue] {msg}", file=sys.stderr)
+
+
+class WebhookQueue:
+
+    def __init__(self, handler, path=None, workers=None, batch=None,
+                 max_depth=None, retries=None, backoff=None, poll=None,
+                 settle=None, settle_max=None):
+        self.handler = handler
+        self.path = path or QUEUE_DB
+        self.workers = WORKERS if workers is None else workers
+        self.batch = batch or BATCH
+        self.max_depth = MAX_DEPTH if max_depth is None else max_depth
+        self.retries = RETRIES if retries is None else retries
+        self.backoff = BACKOFF if backoff is None else backoff
+        self.poll = POLL_SECS if poll is None else poll
+        self.settle = SETTLE_SECS if settle is None else settle
+        self.settle_max = SETTLE_MAX_SECS if settle_max is None else settle_max
+        self.accepted = self.duplicates = self.rejected = 0
+        self.processed = self.failed_count = self.retried = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # a commit is durable against process crashes without an fsync
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._depth, self._counted = self._count_waiting(), time.monotonic()
+        self._last_put = 0.0
+        self._waiting_since = None  # first put() since the queue ran empty
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params)
+
+    def _count_waiting(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM events WHERE status IN "
+                "('queued', 'working')").fetchone()[0]
+
+    # ---------- ingestion ----------
+    def put(self, source, key, payload, headers=None):
+        """
+        Queue one event; returns its row id, or None when an event with
+        the same key is already queued, in progress or done. Raises Full
+        while max_depth events are waiting.
+        """
+        if self.max_depth:
+            if time.monotonic() - self._counted > DEPTH_SECS:
+                self._depth = self._count_waiting()
+                self._counted = time.monotonic()
+            if self._depth >= self.max_depth:
+                self.rejected += 1
+                raise Full(f"{self._depth} webhook events waiting")
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        now = time.time()
+        cur = self._write(
+            "INSERT OR IGNORE INTO events (source, key, payload, headers, "
+            "created, due) VALUES (?, ?, ?, ?, ?, ?)",
+            (source, key, payload, json.dumps(headers or {}), now, now))
+        if not cur.rowcount:
+            self.duplicates += 1
+            return None
+        self.accepted += 1
+        self._depth += 1  # approximate until the next count
+        self._last_put = time.monotonic()
+        if self._waiting_since is None:
+            self._waiting_since = self._last_put
+        if not self._threads:
+            self.start()
+        with self._wake:
+            self._wake.notify()
+        return cur.lastrowid
+
+    # ---------- processing ----------
+    def start(self):
+        """Start processing (put() does this on first use); the workers run
+        once this process holds the queue's lock."""
+        with self._lock:
+            if self._threads or self._stop.is_set():
+                return
+            t = threading.Thread(target=self._serve, daemon=True,
+                                 name="webhook-queue")
+            self._threads.append(t)
+            t.start()
+
+    def _hold(self):
+        """Block until this process is the queue's processor; returns the
+        lock file (None without fcntl), or False once stopped."""
+        if fcntl is None:
+            return None
+        fh = open(f"{self.path}.lock", "a")
+        while not self._stop.is_set():
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fh
+            except OSError:
+                self._stop.wait(self.poll)
+        fh.close()
+        return False
+
+    def _serve(self):
+        lock = self._hold()
+        if lock is False:
+            return
+        try:
+            # whatever the previous processor had in hand when it died
+            n = self._write("UPDATE events SET status = 'queued' "
+                            "WHERE status = 'working'").rowcount
+            if n:
+                log(f"requeued {n} event(s) left in progress")
+            workers = [
+                threading.Thread(target=self._run, daemon=True,
+                                 name=f"webhook-worker-{i}")
+                for i in range(1, max(1, self.workers))
+            ]
+            for t in workers:
+                t.start()
+            self._run()
+            for t in workers:
+                t.join()
+        finally:
+            if lock:
+                lock.close()  # releases the flock
+
+    def _claim(self):
+        """Take up to `batch` due events for this worker."""
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT id, source, key, payload, headers, attempts "
+                "FROM events WHERE status = 'queued' AND due <= ? "
+                "ORDER BY id LIMIT ?", (time.time(), self.batch)).fetchall()
+            if rows:
+                self.conn.execute(
+                    f"UPDATE events SET status = 'working' "
+                    f"WHERE id IN ({','.join('?' * len(rows))})",
+                    [r["id"] for r in rows])
+        return [Event(r["id"], r["source"], r["key"], r["payload"],
+                      json.loads(r["headers"]), r["attempts"]) for r in rows]
+
+    def _next_due(self):
+        row = self._query("SELECT MIN(due) FROM events "
+                          "WHERE status = 'queued'")[0]
+        return row[0]
+
+    def _run(self):
+        while not self._stop.is_set():
+            # let a burst be acked first: wait for a pause in put()s, unless
+            # events have waited settle_max or the backlog is half way to
+            # max_depth
+            now = time.monotonic()
+            quiet = self._last_put + self.settle - now
+            since = self._waiting_since
+            if (quiet > 0 and (since is None or now - since < self.settle_max)
+                    and not (self.max_depth
+                             and self._depth * 2 >= self.max_depth)):
+                self._stop.wait(min(quiet, self.settle_max))
+                continue
+            try:
+                events = self._claim()
+                if not events:
+                    self._waiting_since = None
+                    due = self._next_due()
+                    wait = self.poll if due is None else min(
+                        self.poll, max(0.0, due - time.time()))
+                    with self._wake:
+                        self._wake.wait(wait)
+                    continue
+                self._finish(events, self._handle(events))
+                self._prune()
+            except sqlite3.Error as e:
+                log(f"database error, retrying: {e}")
+                self._stop.wait(self.poll)
+
+    def _handle(self, events):
+        try:
+            results = list(self.handler(events))
+            if len(results) != len(events):
+                raise ValueError(f"handler returned {len(results)} results "
+                                 f"for {len(events)} events")
+            return results
+        except Exception as e:
+            log(f"handler failed on {len(events)} event(s): {e}")
+            return [e] * len(events)
+
+    def _finish(self, events, results):
+        now = time.time()
+        done, updates = [], []
+        for event, error in zip(events, results):
+            if error is None:
+                done.append(event.id)
+                continue
+            attempts = event.attempts + 1
+            if attempts >= self.retries or isinstance(error, Reject):
+                updates.append(("failed", attempts, str(error), now, now,
+                                event.id))
+                self.failed_count += 1
+                log(f"giving up on {event.key} after {attempts} "
+                    f"attempt(s): {error}")
+            else:
+                delay = min(BACKOFF_MAX, self.backoff * 2**(attempts - 1))
+                updates.append(("queued", attempts, str(error), now + delay,
+                                None, event.id))
+                self.retried += 1
+        with self._lock, self.conn:
+            if done:
+                self.conn.execute(
+                    f"UPDATE events SET status = 'done', attempts = "
+                    f"attempts + 1, error = NULL, done = ? "
+                    f"WHERE id IN ({','.join('?' * len(done))})",
+                    (now, *done))
+            self.conn.executemany(
+                "UPDATE events SET status = ?, attempts = ?, error = ?, "
+                "due = ?, done = ? WHERE id = ?", updates)
+        self.processed += len(done)
+
+    def _prune(self):
+        self._write(
+            "DELETE FROM events WHERE status IN ('done', 'failed') "
+            "AND done < ?", (time.time() - KEEP_DAYS * 86400, ))
+
+    # ---------- housekeeping ----------
+    def counts(self):
+        """{status: rows}"""
+        return {r[0]: r[1] for r in self._query(
+            "SELECT status, COUNT(*) FROM events GROUP BY status")}
+
+    def failed(self, limit=50):
+        return [dict(r) for r in self._query(
+            "SELECT id, source, key, attempts, error, done FROM events "
+            "WHERE status = 'failed' ORDER BY id DESC LIMIT ?", (limit, ))]
+
+    def requeue_failed(self):
+        """Put failed events back in the queue; returns how many."""
+        return self._write(
+            "UPDATE OR IGNORE events SET status = 'queued', attempts = 0, "
+            "due = ? WHERE status = 'failed'", (time.time(), )).rowcount
+
+    def drain(self, timeout=None):
+        """Wait until nothing due is queued or in progress; returns False on
+        timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            left = self._query(
+                "SELECT COUNT(*) FROM events WHERE (status = 'queued' AND "
+                "due <= ?) OR status = 'working'", (time.time(), ))[0][0]
+            if not left:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def close(self, timeout=0):
+        """Stop the workers, after up to `timeout` seconds of draining.
+        Whatever is still queued is processed after the next start."""
+        if timeout and self._threads:
+            self.drain(timeout)
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for t in self._threads:
+            t.join(10)
+        with self._lock:
+            self.conn.close()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(handler, **options):
+    """The process-wide WebhookQueue (handler and options apply on first
+    use), drained for up to EXIT_SECS at exit."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WebhookQueue(handler, **options)
+            atexit.register(_queue.close, EXIT_SECS)
+        return _queue
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="JRAVIS webhook queue")
+    p.add_argument("--db", default=QUEUE_DB)
+    p.add_argument("--stats", action="store_true")
+    p.add_argument("--failed", action="store_true")
+    p.add_argument("--requeue-failed", action="store_true")
+    args = p.parse_args(argv)
+    queue = WebhookQueue(None, args.db)
+    if args.stats or not (args.failed or args.requeue_failed):
+        print(json.dumps(queue.counts(), indent=2))
+    if args.failed:
+        for row in queue.failed():
+            print(f"#{row['id']} {row['key']} x{row['attempts']}: "
+                  f"{row['error']}")
+    if args.requeue_failed:
+        print(f"Requeued {queue.requeue_failed()} event(s); they are "
+              f"processed by the next income_core_cloud start.")
+    queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
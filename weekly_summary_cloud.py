@@ -3,8 +3,8 @@
 weekly_summary_cloud.py
 
 Purpose:
-- Gather last 7 days of PDFs (reports & invoices)
-- Merge into a single Weekly Summary PDF
+- Gather last 7 days of PDFs (reports & invoices) from report_catalog
+- Merge into a single Weekly Summary PDF behind a cover page
 - Encrypt summary (if LOCK_CODE provided)
 - Email the summary + invoices to RECEIVER_EMAIL
 - Backup all involved files into /backups/week_<YYYY-MM-DD>/
@@ -17,17 +17,22 @@ Usage:
     python weekly_summary_cloud.py
 """
 
+import io
 import os
 import sys
 import argparse
-import smtplib
 import shutil
 import schedule
 import time
 import pytz
 from datetime import datetime, timedelta
-from email.message import EmailMessage
-from PyPDF2 import PdfReader, PdfWriter
+
+import mail_service
+import pdf_crypt
+import pdf_merge
+import pdf_render
+import report_catalog
+import stream_history
 
 # -------------------------
 # Configuration (env / defaults)
@@ -43,9 +48,9 @@ BACKUP_ROOT = os.path.join(WORK_DIR, "backups")
 LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "7"))
 IST = pytz.timezone("Asia/Kolkata")
 
-# Filenames pattern expectations (adjust if you use different names)
-# This script relies on file mtimes rather than strict filename date parsing.
-VALID_EXTS = (".pdf", )
+# Catalog kinds gathered into the weekly summary (the weekly summaries
+# themselves are catalogued as "weekly" and left out).
+SOURCE_KINDS = ("report", "invoice")
 
 # Output weekly summary name
 WEEKLY_SUMMARY_NAME = "weekly_summary.pdf"
@@ -62,87 +67,75 @@ def log(*args, **kwargs):
 
 def find_files_modified_within(days=7, root=WORK_DIR):
     """
-    Return list of file paths with PDF extension modified within last `days`.
+    Return catalogued report/invoice PDFs under `root` modified within the
+    last `days`. Looks them up in report_catalog (one indexed range query)
+    instead of walking the tree; run `python3 report_catalog.py --reindex`
+    once to pick up PDFs written before the catalog existed.
     """
-    now = datetime.now()
-    cutoff = now - timedelta(days=days)
-    found = []
-    for dirpath, _, filenames in os.walk(root):
-        # skip backup folder to avoid recursion
-        if os.path.abspath(dirpath).startswith(os.path.abspath(BACKUP_ROOT)):
-            continue
-        for fn in filenames:
-            if not fn.lower().endswith(VALID_EXTS):
-                continue
-            path = os.path.join(dirpath, fn)
-            try:
-                mtime = datetime.fromtimestamp(os.path.getmtime(path))
-            except Exception:
-                continue
-            if mtime >= cutoff:
-                found.append(path)
-    return sorted(found)
+    return sorted(
+        report_catalog.find_within(days, kinds=SOURCE_KINDS, root=root))
 
 
 def merge_pdfs(pdf_paths, out_path):
-    """Merge PDFs in given order into out_path"""
-    writer = PdfWriter()
-    for p in pdf_paths:
-        try:
-            reader = PdfReader(p)
-            for page in reader.pages:
-                writer.add_page(page)
-        except Exception as e:
-            log("Warning: failed to read PDF", p, ":", e)
-    with open(out_path, "wb") as f:
-        writer.write(f)
-    log("Merged", len(pdf_paths), "PDF(s) ->", out_path)
+    """
+    Merge PDFs in given order into out_path. Streams one input at a time and
+    shares identical fonts/resources across inputs (see pdf_merge.py), so
+    memory stays flat however many PDFs the week produced.
+    """
+    writer = pdf_merge.merge_pdfs(pdf_paths, out_path, password=LOCK_CODE,
+                                  log=log)
+    log("Merged", len(pdf_paths), "PDF(s) ->", out_path, f"({writer.page_count}",
+        f"pages, {writer.deduplicated} shared objects)")
     return out_path
 
 
+def weekly_cover(pdf_paths, week_ending):
+    """
+    First page of the weekly summary: period, 7/30/365-day earnings trends
+    with sparklines (stream_history) and the documents included.
+    """
+    start = (datetime.now(IST) - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    try:
+        trends = stream_history.trend_fields(
+            stream_history.open_history().trends(end=week_ending))
+    except Exception as e:
+        log("Trends unavailable:", e)
+        trends = {}
+    data = pdf_render.render_bytes(
+        "weekly",
+        title="JRAVIS Weekly Summary",
+        period=f"{start} to {week_ending}",
+        headline=f"{len(pdf_paths)} document(s) included",
+        lines=[os.path.basename(p) for p in pdf_paths],
+        **trends)
+    return io.BytesIO(data)
+
+
 def encrypt_pdf(input_path, output_path, password):
-    """Encrypt input_path -> output_path with password using PyPDF2"""
-    reader = PdfReader(input_path)
-    writer = PdfWriter()
-    for page in reader.pages:
-        writer.add_page(page)
-    writer.encrypt(password)
-    with open(output_path, "wb") as f:
-        writer.write(f)
+    """Encrypt input_path -> output_path with password (AES-256, streamed)"""
+    pdf_crypt.encrypt_pdf(input_path, output_path, password)
     log("Encrypted PDF written to", output_path)
     return output_path
 
 
 def send_email(subject, body, attachments):
-    """Send email with attachments via Gmail SMTP (SSL)."""
+    """Send email with attachments via Gmail SMTP (SSL), over the shared
+    mail_service pool; attachments are streamed from disk."""
     if not SMTP_USER or not SMTP_PASS:
         raise ValueError(
             "SMTP_USER or SMTP_PASS not set. Add them to environment/secrets.")
-    msg = EmailMessage()
-    msg["From"] = f"{SENDER_NAME} <{SMTP_USER}>"
-    msg["To"] = RECEIVER_EMAIL
-    msg["Subject"] = subject
-    msg.set_content(body)
-
+    files = []
     for path in attachments:
         if not os.path.exists(path):
             log("Attachment not found, skipping:", path)
             continue
-        with open(path, "rb") as f:
-            data = f.read()
-        maintype = "application"
-        subtype = "pdf"
-        filename = os.path.basename(path)
-        msg.add_attachment(data,
-                           maintype=maintype,
-                           subtype=subtype,
-                           filename=filename)
-
-    # Send via Gmail SSL
-    log("Connecting to SMTP and sending email to", RECEIVER_EMAIL)
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(SMTP_USER, SMTP_PASS)
-        smtp.send_message(msg)
+        files.append(path)
+
+    log("Sending email to", RECEIVER_EMAIL)
+    svc = mail_service.get_service(
+        mail_service.Account("smtp.gmail.com", 465, SMTP_USER, SMTP_PASS))
+    svc.send(f"{SENDER_NAME} <{SMTP_USER}>", [RECEIVER_EMAIL], subject, body,
+             files).result()
     log("Email sent.")
 
 
@@ -190,7 +183,8 @@ def weekly_run(dry_run=False):
         except Exception:
             pass
 
-    merge_pdfs(files, merged_path)
+    merge_pdfs([weekly_cover(files, timestamp)] + files, merged_path)
+    report_catalog.register(merged_path, "weekly")
 
     final_summary_path = merged_path
 
@@ -200,6 +194,7 @@ def weekly_run(dry_run=False):
         encrypted_path = os.path.join(WORK_DIR, WEEKLY_SUMMARY_LOCKED)
         try:
             encrypt_pdf(merged_path, encrypted_path, LOCK_CODE)
+            report_catalog.register(encrypted_path, "weekly")
             final_summary_path = encrypted_path
         except Exception as e:
             log("Error encrypting PDF:", e)